@@ -0,0 +1,142 @@
+"""
+Escrow auto-capture batch throughput.
+
+Seeds N authorized PaymentIntents in benchmarks/stripe_standin.py (with its
+latency, injected 500s and 429 rate limit) and the matching due escrow_held
+payments in an in-memory payments table, then runs AutoCaptureJob once
+through the real AsyncEscrowManager, EscrowManager retries, idempotency
+keys and client-side rate limiter. Reports captures/sec, how many
+set-based status writes recorded them, and failures by Stripe error code.
+
+Every statement costs `--statement-ms` so the numbers show batching and
+Stripe concurrency, not Postgres.
+
+Usage:
+    python benchmarks/bench_auto_capture.py --payments 2000 --concurrency 32
+    python benchmarks/bench_auto_capture.py --stripe-rate-limit 50 --client-rate-limit 45
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stripe_standin import StripeStandIn, use_standin  # noqa: E402
+from src import db as database  # noqa: E402
+from src.payments import auto_capture, escrow_state  # noqa: E402
+from src.payments.async_escrow import AsyncEscrowManager  # noqa: E402
+from src.payments.auto_capture import AutoCaptureJob  # noqa: E402
+from src.payments.escrow_manager import EscrowManager  # noqa: E402
+from src.payments.journal import EscrowJournal  # noqa: E402
+from src.payments.stripe_limiter import StripeRateLimiter  # noqa: E402
+
+
+class EscrowConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetch(self, query, *args):
+        await asyncio.sleep(self.pool.statement_seconds)
+        self.pool.statements[query] += 1
+        if query == auto_capture.DUE_CAPTURES_SQL:
+            _, after_at, after_id, limit = args
+            due = [row for row in self.pool.rows if (row["escrow_held_at"], row["id"]) > (after_at, after_id)
+                   and row["status"] == "escrow_held"]
+            return [dict(row) for row in due[:limit]]
+        if query == escrow_state.APPLY_TRANSITIONS_SQL:
+            result = []
+            for payment_id, target in zip(args[0], args[1]):
+                row = self.pool.by_id[payment_id]
+                row["status"], row["version"] = target, row["version"] + 1
+                result.append({"id": payment_id, "new_version": row["version"],
+                               "current_status": target, "current_version": row["version"]})
+            return result
+        raise AssertionError(f"unexpected query: {query}")
+
+
+class EscrowPool:
+    """Due escrow_held payments, sorted by (escrow_held_at, id)."""
+
+    def __init__(self, rows, statement_ms: float):
+        self.rows = rows
+        self.by_id = {row["id"]: row for row in rows}
+        self.statement_seconds = statement_ms / 1000
+        self.statements = {auto_capture.DUE_CAPTURES_SQL: 0, escrow_state.APPLY_TRANSITIONS_SQL: 0}
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        yield EscrowConnection(self)
+
+
+async def run(args) -> None:
+    logging.getLogger().setLevel(logging.ERROR)
+    server = StripeStandIn(args.latency, args.jitter, args.error_rate, args.stripe_rate_limit, seed=1)
+    server.start()
+    use_standin(server.url)
+
+    now = datetime.now(timezone.utc)
+    held_at = now - timedelta(days=auto_capture.AUTHORIZATION_DAYS - 1)
+    rows = sorted(
+        ({
+            "id": str(uuid.UUID(int=i + 1)), "bid_id": str(uuid.UUID(int=10 ** 9 + i)),
+            "stripe_payment_intent_id": server.add_intent(105000), "amount_cents": 105000,
+            "escrow_held_at": held_at + timedelta(seconds=i), "version": 0, "status": "escrow_held",
+        } for i in range(args.payments)),
+        key=lambda row: (row["escrow_held_at"], row["id"]),
+    )
+    pool = database.db_pool = EscrowPool(rows, args.statement_ms)
+    limiter = StripeRateLimiter(args.client_rate_limit or 1e6, burst=args.client_burst, background_reserve=0)
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        manager = EscrowManager(
+            journal=EscrowJournal(os.path.join(journal_dir, "journal.jsonl")),
+            max_attempts=args.max_attempts,
+            limiter=limiter,
+        )
+        async with AsyncEscrowManager(manager, max_concurrency=args.concurrency) as escrow:
+            job = AutoCaptureJob(escrow, page_size=args.page_size, concurrency=args.concurrency)
+            started = time.perf_counter()
+            report = await job.run(now=now)
+            elapsed = time.perf_counter() - started
+    server.stop()
+
+    stats = server.stats
+    print(f"{args.payments:,} due payments, {args.concurrency} concurrent captures, pages of {args.page_size}; "
+          f"stand-in {args.latency * 1000:.0f}±{args.jitter * 1000:.0f} ms, {args.error_rate:.1%} errors, "
+          f"limit {args.stripe_rate_limit or 'none'} req/s, client limit {args.client_rate_limit or 'none'} req/s")
+    print(f"captured {report.captured:,} of {report.selected:,} in {elapsed:.2f}s = {report.captured / elapsed:,.1f}/s "
+          f"(${report.captured_cents / 100:,.0f}); peak {server.max_in_flight} Stripe calls in flight")
+    print(f"Stripe requests {stats['requests']:,}: 429s {stats['rate_limited']:,}, 500s {stats['injected_errors']:,}, "
+          f"idempotent replays {stats['idempotent_replays']:,}; client limiter paused {limiter.throttled:,} times")
+    print(f"statements: {pool.statements[auto_capture.DUE_CAPTURES_SQL]} page selects, "
+          f"{pool.statements[escrow_state.APPLY_TRANSITIONS_SQL]} status writes ({report.statements} reported)")
+    print(f"failed {report.failed:,}, expired {report.expired:,}, not recorded {len(report.conflicts):,}; "
+          f"by code {dict(report.failures)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Escrow auto-capture batch throughput against a Stripe stand-in")
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=auto_capture.AUTO_CAPTURE_PAGE_SIZE)
+    parser.add_argument("--concurrency", type=int, default=auto_capture.AUTO_CAPTURE_CONCURRENCY)
+    parser.add_argument("--latency", type=float, default=0.2, help="stand-in seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.01, help="share of calls answered 500")
+    parser.add_argument("--stripe-rate-limit", type=float, default=None, help="stand-in req/s before 429")
+    parser.add_argument("--client-rate-limit", type=float, default=None, help="client-side Stripe req/s")
+    parser.add_argument("--client-burst", type=float, default=10.0)
+    parser.add_argument("--max-attempts", type=int, default=4)
+    parser.add_argument("--statement-ms", type=float, default=2.0, help="simulated cost of each SQL statement")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Fee economics throughput: scalar vs batch.
+
+Recomputes every economics column (src/payments/fees.py) for N synthetic
+historical transactions, once through the per-transaction scalar path and
+once through compute_fee_columns, then checks both agree to the cent and
+reports rows/sec. A second batch run applies an alternative FeePolicy, the
+what-if case finance runs when fees change.
+
+Usage:
+    python benchmarks/bench_fees.py --rows 2000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from src.payments.fees import FEE_COLUMNS, FeePolicy, compute_fee_columns, compute_fees  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scalar vs batch fee computation")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--scalar-rows", type=int, default=200_000, help="rows for the (slow) scalar pass")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    amounts = rng.integers(5_000, 2_500_000, args.rows)
+    elite = rng.random(args.rows) < 0.2
+
+    n = min(args.scalar_rows, args.rows)
+    scalar_amounts = amounts[:n].tolist()
+    scalar_tiers = np.where(elite[:n], "elite", "standard").tolist()
+    started = time.perf_counter()
+    scalar = [compute_fees(amount, tier) for amount, tier in zip(scalar_amounts, scalar_tiers)]
+    scalar_rate = n / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    columns = compute_fee_columns(amounts, elite)
+    batch_rate = args.rows / (time.perf_counter() - started)
+
+    for name in FEE_COLUMNS:
+        expected = np.fromiter((getattr(row, name) for row in scalar), dtype=np.int64, count=n)
+        if not np.array_equal(columns[name][:n], expected):
+            raise SystemExit(f"column {name} differs from scalar path")
+
+    policy = FeePolicy(standard_provider_fee=0.14, elite_provider_fee=0.11)
+    started = time.perf_counter()
+    what_if = compute_fee_columns(amounts, elite, policy)
+    what_if_rate = args.rows / (time.perf_counter() - started)
+    delta = int(what_if["net_platform_revenue"].sum() - columns["net_platform_revenue"].sum())
+
+    print(f"rows={args.rows:,} (scalar pass {n:,}); all columns match scalar to the cent")
+    print(f"{'path':<10} {'rows/s':>14}")
+    print(f"{'scalar':<10} {scalar_rate:>14,.0f}")
+    print(f"{'batch':<10} {batch_rate:>14,.0f}   ({batch_rate / scalar_rate:,.0f}x)")
+    print(f"{'what-if':<10} {what_if_rate:>14,.0f}   net revenue change {delta / 100:+,.2f} USD")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Import-time profile for the API process.
+
+Runs `python -X importtime -c "import src.main"` in fresh interpreters and
+reports the cumulative import time plus the slowest modules. Exits non-zero
+when the best run exceeds the budget or when a deferred SDK (asyncpg,
+SQLAlchemy, stripe, supabase, uvicorn) is imported eagerly, so CI can run it
+as a regression gate.
+
+Usage:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --budget-ms 600 --runs 7 --top 15
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be executed just by loading the app module. A lazy_import()
+# placeholder (src/lazy.py) sits in sys.modules until first use, so only
+# entries that are plain, executed modules count as eager.
+DEFERRED_MODULES = ("asyncpg", "sqlalchemy", "stripe", "supabase", "uvicorn")
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "800"))
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+def profile_import(target: str) -> dict:
+    """Import `target` in a fresh interpreter and parse the -X importtime log."""
+    probe = (
+        f"import sys, {target}; "
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if type(sys.modules.get(m)).__name__ == 'module'))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append((name, int(self_us), int(cumulative_us)))
+        if name == target:
+            total_us = int(cumulative_us)
+    eager = [m for m in proc.stdout.strip().split(",") if m]
+    return {"total_us": total_us, "modules": modules, "eager": eager}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import-time profile for the API process")
+    parser.add_argument("--target", default="src.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    runs = [profile_import(args.target) for _ in range(args.runs)]
+    best = min(runs, key=lambda r: r["total_us"])
+    best_ms = best["total_us"] / 1000
+
+    print(f"import {args.target}: best {best_ms:.1f} ms over {args.runs} runs "
+          f"(budget {args.budget_ms:.0f} ms)")
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    slowest = sorted(best["modules"], key=lambda m: m[1], reverse=True)[: args.top]
+    for name, self_us, cumulative_us in slowest:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}  {name}")
+
+    failed = False
+    if best["eager"]:
+        print(f"FAIL: deferred modules imported eagerly: {', '.join(best['eager'])}")
+        failed = True
+    if best_ms > args.budget_ms:
+        print(f"FAIL: import time {best_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Per-request overhead of MetricsMiddleware.
+
+Drives a trivial ASGI app directly (no server, no sockets) with and without
+the middleware and reports the difference per request, so the number is the
+middleware's own cost: context-var setup, send wrapping, histogram updates.
+
+Also renders /metrics for a registry with every API route populated, to
+show scrape cost.
+
+Usage:
+    python benchmarks/bench_metrics_overhead.py --requests 200000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.metrics import MetricsMiddleware, MetricsRegistry, record_db_time  # noqa: E402
+
+
+class _Route:
+    path = "/api/v1/requests/{request_id}/bids"
+
+
+ROUTE = _Route()
+BODY = b'{"total":null,"limit":50,"next_cursor":null,"items":[]}'
+START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+MESSAGE = {"type": "http.response.body", "body": BODY}
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = ROUTE
+    record_db_time(0.0012)
+    await send(START)
+    await send(MESSAGE)
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+def make_scope():
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/requests/7d9f2a4e-3c1b-4a5e-9f0d-2b6c8e1a4f73/bids",
+        "headers": [(b"host", b"api"), (b"accept", b"application/json")],
+    }
+
+
+async def run(app, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        await app(make_scope(), receive, send)
+    return time.perf_counter() - started
+
+
+async def main_async(count):
+    registry = MetricsRegistry()
+    wrapped = MetricsMiddleware(endpoint, registry=registry)
+    await run(endpoint, 1000)
+    await run(wrapped, 1000)
+
+    bare = min([await run(endpoint, count) for _ in range(3)])
+    instrumented = min([await run(wrapped, count) for _ in range(3)])
+    overhead_us = (instrumented - bare) / count * 1e6
+
+    print(f"requests={count}")
+    print(f"bare:         {bare / count * 1e6:8.2f} us/request")
+    print(f"instrumented: {instrumented / count * 1e6:8.2f} us/request")
+    print(f"overhead:     {overhead_us:8.2f} us/request")
+
+    for i in range(30):
+        registry.route("GET", f"/api/v1/route_{i}").duration.observe(0.01)
+    started = time.perf_counter()
+    body = registry.render()
+    print(f"/metrics render: {(time.perf_counter() - started) * 1000:.2f} ms, {len(body):,} bytes (31 routes)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MetricsMiddleware overhead")
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.requests))
+
+
+if __name__ == "__main__":
+    main()
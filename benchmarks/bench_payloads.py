@@ -0,0 +1,68 @@
+"""
+Response bytes and encode time for sparse fieldsets and compression.
+
+For one limit=1000 BidList / ProviderList page, compares the full payload
+with a mobile-style sparse fieldset, each as identity, gzip and (if the
+`brotli` package is installed) brotli, using the same code paths as the API
+(src/serialization.py, src/compression.py).
+
+Encode time is serialization plus compression per page; it excludes the
+database, so it understates the fieldset win for providers, where unrequested
+verification flags also drop three EXISTS subqueries from the SQL.
+
+Usage:
+    python benchmarks/bench_payloads.py --rows 1000 --repeat 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_serialization import bid_rows, provider_rows  # noqa: E402
+
+from src.compression import HAS_BROTLI, compress  # noqa: E402
+from src.main import BidSummary, ProviderVerification  # noqa: E402
+from src.serialization import FastJSONResponse, page_payload  # noqa: E402
+
+CASES = {
+    "BidList": (bid_rows, BidSummary, ("id", "provider_name", "amount_cents")),
+    "ProviderList": (provider_rows, ProviderVerification, ("provider_id", "name", "overall_tier")),
+}
+ENCODINGS = ("identity", "gzip") + (("br",) if HAS_BROTLI else ())
+
+
+def encode(rows, model, fields, encoding, limit):
+    body = FastJSONResponse(page_payload(rows, model, limit, None, None, fields)).body
+    return body if encoding == "identity" else compress(body, encoding)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sparse fieldset and compression savings")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"rows/page={args.rows} repeat={args.repeat} brotli={'yes' if HAS_BROTLI else 'not installed'}")
+    print(f"{'model':<13} {'fields':<7} {'encoding':<9} {'bytes':>10} {'vs full':>8} {'ms/page':>8}")
+    for name, (make_rows, model, sparse) in CASES.items():
+        rows = make_rows(args.rows)
+        full_bytes = None
+        for label, fields in (("all", None), ("sparse", sparse)):
+            for encoding in ENCODINGS:
+                body = encode(rows, model, fields, encoding, args.rows)
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    encode(rows, model, fields, encoding, args.rows)
+                elapsed = (time.perf_counter() - started) / args.repeat
+                full_bytes = full_bytes or len(body)
+                print(
+                    f"{name:<13} {label:<7} {encoding:<9} {len(body):>10,} "
+                    f"{len(body) / full_bytes:>7.1%} {elapsed * 1000:>8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
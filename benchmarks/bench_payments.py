@@ -0,0 +1,178 @@
+"""
+Escrow lifecycle throughput against the local Stripe stand-in.
+
+Drives full create -> hold -> capture -> transfer -> refund lifecycles
+through AsyncEscrowManager (the real EscrowManager, stripe SDK, journal and
+retry path) at a target rate, against benchmarks/stripe_standin.py with
+configurable latency, injected 500s and a 429 rate limit. Reports achieved
+lifecycles/sec and Stripe calls/sec, per-step and end-to-end latency
+percentiles, and what happened to every 429 and 500: retried to success, or
+exhausted max attempts and surfaced as a failed lifecycle.
+
+Load is open-loop: lifecycle i starts at i / --rate seconds and its latency
+is measured from that scheduled time, so falling behind shows up as
+latency instead of a lower offered rate. Each lifecycle is five Stripe
+calls, so the default 10 lifecycles/sec is the 50 TPS processor limit in
+docs/CAPACITY_PLAN.md.
+
+Usage:
+    python benchmarks/bench_payments.py --rate 10 --duration 20
+    python benchmarks/bench_payments.py --rate 12 --stripe-rate-limit 50 --error-rate 0.02
+    python benchmarks/bench_payments.py --rate 14 --client-rate-limit 45
+
+--client-rate-limit paces calls with src/payments/stripe_limiter.py below
+the stand-in's limit; compare its 429 and backoff counts with a run
+without it.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stripe_standin import StripeStandIn, use_standin  # noqa: E402
+from src.payments.async_escrow import AsyncEscrowManager  # noqa: E402
+from src.payments.escrow_manager import EscrowManager  # noqa: E402
+from src.payments.journal import EscrowJournal  # noqa: E402
+from src.payments.stripe_limiter import Priority, StripeRateLimiter  # noqa: E402
+
+STEPS = ("create", "hold", "capture", "transfer", "refund")
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+class RetryCounter:
+    """EscrowManager sleep hook: counts retries and time spent backing off."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.retries = 0
+        self.backoff_seconds = 0.0
+
+    def __call__(self, delay: float) -> None:
+        with self.lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+        time.sleep(delay)
+
+
+async def lifecycle(escrow: AsyncEscrowManager, i: int, latencies: Dict[str, List[float]], failures: Counter):
+    bid_id = f"bench-bid-{i}"
+    step = "create"
+    try:
+        started = time.perf_counter()
+        hold = await escrow.create_escrow(bid_id, 100000, f"cus_{i}", "acct_bench")
+        latencies["create"].append(time.perf_counter() - started)
+
+        calls = (
+            ("hold", lambda: escrow.hold_funds(hold.payment_intent_id, hold.amount_total, bid_id=bid_id)),
+            ("capture", lambda: escrow.capture_payment(hold.payment_intent_id, hold.amount_total, bid_id=bid_id)),
+            ("transfer", lambda: escrow.release_to_provider(
+                hold.payment_intent_id, "acct_bench", hold.provider_payout, hold.platform_fee, bid_id=bid_id)),
+            ("refund", lambda: escrow.initiate_refund(
+                hold.payment_intent_id, "partial", hold.amount_total // 10, bid_id=bid_id)),
+        )
+        for step, call in calls:
+            started = time.perf_counter()
+            await call()
+            latencies[step].append(time.perf_counter() - started)
+        return True
+    except ValueError as e:
+        cause = "429 rate limit" if "rate limit" in str(e).lower() else "500 api_error" if "stand-in" in str(e) \
+            else str(e)[:60]
+        failures[(step, cause)] += 1
+        return False
+
+
+async def run(args) -> None:
+    logging.getLogger().setLevel(logging.ERROR)
+    server = StripeStandIn(args.latency, args.jitter, args.error_rate, args.stripe_rate_limit, seed=1)
+    server.start()
+    use_standin(server.url)
+
+    retries = RetryCounter()
+    # Unpaced baseline: a bucket far above any rate the stand-in admits
+    limiter = StripeRateLimiter(args.client_rate_limit or 1e6, burst=args.client_burst, background_reserve=0)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    failures: Counter = Counter()
+    total = int(args.rate * args.duration)
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        manager = EscrowManager(
+            journal=EscrowJournal(os.path.join(journal_dir, "journal.jsonl")),
+            max_attempts=args.max_attempts,
+            sleep=retries,
+            limiter=limiter,
+        )
+        async with AsyncEscrowManager(manager, max_concurrency=args.concurrency) as escrow:
+            loop = asyncio.get_running_loop()
+            begin = loop.time()
+
+            async def scheduled(i: int):
+                at = begin + i / args.rate
+                await asyncio.sleep(max(0.0, at - loop.time()))
+                ok = await lifecycle(escrow, i, latencies, failures)
+                if ok:
+                    latencies["lifecycle"].append(loop.time() - at)
+
+            await asyncio.gather(*(scheduled(i) for i in range(total)))
+            elapsed = loop.time() - begin
+    server.stop()
+
+    stats = server.stats
+    succeeded = len(latencies["lifecycle"])
+    print(f"target {args.rate:g} lifecycles/s ({args.rate * len(STEPS):g} Stripe calls/s) for {args.duration:g}s; "
+          f"stand-in {args.latency * 1000:.0f}±{args.jitter * 1000:.0f} ms, {args.error_rate:.1%} errors, "
+          f"limit {args.stripe_rate_limit or 'none'} req/s; {args.concurrency} threads")
+    print(f"lifecycles: {succeeded:,} ok, {total - succeeded:,} failed   "
+          f"achieved {succeeded / elapsed:.1f}/s   Stripe calls {stats['requests'] / elapsed:.1f}/s "
+          f"(peak {server.max_in_flight} in flight)")
+    print(f"{'step':<10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for step in (*STEPS, "lifecycle"):
+        values = latencies[step]
+        print(f"{step:<10}" + "".join(f"{percentile(values, q) * 1000:>9.0f}" for q in (0.5, 0.95, 0.99))
+              + f"{max(values, default=0) * 1000:>9.0f}")
+
+    exhausted_429 = sum(n for (_, cause), n in failures.items() if cause.startswith("429"))
+    exhausted_500 = sum(n for (_, cause), n in failures.items() if cause.startswith("500"))
+    print(f"429s served {stats['rate_limited']:,}, 500s served {stats['injected_errors']:,}; "
+          f"calls that gave up after {args.max_attempts} attempts: {exhausted_429:,} on 429, {exhausted_500:,} on 500")
+    print(f"retries {retries.retries:,} (backoff {retries.backoff_seconds:.1f}s on executor threads), "
+          f"idempotent replays {stats['idempotent_replays']:,}")
+    if args.client_rate_limit:
+        queued = limiter.queue_time[Priority.INTERACTIVE], limiter.queue_time[Priority.DEFAULT]
+        print(f"client limiter {args.client_rate_limit:g} req/s: paused {limiter.throttled:,} times on 429; "
+              f"queue p95 interactive {queued[0].quantile(0.95) or 0:g}s, default {queued[1].quantile(0.95) or 0:g}s "
+              f"(bucket bounds)")
+    for (step, cause), count in failures.most_common():
+        print(f"  failed at {step}: {cause} x{count}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Escrow lifecycle throughput against a Stripe stand-in")
+    parser.add_argument("--rate", type=float, default=10.0, help="lifecycles/sec (5 Stripe calls each)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of arrivals")
+    parser.add_argument("--latency", type=float, default=0.2, help="stand-in seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.01, help="share of calls answered 500")
+    parser.add_argument("--stripe-rate-limit", type=float, default=50.0, help="stand-in req/s before 429")
+    parser.add_argument("--concurrency", type=int, default=16, help="AsyncEscrowManager threads")
+    parser.add_argument("--max-attempts", type=int, default=4)
+    parser.add_argument("--client-rate-limit", type=float, default=None, help="client-side Stripe req/s (off by default)")
+    parser.add_argument("--client-burst", type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
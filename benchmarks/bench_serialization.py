@@ -0,0 +1,145 @@
+"""
+Row-to-response serialization throughput for the list endpoints.
+
+Compares, for one limit=1000 page of bid / service-request / provider rows:
+
+- validated: Model(**row) per row, FastAPI response_model re-validation,
+             jsonable_encoder + json.dumps (the default FastAPI path)
+- construct: Model.model_construct(**row) per row, then model_dump_json
+- fast:      field projection + orjson (src/serialization.py, used by the API)
+
+Rows are plain dicts shaped like the asyncpg records returned by
+src/listings.py, so no database is needed.
+
+Usage:
+    python benchmarks/bench_serialization.py --rows 1000 --repeat 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from src.main import (  # noqa: E402
+    BidList,
+    BidSummary,
+    ProviderList,
+    ProviderVerification,
+    ServiceRequestList,
+    ServiceRequestSummary,
+)
+from src.serialization import FastJSONResponse, page_payload  # noqa: E402
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def bid_rows(n):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "request_id": str(uuid.uuid4()),
+            "provider_id": str(uuid.uuid4()),
+            "provider_name": f"Provider {i}",
+            "amount_cents": 45000 + i,
+            "timeline_days": 7,
+            "status": "pending",
+            "submitted_at": NOW - timedelta(seconds=i),
+        }
+        for i in range(n)
+    ]
+
+
+def request_rows(n):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Service Request {i}",
+            "description": "Replace water heater in basement utility room",
+            "customer_id": str(uuid.uuid4()),
+            "service_type": "plumbing",
+            "status": "open",
+            "budget_cents": 50000,
+            "created_at": NOW - timedelta(seconds=i),
+            "due_date": None,
+        }
+        for i in range(n)
+    ]
+
+
+def provider_rows(n):
+    return [
+        {
+            "provider_id": str(uuid.uuid4()),
+            "name": f"Provider {i}",
+            "status": "verified",
+            "license_verified": True,
+            "insurance_verified": True,
+            "background_check_verified": True,
+            "overall_tier": "standard",
+            "created_at": NOW - timedelta(seconds=i),
+        }
+        for i in range(n)
+    ]
+
+
+def validated(rows, item_model, list_model, limit):
+    items = [item_model(**row) for row in rows]
+    response = list_model(total=None, limit=limit, next_cursor=None, items=items)
+    # FastAPI re-validates the returned model against response_model
+    checked = TypeAdapter(list_model).validate_python(response.model_dump())
+    return json.dumps(jsonable_encoder(checked)).encode()
+
+
+def construct(rows, item_model, list_model, limit):
+    fields = tuple(item_model.model_fields)
+    items = [item_model.model_construct(**{f: row[f] for f in fields}) for row in rows]
+    return list_model.model_construct(total=None, limit=limit, next_cursor=None, items=items).model_dump_json().encode()
+
+
+def fast(rows, item_model, list_model, limit):
+    return FastJSONResponse(page_payload(rows, item_model, limit, None, None)).body
+
+
+PATHS = {"validated": validated, "construct": construct, "fast": fast}
+DATASETS = {
+    "BidList": (bid_rows, BidSummary, BidList),
+    "ServiceRequestList": (request_rows, ServiceRequestSummary, ServiceRequestList),
+    "ProviderList": (provider_rows, ProviderVerification, ProviderList),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Row serialization throughput")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"rows/page={args.rows} repeat={args.repeat}")
+    print(f"{'model':<20} {'path':<10} {'rows/sec':>12} {'ms/page':>9} {'speedup':>8}")
+    for name, (make_rows, item_model, list_model) in DATASETS.items():
+        rows = make_rows(args.rows)
+        baseline = None
+        for path_name, path in PATHS.items():
+            path(rows, item_model, list_model, args.rows)  # warm-up
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                path(rows, item_model, list_model, args.rows)
+            elapsed = time.perf_counter() - started
+            rows_per_sec = args.rows * args.repeat / elapsed
+            baseline = baseline or rows_per_sec
+            print(
+                f"{name:<20} {path_name:<10} {rows_per_sec:>12,.0f} "
+                f"{elapsed / args.repeat * 1000:>9.2f} {rows_per_sec / baseline:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Year-end 1099 job: detail streaming and file writing throughput.
+
+The totals are one GROUP BY in Postgres; what runs in Python is the detail
+stream of reportable providers and one CSV per provider. This feeds
+Tax1099Job synthetic detail rows through the same db.stream path (an
+in-memory cursor, `--prefetch` rows per fetch) and reports rows/sec, files
+written and projected wall time for the full provider count.
+
+Use --db postgres with DATABASE_URL pointing at a database with migration
+007 applied and a year of paid payouts to time the whole job, aggregate
+included.
+
+Usage:
+    python benchmarks/bench_tax_1099.py --providers 120000 --reportable 0.3 --payouts 40
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import db as database  # noqa: E402
+from src.payments import tax_reporting  # noqa: E402
+from src.payments.tax_reporting import Tax1099Job  # noqa: E402
+
+
+class SyntheticConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetch(self, query, *args):
+        if query == tax_reporting.SUMMARIZE_YEAR_SQL:
+            return [{"providers": self.pool.providers, "reportable": self.pool.reportable, "gross_cents": 0}]
+        return []
+
+    @asynccontextmanager
+    async def transaction(self, **kwargs):
+        yield
+
+    async def cursor(self, query, *args, prefetch=None):
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for p in range(self.pool.reportable):
+            provider_id = f"00000000-0000-0000-0000-{p:012d}"
+            for i in range(self.pool.payouts):
+                yield {
+                    "provider_id": provider_id,
+                    "payment_id": f"{p:08d}-{i:04d}",
+                    "request_id": f"req-{p:08d}-{i:04d}",
+                    "payout_completed_at": start + timedelta(days=i % 365),
+                    "provider_payout_cents": 25000 + i,
+                }
+                if (i + 1) % prefetch == 0:
+                    await asyncio.sleep(0)
+
+
+class SyntheticPool:
+    def __init__(self, providers: int, reportable: int, payouts: int):
+        self.providers, self.reportable, self.payouts = providers, reportable, payouts
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        yield SyntheticConnection(self)
+
+
+async def run(args) -> None:
+    if args.db == "postgres":
+        await database.init_asyncpg_pool()
+        sample = args.providers
+    else:
+        # A sample of reportable providers; the rest is projected
+        sample = min(args.sample, int(args.providers * args.reportable))
+        database.db_pool = SyntheticPool(args.providers, sample, args.payouts)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        report = await Tax1099Job(output_dir=output_dir, prefetch=args.prefetch).run(args.year)
+
+    rows_per_second = report.detail_rows / report.elapsed_seconds if report.elapsed_seconds else 0.0
+    print(f"providers={report.providers:,} reportable={report.reportable:,} db={args.db}")
+    print(f"detail:  {report.detail_rows:,} rows in {report.detail_files:,} files  "
+          f"{report.elapsed_seconds:.2f}s  {rows_per_second:,.0f} rows/s")
+    if args.db == "fake" and report.detail_files:
+        total_rows = int(args.providers * args.reportable) * args.payouts
+        print(f"projected: {total_rows:,} detail rows for {args.providers:,} providers "
+              f"in {total_rows / rows_per_second / 60:.1f} min (excluding the aggregate)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="1099 job detail throughput")
+    parser.add_argument("--providers", type=int, default=120000)
+    parser.add_argument("--reportable", type=float, default=0.3, help="share of providers over the threshold")
+    parser.add_argument("--payouts", type=int, default=40, help="paid payouts per reportable provider")
+    parser.add_argument("--sample", type=int, default=5000, help="reportable providers actually written (fake db)")
+    parser.add_argument("--prefetch", type=int, default=tax_reporting.TAX_1099_PREFETCH)
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--db", choices=("fake", "postgres"), default="fake")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
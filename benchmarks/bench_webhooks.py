@@ -0,0 +1,193 @@
+"""
+Stripe webhook ingest and processing throughput.
+
+Ingest: fires N signed charge events at POST /api/v1/webhooks/stripe
+(in-process ASGI, `--concurrency` in flight) and reports acknowledged
+events/sec, ack latency percentiles and how many INSERT statements the
+group commit needed. The in-process HTTP client costs about as much CPU as
+the app, so a second "pipeline" pass runs the same events through
+signature verification and the ingestor directly: that is the per-core
+ceiling a server process approaches. Processing: drains the same events through
+WebhookProcessor and reports events/sec and how many payment updates the
+per-PaymentIntent coalescing saved.
+
+The database is an in-memory stand-in where every statement costs
+`--statement-ms` on one of `--pool-size` connections, so the numbers show
+batching, not Postgres. Point DATABASE_URL at a real database and use
+--db postgres to include it (apply migration 006 first).
+
+Usage:
+    python benchmarks/bench_webhooks.py --events 20000 --concurrency 500
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import orjson  # noqa: E402
+
+from src import db as database  # noqa: E402
+from src import main  # noqa: E402
+from src.payments import webhooks  # noqa: E402
+
+SECRET = "whsec_bench"
+
+
+class InboxConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetch(self, query, *args):
+        await asyncio.sleep(self.pool.statement_seconds)
+        return self.pool.execute(query, args)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class InboxPool:
+    """In-memory stripe_webhook_events with per-statement latency."""
+
+    def __init__(self, size: int, statement_seconds: float):
+        self.statement_seconds = statement_seconds
+        self._slots = asyncio.Semaphore(size)
+        self.events = {}
+        self.queue = []
+        self.statements = {"insert": 0, "claim": 0, "apply": 0}
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        async with self._slots:
+            yield InboxConnection(self)
+
+    def execute(self, query, args):
+        if query == webhooks.INSERT_EVENTS_SQL:
+            self.statements["insert"] += 1
+            new = []
+            for event_id, event_type, payment_intent_id, created, payload in zip(*args):
+                if event_id not in self.events:
+                    row = {"event_id": event_id, "type": event_type, "payment_intent_id": payment_intent_id,
+                           "created": created, "payload": payload}
+                    self.events[event_id] = row
+                    self.queue.append(row)
+                    new.append({"event_id": event_id})
+            return new
+        if query == webhooks.CLAIM_EVENTS_SQL:
+            self.statements["claim"] += 1
+            batch, self.queue = self.queue[:args[0]], self.queue[args[0]:]
+            return batch
+        self.statements["apply"] += 1
+        if query == webhooks.APPLY_STATUSES_SQL:
+            # Every payment accepts the move
+            return [{"stripe_payment_intent_id": payment_intent_id} for payment_intent_id in args[0]]
+        return []
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def make_events(args):
+    return [
+        orjson.dumps({
+            "id": f"evt_{i}", "type": "charge.succeeded" if i % 4 else "charge.failed", "created": 1760000000 + i,
+            "data": {"object": {"object": "charge", "id": f"ch_{i}", "payment_intent": f"pi_{i % args.intents}"}},
+        })
+        for i in range(args.events)
+    ]
+
+
+async def ingest(args, pool, events) -> None:
+    headers = [{"Stripe-Signature": webhooks.sign_payload(body, SECRET)} for body in events]
+    latencies = []
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        async def post(body, header):
+            async with slots:
+                started = time.perf_counter()
+                response = await client.post("/api/v1/webhooks/stripe", content=body, headers=header)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(body, header) for body, header in zip(events, headers)))
+        elapsed = time.perf_counter() - started
+    await main.webhook_ingestor.close()
+
+    print(f"http:    {args.events / elapsed:>10,.0f} events/s   "
+          f"ack p50 {percentile(latencies, 0.5) * 1000:.1f} ms  p99 {percentile(latencies, 0.99) * 1000:.1f} ms   "
+          f"{pool.statements['insert']:,} INSERTs for {len(pool.events):,} events")
+
+
+async def pipeline(args, pool, events) -> None:
+    ingestor = webhooks.WebhookIngestor()
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def one(body, header):
+        async with slots:
+            await ingestor.ingest(webhooks.verify_event(body, header), body)
+
+    headers = [webhooks.sign_payload(body, SECRET) for body in events]
+    before = pool.statements["insert"]
+    started = time.perf_counter()
+    await asyncio.gather(*(one(body, header) for body, header in zip(events, headers)))
+    elapsed = time.perf_counter() - started
+    await ingestor.close()
+    print(f"pipeline:{args.events / elapsed:>10,.0f} events/s   "
+          f"{pool.statements['insert'] - before:,} INSERTs ({ingestor.stats['duplicates']:,} duplicates dropped)")
+
+
+async def process(args, pool) -> None:
+    processor = webhooks.WebhookProcessor(batch_size=args.process_batch)
+    started = time.perf_counter()
+    while await processor.process_batch():
+        pass
+    elapsed = time.perf_counter() - started
+    stats = processor.stats
+    print(f"process: {stats['events'] / elapsed:>10,.0f} events/s   "
+          f"{stats['status_updates']:,} payment updates ({stats['coalesced']:,} coalesced away) "
+          f"in {pool.statements['claim']:,} batches")
+
+
+async def run(args) -> None:
+    logging.getLogger().setLevel(logging.WARNING)
+    webhooks.STRIPE_WEBHOOK_SECRET = SECRET
+    if args.db == "postgres":
+        await database.init_asyncpg_pool()
+        pool = None
+    else:
+        pool = InboxPool(args.pool_size, args.statement_ms / 1000)
+        database.db_pool = pool
+    print(f"events={args.events:,} concurrency={args.concurrency} intents={args.intents:,} db={args.db}")
+    pool = pool or InboxPool(1, 0)
+    events = make_events(args)
+    await ingest(args, pool, events)
+    # Same event ids again: every one is a redelivery for the dedupe path
+    await pipeline(args, pool, events)
+    await process(args, pool)
+
+
+def main_() -> None:
+    parser = argparse.ArgumentParser(description="Webhook ingest/processing throughput")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--intents", type=int, default=200, help="distinct PaymentIntents")
+    parser.add_argument("--process-batch", type=int, default=1000)
+    parser.add_argument("--db", choices=("fake", "postgres"), default="fake")
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--statement-ms", type=float, default=2.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,113 @@
+"""
+Throughput scaling with worker count for the production server profile.
+
+For each worker count, starts `python -m src.server` (WEB_CONCURRENCY=n)
+and drives it with closed-loop HTTP clients spread over several client
+processes, then reports requests/sec and scaling efficiency relative to one
+worker.
+
+The default path (/health) is served from memory, so the numbers measure
+the server stack (uvloop/httptools, middleware, serialization) rather than
+Postgres; point --path at a list endpoint with a seeded DATABASE_URL to
+include the database.
+
+Usage:
+    python benchmarks/bench_workers.py --workers 1,2,4,8 --duration 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _client_loop(url: str, concurrency: int, duration: float) -> int:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=10) as client:
+        deadline = time.perf_counter() + duration
+        done = 0
+
+        async def worker():
+            nonlocal done
+            while time.perf_counter() < deadline:
+                response = await client.get(url)
+                if response.status_code < 500:
+                    done += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return done
+
+
+def _client_process(url, concurrency, duration, results):
+    results.put(asyncio.run(_client_loop(url, concurrency, duration)))
+
+
+def wait_until_up(base_url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base_url}/health", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise SystemExit("server did not start")
+
+
+def measure(workers: int, args) -> float:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(args.port), DRAIN_SECONDS="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "src.server"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_up(base_url)
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(
+                target=_client_process, args=(base_url + args.path, args.concurrency, args.duration, results)
+            )
+            for _ in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        total = sum(results.get() for _ in clients)
+        return total / args.duration
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Server throughput vs worker count")
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4) if n <= (os.cpu_count() or 1)) or "1")
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 1) // 2), help="client processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="connections per client process")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    print(f"path={args.path} clients={args.clients}x{args.concurrency} duration={args.duration}s cpus={os.cpu_count()}")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'efficiency':>11}")
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(",")):
+        rps = measure(workers, args)
+        baseline = baseline or rps
+        speedup = rps / baseline
+        print(f"{workers:>8} {rps:>10,.0f} {speedup:>7.2f}x {speedup / workers * 100:>10.0f}%")
+
+
+if __name__ == "__main__":
+    main()
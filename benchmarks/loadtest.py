@@ -0,0 +1,432 @@
+"""
+Async load-test harness for src.main:app.
+
+Replays a weighted traffic mix (list requests, list bids, list providers,
+health, bid history exports) at a target request rate and reports latency percentiles, error
+rates and achieved throughput per route. With --find-saturation it steps the
+rate up until the service misses its latency/error budget and reports the
+highest sustainable rate against the capacity-plan targets (160 req/min at
+2x, 800 req/min at 10x; docs/CAPACITY_PLAN.md).
+
+Load is open-loop: requests are scheduled at fixed (or Poisson) arrival
+times and latency is measured from the scheduled time, so when the service
+falls behind, queueing shows up in the percentiles instead of silently
+lowering the offered rate (no coordinated omission).
+
+Targets:
+    --target inprocess   ASGI app in this process via httpx.ASGITransport
+    --target uvicorn     spawn `uvicorn src.main:app` locally and drive it over HTTP
+    --target URL         drive an already-running server (e.g. http://localhost:8000)
+
+Databases (inprocess only; spawned/remote servers use their own DATABASE_URL):
+    --db postgres        run the app lifespan against DATABASE_URL (seed with schema/seed.sql)
+    --db fake            in-memory pool with a fixed connection count and per-query
+                         latency, so saturation behaves like a real pool
+
+Usage:
+    python benchmarks/loadtest.py --db fake --rps 20 --duration 15
+    python benchmarks/loadtest.py --db fake --find-saturation --p95-slo-ms 200
+    make up && make db-init db-seed
+    python benchmarks/loadtest.py --target uvicorn --mix requests=4,bids=4,providers=1,health=1
+
+Adding `exports` to the mix streams long bid exports alongside customer
+traffic; compare the bids p95 with and without it to check that admission
+control (src/admission.py) sheds exports (429s in the exports row) before
+customer latency moves:
+    python benchmarks/loadtest.py --db fake --rps 150 --mix bids=80,providers=10,exports=10
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+CAPACITY_TARGETS_PER_MIN = {"2x (160 req/min)": 160, "10x (800 req/min)": 800}
+DEFAULT_MIX = "requests=35,bids=35,providers=20,health=10"
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+# ============================================================================
+# Fake database
+# ============================================================================
+
+class FakeLoadConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetch(self, query, *args):
+        await asyncio.sleep(self.pool.query_latency)
+        return self.pool.rows_for(query, args)
+
+    async def fetchval(self, query, *args):
+        await asyncio.sleep(self.pool.query_latency)
+        return 1
+
+    @asynccontextmanager
+    async def transaction(self, readonly=False):
+        yield
+
+    async def cursor(self, query, *args, prefetch=1000):
+        # An export holds its connection for export_batches round trips
+        for _ in range(self.pool.export_batches):
+            await asyncio.sleep(self.pool.query_latency)
+            for i in range(self.pool.page_rows):
+                yield _bid_row(i)
+
+
+class FakeLoadPool:
+    """
+    Stand-in for asyncpg.Pool under load.
+
+    `size` connections are handed out through a semaphore and every query
+    sleeps `query_latency` seconds, so the pool saturates the way a real one
+    does when offered load exceeds size / latency queries per second.
+    """
+
+    def __init__(self, size: int, query_latency: float, page_rows: int = 50, export_batches: int = 20):
+        self.size = size
+        self.query_latency = query_latency
+        self.page_rows = page_rows
+        self.export_batches = export_batches
+        self._slots = asyncio.Semaphore(size)
+        self._in_use = 0
+
+    def get_size(self):
+        return self.size
+
+    def get_idle_size(self):
+        return self.size - self._in_use
+
+    def get_max_size(self):
+        return self.size
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        async with self._slots:
+            self._in_use += 1
+            try:
+                yield FakeLoadConnection(self)
+            finally:
+                self._in_use -= 1
+
+    def rows_for(self, query: str, args) -> List[dict]:
+        if query.lstrip().startswith("EXPLAIN"):
+            return [{"QUERY PLAN": [{"Plan": {"Plan Rows": 1000}}]}]
+        limit = args[-1] if args and isinstance(args[-1], int) else self.page_rows
+        count = min(limit, self.page_rows)
+        if "FROM bids" in query:
+            return [_bid_row(i) for i in range(count)]
+        if "FROM providers" in query:
+            return [_provider_row(i) for i in range(count)]
+        return [_request_row(i) for i in range(count)]
+
+
+def _bid_row(i):
+    return {
+        "id": str(uuid.uuid4()), "request_id": str(uuid.uuid4()), "provider_id": str(uuid.uuid4()),
+        "provider_name": f"Provider {i}", "amount_cents": 45000 + i, "timeline_days": 7,
+        "status": "pending", "submitted_at": NOW - timedelta(seconds=i),
+    }
+
+
+def _provider_row(i):
+    return {
+        "provider_id": str(uuid.uuid4()), "name": f"Provider {i}", "status": "verified",
+        "license_verified": True, "insurance_verified": True, "background_check_verified": True,
+        "overall_tier": "standard", "created_at": NOW - timedelta(seconds=i),
+    }
+
+
+def _request_row(i):
+    return {
+        "id": str(uuid.uuid4()), "title": f"Service Request {i}",
+        "description": "Replace water heater in basement utility room", "customer_id": str(uuid.uuid4()),
+        "service_type": "plumbing", "status": "open", "budget_cents": 50000,
+        "created_at": NOW - timedelta(seconds=i), "due_date": None,
+    }
+
+
+# ============================================================================
+# Traffic
+# ============================================================================
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ROUTES:
+            raise SystemExit(f"unknown route in --mix: {name} (choose from {', '.join(ROUTES)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+ROUTES = {
+    "requests": lambda ids: "/api/v1/requests?limit=50",
+    "bids": lambda ids: f"/api/v1/requests/{random.choice(ids)}/bids?limit=50",
+    "providers": lambda ids: "/api/v1/providers?limit=50",
+    "health": lambda ids: "/health/ready",
+    "exports": lambda ids: "/api/v1/bids/export",
+}
+
+
+@dataclass
+class RouteResult:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+
+
+@dataclass
+class LevelResult:
+    target_rps: float
+    duration: float
+    routes: Dict[str, RouteResult]
+
+    @property
+    def all_latencies(self) -> List[float]:
+        return sorted(lat for r in self.routes.values() for lat in r.latencies)
+
+    @property
+    def total(self) -> int:
+        return sum(len(r.latencies) for r in self.routes.values())
+
+    @property
+    def errors(self) -> int:
+        return sum(r.errors for r in self.routes.values())
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.total if self.total else 0.0
+
+    @property
+    def achieved_rps(self) -> float:
+        return self.total / self.duration if self.duration else 0.0
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    rps: float,
+    duration: float,
+    mix: Dict[str, float],
+    request_ids: List[str],
+    max_in_flight: int,
+    poisson: bool,
+) -> LevelResult:
+    """Offer `rps` for `duration` seconds; latency counts from each scheduled start."""
+    routes = {name: RouteResult() for name in mix}
+    names, weights = list(mix), list(mix.values())
+    in_flight = asyncio.Semaphore(max_in_flight)
+    tasks = []
+
+    async def one(name: str, scheduled: float):
+        async with in_flight:
+            result = routes[name]
+            try:
+                response = await client.get(ROUTES[name](request_ids))
+                status = response.status_code
+            except Exception:
+                status = 0
+            result.latencies.append(time.perf_counter() - scheduled)
+            result.statuses[status] = result.statuses.get(status, 0) + 1
+            if status == 0 or status >= 400:
+                result.errors += 1
+
+    started = time.perf_counter()
+    next_at = started
+    while next_at < started + duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = random.choices(names, weights)[0]
+        tasks.append(asyncio.create_task(one(name, next_at)))
+        next_at += random.expovariate(rps) if poisson else 1.0 / rps
+    await asyncio.gather(*tasks)
+    return LevelResult(rps, time.perf_counter() - started, routes)
+
+
+def print_level(level: LevelResult) -> None:
+    print(
+        f"\ntarget {level.target_rps:.2f} rps ({level.target_rps * 60:.0f} req/min): "
+        f"achieved {level.achieved_rps:.2f} rps, {level.total} requests, "
+        f"error rate {level.error_rate:.2%}"
+    )
+    print(f"  {'route':<10} {'count':>7} {'errors':>7} {'p50 ms':>8} {'p90 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    rows = [(name, sorted(r.latencies), r.errors) for name, r in level.routes.items()]
+    rows.append(("ALL", level.all_latencies, level.errors))
+    for name, latencies, errors in rows:
+        if not latencies:
+            continue
+        print(
+            f"  {name:<10} {len(latencies):>7} {errors:>7} "
+            + " ".join(f"{percentile(latencies, q) * 1000:>8.1f}" for q in (0.5, 0.9, 0.95, 0.99, 1.0))
+        )
+
+
+def meets_slo(level: LevelResult, p95_slo: float, max_error_rate: float) -> bool:
+    return (
+        percentile(level.all_latencies, 0.95) <= p95_slo
+        and level.error_rate <= max_error_rate
+        and level.achieved_rps >= 0.95 * level.target_rps
+    )
+
+
+# ============================================================================
+# Targets
+# ============================================================================
+
+@asynccontextmanager
+async def inprocess_client(db: str, pool_size: int, query_latency: float):
+    from src import db as database
+    from src import main
+
+    # Per-request INFO logs would dominate in-process CPU time
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if db == "fake":
+        async def fake_probe(timeout=None):
+            return {"in_recovery": False, "replica_lag_seconds": None}
+
+        database.db_pool = FakeLoadPool(pool_size, query_latency)
+        main.health_monitor.probe = fake_probe
+        await main.health_monitor.refresh()
+        main.health_monitor.start()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://loadtest") as client:
+                yield client
+        finally:
+            await main.health_monitor.stop()
+            database.db_pool = None
+    else:
+        async with main.lifespan(main.app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://loadtest") as client:
+                yield client
+
+
+@asynccontextmanager
+async def uvicorn_client(port: int, max_in_flight: int):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    try:
+        async with http_client(f"http://127.0.0.1:{port}", max_in_flight) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/health")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise SystemExit("uvicorn did not start")
+            yield client
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@asynccontextmanager
+async def http_client(base_url: str, max_in_flight: int):
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        yield client
+
+
+async def discover_request_ids(client: httpx.AsyncClient) -> List[str]:
+    """Real request IDs from the service (falls back to random UUIDs)."""
+    try:
+        response = await client.get("/api/v1/requests?limit=200")
+        ids = [item["id"] for item in response.json().get("items", [])]
+    except Exception:
+        ids = []
+    # A small fixed set keeps some requests hot, as in production
+    return ids or [str(uuid.uuid4()) for _ in range(50)]
+
+
+async def main_async(args) -> int:
+    mix = parse_mix(args.mix)
+    if args.target == "inprocess":
+        target = inprocess_client(args.db, args.pool_size, args.query_latency_ms / 1000)
+    elif args.target == "uvicorn":
+        target = uvicorn_client(args.port, args.max_in_flight)
+    else:
+        target = http_client(args.target, args.max_in_flight)
+
+    async with target as client:
+        request_ids = await discover_request_ids(client)
+        print(f"target={args.target} db={args.db if args.target == 'inprocess' else 'server'} mix={mix}")
+
+        async def level(rps):
+            result = await run_level(client, rps, args.duration, mix, request_ids, args.max_in_flight, args.poisson)
+            print_level(result)
+            return result
+
+        if not args.find_saturation:
+            result = await level(args.rps)
+            return 0 if meets_slo(result, args.p95_slo_ms / 1000, args.max_error_rate) else 1
+
+        sustainable = 0.0
+        rps = args.start_rps
+        while rps <= args.max_rps:
+            result = await level(rps)
+            if not meets_slo(result, args.p95_slo_ms / 1000, args.max_error_rate):
+                print(f"  -> budget missed at {rps:.2f} rps")
+                break
+            sustainable = rps
+            rps *= args.step
+
+    print(
+        f"\nsaturation: sustainable {sustainable:.2f} rps ({sustainable * 60:.0f} req/min) "
+        f"at p95 <= {args.p95_slo_ms:.0f} ms, errors <= {args.max_error_rate:.1%}"
+    )
+    failed = 0
+    for label, per_min in CAPACITY_TARGETS_PER_MIN.items():
+        ok = sustainable * 60 >= per_min
+        failed += not ok
+        print(f"  {label:<20} {'PASS' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test src.main:app")
+    parser.add_argument("--target", default="inprocess", help="inprocess | uvicorn | http://host:port")
+    parser.add_argument("--db", choices=("fake", "postgres"), default="fake")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route=weight,... over requests,bids,providers,health,exports")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per rate level")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--find-saturation", action="store_true")
+    parser.add_argument("--start-rps", type=float, default=2.0)
+    parser.add_argument("--max-rps", type=float, default=2000.0)
+    parser.add_argument("--step", type=float, default=1.5)
+    parser.add_argument("--p95-slo-ms", type=float, default=500.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--pool-size", type=int, default=20, help="fake DB connections")
+    parser.add_argument("--query-latency-ms", type=float, default=5.0, help="fake DB per-query latency")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Local Stripe stand-in for payment tests and throughput runs.
+
+An HTTP server that answers the Stripe API calls the escrow lifecycle makes
+(PaymentIntent create / confirm / capture / cancel / retrieve, Transfer
+create, Refund create) with Stripe-shaped JSON, so the real stripe SDK and
+EscrowManager run unmodified against it. Knobs:
+
+    latency, jitter   seconds added to every request (uniform +/- jitter)
+    error_rate        share of requests answered 500 api_error
+    rate_limit        requests/sec admitted by a token bucket (burst =
+                      rate_limit); the rest get 429 rate_limit, like
+                      Stripe's per-account limiter
+
+PaymentIntents keep their state, so an out-of-order call (capture before
+confirm) fails with 400 as it would on Stripe. Idempotency-Key is honoured:
+a repeated key replays the first response (429s and 500s are not stored,
+matching Stripe), which is what makes EscrowManager's retries safe.
+Customer "cus_declined" gets a 402 card_declined.
+
+    with StripeStandIn(latency=0.05, rate_limit=50) as server:
+        use_standin(server.url)
+        ...
+        print(server.stats)
+
+Run standalone and point another process's stripe.api_base at it:
+    python benchmarks/stripe_standin.py --port 12111 --latency 0.2 --rate-limit 50
+"""
+
+import argparse
+import copy
+import importlib
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DECLINED_CUSTOMER = "cus_declined"
+
+# stripe 7.8's module __getattr__ returns None for unknown names, so its
+# `from stripe import apps, ...` binds None unless the subpackages are already
+# imported, and converting any API response then fails
+STRIPE_NAMESPACES = (
+    "apps", "billing_portal", "checkout", "climate", "financial_connections", "identity", "issuing",
+    "radar", "reporting", "sigma", "tax", "terminal", "test_helpers", "treasury",
+)
+
+
+def use_standin(url: str) -> None:
+    """Point the stripe SDK at a stand-in (process-wide)."""
+    import stripe
+
+    for name in STRIPE_NAMESPACES:
+        importlib.import_module(f"stripe.{name}")
+    stripe.api_base = url
+    stripe.api_key = "sk_test_standin"
+    stripe.max_network_retries = 0  # retries are ours to make (EscrowManager._call)
+
+
+def _error(status: int, type: str, message: str, code: Optional[str] = None) -> Tuple[int, dict]:
+    error = {"type": type, "message": message}
+    if code:
+        error["code"] = code
+    return status, {"error": error}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like api.stripe.com
+
+    def do_GET(self):
+        self._handle({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode()) if length else {}
+        self._handle({key: values[0] for key, values in form.items()})
+
+    def _handle(self, form: Dict[str, str]):
+        server: "StripeStandIn" = self.server.standin
+        status, body = server.respond(self.command, urlparse(self.path).path, form, self.headers.get("Idempotency-Key"))
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 429:
+            self.send_header("Stripe-Should-Retry", "true")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StripeStandIn:
+    """Threaded local Stripe API stand-in; see the module docstring."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: Optional[float] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._bucket = TokenBucket(rate_limit) if rate_limit else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._intents: Dict[str, dict] = {}
+        self._idempotent: Dict[str, Tuple[int, dict]] = {}
+        self.stats: Counter = Counter()
+        self.in_flight = self.max_in_flight = 0
+
+        self._httpd = ThreadingHTTPServer((host, port), StandInHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.standin = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StripeStandIn":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stripe-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StripeStandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def add_intent(self, amount: int, status: str = "requires_capture") -> str:
+        """Seed a PaymentIntent (authorized and awaiting capture by default); returns its id."""
+        with self._lock:
+            intent = {
+                "id": self._new_id("pi"), "object": "payment_intent", "amount": amount, "currency": "usd",
+                "capture_method": "manual", "status": status, "charges": {"object": "list", "data": [
+                    {"id": self._new_id("ch"), "object": "charge", "amount": amount, "captured": False},
+                ]},
+            }
+            self._intents[intent["id"]] = intent
+        return intent["id"]
+
+    # Request handling (runs on the server's handler threads)
+
+    def respond(self, method: str, path: str, form: Dict[str, str], key: Optional[str]) -> Tuple[int, dict]:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            limited = self._bucket is not None and not self._bucket.take()
+            failed = not limited and self._random.random() < self.error_rate
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        try:
+            time.sleep(delay)
+            if limited:
+                self._count("rate_limited")
+                return _error(429, "invalid_request_error", "Request rate limit exceeded.", "rate_limit")
+            if failed:
+                self._count("injected_errors")
+                return _error(500, "api_error", "Injected stand-in failure.")
+            if key is not None:
+                with self._lock:
+                    cached = self._idempotent.get(key)
+                if cached is not None:
+                    self._count("idempotent_replays")
+                    return cached
+            status, body = self._route(method, path, form)
+            with self._lock:
+                # Snapshot: stored intents keep changing after this response
+                body = copy.deepcopy(body)
+                self.stats[str(status)] += 1
+                if key is not None:
+                    self._idempotent.setdefault(key, (status, body))
+            return status, body
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _new_id(self, prefix: str) -> str:
+        return f"{prefix}_standin{next(self._ids)}"
+
+    def _route(self, method: str, path: str, form: Dict[str, str]) -> Tuple[int, dict]:
+        parts = path.strip("/").split("/")  # ["v1", resource, id?, action?]
+        resource = parts[1] if len(parts) > 1 else ""
+
+        if resource == "payment_intents":
+            if len(parts) == 2 and method == "POST":
+                return self._create_intent(form)
+            intent = self._intents.get(parts[2]) if len(parts) > 2 else None
+            if intent is None:
+                return _error(404, "invalid_request_error", "No such payment_intent", "resource_missing")
+            action = parts[3] if len(parts) > 3 else None
+            if action is None:
+                return 200, intent
+            return self._intent_action(intent, action)
+
+        if resource == "transfers" and method == "POST":
+            return 200, {
+                "id": self._new_id("tr"), "object": "transfer", "amount": int(form.get("amount", 0)),
+                "currency": form.get("currency", "usd"), "destination": form.get("destination"),
+                "transfer_group": form.get("transfer_group"), "status": "paid",
+            }
+
+        if resource == "refunds" and method == "POST":
+            intent = self._intents.get(form.get("payment_intent", ""))
+            if intent is None or intent["status"] != "succeeded":
+                return _error(400, "invalid_request_error", "PaymentIntent has not been captured", "charge_not_captured")
+            amount = int(form.get("amount", intent["amount"]))
+            return 200, {"id": self._new_id("re"), "object": "refund", "amount": amount,
+                         "payment_intent": intent["id"], "status": "succeeded"}
+
+        return _error(404, "invalid_request_error", f"Unrecognized request URL ({method} {path})")
+
+    def _create_intent(self, form: Dict[str, str]) -> Tuple[int, dict]:
+        if form.get("customer") == DECLINED_CUSTOMER:
+            return _error(402, "card_error", "Your card was declined.", "card_declined")
+        intent = {
+            "id": self._new_id("pi"), "object": "payment_intent", "amount": int(form.get("amount", 0)),
+            "currency": form.get("currency", "usd"), "capture_method": form.get("capture_method", "automatic"),
+            "status": "requires_payment_method", "charges": {"object": "list", "data": []},
+        }
+        with self._lock:
+            self._intents[intent["id"]] = intent
+        return 200, intent
+
+    def _intent_action(self, intent: dict, action: str) -> Tuple[int, dict]:
+        allowed = {
+            "confirm": ("requires_payment_method", "requires_confirmation"),
+            "capture": ("requires_capture",),
+            "cancel": ("requires_payment_method", "requires_confirmation", "requires_capture"),
+        }
+        with self._lock:
+            if action not in allowed:
+                return _error(404, "invalid_request_error", f"Unknown action {action}")
+            if intent["status"] not in allowed[action]:
+                return _error(400, "invalid_request_error",
+                              f"PaymentIntent is {intent['status']}; cannot {action}", "payment_intent_unexpected_state")
+            if action == "confirm":
+                intent["status"] = "requires_capture"
+                intent["charges"] = {"object": "list", "data": [
+                    {"id": self._new_id("ch"), "object": "charge", "amount": intent["amount"], "captured": False},
+                ]}
+            elif action == "capture":
+                intent["status"] = "succeeded"
+                intent["charges"]["data"][0]["captured"] = True
+            else:
+                intent["status"] = "canceled"
+            return 200, intent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Stripe API stand-in")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests/sec before 429s")
+    args = parser.parse_args()
+
+    server = StripeStandIn(args.latency, args.jitter, args.error_rate, args.rate_limit, port=args.port)
+    print(f"Stripe stand-in on {server.url} (set stripe.api_base to it); Ctrl-C to stop")
+    server.start()
+    try:
+        while True:
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print(dict(server.stats))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -173,6 +173,24 @@ CREATE TABLE IF NOT EXISTS bids (
 -- 5. PAYMENTS AND ESCROW
 -- ============================================================================
 
+-- Enum types as in supabase/migrations/001_initial_schema.sql, so queries
+-- that type status values (unnest($n::payment_status_enum[]), ...) run here too.
+-- Schema change: payments.status and payout_status used to be TEXT with CHECK
+-- constraints. CREATE TABLE IF NOT EXISTS leaves an existing dev database's
+-- columns as they were; recreate it (docker compose down -v) to get the enums.
+DO $$ BEGIN
+    CREATE TYPE payment_status_enum AS ENUM (
+        'pending', 'escrow_held', 'captured', 'partially_refunded',
+        'refunded', 'failed', 'cancelled'
+    );
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$ BEGIN
+    CREATE TYPE payout_status_enum AS ENUM ('pending', 'scheduled', 'paid', 'failed');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
 CREATE TABLE IF NOT EXISTS payments (
     id                  UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     request_id          UUID NOT NULL REFERENCES service_requests(id),
@@ -187,18 +205,13 @@ CREATE TABLE IF NOT EXISTS payments (
     platform_fee        NUMERIC(10,2) NOT NULL,
     provider_payout     NUMERIC(10,2) NOT NULL,
     stripe_processing_fee NUMERIC(10,2),
-    status              TEXT NOT NULL DEFAULT 'pending'
-                        CHECK (status IN (
-                            'pending', 'escrow_held', 'captured', 'partially_refunded',
-                            'refunded', 'failed', 'cancelled'
-                        )),
+    status              payment_status_enum NOT NULL DEFAULT 'pending',
     escrow_held_at      TIMESTAMPTZ,
     captured_at         TIMESTAMPTZ,
     refunded_at         TIMESTAMPTZ,
     refund_amount       NUMERIC(10,2),
     refund_reason       TEXT,
-    payout_status       TEXT DEFAULT 'pending'
-                        CHECK (payout_status IN ('pending', 'scheduled', 'paid', 'failed')),
+    payout_status       payout_status_enum DEFAULT 'pending',
     payout_scheduled_at TIMESTAMPTZ,
     payout_completed_at TIMESTAMPTZ,
     created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
@@ -405,9 +418,16 @@ CREATE INDEX IF NOT EXISTS idx_providers_active_verified
     ON providers (verification_status, is_active)
     WHERE verification_status = 'verified' AND is_active = true;
 
+CREATE INDEX IF NOT EXISTS idx_providers_verified_created
+    ON providers (created_at DESC, id DESC)
+    WHERE verification_status = 'verified' AND is_active = true;
+
 CREATE INDEX IF NOT EXISTS idx_requests_customer
     ON service_requests (customer_id, created_at DESC);
 
+CREATE INDEX IF NOT EXISTS idx_requests_created
+    ON service_requests (created_at DESC, id DESC);
+
 CREATE INDEX IF NOT EXISTS idx_requests_status
     ON service_requests (status)
     WHERE status NOT IN ('closed', 'cancelled');
@@ -499,3 +519,246 @@ GROUP BY DATE_TRUNC('day', sr.created_at), sr.address_state;
 
 CREATE INDEX IF NOT EXISTS idx_mv_marketplace_health
     ON marketplace_health (day DESC, market);
+
+-- ============================================================================
+-- 16. RESPONSE CACHE INVALIDATION
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('cache_invalidation', TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER providers_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON providers
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('providers');
+
+CREATE TRIGGER verifications_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON verifications
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('providers');
+
+-- ============================================================================
+-- 17. LIVE BID EVENTS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notify_bid_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('bid_events', json_build_object(
+        'id', NEW.id,
+        'request_id', NEW.request_id,
+        'provider_id', NEW.provider_id,
+        'provider_name', (SELECT business_name FROM providers WHERE id = NEW.provider_id),
+        'amount_cents', (NEW.amount * 100)::bigint,
+        'timeline_days', COALESCE(NEW.estimated_days, 0),
+        'status', NEW.status,
+        'submitted_at', NEW.created_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER bids_notify_insert
+    AFTER INSERT ON bids
+    FOR EACH ROW EXECUTE FUNCTION notify_bid_event();
+
+CREATE TRIGGER bids_notify_status
+    AFTER UPDATE OF status ON bids
+    FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION notify_bid_event();
+
+-- ============================================================================
+-- 18. BATCH JOB CHECKPOINTS AND PAYOUT RECONCILIATION
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS job_checkpoints (
+    job         TEXT PRIMARY KEY,
+    position    TEXT NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_payments_open_payouts
+    ON payments (id)
+    WHERE payout_status IN ('pending', 'scheduled') AND stripe_transfer_id IS NOT NULL;
+
+-- ============================================================================
+-- 19. STRIPE WEBHOOK EVENT QUEUE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS stripe_webhook_events (
+    event_id            TEXT PRIMARY KEY,
+    type                TEXT NOT NULL,
+    payment_intent_id   TEXT,
+    created             TIMESTAMPTZ NOT NULL,
+    payload             JSONB NOT NULL,
+    received_at         TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    processed_at        TIMESTAMPTZ,
+    claimed_until       TIMESTAMPTZ,
+    error               TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_stripe_webhook_events_queue
+    ON stripe_webhook_events (created, received_at)
+    WHERE processed_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_stripe_webhook_events_dead_letter
+    ON stripe_webhook_events (received_at)
+    WHERE error IS NOT NULL;
+
+ALTER TABLE payments
+    ADD COLUMN IF NOT EXISTS stripe_event_created TIMESTAMPTZ;
+
+-- ============================================================================
+-- 20. BULK 1099 REPORTING
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS tax_1099_summaries (
+    provider_id         UUID NOT NULL REFERENCES providers(id),
+    tax_year            INTEGER NOT NULL,
+    gross_amount        NUMERIC(12,2) NOT NULL,
+    transaction_count   INTEGER NOT NULL,
+    reportable          BOOLEAN NOT NULL,
+    first_paid_at       TIMESTAMPTZ,
+    last_paid_at        TIMESTAMPTZ,
+    generated_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (provider_id, tax_year)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tax_1099_summaries_reportable
+    ON tax_1099_summaries (tax_year, provider_id)
+    WHERE reportable;
+
+CREATE INDEX IF NOT EXISTS idx_payments_paid_by_provider
+    ON payments (provider_id, payout_completed_at)
+    INCLUDE (provider_payout)
+    WHERE payout_status = 'paid';
+
+-- ============================================================================
+-- 21. PROVIDER EARNINGS LEDGER
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS provider_earnings (
+    provider_id             UUID PRIMARY KEY REFERENCES providers(id),
+    total_earned_cents      BIGINT NOT NULL DEFAULT 0,
+    pending_payout_cents    BIGINT NOT NULL DEFAULT 0,
+    in_escrow_cents         BIGINT NOT NULL DEFAULT 0,
+    completed_payments      INTEGER NOT NULL DEFAULT 0,
+    paid_payout_cents       BIGINT NOT NULL DEFAULT 0,  -- avg payout numerator
+    updated_at              TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION add_provider_earnings(
+    p_provider_ids UUID[],
+    p_signs INTEGER[],
+    p_statuses TEXT[],
+    p_payout_statuses TEXT[],
+    p_payouts NUMERIC[]
+) RETURNS VOID AS $$
+    INSERT INTO provider_earnings AS e (
+        provider_id, total_earned_cents, pending_payout_cents, in_escrow_cents,
+        completed_payments, paid_payout_cents, updated_at
+    )
+    SELECT d.provider_id, d.total_earned, d.pending_payout, d.in_escrow, d.completed, d.paid_payout, NOW()
+    FROM (
+        SELECT c.provider_id,
+               SUM(c.sign * CASE WHEN c.status = 'captured' AND c.payout_status = 'paid'
+                                 THEN c.cents ELSE 0 END) AS total_earned,
+               SUM(c.sign * CASE WHEN c.status = 'captured' AND c.payout_status IN ('pending', 'scheduled')
+                                 THEN c.cents ELSE 0 END) AS pending_payout,
+               SUM(c.sign * CASE WHEN c.status = 'escrow_held' THEN c.cents ELSE 0 END) AS in_escrow,
+               SUM(c.sign * CASE WHEN c.payout_status = 'paid' THEN 1 ELSE 0 END) AS completed,
+               SUM(c.sign * CASE WHEN c.payout_status = 'paid' THEN c.cents ELSE 0 END) AS paid_payout
+        FROM (
+            SELECT u.provider_id, u.sign, u.status, u.payout_status, (u.payout * 100)::bigint AS cents
+            FROM unnest(p_provider_ids, p_signs, p_statuses, p_payout_statuses, p_payouts)
+                AS u(provider_id, sign, status, payout_status, payout)
+        ) c
+        GROUP BY c.provider_id
+    ) d
+    WHERE d.total_earned <> 0 OR d.pending_payout <> 0 OR d.in_escrow <> 0
+       OR d.completed <> 0 OR d.paid_payout <> 0
+    ORDER BY d.provider_id
+    ON CONFLICT (provider_id) DO UPDATE SET
+        total_earned_cents = e.total_earned_cents + EXCLUDED.total_earned_cents,
+        pending_payout_cents = e.pending_payout_cents + EXCLUDED.pending_payout_cents,
+        in_escrow_cents = e.in_escrow_cents + EXCLUDED.in_escrow_cents,
+        completed_payments = e.completed_payments + EXCLUDED.completed_payments,
+        paid_payout_cents = e.paid_payout_cents + EXCLUDED.paid_payout_cents,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION track_provider_earnings()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM add_provider_earnings(
+            array_agg(provider_id), array_agg(1), array_agg(status::text),
+            array_agg(payout_status::text), array_agg(provider_payout))
+        FROM new_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM add_provider_earnings(
+            array_agg(c.provider_id), array_agg(c.sign), array_agg(c.status::text),
+            array_agg(c.payout_status::text), array_agg(c.provider_payout))
+        FROM (
+            SELECT provider_id, 1 AS sign, status, payout_status, provider_payout FROM new_rows
+            UNION ALL
+            SELECT provider_id, -1 AS sign, status, payout_status, provider_payout FROM old_rows
+        ) c;
+    ELSE
+        PERFORM add_provider_earnings(
+            array_agg(provider_id), array_agg(-1), array_agg(status::text),
+            array_agg(payout_status::text), array_agg(provider_payout))
+        FROM old_rows;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER payments_earnings_insert
+    AFTER INSERT ON payments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_provider_earnings();
+
+CREATE TRIGGER payments_earnings_update
+    AFTER UPDATE ON payments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_provider_earnings();
+
+CREATE TRIGGER payments_earnings_delete
+    AFTER DELETE ON payments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_provider_earnings();
+
+-- ============================================================================
+-- 22. ESCROW STATE MACHINE
+-- ============================================================================
+
+ALTER TABLE payments
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_row_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER payments_bump_version
+    BEFORE UPDATE ON payments
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+-- ============================================================================
+-- 23. ESCROW AUTO-CAPTURE
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_payments_escrow_held_age
+    ON payments (escrow_held_at, id)
+    WHERE status = 'escrow_held';
+
+CREATE INDEX IF NOT EXISTS idx_disputes_open_payment
+    ON disputes (payment_id)
+    WHERE status <> 'resolved';
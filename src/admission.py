@@ -0,0 +1,221 @@
+"""
+Request admission control with priority lanes.
+
+Every API request is classified into a lane by path:
+
+    customer  waiting on bids, browsing the provider directory   (highest)
+    provider  browsing open service requests, the earnings dashboard
+    operator  history exports and other analytics-style reads     (lowest)
+
+Health, metrics, docs, the SSE bid stream and Stripe webhooks are exempt
+(they hold no DB connection, are group-committed, or must never be shed).
+
+A worker admits at most ADMISSION_CAPACITY requests at once. Each lane
+also has its own concurrency limit and may only take a slot while total
+in-flight work is below its share of capacity, so as load rises operator
+requests stop being admitted first (at 50%), then provider (at 75%), and
+customers keep the remaining headroom. A request that cannot be admitted
+waits in its lane's queue until its deadline; when a slot frees, queued
+work is admitted in priority order. A full queue or a missed deadline is
+answered with 429 and Retry-After, so a dashboard export can wait or be
+shed but never occupies capacity customers need. The 429 is sent before
+routing, so the middleware matches the route itself for MetricsMiddleware:
+rejections are counted under the route template, not "unmatched".
+
+The controller runs on one event loop per worker and needs no locks.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Pattern, Tuple
+
+import orjson
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "64"))
+ADMISSION_OPERATOR_LIMIT = int(os.getenv("ADMISSION_OPERATOR_LIMIT", "4"))
+
+# First match wins; None means exempt from admission control
+ROUTE_LANES: List[Tuple[Pattern, Optional[str]]] = [
+    (re.compile(r"^/api/v1/requests/[^/]+/bids/stream$"), None),
+    (re.compile(r"^/api/v1/webhooks/"), None),
+    (re.compile(r"^/api/v1/[^/]+/export$"), "operator"),
+    (re.compile(r"^/api/v1/requests/[^/]+/bids$"), "customer"),
+    (re.compile(r"^/api/v1/providers$"), "customer"),
+    (re.compile(r"^/api/v1/providers/[^/]+/earnings$"), "provider"),
+    (re.compile(r"^/api/v1/requests$"), "provider"),
+    (re.compile(r"^/api/"), "operator"),
+]
+
+
+@dataclass
+class LaneConfig:
+    priority: int  # lower is more important
+    limit: int  # max concurrent requests in this lane
+    share: float  # admitted only while total in-flight < share * capacity
+    max_queue: int
+    max_wait: float  # seconds a request may wait for a slot
+
+
+@dataclass
+class Lane:
+    name: str
+    config: LaneConfig
+    in_flight: int = 0
+    queue: Deque[asyncio.Future] = field(default_factory=deque)
+    admitted: int = 0
+    rejected: int = 0
+
+
+def default_lanes(capacity: int = ADMISSION_CAPACITY) -> Dict[str, LaneConfig]:
+    return {
+        "customer": LaneConfig(priority=0, limit=capacity, share=1.0, max_queue=4 * capacity, max_wait=2.0),
+        "provider": LaneConfig(
+            priority=1, limit=max(1, capacity * 3 // 4), share=0.75, max_queue=2 * capacity, max_wait=1.0
+        ),
+        "operator": LaneConfig(
+            priority=2, limit=ADMISSION_OPERATOR_LIMIT, share=0.5,
+            max_queue=ADMISSION_OPERATOR_LIMIT, max_wait=0.5,
+        ),
+    }
+
+
+def lane_for_path(path: str) -> Optional[str]:
+    for pattern, lane in ROUTE_LANES:
+        if pattern.match(path):
+            return lane
+    return None
+
+
+def match_route(scope) -> None:
+    """Set scope["route"] to the app route `scope` would have reached, as routing does."""
+    router = getattr(scope.get("app"), "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            scope["route"] = route
+            return
+
+
+class AdmissionController:
+    """Per-worker admission with prioritized, deadline-bounded queues."""
+
+    def __init__(self, capacity: int = ADMISSION_CAPACITY, lanes: Optional[Dict[str, LaneConfig]] = None):
+        self.capacity = capacity
+        configs = lanes if lanes is not None else default_lanes(capacity)
+        ordered = sorted(configs.items(), key=lambda item: item[1].priority)
+        self.lanes: Dict[str, Lane] = {name: Lane(name, config) for name, config in ordered}
+        self.in_flight = 0
+
+    def _can_admit(self, lane: Lane) -> bool:
+        return lane.in_flight < lane.config.limit and self.in_flight < lane.config.share * self.capacity
+
+    def _higher_priority_waiting(self, lane: Lane) -> bool:
+        return any(
+            other.queue for other in self.lanes.values() if other.config.priority <= lane.config.priority
+        )
+
+    def _admit(self, lane: Lane) -> None:
+        lane.in_flight += 1
+        lane.admitted += 1
+        self.in_flight += 1
+
+    async def acquire(self, lane_name: str) -> bool:
+        """Wait for a slot in `lane_name`; False means the request should be rejected."""
+        lane = self.lanes[lane_name]
+        if self._can_admit(lane) and not self._higher_priority_waiting(lane):
+            self._admit(lane)
+            return True
+        if len(lane.queue) >= lane.config.max_queue:
+            lane.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.queue.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=lane.config.max_wait)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(lane_name)  # admitted just as the client went away
+            else:
+                waiter.cancel()
+                lane.queue.remove(waiter)
+            raise
+
+        if waiter.done():
+            return True
+        waiter.cancel()
+        lane.queue.remove(waiter)
+        lane.rejected += 1
+        return False
+
+    def release(self, lane_name: str) -> None:
+        lane = self.lanes[lane_name]
+        lane.in_flight -= 1
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand freed slots to queued requests, highest priority first."""
+        for lane in self.lanes.values():
+            while lane.queue and self._can_admit(lane):
+                waiter = lane.queue.popleft()
+                if waiter.done():
+                    continue
+                self._admit(lane)
+                waiter.set_result(True)
+            if lane.queue:
+                # Don't let lower lanes jump a waiting higher-priority lane
+                return
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {
+                "in_flight": lane.in_flight,
+                "queued": len(lane.queue),
+                "admitted": lane.admitted,
+                "rejected": lane.rejected,
+            }
+            for name, lane in self.lanes.items()
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to HTTP requests."""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller if controller is not None else AdmissionController()
+
+    async def __call__(self, scope, receive, send):
+        lane = lane_for_path(scope["path"]) if scope["type"] == "http" else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(lane):
+            logger.info("Admission rejected: lane=%s path=%s", lane, scope["path"])
+            match_route(scope)
+            body = orjson.dumps({"detail": "Server busy, retry shortly", "lane": lane})
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(lane)
@@ -0,0 +1,198 @@
+"""
+HTTP response cache with ETags and conditional GET.
+
+Cache keys are per namespace (one per cached route family) and vary by the
+request path and its sorted query parameters. Every namespace carries a data
+version; the ETag is derived from (namespace, version, key), so:
+
+- a repeat request with a matching If-None-Match gets 304 with no body, and
+  without a cache lookup or render, even after the entry's TTL has expired
+- a repeat request without it is served from the cache, never from Postgres
+- invalidate(namespace) bumps the version, which changes every ETag and
+  orphans every old entry at once (they age out via TTL)
+
+A version is only meaningful to the backend that issued it, so versions
+start from a random epoch rather than 0: the in-memory backend draws one
+per process, Redis one per namespace when the version key is first created
+(again after a flush). An ETag from another worker or from before a restart
+then never matches by accident; it just costs one render.
+
+Provider rows notify the `cache_invalidation` channel from a Postgres trigger
+(migration 003); the API listens and invalidates the "providers" namespace.
+
+Backends:
+- InMemoryCacheBackend: per-process LRU, the default
+- RedisCacheBackend: shared across workers; takes any redis.asyncio-style
+  client, so tests can pass a local fake
+"""
+
+import hashlib
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory | redis
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+CACHE_INVALIDATION_CHANNEL = "cache_invalidation"
+
+
+def _version_epoch() -> int:
+    """Random starting version, so version numbers are not reused across processes or Redis flushes."""
+    return secrets.randbits(48)
+
+
+class InMemoryCacheBackend:
+    """Process-local LRU with per-entry TTL."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._epoch = _version_epoch()
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_version(self, namespace: str) -> int:
+        return self._versions.get(namespace, self._epoch)
+
+    async def bump_version(self, namespace: str) -> int:
+        self._versions[namespace] = self._versions.get(namespace, self._epoch) + 1
+        return self._versions[namespace]
+
+
+class RedisCacheBackend:
+    """
+    Redis-backed cache shared by all workers.
+
+    Versions live in Redis too, so one invalidation is seen by every worker.
+    """
+
+    def __init__(self, client, prefix: str = "respcache"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(f"{self.prefix}:entry:{key}")
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.client.set(f"{self.prefix}:entry:{key}", value, ex=ttl)
+
+    async def get_version(self, namespace: str) -> int:
+        key = f"{self.prefix}:version:{namespace}"
+        value = await self.client.get(key)
+        if value is None:
+            # First use (or the key was flushed): whichever worker's SET NX lands seeds it for all
+            await self.client.set(key, _version_epoch(), nx=True)
+            value = await self.client.get(key)
+        return int(value)
+
+    async def bump_version(self, namespace: str) -> int:
+        await self.get_version(namespace)  # INCR of a missing key would restart at 1
+        return int(await self.client.incr(f"{self.prefix}:version:{namespace}"))
+
+
+def build_cache_backend():
+    """Backend selected by RESPONSE_CACHE_BACKEND (redis is imported only if chosen)."""
+    if RESPONSE_CACHE_BACKEND == "redis":
+        import redis.asyncio as redis
+
+        return RedisCacheBackend(redis.from_url(REDIS_URL))
+    return InMemoryCacheBackend()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as RFC 9110 specifies for If-None-Match (compression weakens ETags)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    """Serves cached GET responses per namespace with ETag revalidation."""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    @staticmethod
+    def cache_key(request: Request) -> str:
+        """Path plus sorted query params, so ?a=1&b=2 and ?b=2&a=1 share an entry."""
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return hashlib.sha256(f"{request.url.path}?{query}".encode()).hexdigest()[:32]
+
+    async def invalidate(self, namespace: str) -> int:
+        """Bump the namespace's data version; returns the new version."""
+        version = await self.backend.bump_version(namespace)
+        logger.info("Response cache invalidated: %s (version %d)", namespace, version)
+        return version
+
+    async def serve(
+        self,
+        request: Request,
+        namespace: str,
+        ttl: int,
+        render: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        """
+        Return the cached response for `request`, rendering it on a miss.
+
+        Only 200 responses are stored. `render` runs at most once per
+        (version, key) per TTL window in this process, and never for a
+        request whose If-None-Match already holds the current ETag.
+        """
+        version = await self.backend.get_version(namespace)
+        key = f"{namespace}:{version}:{self.cache_key(request)}"
+        etag = f'"{namespace}-{version}-{key.rsplit(":", 1)[1]}"'
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={ttl}"}
+
+        # The ETag names the data version, not the stored entry: still valid after the TTL
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+
+        cached = await self.backend.get(key)
+        if cached is None:
+            self.stats["misses"] += 1
+            response = await render()
+            if response.status_code != 200:
+                return response
+            media_type = response.media_type or "application/json"
+            await self.backend.set(key, media_type.encode() + b"\n" + response.body, ttl)
+            cache_status = "MISS"
+        else:
+            self.stats["hits"] += 1
+            media_type_bytes, body = cached.split(b"\n", 1)
+            response = Response(content=body, media_type=media_type_bytes.decode())
+            cache_status = "HIT"
+
+        response.headers.update(headers)
+        response.headers["X-Cache"] = cache_status
+        return response
@@ -0,0 +1,125 @@
+"""
+gzip / brotli response compression above a size threshold.
+
+Only complete (single-message) responses are compressed: list pages,
+provider directory, metrics. Streaming responses (SSE bid streams, NDJSON
+exports) pass through untouched, since buffering them would defeat the
+point of streaming.
+
+Brotli is used when the client accepts it and the `brotli` package is
+installed, otherwise gzip. Levels favour speed (API payloads are generated
+per request, not precompressed): gzip 5, brotli quality 4.
+
+A compressed response's ETag is weakened (W/"...") as it no longer
+identifies the identity-encoded bytes; If-None-Match uses weak comparison,
+so revalidation against src/cache.py still returns 304.
+"""
+
+import gzip
+import importlib.util
+import os
+
+HAS_BROTLI = importlib.util.find_spec("brotli") is not None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/x-ndjson")
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """Best supported content-coding for an Accept-Encoding header ("" for none)."""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[coding.strip()] = quality
+    if HAS_BROTLI and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return ""
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        import brotli
+
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses of at least `minimum_size` bytes."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = choose_encoding(value.decode("latin-1"))
+                break
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = start.get("headers", [])
+            if message.get("more_body", False) or not self._should_compress(headers, body):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            rewritten = []
+            for name, value in headers:
+                if name == b"content-length":
+                    continue
+                if name == b"etag" and not value.startswith(b"W/"):
+                    value = b"W/" + value
+                rewritten.append((name, value))
+            rewritten += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": rewritten})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, headers, body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.startswith(COMPRESSIBLE_TYPES)
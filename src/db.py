@@ -3,48 +3,109 @@ Database Connection Management — Central persistence layer for Verified Servic
 
 Provides:
 - PostgreSQL/async connection pooling with asyncpg
-- SQLAlchemy session management for ORM operations
+- SQLAlchemy session management for ORM operations (created lazily)
 - Health check utilities
 - Graceful error handling and connection recovery
+
+Connection budget:
+    The asyncpg pool is the only pool opened at startup. The SQLAlchemy engine
+    is built on first ORM use. With DATABASE_ORM_POOL=shared (default) the ORM
+    borrows connections from the asyncpg pool instead of opening its own, so a
+    worker never holds more than DATABASE_POOL_SIZE connections. Set
+    DATABASE_ORM_POOL=dedicated to give the ORM its own QueuePool.
 """
 
+import asyncio
+import importlib.util
+import json
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Callable, Dict, Optional
 
-try:
-    import asyncpg
-    HAS_ASYNCPG = True
-except ImportError:
-    HAS_ASYNCPG = False
+from src.metrics import record_db_time
 
-try:
-    from sqlalchemy import create_engine, text
-    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-    from sqlalchemy.orm import sessionmaker
-    HAS_SQLALCHEMY = True
-except ImportError:
-    HAS_SQLALCHEMY = False
+# asyncpg and SQLAlchemy are imported inside the init functions so that
+# importing this module (and src.main) stays cheap on cold start.
+HAS_ASYNCPG = importlib.util.find_spec("asyncpg") is not None
+HAS_SQLALCHEMY = importlib.util.find_spec("sqlalchemy") is not None
 
 logger = logging.getLogger(__name__)
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost/marketplace")
 DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "20"))
+# Connections opened at startup; src/server.py sets this to the full pool size
+DATABASE_POOL_MIN_SIZE = min(int(os.getenv("DATABASE_POOL_MIN_SIZE", "5")), DATABASE_POOL_SIZE)
 DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
 DATABASE_POOL_TIMEOUT = int(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
 DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "3600"))
+# Bound on opening the control connection: startup and health probes must not hang on a dead database
+DATABASE_CONTROL_CONNECT_TIMEOUT = float(os.getenv("DATABASE_CONTROL_CONNECT_TIMEOUT", "2"))
+DATABASE_ORM_POOL = os.getenv("DATABASE_ORM_POOL", "shared")  # shared | dedicated
+DATABASE_ORM_POOL_SIZE = int(os.getenv("DATABASE_ORM_POOL_SIZE", str(DATABASE_POOL_SIZE)))  # dedicated only
 
 # Asyncpg connection pool
-db_pool: Optional[asyncpg.Pool] = None
+db_pool: Optional["asyncpg.Pool"] = None
 
-# SQLAlchemy async engine
+# SQLAlchemy async engine (built on first ORM use)
 async_engine = None
 AsyncSessionLocal = None
+_sqlalchemy_init_lock: Optional[asyncio.Lock] = None
+
+# Control connection for LISTEN and health probes (one per worker, outside the pool)
+control_conn = None
+_listeners: dict = {}  # channel -> asyncpg listener callback, re-added on reconnect
 
 
-async def init_asyncpg_pool() -> Optional[asyncpg.Pool]:
+# Codecs SQLAlchemy's asyncpg dialect registers on each connection it opens
+# (sqlalchemy/dialects/postgresql/asyncpg.py on_connect)
+_ORM_TYPE_CODECS = ("json", "jsonb", "inet", "cidr")
+
+
+class _BorrowedConnection:
+    """
+    asyncpg connection on loan to SQLAlchemy from the shared pool.
+
+    SQLAlchemy closes driver connections when a session ends (NullPool).
+    Closing here returns the connection to the asyncpg pool instead, after
+    dropping the type codecs the dialect registered on it, so raw asyncpg
+    queries always see asyncpg's defaults (json as str) whichever layer used
+    the connection last.
+    """
+
+    __slots__ = ("_pool", "_conn")
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, attr):
+        return getattr(self._conn, attr)
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        try:
+            for type_name in _ORM_TYPE_CODECS:
+                await self._conn.reset_type_codec(type_name, schema="pg_catalog")
+        finally:
+            await self._pool.release(self._conn, timeout=timeout)
+
+    def terminate(self) -> None:
+        self._conn.terminate()
+        # Hand the dead holder back so the pool can replace it
+        asyncio.ensure_future(self._pool.release(self._conn))
+
+
+async def _borrow_pooled_connection():
+    """async_creator for the shared-mode engine."""
+    if not db_pool:
+        raise RuntimeError("asyncpg pool not initialized; cannot borrow ORM connection")
+    conn = await db_pool.acquire(timeout=DATABASE_POOL_TIMEOUT)
+    return _BorrowedConnection(db_pool, conn)
+
+
+async def init_asyncpg_pool() -> Optional["asyncpg.Pool"]:
     """
     Initialize asyncpg connection pool for high-performance async queries.
 
@@ -57,10 +118,12 @@ async def init_asyncpg_pool() -> Optional[asyncpg.Pool]:
         logger.warning("asyncpg not installed; async database layer unavailable")
         return None
 
+    import asyncpg
+
     try:
         db_pool = await asyncpg.create_pool(
             DATABASE_URL,
-            min_size=5,
+            min_size=DATABASE_POOL_MIN_SIZE,
             max_size=DATABASE_POOL_SIZE,
             max_cached_statement_lifetime=DATABASE_POOL_RECYCLE,
             max_cacheable_statement_size=15000,
@@ -78,6 +141,10 @@ async def init_sqlalchemy() -> Optional:
     """
     Initialize SQLAlchemy async engine for ORM operations.
 
+    Not called at startup; get_async_session() invokes it on first ORM use.
+    In shared mode the engine uses NullPool with an async_creator that borrows
+    from the asyncpg pool, so it opens no connections of its own.
+
     Returns:
         AsyncSession factory or None if initialization fails
     """
@@ -87,20 +154,34 @@ async def init_sqlalchemy() -> Optional:
         logger.warning("SQLAlchemy not installed; ORM layer unavailable")
         return None
 
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal
+
+    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import NullPool
+
     try:
         # Convert postgresql:// to postgresql+asyncpg:// for async driver
         async_db_url = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
-        async_engine = create_async_engine(
-            async_db_url,
-            poolclass=__import__("sqlalchemy.ext.asyncio", fromlist=["AsyncPool"]).AsyncPool,
-            pool_size=DATABASE_POOL_SIZE,
-            max_overflow=DATABASE_MAX_OVERFLOW,
-            pool_timeout=DATABASE_POOL_TIMEOUT,
-            pool_recycle=DATABASE_POOL_RECYCLE,
-            pool_pre_ping=True,
-            echo=False,
-        )
+        if DATABASE_ORM_POOL == "shared":
+            async_engine = create_async_engine(
+                async_db_url,
+                poolclass=NullPool,
+                async_creator=_borrow_pooled_connection,
+                echo=False,
+            )
+        else:
+            async_engine = create_async_engine(
+                async_db_url,
+                pool_size=DATABASE_ORM_POOL_SIZE,
+                max_overflow=DATABASE_MAX_OVERFLOW,
+                pool_timeout=DATABASE_POOL_TIMEOUT,
+                pool_recycle=DATABASE_POOL_RECYCLE,
+                pool_pre_ping=True,
+                echo=False,
+            )
 
         AsyncSessionLocal = sessionmaker(
             async_engine,
@@ -108,7 +189,7 @@ async def init_sqlalchemy() -> Optional:
             expire_on_commit=False,
         )
 
-        logger.info("SQLAlchemy async engine initialized")
+        logger.info("SQLAlchemy async engine initialized (pool: %s)", DATABASE_ORM_POOL)
         return AsyncSessionLocal
     except Exception as e:
         logger.error("Failed to initialize SQLAlchemy: %s", str(e))
@@ -117,7 +198,7 @@ async def init_sqlalchemy() -> Optional:
         return None
 
 
-def get_asyncpg_pool() -> Optional[asyncpg.Pool]:
+def get_asyncpg_pool() -> Optional["asyncpg.Pool"]:
     """
     Get asyncpg connection pool.
 
@@ -132,7 +213,7 @@ def get_sessionmaker():
     Get SQLAlchemy AsyncSession factory.
 
     Returns:
-        sessionmaker or None if not initialized
+        sessionmaker or None if the ORM has not been used yet
     """
     return AsyncSessionLocal
 
@@ -142,11 +223,21 @@ async def get_async_session():
     """
     Context manager for async database sessions.
 
+    The engine is created on the first call.
+
     Usage:
         async with get_async_session() as session:
             result = await session.execute(...)
             await session.commit()
     """
+    global _sqlalchemy_init_lock
+
+    if not AsyncSessionLocal:
+        if _sqlalchemy_init_lock is None:
+            _sqlalchemy_init_lock = asyncio.Lock()
+        async with _sqlalchemy_init_lock:
+            if not AsyncSessionLocal:
+                await init_sqlalchemy()
     if not AsyncSessionLocal:
         raise RuntimeError("AsyncSession factory not initialized")
 
@@ -177,6 +268,7 @@ async def execute_query(query: str, *args) -> Optional[list]:
         logger.warning("asyncpg pool not initialized")
         return None
 
+    started = time.perf_counter()
     try:
         async with db_pool.acquire() as conn:
             results = await conn.fetch(query, *args)
@@ -184,6 +276,205 @@ async def execute_query(query: str, *args) -> Optional[list]:
     except Exception as e:
         logger.error("Query execution failed: %s", str(e))
         return None
+    finally:
+        record_db_time(time.perf_counter() - started)
+
+
+class DatabaseUnavailableError(RuntimeError):
+    """Raised when a query is attempted without an initialized pool."""
+
+
+async def fetch(query: str, *args) -> list:
+    """
+    Execute a read query on the asyncpg pool, propagating errors.
+
+    Unlike execute_query, failures raise so API handlers can tell
+    "no rows" from "database down".
+
+    Raises:
+        DatabaseUnavailableError: pool not initialized
+    """
+    if not db_pool:
+        raise DatabaseUnavailableError("asyncpg pool not initialized")
+
+    started = time.perf_counter()
+    try:
+        async with db_pool.acquire() as conn:
+            return await conn.fetch(query, *args)
+    finally:
+        record_db_time(time.perf_counter() - started)
+
+
+async def stream(query: str, *args, prefetch: int = 1000):
+    """
+    Iterate a query's rows through a server-side cursor.
+
+    Rows are pulled `prefetch` at a time, so memory stays flat no matter how
+    many rows the query returns. The connection is held until the iterator
+    is exhausted or closed.
+
+    Raises:
+        DatabaseUnavailableError: pool not initialized
+    """
+    if not db_pool:
+        raise DatabaseUnavailableError("asyncpg pool not initialized")
+
+    # DB time covers acquire and cursor fetches, not time spent yielding rows
+    db_seconds = 0.0
+    started = time.perf_counter()
+    try:
+        async with db_pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                async for row in conn.cursor(query, *args, prefetch=prefetch):
+                    db_seconds += time.perf_counter() - started
+                    started = None
+                    yield row
+                    started = time.perf_counter()
+    finally:
+        if started is not None:
+            db_seconds += time.perf_counter() - started
+        record_db_time(db_seconds)
+
+
+@asynccontextmanager
+async def transaction():
+    """
+    Pooled connection inside a transaction, committed on normal exit and
+    rolled back if the block raises.
+
+    Raises:
+        DatabaseUnavailableError: pool not initialized
+    """
+    if not db_pool:
+        raise DatabaseUnavailableError("asyncpg pool not initialized")
+
+    started = time.perf_counter()
+    try:
+        async with db_pool.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+    finally:
+        record_db_time(time.perf_counter() - started)
+
+
+async def _get_control_connection(timeout: Optional[float] = None):
+    """
+    The worker's out-of-pool connection, opened on first use.
+
+    Used for LISTEN and health probes so neither ever waits behind, or takes
+    a slot from, user queries on the pool. If the connection was lost, the
+    replacement re-subscribes every registered channel. Opening it (connect
+    and re-subscribe) is bounded by `timeout` as a whole, by default
+    DATABASE_CONTROL_CONNECT_TIMEOUT.
+
+    Raises:
+        asyncio.TimeoutError: not connected within `timeout`
+    """
+    global control_conn
+
+    import asyncpg
+
+    timeout = DATABASE_CONTROL_CONNECT_TIMEOUT if timeout is None else timeout
+
+    async def connect():
+        conn = await asyncpg.connect(DATABASE_URL, timeout=timeout)
+        try:
+            for channel, listener in list(_listeners.items()):
+                await conn.add_listener(channel, listener)
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
+
+    if control_conn is None or control_conn.is_closed():
+        control_conn = await asyncio.wait_for(connect(), timeout)
+    return control_conn
+
+
+async def add_listeners(callbacks: Dict[str, Callable[[str], None]]) -> bool:
+    """
+    Subscribe each `callback(payload)` to its Postgres NOTIFY channel.
+
+    Listens on the control connection (one per worker, outside the pool),
+    opened at most once for all the channels. If the database is down now,
+    the channels are subscribed when the control connection next
+    reconnects (the health monitor probes it periodically).
+
+    Returns:
+        True if subscribed, False if the database is unreachable
+    """
+    if not HAS_ASYNCPG:
+        return False
+
+    def listener_for(callback):
+        def listener(_conn, _pid, _channel, payload):
+            callback(payload)
+        return listener
+
+    listeners = {channel: listener_for(callback) for channel, callback in callbacks.items()}
+    connected = control_conn is not None and not control_conn.is_closed()
+    # Recorded before connecting: a new control connection subscribes them itself,
+    # and on failure the next reconnect does
+    _listeners.update(listeners)
+    try:
+        conn = await _get_control_connection()
+        if connected:
+            for channel, listener in listeners.items():
+                await conn.add_listener(channel, listener)
+        logger.info("Listening on channels %s", ", ".join(listeners))
+        return True
+    except Exception as e:
+        logger.error("Failed to listen on %s: %s", ", ".join(listeners), str(e) or type(e).__name__)
+        return False
+
+
+async def add_listener(channel: str, callback: Callable[[str], None]) -> bool:
+    """Subscribe one channel (see add_listeners)."""
+    return await add_listeners({channel: callback})
+
+
+REPLICATION_PROBE_SQL = """
+    SELECT
+        pg_is_in_recovery() AS in_recovery,
+        CASE WHEN pg_is_in_recovery()
+            THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+            ELSE (SELECT MAX(EXTRACT(EPOCH FROM replay_lag)) FROM pg_stat_replication)
+        END::float8 AS replica_lag_seconds
+"""
+
+
+async def probe_database(timeout: float = 2.0) -> dict:
+    """
+    Connectivity and replication probe on the control connection.
+
+    Replica lag is this server's replay lag when it is a standby, otherwise
+    the worst replay lag among its streaming replicas (None if it has none).
+
+    Raises:
+        DatabaseUnavailableError: asyncpg not installed
+        Exception: connection or query failure
+    """
+    if not HAS_ASYNCPG:
+        raise DatabaseUnavailableError("asyncpg not installed")
+
+    conn = await _get_control_connection(timeout)
+    row = await conn.fetchrow(REPLICATION_PROBE_SQL, timeout=timeout)
+    return {"in_recovery": row["in_recovery"], "replica_lag_seconds": row["replica_lag_seconds"]}
+
+
+def pool_stats() -> Optional[dict]:
+    """Pool occupancy read from asyncpg's counters; never acquires a connection."""
+    if not db_pool:
+        return None
+    size, idle, max_size = db_pool.get_size(), db_pool.get_idle_size(), db_pool.get_max_size()
+    in_use = size - idle
+    return {
+        "size": size,
+        "idle": idle,
+        "in_use": in_use,
+        "max_size": max_size,
+        "saturation": in_use / max_size if max_size else 1.0,
+    }
 
 
 async def check_database() -> bool:
@@ -204,19 +495,17 @@ async def check_database() -> bool:
 
 async def shutdown():
     """Shutdown database connections."""
-    global db_pool, async_engine, AsyncSessionLocal
+    global db_pool, async_engine, AsyncSessionLocal, control_conn
 
-    # Close asyncpg pool
-    if db_pool:
+    if control_conn is not None:
         try:
-            await db_pool.close()
-            logger.info("asyncpg connection pool closed")
+            await control_conn.close()
         except Exception as e:
-            logger.error("Error closing asyncpg pool: %s", str(e))
+            logger.error("Error closing control connection: %s", str(e))
         finally:
-            db_pool = None
+            control_conn = None
 
-    # Dispose async engine
+    # Dispose async engine first; in shared mode it holds asyncpg connections
     if async_engine:
         try:
             await async_engine.dispose()
@@ -226,3 +515,13 @@ async def shutdown():
         finally:
             async_engine = None
             AsyncSessionLocal = None
+
+    # Close asyncpg pool
+    if db_pool:
+        try:
+            await db_pool.close()
+            logger.info("asyncpg connection pool closed")
+        except Exception as e:
+            logger.error("Error closing asyncpg pool: %s", str(e))
+        finally:
+            db_pool = None
@@ -0,0 +1,116 @@
+"""
+Live bid updates over Server-Sent Events.
+
+Bids notify the `bid_events` channel from a Postgres trigger (migration 004)
+with a BidSummary-shaped JSON payload. Each worker holds one LISTEN (on the
+db control connection) and fans every notification out to the in-process
+subscribers of that bid's service request, so a thousand open streams cost
+one database listener, not a thousand pollers.
+
+Clients should open the stream first and then load the current bids once
+from /api/v1/requests/{id}/bids; anything that lands in between arrives on
+the stream (duplicates are keyed by bid id).
+
+Slow consumers get a bounded queue; when it overflows the stream is closed
+and the browser's EventSource reconnects and re-lists.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+BID_EVENTS_CHANNEL = "bid_events"
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_RETRY_MS = 5000
+
+# Queue sentinel telling a stream its consumer fell behind
+_OVERFLOW = object()
+
+
+class BidEventHub:
+    """In-process pub/sub keyed by service request ID."""
+
+    def __init__(self, queue_size: int = SSE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self.stats = {"published": 0, "delivered": 0, "overflowed": 0}
+
+    def subscriber_count(self, request_id: Optional[str] = None) -> int:
+        if request_id is not None:
+            return len(self._subscribers.get(request_id, ()))
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    @contextmanager
+    def subscribe(self, request_id: str):
+        """Register a queue for `request_id`'s bid events for the block's duration."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[request_id].add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(request_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[request_id]
+
+    def publish(self, payload: str) -> None:
+        """
+        Fan a NOTIFY payload out to the request's subscribers.
+
+        Runs synchronously in the LISTEN callback; never blocks.
+        """
+        try:
+            event = json.loads(payload)
+            request_id = event["request_id"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed bid event: %r", payload)
+            return
+
+        self.stats["published"] += 1
+        for queue in list(self._subscribers.get(request_id, ())):
+            try:
+                queue.put_nowait(event)
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                # Make room for the sentinel; the stream closes on reading it
+                queue.get_nowait()
+                queue.put_nowait(_OVERFLOW)
+                self.stats["overflowed"] += 1
+
+
+def _sse(event: dict) -> bytes:
+    return f"id: {event['id']}\nevent: bid\ndata: {json.dumps(event, separators=(',', ':'))}\n\n".encode()
+
+
+async def bid_event_stream(
+    hub: BidEventHub,
+    request_id: str,
+    heartbeat: float = SSE_HEARTBEAT_SECONDS,
+) -> AsyncIterator[bytes]:
+    """
+    SSE body for one subscriber.
+
+    Sends a comment line every `heartbeat` seconds so proxies keep the
+    connection open. Ends on queue overflow; Starlette cancels it when the
+    client disconnects.
+    """
+    with hub.subscribe(request_id) as queue:
+        yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is _OVERFLOW:
+                yield b"event: overflow\ndata: {}\n\n"
+                return
+            yield _sse(event)
@@ -0,0 +1,155 @@
+"""
+Streaming NDJSON / CSV exports of request, bid and payment history.
+
+Exports read through a server-side cursor (db.stream) and are encoded in
+fixed-size chunks that are written to the client as they fill, so a
+multi-million-row export holds one chunk in memory, not the whole result.
+Rows are ordered oldest-first on (created_at, id) so an interrupted export
+can be resumed with ?since=<last created_at>&after_id=<last id>, a keyset
+seek past the last row received. Rows sharing its timestamp are not lost.
+"""
+
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+
+from src import db as database
+from src.listings import BID_SELECT, SERVICE_REQUEST_SELECT
+from src.pagination import Cursor, keyset_predicate
+
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_PREFETCH = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+PAYMENT_SELECT = """
+    SELECT
+        pay.id::text AS id,
+        pay.request_id::text AS request_id,
+        pay.bid_id::text AS bid_id,
+        pay.customer_id::text AS customer_id,
+        pay.provider_id::text AS provider_id,
+        pay.stripe_payment_intent_id,
+        pay.stripe_transfer_id,
+        (pay.amount_total * 100)::bigint AS amount_total_cents,
+        (pay.bid_amount * 100)::bigint AS bid_amount_cents,
+        (pay.customer_fee * 100)::bigint AS customer_fee_cents,
+        (pay.platform_fee * 100)::bigint AS platform_fee_cents,
+        (pay.provider_payout * 100)::bigint AS provider_payout_cents,
+        pay.status::text AS status,
+        pay.payout_status::text AS payout_status,
+        pay.escrow_held_at,
+        pay.captured_at,
+        pay.refunded_at,
+        pay.payout_completed_at,
+        pay.created_at
+    FROM payments pay
+"""
+
+# dataset -> (select, table alias)
+EXPORT_DATASETS: Dict[str, Tuple[str, str]] = {
+    "service_requests": (SERVICE_REQUEST_SELECT, "sr"),
+    "bids": (BID_SELECT, "b"),
+    "payments": (PAYMENT_SELECT, "pay"),
+}
+
+
+def build_export_query(
+    dataset: str,
+    filters: Dict[str, object],
+    since: Optional[datetime] = None,
+    after: Optional[Cursor] = None,
+) -> Tuple[str, list]:
+    """
+    Build the ordered export query for `dataset`.
+
+    Args:
+        filters: column (qualified with the dataset alias) -> required value
+        since: only rows created strictly after this timestamp
+        after: resume position; only rows after this (created_at, id) key.
+            Takes precedence over `since`
+    """
+    select_sql, alias = EXPORT_DATASETS[dataset]
+    clauses, args = [], []
+    for column, value in filters.items():
+        if value is not None:
+            args.append(value)
+            clauses.append(f"{column} = ${len(args)}")
+    if after is not None:
+        seek_sql, seek_args = keyset_predicate(
+            after, len(args) + 1, f"{alias}.created_at", f"{alias}.id", descending=False
+        )
+        args.extend(seek_args)
+        clauses.append(seek_sql)
+    elif since is not None:
+        args.append(since)
+        clauses.append(f"{alias}.created_at > ${len(args)}")
+    where = " AND ".join(clauses) or "TRUE"
+    return f"{select_sql} WHERE {where} ORDER BY {alias}.created_at, {alias}.id", args
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def _orjson_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+def _encode_ndjson(rows: List) -> bytes:
+    return b"".join(
+        orjson.dumps(dict(row), default=_orjson_default, option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def _encode_csv(rows: List, header: Optional[List[str]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    for row in rows:
+        writer.writerow([_csv_value(v) for v in row.values()])
+    return buffer.getvalue().encode()
+
+
+async def export_chunks(
+    query: str,
+    args: list,
+    fmt: str,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> AsyncIterator[bytes]:
+    """
+    Stream `query` as encoded NDJSON or CSV chunks of up to `chunk_rows` rows.
+
+    CSV output starts with a header row taken from the first row's columns.
+    """
+    batch: List = []
+    header_pending = fmt == "csv"
+
+    def encode(rows: List) -> bytes:
+        nonlocal header_pending
+        if fmt == "ndjson":
+            return _encode_ndjson(rows)
+        header = list(rows[0].keys()) if header_pending else None
+        header_pending = False
+        return _encode_csv(rows, header)
+
+    async for row in database.stream(query, *args, prefetch=EXPORT_PREFETCH):
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            yield encode(batch)
+            batch = []
+    if batch:
+        yield encode(batch)
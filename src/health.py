@@ -0,0 +1,139 @@
+"""
+Background health monitor behind /health and /health/ready.
+
+Probes run on a fixed interval in one background task per worker and the
+endpoints return the last snapshot from memory, so probe traffic (kubelet,
+load balancer, uptime checks, ...) costs nothing per request.
+
+The database probe runs on the control connection (see db.probe_database),
+never on the pool, and pool saturation is read from asyncpg's counters, so
+health checks cannot compete with user queries for a connection, even when
+the pool is exhausted.
+
+Readiness fails when any of these is true:
+- the worker is draining for shutdown (src/server.py sets `draining`)
+- the last probe failed, or no probe has completed yet
+- the snapshot is stale (the monitor itself is stuck)
+- pool saturation >= HEALTH_MAX_POOL_SATURATION
+- replica lag > HEALTH_MAX_REPLICA_LAG_SECONDS
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+from src import db as database
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+HEALTH_MAX_POOL_SATURATION = float(os.getenv("HEALTH_MAX_POOL_SATURATION", "0.95"))
+HEALTH_MAX_REPLICA_LAG_SECONDS = float(os.getenv("HEALTH_MAX_REPLICA_LAG_SECONDS", "30"))
+
+# A snapshot older than this many intervals means the monitor has stalled
+STALE_AFTER_INTERVALS = 3
+
+
+@dataclass
+class HealthSnapshot:
+    """Result of one probe round."""
+
+    checked_at: float = 0.0  # time.monotonic()
+    database_ok: bool = False
+    error: Optional[str] = None
+    probe_ms: Optional[float] = None
+    pool: Optional[dict] = None
+    in_recovery: Optional[bool] = None
+    replica_lag_seconds: Optional[float] = None
+    reasons: List[str] = field(default_factory=list)
+
+
+class HealthMonitor:
+    """Refreshes a HealthSnapshot every `interval` seconds in a background task."""
+
+    def __init__(
+        self,
+        interval: float = HEALTH_CHECK_INTERVAL,
+        probe: Callable[..., Awaitable[dict]] = database.probe_database,
+        pool_stats: Callable[[], Optional[dict]] = database.pool_stats,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.interval = interval
+        self.probe = probe
+        self.pool_stats = pool_stats
+        self.clock = clock
+        self.snapshot = HealthSnapshot(reasons=["starting"])
+        self._task: Optional[asyncio.Task] = None
+        self.draining = False
+
+    async def refresh(self) -> HealthSnapshot:
+        """Run one probe round and publish the result."""
+        snapshot = HealthSnapshot()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self.probe(timeout=HEALTH_PROBE_TIMEOUT), HEALTH_PROBE_TIMEOUT)
+            snapshot.database_ok = True
+            snapshot.in_recovery = result.get("in_recovery")
+            snapshot.replica_lag_seconds = result.get("replica_lag_seconds")
+        except Exception as e:
+            snapshot.error = str(e) or type(e).__name__
+            snapshot.reasons.append("database unavailable")
+        snapshot.probe_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        snapshot.pool = self.pool_stats()
+        if snapshot.pool is None:
+            snapshot.reasons.append("pool not initialized")
+        elif snapshot.pool["saturation"] >= HEALTH_MAX_POOL_SATURATION:
+            snapshot.reasons.append("pool saturated")
+
+        lag = snapshot.replica_lag_seconds
+        if lag is not None and lag > HEALTH_MAX_REPLICA_LAG_SECONDS:
+            snapshot.reasons.append("replica lag")
+
+        snapshot.checked_at = self.clock()
+        self.snapshot = snapshot
+        return snapshot
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Health probe round failed: %s", str(e))
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def readiness(self) -> dict:
+        """Readiness verdict from the last snapshot; performs no I/O."""
+        snapshot = self.snapshot
+        age = self.clock() - snapshot.checked_at
+        reasons = list(snapshot.reasons)
+        if self.draining:
+            reasons.insert(0, "draining")
+        if snapshot.checked_at and age > self.interval * STALE_AFTER_INTERVALS:
+            reasons.append("health snapshot stale")
+        body = asdict(snapshot)
+        body.pop("checked_at")
+        body.pop("reasons")
+        return {
+            "status": "not_ready" if reasons else "ready",
+            "reasons": reasons,
+            "age_seconds": round(age, 2) if snapshot.checked_at else None,
+            **body,
+        }
@@ -0,0 +1,75 @@
+"""
+Deferred imports and on-demand clients.
+
+Heavy SDKs (stripe, supabase, asyncpg, SQLAlchemy) cost hundreds of
+milliseconds to import. Cold-starting workers should not pay for SDKs a
+request path never touches, so modules bind them through these helpers and
+the real import / client construction happens on first attribute access.
+
+    stripe = lazy_import("stripe")          # module loads on first stripe.X
+    supabase = LazyClient(_create_supabase)  # client built on first .table()
+"""
+
+import importlib.util
+import sys
+import threading
+from typing import Any, Callable
+
+
+def lazy_import(name: str):
+    """
+    Return module `name`, deferring execution until an attribute is accessed.
+
+    Uses importlib.util.LazyLoader, so `module.attr` and `except module.Error`
+    work unchanged. Raises ImportError immediately if the module is not
+    installed; only the cost of executing it is deferred.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"No module named {name!r}")
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class LazyClient:
+    """
+    Proxy that builds a client with `factory()` on first use.
+
+    Attribute access is forwarded to the real client, so call sites keep the
+    shape `client.table("payments")...`. Construction happens once per process.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_client", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def get(self) -> Any:
+        """Return the underlying client, building it if needed."""
+        client = self._client
+        if client is None:
+            with self._lock:
+                client = self._client
+                if client is None:
+                    client = self._factory()
+                    object.__setattr__(self, "_client", client)
+        return client
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._client is not None
+
+    def reset(self) -> None:
+        """Drop the cached client (tests, credential rotation)."""
+        object.__setattr__(self, "_client", None)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.get(), attr)
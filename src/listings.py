@@ -0,0 +1,237 @@
+"""
+Read queries behind the list endpoints.
+
+Each fetch_* function returns one keyset page (see src/pagination.py):
+rows ordered newest-first on (created_at, id), the cursor for the next page,
+and an optional planner-estimated total.
+
+Pass `fields` to select only some output columns (sparse fieldsets); the
+keyset columns are always added since the cursor is built from them.
+
+Bid and provider reads are single-flighted (src/singleflight.py): identical
+concurrent calls share one query. Callers must treat returned Pages as
+read-only since they may be shared.
+"""
+
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src import db as database
+from src.pagination import Cursor, estimate_count, keyset_predicate, split_page
+from src.singleflight import SingleFlight
+
+read_flight = SingleFlight()
+
+# Values of request_status_enum and bid_status_enum (supabase migration 001);
+# anything else in a status filter is rejected before it reaches Postgres
+REQUEST_STATUSES = (
+    "draft", "open", "matching", "bidding", "awarded", "scheduled",
+    "in_progress", "completed", "disputed", "resolved", "cancelled", "closed",
+)
+BID_STATUSES = ("pending", "accepted", "rejected", "withdrawn", "expired")
+
+
+@dataclass
+class Page:
+    rows: List
+    next_cursor: Optional[str]
+    total: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Projection:
+    """
+    Output columns of a list query, so ?fields= can be pushed into SQL.
+
+    `columns` maps output name -> SQL expression in response order; `joins`
+    maps output name -> the JOIN it needs, so a join (or an EXISTS subquery
+    expression) is only paid for when its column is requested.
+    """
+
+    from_sql: str
+    columns: Dict[str, str]
+    joins: Dict[str, str] = field(default_factory=dict)
+
+    def select(self, fields: Optional[Iterable[str]] = None) -> str:
+        names = list(self.columns) if fields is None else [n for n in self.columns if n in fields]
+        joins = dict.fromkeys(self.joins[n] for n in names if n in self.joins)
+        return "\n".join([
+            "SELECT " + ", ".join(f"{self.columns[n]} AS {n}" for n in names),
+            self.from_sql,
+            *joins,
+        ])
+
+
+SERVICE_REQUEST_PROJECTION = Projection(
+    from_sql="FROM service_requests sr",
+    columns={
+        "id": "sr.id::text",
+        "title": "sr.title",
+        "description": "sr.description",
+        "customer_id": "sr.customer_id::text",
+        "service_type": "sc.slug",
+        "status": "sr.status::text",
+        "budget_cents": "COALESCE((sr.budget_max * 100)::bigint, 0)",
+        "created_at": "sr.created_at",
+        "due_date": "sr.preferred_date_end::timestamptz",
+    },
+    joins={"service_type": "JOIN service_categories sc ON sc.id = sr.category_id"},
+)
+
+# bids.provider_id is a NOT NULL foreign key, so dropping the join when
+# provider_name is not requested never changes which rows come back
+BID_PROJECTION = Projection(
+    from_sql="FROM bids b",
+    columns={
+        "id": "b.id::text",
+        "request_id": "b.request_id::text",
+        "provider_id": "b.provider_id::text",
+        "provider_name": "p.business_name",
+        "amount_cents": "(b.amount * 100)::bigint",
+        "timeline_days": "COALESCE(b.estimated_days, 0)",
+        "status": "b.status::text",
+        "submitted_at": "b.created_at",
+    },
+    joins={"provider_name": "JOIN providers p ON p.id = b.provider_id"},
+)
+
+PROVIDER_PROJECTION = Projection(
+    from_sql="FROM providers p",
+    columns={
+        "provider_id": "p.id::text",
+        "name": "p.business_name",
+        "status": "p.verification_status::text",
+        "license_verified": """EXISTS (
+            SELECT 1 FROM verifications v
+            WHERE v.provider_id = p.id AND v.status = 'passed'
+              AND v.check_type IN ('trade_license', 'business_license')
+        )""",
+        "insurance_verified": """EXISTS (
+            SELECT 1 FROM verifications v
+            WHERE v.provider_id = p.id AND v.status = 'passed'
+              AND v.check_type IN ('general_liability_insurance', 'workers_comp_insurance')
+        )""",
+        "background_check_verified": """EXISTS (
+            SELECT 1 FROM verifications v
+            WHERE v.provider_id = p.id AND v.status = 'passed'
+              AND v.check_type = 'criminal_background'
+        )""",
+        "overall_tier": "p.tier::text",
+        "created_at": "p.created_at",
+    },
+)
+
+# Full projections, shared with src/exports.py
+SERVICE_REQUEST_SELECT = SERVICE_REQUEST_PROJECTION.select()
+BID_SELECT = BID_PROJECTION.select()
+PROVIDER_SELECT = PROVIDER_PROJECTION.select()
+
+
+async def _fetch_page(
+    projection: Projection,
+    filters: List[str],
+    args: list,
+    cursor: Optional[Cursor],
+    limit: int,
+    alias: str,
+    created_at_key: str,
+    id_key: str,
+    include_total: bool,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Page:
+    if fields is not None:
+        fields = (*fields, created_at_key, id_key)
+    select_sql = projection.select(fields)
+    where = " AND ".join(filters) or "TRUE"
+    seek_sql, seek_args = keyset_predicate(
+        cursor,
+        first_param=len(args) + 1,
+        created_at_column=f"{alias}.created_at",
+        id_column=f"{alias}.id",
+    )
+    query = (
+        f"{select_sql} WHERE {where} AND {seek_sql} "
+        f"ORDER BY {alias}.created_at DESC, {alias}.id DESC "
+        f"LIMIT ${len(args) + len(seek_args) + 1}"
+    )
+    rows = await database.fetch(query, *args, *seek_args, limit + 1)
+    page_rows, next_cursor = split_page(rows, limit, key=lambda r: (r[created_at_key], r[id_key]))
+
+    total = None
+    if include_total:
+        total = await estimate_count(f"SELECT 1 {projection.from_sql} WHERE {where}", *args)
+    return Page(rows=page_rows, next_cursor=next_cursor, total=total)
+
+
+async def fetch_service_requests(
+    limit: int,
+    cursor: Optional[Cursor] = None,
+    status: Optional[str] = None,
+    customer_id: Optional[uuid.UUID] = None,
+    include_total: bool = False,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Page:
+    """Page of service requests; uses idx_service_requests_customer_id when filtered by customer."""
+    filters, args = [], []
+    if customer_id is not None:
+        args.append(customer_id)
+        filters.append(f"sr.customer_id = ${len(args)}")
+    if status is not None:
+        args.append(status)
+        filters.append(f"sr.status = ${len(args)}")
+    return await _fetch_page(
+        SERVICE_REQUEST_PROJECTION, filters, args, cursor, limit,
+        alias="sr", created_at_key="created_at", id_key="id",
+        include_total=include_total, fields=fields,
+    )
+
+
+@read_flight.coalesce("bids")
+async def fetch_bids(
+    request_id: uuid.UUID,
+    limit: int,
+    cursor: Optional[Cursor] = None,
+    status: Optional[str] = None,
+    include_total: bool = False,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Page:
+    """Page of bids for one request; uses idx_bids_request_id."""
+    filters, args = ["b.request_id = $1"], [request_id]
+    if status is not None:
+        args.append(status)
+        filters.append(f"b.status = ${len(args)}")
+    return await _fetch_page(
+        BID_PROJECTION, filters, args, cursor, limit,
+        alias="b", created_at_key="submitted_at", id_key="id",
+        include_total=include_total, fields=fields,
+    )
+
+
+@read_flight.coalesce("providers")
+async def fetch_providers(
+    limit: int,
+    cursor: Optional[Cursor] = None,
+    tier: Optional[str] = None,
+    service_type: Optional[str] = None,
+    include_total: bool = False,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Page:
+    """Page of verified, active providers; uses idx_providers_verified_created (migration 002)."""
+    filters = ["p.verification_status = 'verified'", "p.is_active = true"]
+    args = []
+    if tier is not None:
+        args.append(tier)
+        filters.append(f"p.tier = ${len(args)}")
+    if service_type is not None:
+        args.append(service_type)
+        filters.append(
+            "EXISTS (SELECT 1 FROM provider_services ps "
+            "JOIN service_categories sc ON sc.id = ps.category_id "
+            f"WHERE ps.provider_id = p.id AND sc.slug = ${len(args)})"
+        )
+    return await _fetch_page(
+        PROVIDER_PROJECTION, filters, args, cursor, limit,
+        alias="p", created_at_key="created_at", id_key="provider_id",
+        include_total=include_total, fields=fields,
+    )
@@ -2,24 +2,38 @@
 FastAPI application for Verified Services Marketplace.
 
 Provides:
-- Service request CRUD with pagination
-- Provider bid management with pagination
+- Service request CRUD with cursor pagination
+- Provider bid management with cursor pagination
 - Verification workflow endpoints
 - Marketplace analytics
+- Streaming NDJSON/CSV history exports
 - Health checks and database pooling
 """
 
+import asyncio
 import logging
+import os
+import uuid
 from contextlib import asynccontextmanager
+from dataclasses import asdict
 from datetime import datetime
-from typing import Optional, List
+from typing import List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Query, status
+from fastapi import FastAPI, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-import uvicorn
 
 from src import db as database
+from src import events, exports, listings, metrics
+from src.admission import AdmissionController, AdmissionMiddleware
+from src.compression import CompressionMiddleware
+from src.cache import CACHE_INVALIDATION_CHANNEL, ResponseCache, build_cache_backend
+from src.health import HealthMonitor
+from src.pagination import Cursor, decode_cursor
+from src.payments import earnings, stripe_limiter, webhooks
+from src.payments.escrow_state import PaymentStatus, PayoutStatus
+from src.serialization import FastJSONResponse, page_payload
 
 # Configure logging
 logging.basicConfig(
@@ -28,6 +42,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+PROVIDERS_CACHE_TTL = int(os.getenv("PROVIDERS_CACHE_TTL", "60"))
+
+response_cache = ResponseCache(build_cache_backend())
+
+health_monitor = HealthMonitor()
+
+bid_events = events.BidEventHub()
+
+admission = AdmissionController()
+
+# Stripe webhooks are stored on receipt and applied by a background processor;
+# this worker's processor only claims the set-based charge status events
+webhook_ingestor = webhooks.WebhookIngestor()
+webhook_processor = webhooks.WebhookProcessor(event_types=tuple(webhooks.COALESCED_STATUS))
+WEBHOOK_PROCESSOR_ENABLED = os.getenv("WEBHOOK_PROCESSOR_ENABLED", "true").lower() == "true"
+
 
 # ============================================================================
 # Pydantic Models
@@ -48,9 +78,9 @@ class ServiceRequestSummary(BaseModel):
 
 class ServiceRequestList(BaseModel):
     """Paginated list of service requests."""
-    total: int
-    skip: int
+    total: Optional[int] = None  # planner estimate, only when include_total=true
     limit: int
+    next_cursor: Optional[str] = None
     items: List[ServiceRequestSummary]
 
 
@@ -68,9 +98,9 @@ class BidSummary(BaseModel):
 
 class BidList(BaseModel):
     """Paginated list of bids."""
-    total: int
-    skip: int
+    total: Optional[int] = None  # planner estimate, only when include_total=true
     limit: int
+    next_cursor: Optional[str] = None
     items: List[BidSummary]
 
 
@@ -87,12 +117,22 @@ class ProviderVerification(BaseModel):
 
 class ProviderList(BaseModel):
     """Paginated list of verified providers."""
-    total: int
-    skip: int
+    total: Optional[int] = None  # planner estimate, only when include_total=true
     limit: int
+    next_cursor: Optional[str] = None
     items: List[ProviderVerification]
 
 
+class ProviderEarnings(BaseModel):
+    """Provider dashboard earnings (cents), from the materialized ledger."""
+    provider_id: str
+    total_earned: int
+    pending_payout: int
+    in_escrow: int
+    completed_payments: int
+    avg_job_payout: int
+
+
 class ErrorResponse(BaseModel):
     """Standard error response."""
     error: str
@@ -115,16 +155,36 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning("Failed to initialize asyncpg pool: %s", str(e))
 
-    try:
-        await database.init_sqlalchemy()
-        logger.info("SQLAlchemy initialized")
-    except Exception as e:
-        logger.warning("Failed to initialize SQLAlchemy: %s", str(e))
+    # SQLAlchemy is not started here: the engine is built on first ORM use
+    # and, by default, borrows from the asyncpg pool (see src/db.py).
+
+    # Provider/verification writes NOTIFY cache_invalidation (migration 003)
+    def on_cache_invalidation(namespace: str) -> None:
+        asyncio.ensure_future(response_cache.invalidate(namespace))
+
+    # One bid_events listener per worker feeds every SSE subscriber (migration 004).
+    # One bounded connection attempt for both, so a down database delays startup
+    # by at most DATABASE_CONTROL_CONNECT_TIMEOUT
+    await database.add_listeners({
+        CACHE_INVALIDATION_CHANNEL: on_cache_invalidation,
+        events.BID_EVENTS_CHANNEL: bid_events.publish,
+    })
+
+    # Health endpoints serve this monitor's snapshot; first round runs now
+    await health_monitor.refresh()
+    health_monitor.start()
+
+    processing = asyncio.ensure_future(webhook_processor.run()) if WEBHOOK_PROCESSOR_ENABLED else None
 
     yield
 
     # Shutdown
     logger.info("Shutting down Verified Services Marketplace API")
+    if processing is not None:
+        processing.cancel()
+        await asyncio.gather(processing, return_exceptions=True)
+    await webhook_ingestor.close()
+    await health_monitor.stop()
     try:
         await database.shutdown()
         logger.info("Database connections closed")
@@ -141,9 +201,16 @@ app = FastAPI(
     description="Two-sided marketplace with verified provider network",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
-# CORS middleware
+# gzip/brotli for complete responses above COMPRESSION_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Per-lane concurrency limits; exports are shed before customer reads
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# CORS middleware (outside admission, so browsers can read its 429s)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -152,6 +219,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# RED metrics per route template (outermost, so CORS time is included)
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+def _pool_gauges() -> dict:
+    stats = database.pool_stats() or {}
+    return {f'state="{key}"': stats[key] for key in ("size", "idle", "in_use", "max_size") if key in stats}
+
+
+metrics.registry.register_gauge("db_pool_connections", "asyncpg pool connections by state.", _pool_gauges)
+metrics.registry.register_gauge(
+    "singleflight_collapsed_calls",
+    "Reads served by another caller's in-flight query.",
+    lambda: {f'group="{group}"': s.collapsed for group, s in listings.read_flight.group_stats.items()},
+)
+metrics.registry.register_gauge(
+    "response_cache_requests",
+    "Cached endpoint lookups by result.",
+    lambda: {f'result="{result}"': count for result, count in response_cache.stats.items()},
+)
+metrics.registry.register_gauge(
+    "bid_stream_subscribers",
+    "Open bid SSE streams in this worker.",
+    lambda: {"": bid_events.subscriber_count()},
+)
+
+
+def _admission_gauges(key: str):
+    return lambda: {f'lane="{lane}"': stats[key] for lane, stats in admission.snapshot().items()}
+
+
+metrics.registry.register_gauge(
+    "admission_in_flight", "Admitted requests by priority lane.", _admission_gauges("in_flight")
+)
+metrics.registry.register_gauge(
+    "admission_queued", "Requests waiting for a slot by lane.", _admission_gauges("queued")
+)
+metrics.registry.register_gauge(
+    "stripe_webhook_events",
+    "Stripe webhook events by ingest/processing outcome.",
+    lambda: {
+        **{f'stage="{k}"': v for k, v in webhook_ingestor.stats.items()},
+        **{f'stage="processed_{k}"': v for k, v in webhook_processor.stats.items()},
+    },
+)
+metrics.registry.register_gauge(
+    "admission_rejected_requests", "Requests answered 429 by lane.", _admission_gauges("rejected")
+)
+metrics.registry.register_histogram(
+    "stripe_limiter_queue_seconds",
+    "Time Stripe calls waited for a rate-limit token, by priority class.",
+    lambda: {f'priority="{p.name.lower()}"': h for p, h in stripe_limiter.limiter.queue_time.items()},
+)
+metrics.registry.register_gauge(
+    "stripe_limiter_waiting",
+    "Stripe calls waiting for a rate-limit token, by priority class.",
+    lambda: {f'priority="{p.name.lower()}"': n for p, n in stripe_limiter.limiter.waiting.items()},
+)
+metrics.registry.register_gauge(
+    "stripe_limiter_throttled",
+    "Stripe 429s that paused all Stripe calls in this worker.",
+    lambda: {"": stripe_limiter.limiter.throttled},
+)
+
 
 # ============================================================================
 # Health Checks
@@ -159,33 +290,97 @@ app.add_middleware(
 
 @app.get("/health", tags=["Health"])
 async def health_check():
-    """Health check endpoint."""
-    db_ok = await database.check_database()
+    """Liveness: served from the background monitor's last snapshot, no DB round-trip."""
     return {
         "status": "healthy",
         "version": "1.0.0",
-        "database": "ready" if db_ok else "unavailable",
+        "database": "ready" if health_monitor.snapshot.database_ok else "unavailable",
     }
 
 
 @app.get("/health/ready", tags=["Health"])
-async def readiness_check():
-    """Readiness check endpoint."""
+async def readiness_check(response: Response):
+    """
+    Readiness: database reachable, pool below saturation, replica lag in bounds.
+
+    Served from memory; returns 503 while not ready so probes take the
+    worker out of rotation.
+    """
+    body = health_monitor.readiness()
+    if body["status"] != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return body
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus scrape endpoint: RED metrics per route plus pool/cache gauges."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health/coalescing", tags=["Health"])
+async def coalescing_stats():
+    """Single-flight stats for bid/provider reads: calls, executions, collapsed."""
+    return listings.read_flight.snapshot()
+
+
+# ============================================================================
+# Pagination Helpers
+# ============================================================================
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """Decode the ?cursor= query parameter or reject it with 400."""
+    if cursor is None:
+        return None
     try:
-        db_ok = await database.check_database()
-        if db_ok:
-            return {"status": "ready"}
-        else:
-            return {
-                "status": "not_ready",
-                "error": "Database unavailable",
-            }
-    except Exception as e:
-        logger.error("Readiness check failed: %s", str(e))
-        return {
-            "status": "not_ready",
-            "error": str(e),
-        }
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _parse_uuid(value: Optional[str], name: str) -> Optional[uuid.UUID]:
+    """Validate an ID parameter before it reaches Postgres."""
+    if value is None:
+        return None
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {name}")
+
+
+def _parse_status(value: Optional[str], allowed, name: str = "status") -> Optional[str]:
+    """Validate an enum filter parameter before it reaches Postgres (an unknown label is a DataError there)."""
+    if value is None:
+        return None
+    if value not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name} {value!r}; choose from {', '.join(allowed)}",
+        )
+    return value
+
+
+def _parse_fields(fields: Optional[str], model) -> Optional[Tuple[str, ...]]:
+    """Validate a ?fields= sparse fieldset against the item model, or reject it with 400."""
+    if fields is None:
+        return None
+    requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in model.model_fields]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid fields {unknown}; choose from {', '.join(model.model_fields)}",
+        )
+    return requested
+
+
+@asynccontextmanager
+async def _database_errors():
+    """Map a missing pool to 503 instead of an unhandled exception."""
+    try:
+        yield
+    except database.DatabaseUnavailableError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable")
 
 
 # ============================================================================
@@ -194,47 +389,39 @@ async def readiness_check():
 
 @app.get("/api/v1/requests", response_model=ServiceRequestList, tags=["Requests"])
 async def list_service_requests(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
     limit: int = Query(50, ge=1, le=1000, description="Number of records to return"),
     status: Optional[str] = Query(None, description="Filter by request status"),
     customer_id: Optional[str] = Query(None, description="Filter by customer ID"),
+    include_total: bool = Query(False, description="Include a planner-estimated total"),
+    fields: Optional[str] = Query(None, description="Comma-separated item fields to return (default: all)"),
 ):
     """
-    List service requests with pagination.
+    List service requests, newest first, with cursor pagination.
 
-    Returns paginated list of service requests with optional filtering.
+    Pass the returned next_cursor as ?cursor= to fetch the following page.
     """
-    # This is a placeholder implementation.
-    # In production, this would query the database:
-    # SELECT * FROM service_requests WHERE ... LIMIT limit OFFSET skip
+    item_fields = _parse_fields(fields, ServiceRequestSummary)
     logger.info(
-        "Listing service requests: skip=%d, limit=%d, status=%s, customer=%s",
-        skip,
+        "Listing service requests: limit=%d, status=%s, customer=%s, cursor=%s",
         limit,
         status,
         customer_id,
+        cursor is not None,
     )
 
-    # Mock data for demo
-    mock_requests = [
-        ServiceRequestSummary(
-            id=f"REQ_{i:06d}",
-            title=f"Service Request {i}",
-            description="Sample service request",
-            customer_id=customer_id or "CUST_001",
-            service_type="general",
-            status=status or "open",
-            budget_cents=50000,
-            created_at=datetime.now(),
+    async with _database_errors():
+        page = await listings.fetch_service_requests(
+            limit=limit,
+            cursor=_parse_cursor(cursor),
+            status=_parse_status(status, listings.REQUEST_STATUSES),
+            customer_id=_parse_uuid(customer_id, "customer_id"),
+            include_total=include_total,
+            fields=item_fields,
         )
-        for i in range(1, 11)
-    ]
-
-    return ServiceRequestList(
-        total=len(mock_requests),
-        skip=skip,
-        limit=limit,
-        items=mock_requests[skip : skip + limit],
+
+    return FastJSONResponse(
+        page_payload(page.rows, ServiceRequestSummary, limit, page.next_cursor, page.total, item_fields)
     )
 
 
@@ -245,43 +432,54 @@ async def list_service_requests(
 @app.get("/api/v1/requests/{request_id}/bids", response_model=BidList, tags=["Bids"])
 async def list_bids_for_request(
     request_id: str,
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
     limit: int = Query(50, ge=1, le=1000, description="Number of records to return"),
     status: Optional[str] = Query(None, description="Filter by bid status"),
+    include_total: bool = Query(False, description="Include a planner-estimated total"),
+    fields: Optional[str] = Query(None, description="Comma-separated item fields to return (default: all)"),
 ):
     """
-    List bids for a specific service request with pagination.
+    List bids for a specific service request, newest first, with cursor pagination.
 
-    Returns paginated list of bids from verified providers.
+    Returns bids from verified providers.
     """
+    item_fields = _parse_fields(fields, BidSummary)
     logger.info(
-        "Listing bids for request %s: skip=%d, limit=%d, status=%s",
+        "Listing bids for request %s: limit=%d, status=%s, cursor=%s",
         request_id,
-        skip,
         limit,
         status,
+        cursor is not None,
     )
 
-    # Mock data for demo
-    mock_bids = [
-        BidSummary(
-            id=f"BID_{i:06d}",
-            request_id=request_id,
-            provider_id=f"PROV_{i:04d}",
-            provider_name=f"Provider {i}",
-            amount_cents=45000 + (i * 1000),
-            timeline_days=7 + i,
-            status=status or "pending",
-            submitted_at=datetime.now(),
+    async with _database_errors():
+        page = await listings.fetch_bids(
+            request_id=_parse_uuid(request_id, "request_id"),
+            limit=limit,
+            cursor=_parse_cursor(cursor),
+            status=_parse_status(status, listings.BID_STATUSES),
+            include_total=include_total,
+            fields=item_fields,
         )
-        for i in range(1, 6)
-    ]
-
-    return BidList(
-        total=len(mock_bids),
-        skip=skip,
-        limit=limit,
-        items=mock_bids[skip : skip + limit],
+
+    return FastJSONResponse(
+        page_payload(page.rows, BidSummary, limit, page.next_cursor, page.total, item_fields)
+    )
+
+
+@app.get("/api/v1/requests/{request_id}/bids/stream", tags=["Bids"])
+async def stream_bids_for_request(request_id: str):
+    """
+    Server-Sent Events stream of new bids and bid status changes for a request.
+
+    Replaces polling the bids list: open the stream, then list once.
+    """
+    request_uuid = _parse_uuid(request_id, "request_id")
+    logger.info("Bid stream opened: request=%s", request_uuid)
+    return StreamingResponse(
+        events.bid_event_stream(bid_events, str(request_uuid)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -291,46 +489,182 @@ async def list_bids_for_request(
 
 @app.get("/api/v1/providers", response_model=ProviderList, tags=["Providers"])
 async def list_verified_providers(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
     limit: int = Query(50, ge=1, le=1000, description="Number of records to return"),
     tier: Optional[str] = Query(None, description="Filter by provider tier (elite, preferred, standard)"),
     service_type: Optional[str] = Query(None, description="Filter by service type"),
+    include_total: bool = Query(False, description="Include a planner-estimated total"),
+    fields: Optional[str] = Query(None, description="Comma-separated item fields to return (default: all)"),
 ):
     """
-    List verified providers with pagination.
+    List verified providers, newest first, with cursor pagination.
 
-    Returns paginated list of verified service providers.
+    Returns verified, active service providers. Responses are cached per
+    query string for PROVIDERS_CACHE_TTL seconds and carry an ETag; a
+    matching If-None-Match returns 304.
     """
-    logger.info(
-        "Listing verified providers: skip=%d, limit=%d, tier=%s, service=%s",
-        skip,
-        limit,
-        tier,
-        service_type,
-    )
+    item_fields = _parse_fields(fields, ProviderVerification)
+
+    async def render() -> FastJSONResponse:
+        logger.info(
+            "Listing verified providers: limit=%d, tier=%s, service=%s, cursor=%s",
+            limit,
+            tier,
+            service_type,
+            cursor is not None,
+        )
 
-    # Mock data for demo
-    mock_providers = [
-        ProviderVerification(
-            provider_id=f"PROV_{i:06d}",
-            name=f"Provider {i}",
-            status="active",
-            license_verified=True,
-            insurance_verified=True,
-            background_check_verified=True,
-            overall_tier=tier or "standard",
+        async with _database_errors():
+            page = await listings.fetch_providers(
+                limit=limit,
+                cursor=_parse_cursor(cursor),
+                tier=tier,
+                service_type=service_type,
+                include_total=include_total,
+                fields=item_fields,
+            )
+
+        return FastJSONResponse(
+            page_payload(page.rows, ProviderVerification, limit, page.next_cursor, page.total, item_fields)
         )
-        for i in range(1, 11)
-    ]
-
-    return ProviderList(
-        total=len(mock_providers),
-        skip=skip,
-        limit=limit,
-        items=mock_providers[skip : skip + limit],
+
+    return await response_cache.serve(request, "providers", PROVIDERS_CACHE_TTL, render)
+
+
+@app.get("/api/v1/providers/{provider_id}/earnings", response_model=ProviderEarnings, tags=["Providers"])
+async def get_provider_earnings(provider_id: str):
+    """
+    Provider dashboard earnings summary.
+
+    One primary-key read of provider_earnings, which triggers on payments
+    keep current (src/payments/earnings.py); no aggregate and no Stripe call.
+    """
+    provider_uuid = _parse_uuid(provider_id, "provider_id")
+    async with _database_errors():
+        summary = await earnings.provider_earnings(str(provider_uuid))
+    return ProviderEarnings(**asdict(summary))
+
+
+# ============================================================================
+# Export Endpoints
+# ============================================================================
+
+def _export_response(
+    dataset: str,
+    filters: dict,
+    since: Optional[datetime],
+    after_id: Optional[str],
+    format: str,
+) -> StreamingResponse:
+    """Stream `dataset` as NDJSON/CSV straight from a server-side cursor."""
+    after = None
+    if after_id is not None:
+        if since is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="after_id requires since")
+        after = Cursor(created_at=since, id=str(_parse_uuid(after_id, "after_id")))
+    if database.get_asyncpg_pool() is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable")
+
+    query, args = exports.build_export_query(dataset, filters, since, after)
+    logger.info("Exporting %s as %s (filters=%s, since=%s, after_id=%s)", dataset, format, filters, since, after_id)
+    return StreamingResponse(
+        exports.export_chunks(query, args, format),
+        media_type=exports.EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
+
+
+@app.get("/api/v1/requests/export", tags=["Exports"])
+async def export_service_requests(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    status: Optional[str] = Query(None, description="Filter by request status"),
+    customer_id: Optional[str] = Query(None, description="Filter by customer ID"),
+    since: Optional[datetime] = Query(None, description="Only rows created after this time"),
+    after_id: Optional[str] = Query(None, description="Resume after the row (since, after_id): last id received"),
+):
+    """Stream the full service request history, oldest first."""
+    return _export_response(
+        "service_requests",
+        {
+            "sr.status": _parse_status(status, listings.REQUEST_STATUSES),
+            "sr.customer_id": _parse_uuid(customer_id, "customer_id"),
+        },
+        since,
+        after_id,
+        format,
+    )
+
+
+@app.get("/api/v1/bids/export", tags=["Exports"])
+async def export_bids(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    request_id: Optional[str] = Query(None, description="Filter by service request ID"),
+    provider_id: Optional[str] = Query(None, description="Filter by provider ID"),
+    status: Optional[str] = Query(None, description="Filter by bid status"),
+    since: Optional[datetime] = Query(None, description="Only rows created after this time"),
+    after_id: Optional[str] = Query(None, description="Resume after the row (since, after_id): last id received"),
+):
+    """Stream the full bid history, oldest first."""
+    return _export_response(
+        "bids",
+        {
+            "b.request_id": _parse_uuid(request_id, "request_id"),
+            "b.provider_id": _parse_uuid(provider_id, "provider_id"),
+            "b.status": _parse_status(status, listings.BID_STATUSES),
+        },
+        since,
+        after_id,
+        format,
+    )
+
+
+@app.get("/api/v1/payments/export", tags=["Exports"])
+async def export_payments(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    status: Optional[str] = Query(None, description="Filter by payment status"),
+    payout_status: Optional[str] = Query(None, description="Filter by payout status"),
+    provider_id: Optional[str] = Query(None, description="Filter by provider ID"),
+    since: Optional[datetime] = Query(None, description="Only rows created after this time"),
+    after_id: Optional[str] = Query(None, description="Resume after the row (since, after_id): last id received"),
+):
+    """Stream the full payment history (amounts in cents), oldest first."""
+    return _export_response(
+        "payments",
+        {
+            "pay.status": _parse_status(status, [s.value for s in PaymentStatus]),
+            "pay.payout_status": _parse_status(payout_status, [s.value for s in PayoutStatus], "payout_status"),
+            "pay.provider_id": _parse_uuid(provider_id, "provider_id"),
+        },
+        since,
+        after_id,
+        format,
     )
 
 
+# ============================================================================
+# Webhooks
+# ============================================================================
+
+@app.post("/api/v1/webhooks/stripe", tags=["Webhooks"])
+async def stripe_webhook(request: Request):
+    """
+    Verify, store and acknowledge a Stripe event.
+
+    Processing happens asynchronously (src/payments/webhooks.py). A 5xx
+    means the event was not stored and Stripe should redeliver it.
+    """
+    payload = await request.body()
+    try:
+        event = webhooks.verify_event(payload, request.headers.get("stripe-signature", ""))
+    except webhooks.SignatureError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async with _database_errors():
+        await webhook_ingestor.ingest(event, payload)
+    return {"received": True}
+
+
 # ============================================================================
 # Root Endpoint
 # ============================================================================
@@ -345,9 +679,14 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "health": "/health",
-            "requests": "/api/v1/requests?skip=0&limit=50",
-            "bids": "/api/v1/requests/{request_id}/bids?skip=0&limit=50",
-            "providers": "/api/v1/providers?skip=0&limit=50",
+            "metrics": "/metrics",
+            "requests": "/api/v1/requests?limit=50",
+            "bids": "/api/v1/requests/{request_id}/bids?limit=50",
+            "bid_stream": "/api/v1/requests/{request_id}/bids/stream",
+            "providers": "/api/v1/providers?limit=50",
+            "provider_earnings": "/api/v1/providers/{provider_id}/earnings",
+            "exports": "/api/v1/{requests|bids|payments}/export?format=ndjson|csv",
+            "stripe_webhooks": "/api/v1/webhooks/stripe",
         },
     }
 
@@ -371,6 +710,9 @@ async def global_exception_handler(request, exc):
 
 
 if __name__ == "__main__":
+    # Development server; production runs `python -m src.server`
+    import uvicorn
+
     uvicorn.run(
         "src.main:app",
         host="0.0.0.0",
@@ -0,0 +1,232 @@
+"""
+RED metrics (rate, errors, duration) per route template, served at /metrics.
+
+MetricsMiddleware is a pure ASGI middleware: per request it takes two
+perf_counter readings, sums response body sizes from the send stream and
+updates a handful of counters under the GIL, so overhead stays in the low
+microseconds (benchmarks/bench_metrics_overhead.py).
+
+Requests are labelled by FastAPI route template (`/api/v1/requests/{request_id}/bids`),
+never by raw path, so cardinality is bounded by the number of routes.
+Unmatched paths share the label "unmatched".
+
+DB time is correlated through a context variable: the middleware installs a
+per-request accumulator and src/db.py adds each query's elapsed time to it
+via record_db_time(). Work a request hands to another task inherits the
+accumulator (tasks copy context), so single-flighted reads charge their DB
+time to the request that actually ran the query.
+
+Exposed series (Prometheus text format 0.0.4):
+    http_requests_total{method,route,status}
+    http_request_duration_seconds{method,route}        histogram
+    http_response_size_bytes{method,route}             histogram
+    http_request_size_bytes_total{method,route}
+    http_request_db_seconds{method,route}              histogram
+    http_request_db_queries_total{method,route}
+    http_requests_in_progress
+plus any gauges and histograms registered with register_gauge() and
+register_histogram().
+
+SLO 1 (matching p95 < 5s) reads the 5.0 duration bucket; SLO 5 (99% not
+dropped) reads the 429/503 share of http_requests_total.
+"""
+
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DB_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+UNMATCHED_ROUTE = "unmatched"
+
+# [db_seconds, db_queries] for the request being served, if any
+_request_db: ContextVar[Optional[List[float]]] = ContextVar("request_db", default=None)
+
+
+def record_db_time(elapsed: float) -> None:
+    """Charge one query's elapsed seconds to the current request (no-op outside requests)."""
+    accumulator = _request_db.get()
+    if accumulator is not None:
+        accumulator[0] += elapsed
+        accumulator[1] += 1
+
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() is one bisect and three adds."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing quantile `q` (None if empty or in +Inf)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return None
+
+
+class RouteMetrics:
+    __slots__ = ("statuses", "duration", "response_size", "request_bytes", "db_time", "db_queries")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.request_bytes = 0
+        self.db_time = Histogram(DB_BUCKETS)
+        self.db_queries = 0
+
+
+class MetricsRegistry:
+    """Process-wide store for per-route metrics and extra gauges."""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.in_progress = 0
+        self._gauges: List[Tuple[str, str, Callable[[], Dict[str, float]]]] = []
+        self._histograms: List[Tuple[str, str, Callable[[], Dict[str, Histogram]]]] = []
+
+    def route(self, method: str, route: str) -> RouteMetrics:
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        return metrics
+
+    def register_gauge(self, name: str, help_text: str, read: Callable[[], Dict[str, float]]) -> None:
+        """
+        Add a gauge read at scrape time.
+
+        `read()` returns {label_string: value}; use "" for an unlabelled gauge,
+        e.g. {'group="bids"': 12}.
+        """
+        self._gauges.append((name, help_text, read))
+
+    def register_histogram(self, name: str, help_text: str, read: Callable[[], Dict[str, Histogram]]) -> None:
+        """Add histograms read at scrape time; `read()` returns {label_string: Histogram}."""
+        self._histograms.append((name, help_text, read))
+
+    def render(self) -> str:
+        """Prometheus text exposition of everything recorded so far."""
+        lines = [
+            "# HELP http_requests_total Requests by route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route), m in self.routes.items():
+            for status_code, count in m.statuses.items():
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status_code}"}} {count}')
+
+        for name, help_text, attr in (
+            ("http_request_duration_seconds", "Request duration until the last body byte.", "duration"),
+            ("http_response_size_bytes", "Response body size.", "response_size"),
+            ("http_request_db_seconds", "Database time spent per request.", "db_time"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), m in self.routes.items():
+                _render_histogram(lines, name, f'method="{method}",route="{route}"', getattr(m, attr))
+
+        for name, help_text, attr in (
+            ("http_request_size_bytes_total", "Request body bytes (Content-Length).", "request_bytes"),
+            ("http_request_db_queries_total", "Database queries issued by requests.", "db_queries"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (method, route), m in self.routes.items():
+                lines.append(f'{name}{{method="{method}",route="{route}"}} {getattr(m, attr)}')
+
+        lines.append("# HELP http_requests_in_progress Requests currently being served.")
+        lines.append("# TYPE http_requests_in_progress gauge")
+        lines.append(f"http_requests_in_progress {self.in_progress}")
+
+        for name, help_text, read in self._gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in read().items():
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+        for name, help_text, read in self._histograms:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in read().items():
+                _render_histogram(lines, name, labels, histogram)
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(lines: List[str], name: str, labels: str, histogram: Histogram) -> None:
+    prefix = f"{labels}," if labels else ""
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.sum}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording RED metrics into a MetricsRegistry."""
+
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        response_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        accumulator = [0.0, 0]
+        token = _request_db.set(accumulator)
+        self.registry.in_progress += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.registry.in_progress -= 1
+            _request_db.reset(token)
+
+            route = scope.get("route")
+            metrics = self.registry.route(scope["method"], route.path if route is not None else UNMATCHED_ROUTE)
+            metrics.statuses[status_code] = metrics.statuses.get(status_code, 0) + 1
+            metrics.duration.observe(elapsed)
+            metrics.response_size.observe(response_bytes)
+            metrics.db_time.observe(accumulator[0])
+            metrics.db_queries += accumulator[1]
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    metrics.request_bytes += int(value)
+                    break
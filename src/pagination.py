@@ -0,0 +1,116 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered newest-first on (created_at, id). Instead of OFFSET, each
+page returns an opaque cursor holding the last row's key, and the next query
+seeks past it:
+
+    WHERE (created_at, id) < ($1, $2) ORDER BY created_at DESC, id DESC LIMIT n
+
+That seek is an index range scan on the (..., created_at DESC) indexes, so
+page 900 costs the same as page 1. Totals are optional and come from the
+planner's row estimate rather than COUNT(*).
+"""
+
+import base64
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from src import db as database
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Cursor:
+    created_at: datetime
+    id: str
+
+
+def encode_cursor(created_at: datetime, row_id: Any) -> str:
+    """Encode a row key as an opaque, URL-safe cursor token."""
+    payload = json.dumps([created_at.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Decode a cursor token.
+
+    Raises:
+        ValueError: token is malformed or was not produced by encode_cursor
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return Cursor(created_at=datetime.fromisoformat(created_at), id=str(uuid.UUID(str(row_id))))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+
+
+def keyset_predicate(
+    cursor: Optional[Cursor],
+    first_param: int,
+    created_at_column: str = "created_at",
+    id_column: str = "id",
+    descending: bool = True,
+) -> Tuple[str, list]:
+    """
+    Build the seek predicate for a (created_at, id) page.
+
+    Args:
+        cursor: Decoded cursor, or None for the first page
+        first_param: Number of the first $n placeholder to use
+        descending: Newest-first order (seek below the cursor); False seeks above it
+
+    Returns:
+        (sql, args) — sql is "TRUE" and args empty on the first page
+    """
+    if cursor is None:
+        return "TRUE", []
+    sql = (
+        f"({created_at_column}, {id_column}) {'<' if descending else '>'} "
+        f"(${first_param}::timestamptz, ${first_param + 1}::uuid)"
+    )
+    return sql, [cursor.created_at, cursor.id]
+
+
+def split_page(
+    rows: Sequence,
+    limit: int,
+    key: Callable[[Any], Tuple[datetime, Any]],
+) -> Tuple[List, Optional[str]]:
+    """
+    Split rows fetched with LIMIT limit + 1 into (page, next_cursor).
+
+    The extra row only signals that another page exists; it is not returned.
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    created_at, row_id = key(page[-1])
+    return page, encode_cursor(created_at, row_id)
+
+
+async def estimate_count(query: str, *args) -> Optional[int]:
+    """
+    Estimated row count for `query` from the planner (EXPLAIN, not COUNT(*)).
+
+    Accuracy follows table statistics (ANALYZE); good enough for "about N
+    results" in the UI and constant-time regardless of table size.
+    """
+    rows = await database.execute_query(f"EXPLAIN (FORMAT JSON) {query}", *args)
+    if not rows:
+        return None
+    try:
+        plan = rows[0]["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        logger.warning("Could not read row estimate from plan: %s", str(e))
+        return None
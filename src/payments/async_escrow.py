@@ -0,0 +1,241 @@
+"""
+Non-blocking EscrowManager for the asyncio event loop.
+
+The stripe SDK pinned here (7.x) has no async client, so each Stripe call
+would block the event loop for a full HTTPS round trip. AsyncEscrowManager
+exposes the same methods as EscrowManager as coroutines and runs the
+Stripe-calling ones on a bounded thread pool:
+
+- at most STRIPE_MAX_CONCURRENCY calls are in flight per process; further
+  calls wait in the executor queue without holding the loop
+- the SDK's requests client keeps one keep-alive session per thread, so
+  the pool's threads reuse their HTTPS connections to Stripe
+- errors are unchanged: StripeErrors surface as the same ValueError
+  messages EscrowManager raises
+
+Pure computations (fees, error lookup) run inline; they never touch the
+network. get_provider_earnings and generate_1099_summary read the earnings
+ledger and the bulk 1099 job's output from the database instead of taking
+caller-supplied totals.
+
+Workers and jobs open it with `async with`, which first replays the
+journal's pending operations (EscrowManager.reconcile) so a call left
+unknown by a crash is settled before new work starts. What the replays did
+is then written to payments (record_replays), since the process that made
+the original call died before it could:
+
+    async with AsyncEscrowManager() as escrow:
+        hold = await escrow.create_escrow(bid_id, amount, customer, account)
+        ...
+"""
+
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from src import db as database
+from src.payments import earnings, tax_reporting
+from src.payments.escrow_manager import EscrowHold, EscrowManager, PayoutSummary
+from src.payments.escrow_state import PaymentStatus, Transition, apply_transitions
+from src.payments.stripe_limiter import STRIPE_MAX_CONCURRENCY, Priority
+
+logger = logging.getLogger(__name__)
+
+REPLAYED_PAYMENTS_SQL = """
+    SELECT id::text AS id, stripe_payment_intent_id
+    FROM payments
+    WHERE stripe_payment_intent_id = ANY($1::text[])
+"""
+
+# A replayed transfer is recorded as capture_payment_and_transfer_to_provider
+# records one; a payment that already has a transfer is left alone
+RECORD_TRANSFERS_SQL = """
+    UPDATE payments AS p
+    SET stripe_transfer_id = u.transfer_id,
+        payout_status = 'scheduled',
+        payout_scheduled_at = NOW(),
+        updated_at = NOW()
+    FROM unnest($1::text[], $2::text[]) AS u(payment_intent_id, transfer_id)
+    WHERE p.stripe_payment_intent_id = u.payment_intent_id
+      AND p.stripe_transfer_id IS NULL
+"""
+
+# Replayed operations that move payments.status, in the order they apply
+REPLAY_STAGES = ("hold_funds", "capture_payment", "initiate_refund")
+
+
+def _replayed_status(outcome: dict) -> Optional[PaymentStatus]:
+    """The payment status a successful replay leaves the payment in, if it changes it."""
+    result, operation = outcome["result"], outcome["operation"]
+    if operation == "hold_funds" and result["status"] == "requires_capture":
+        return PaymentStatus.ESCROW_HELD
+    if operation == "capture_payment" and result["status"] == "succeeded":
+        return PaymentStatus.CAPTURED
+    if operation == "initiate_refund" and result["status"] in ("pending", "succeeded"):
+        return PaymentStatus.REFUNDED if result["refund_type"] == "full" else PaymentStatus.PARTIALLY_REFUNDED
+    return None
+
+
+async def record_replays(replays: List[dict]) -> None:
+    """
+    Write the outcome of EscrowManager.reconcile() replays to payments.
+
+    Holds, captures and refunds go through the state machine
+    (apply_transitions), one stage after another so a payment held and
+    captured in the same reconcile ends up captured; transfers set
+    stripe_transfer_id and payout_status. Replayed creates have no payments
+    row to update (the caller inserts it after the PaymentIntent exists).
+    Transitions the state machine rejects are logged, not raised.
+    """
+    succeeded = [outcome for outcome in replays if "result" in outcome and outcome["payment_intent_id"]]
+    if not succeeded:
+        return
+    rows = await database.fetch(
+        REPLAYED_PAYMENTS_SQL, sorted({outcome["payment_intent_id"] for outcome in succeeded})
+    )
+    payment_ids = {row["stripe_payment_intent_id"]: row["id"] for row in rows}
+
+    for operation in REPLAY_STAGES:
+        # Later replays of the same payment (a second partial refund) win
+        targets: Dict[str, PaymentStatus] = {}
+        for outcome in succeeded:
+            payment_id = payment_ids.get(outcome["payment_intent_id"])
+            status = _replayed_status(outcome) if outcome["operation"] == operation else None
+            if payment_id is not None and status is not None:
+                targets[payment_id] = status
+        if not targets:
+            continue
+        report = await apply_transitions([Transition(payment_id, status) for payment_id, status in targets.items()])
+        for conflict in report.conflicts:
+            logger.warning(
+                "Replayed %s not recorded for payment %s: %s (status %s)",
+                operation, conflict.transition.payment_id, conflict.conflict, conflict.current_status,
+            )
+
+    transfers = [
+        (outcome["payment_intent_id"], outcome["result"]["transfer_id"])
+        for outcome in succeeded
+        if outcome["operation"] == "release_to_provider"
+    ]
+    if transfers:
+        await database.fetch(RECORD_TRANSFERS_SQL, *[list(column) for column in zip(*transfers)])
+
+
+class AsyncEscrowManager:
+    """EscrowManager whose Stripe calls run off the event loop."""
+
+    def __init__(
+        self,
+        manager: Optional[EscrowManager] = None,
+        max_concurrency: int = STRIPE_MAX_CONCURRENCY,
+    ):
+        self.manager = manager if manager is not None else EscrowManager()
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="stripe")
+
+    async def _run(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    def close(self) -> None:
+        """Wait for in-flight Stripe calls and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        try:
+            await self.reconcile()
+        except BaseException:
+            await asyncio.get_running_loop().run_in_executor(None, self.close)
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    # Stripe calls (thread pool)
+
+    async def create_escrow(
+        self,
+        bid_id: str,
+        bid_amount_cents: int,
+        customer_stripe_id: str,
+        provider_stripe_account_id: str,
+        provider_tier: str = "standard",
+    ) -> EscrowHold:
+        return await self._run(
+            self.manager.create_escrow,
+            bid_id, bid_amount_cents, customer_stripe_id, provider_stripe_account_id, provider_tier,
+        )
+
+    async def hold_funds(self, payment_intent_id: str, amount_cents: int, bid_id: Optional[str] = None) -> dict:
+        return await self._run(self.manager.hold_funds, payment_intent_id, amount_cents, bid_id)
+
+    async def capture_payment(
+        self,
+        payment_intent_id: str,
+        amount_cents: int,
+        bid_id: Optional[str] = None,
+        priority: Optional[Priority] = None,
+    ) -> dict:
+        return await self._run(self.manager.capture_payment, payment_intent_id, amount_cents, bid_id, priority)
+
+    async def release_to_provider(
+        self,
+        payment_intent_id: str,
+        provider_stripe_account_id: str,
+        provider_payout_cents: int,
+        platform_fee_cents: int,
+        bid_id: Optional[str] = None,
+    ) -> dict:
+        return await self._run(
+            self.manager.release_to_provider,
+            payment_intent_id, provider_stripe_account_id, provider_payout_cents, platform_fee_cents, bid_id,
+        )
+
+    async def initiate_refund(
+        self,
+        payment_intent_id: str,
+        refund_type: str = "full",
+        refund_amount_cents: Optional[int] = None,
+        reason: str = "requested_by_customer",
+        bid_id: Optional[str] = None,
+        refund_seq: int = 1,
+    ) -> dict:
+        return await self._run(
+            self.manager.initiate_refund,
+            payment_intent_id, refund_type, refund_amount_cents, reason, bid_id, refund_seq,
+        )
+
+    async def reconcile(self) -> List[dict]:
+        replays = await self._run(self.manager.reconcile)
+        await record_replays(replays)
+        return replays
+
+    async def get_provider_earnings(self, provider_id: str, stripe_account_id: Optional[str] = None) -> PayoutSummary:
+        return await earnings.provider_earnings(provider_id)
+
+    # Pure computations (inline)
+
+    async def create_payment_intent(
+        self,
+        bid_id: str,
+        bid_amount_cents: int,
+        customer_stripe_id: str,
+        provider_stripe_account_id: str,
+        provider_tier: str = "standard",
+    ) -> dict:
+        return self.manager.create_payment_intent(
+            bid_id, bid_amount_cents, customer_stripe_id, provider_stripe_account_id, provider_tier
+        )
+
+    async def handle_payment_errors(self, error_type: str) -> dict:
+        return self.manager.handle_payment_errors(error_type)
+
+    async def generate_1099_summary(self, provider_id: str, year: int) -> dict:
+        return await tax_reporting.provider_summary(provider_id, year)
+
+    async def calculate_platform_economics(self, bid_amount_cents: int, tier: str = "standard") -> dict:
+        return self.manager.calculate_platform_economics(bid_amount_cents, tier)
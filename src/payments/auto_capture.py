@@ -0,0 +1,193 @@
+"""
+Scheduled batch capture of confirmed escrow holds.
+
+Stripe card authorizations expire AUTHORIZATION_DAYS after the hold; an
+escrow payment that is never captured is lost. Replaces capturing one job
+at a time by hand. Each run:
+
+1. selects payments still escrow_held whose job the customer confirmed
+   complete (service_requests.status = 'completed'), with no open dispute,
+   and whose authorization expires within AUTO_CAPTURE_WINDOW_HOURS.
+   Oldest holds come first, AUTO_CAPTURE_PAGE_SIZE rows per keyset-paged
+   query (partial index from migration 010)
+2. captures each page concurrently on AsyncEscrowManager's bounded thread
+   pool, AUTO_CAPTURE_CONCURRENCY captures in flight. Captures run in the
+   Stripe rate limiter's default class, below interactive calls. Each one
+   carries idempotency_key(bid_id, "capture"), the same key as a manual
+   capture of that bid, so a capture that raced another or is repeated by
+   a rerun is never charged twice
+3. records the page's outcomes in one set-based apply_transitions()
+   statement: captured payments -> captured, authorizations Stripe reports
+   expired -> failed
+
+Any other failed capture leaves the payment escrow_held; the next run
+retries it while the authorization lasts. Every run returns an
+AutoCaptureReport with throughput and failures by Stripe error code.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from src import db as database
+from src.payments.async_escrow import AsyncEscrowManager
+from src.payments.escrow_state import PaymentStatus, Transition, TransitionResult, apply_transitions
+from src.payments.stripe_limiter import Priority
+
+logger = logging.getLogger(__name__)
+
+AUTHORIZATION_DAYS = 7
+AUTO_CAPTURE_WINDOW_HOURS = float(os.getenv("AUTO_CAPTURE_WINDOW_HOURS", "48"))
+AUTO_CAPTURE_PAGE_SIZE = int(os.getenv("AUTO_CAPTURE_PAGE_SIZE", "500"))
+AUTO_CAPTURE_CONCURRENCY = int(os.getenv("AUTO_CAPTURE_CONCURRENCY", "16"))
+
+START_POSITION = "00000000-0000-0000-0000-000000000000"
+
+# Stripe error codes meaning the hold is gone for good
+EXPIRED_CODES = frozenset({"charge_expired_for_capture"})
+
+# Keyset on (escrow_held_at, id): failed captures stay escrow_held, so a run
+# must move past them rather than select them again
+DUE_CAPTURES_SQL = """
+    SELECT p.id::text AS id,
+           p.bid_id::text AS bid_id,
+           p.stripe_payment_intent_id,
+           (p.amount_total * 100)::bigint AS amount_cents,
+           p.escrow_held_at,
+           p.version
+    FROM payments p
+    JOIN service_requests r ON r.id = p.request_id
+    WHERE p.status = 'escrow_held'
+      AND p.escrow_held_at <= $1
+      AND (p.escrow_held_at, p.id) > ($2, $3::uuid)
+      AND r.status = 'completed'
+      AND NOT EXISTS (
+          SELECT 1 FROM disputes d
+          WHERE d.payment_id = p.id AND d.status <> 'resolved'
+      )
+    ORDER BY p.escrow_held_at, p.id
+    LIMIT $4
+"""
+
+
+@dataclass
+class AutoCaptureReport:
+    pages: int = 0
+    selected: int = 0
+    captured: int = 0
+    captured_cents: int = 0
+    expired: int = 0
+    failed: int = 0
+    failures: Counter = field(default_factory=Counter)  # Stripe error code -> count
+    conflicts: List[TransitionResult] = field(default_factory=list)  # outcomes the DB could not record
+    statements: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.captured / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def failure_code(error: Exception) -> str:
+    """Stripe error code behind an EscrowManager ValueError ("error" if none)."""
+    cause = error.__cause__ or error.__context__
+    return getattr(cause, "code", None) or getattr(error, "code", None) or "error"
+
+
+class AutoCaptureJob:
+    """Bounded-concurrency capture of confirmed holds nearing authorization expiry."""
+
+    def __init__(
+        self,
+        escrow: Optional[AsyncEscrowManager] = None,
+        window_hours: float = AUTO_CAPTURE_WINDOW_HOURS,
+        page_size: int = AUTO_CAPTURE_PAGE_SIZE,
+        concurrency: int = AUTO_CAPTURE_CONCURRENCY,
+    ):
+        self.escrow = escrow
+        self.window = timedelta(hours=window_hours)
+        self.page_size = page_size
+        self.concurrency = concurrency
+
+    async def run(self, now: Optional[datetime] = None, max_pages: Optional[int] = None) -> AutoCaptureReport:
+        """Capture every due payment; `max_pages` stops early."""
+        now = now or datetime.now(timezone.utc)
+        expires_after = now - timedelta(days=AUTHORIZATION_DAYS)
+        due_before = expires_after + self.window
+        report = AutoCaptureReport()
+        started = time.perf_counter()
+
+        escrow = self.escrow or AsyncEscrowManager(max_concurrency=self.concurrency)
+        try:
+            if self.escrow is None:
+                # Settle captures a crashed run left unknown before selecting new ones
+                await escrow.reconcile()
+            position = (expires_after, START_POSITION)
+            while max_pages is None or report.pages < max_pages:
+                page = await database.fetch(DUE_CAPTURES_SQL, due_before, *position, self.page_size)
+                if not page:
+                    break
+                position = (page[-1]["escrow_held_at"], page[-1]["id"])
+                await self._capture_page(escrow, page, report)
+                report.pages += 1
+                report.selected += len(page)
+                if len(page) < self.page_size:
+                    break
+        finally:
+            if self.escrow is None:
+                await asyncio.get_running_loop().run_in_executor(None, escrow.close)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(
+            "Auto-capture: %d of %d captured (%.1f/s), %d expired, %d failed %s, %d not recorded",
+            report.captured, report.selected, report.per_second, report.expired, report.failed,
+            dict(report.failures), len(report.conflicts),
+        )
+        return report
+
+    async def _capture_page(self, escrow: AsyncEscrowManager, page: List, report: AutoCaptureReport) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def capture(row):
+            async with semaphore:
+                return await escrow.capture_payment(
+                    row["stripe_payment_intent_id"], row["amount_cents"], bid_id=row["bid_id"],
+                    priority=Priority.DEFAULT,
+                )
+
+        results = await asyncio.gather(*(capture(row) for row in page), return_exceptions=True)
+
+        transitions = []
+        for row, result in zip(page, results):
+            if not isinstance(result, BaseException):
+                # Stripe has the money: record it from whatever legal state the row is in now
+                transitions.append(Transition(row["id"], PaymentStatus.CAPTURED))
+                report.captured += 1
+                report.captured_cents += row["amount_cents"]
+                continue
+            code = failure_code(result)
+            report.failures[code] += 1
+            if code in EXPIRED_CODES:
+                # Only if nothing touched the row since it was selected
+                transitions.append(Transition(row["id"], PaymentStatus.FAILED, expected_version=row["version"]))
+                report.expired += 1
+            else:
+                report.failed += 1
+                logger.warning("Auto-capture failed for payment %s: %s", row["id"], result)
+
+        if transitions:
+            recorded = await apply_transitions(transitions)
+            report.statements += recorded.statements
+            for conflict in recorded.conflicts:
+                if conflict.current_status == conflict.transition.to_status.value:
+                    continue  # already recorded by another path (webhook, manual capture)
+                report.conflicts.append(conflict)
+                logger.error(
+                    "Auto-capture outcome for payment %s not recorded (%s, now %s)",
+                    conflict.transition.payment_id, conflict.conflict, conflict.current_status,
+                )
@@ -0,0 +1,105 @@
+"""
+Materialized per-provider earnings ledger.
+
+provider_earnings holds one row per provider with the dashboard figures in
+cents. Statement-level triggers on payments (migration 008) apply the net
+change of every INSERT / UPDATE / DELETE to it, grouped by provider, so
+bulk writes (webhook batches, payout reconciliation) cost one ledger upsert
+per affected provider, not one per payment. A payment contributes:
+
+    total_earned    provider_payout   status = captured, payout_status = paid
+    pending_payout  provider_payout   status = captured, payout_status pending/scheduled
+    in_escrow       provider_payout   status = escrow_held
+    completed       1                 payout_status = paid
+    paid_payout     provider_payout   payout_status = paid (avg_job_payout numerator)
+
+Reading a provider's earnings is then a primary-key lookup, with no
+aggregate over payments and no Stripe call. rebuild() recomputes rows from
+payments to repair drift (e.g. after a manual data fix with triggers
+disabled); run it while payments writes are paused, since a transition
+committed during the rebuild can be overwritten by the older snapshot.
+"""
+
+from dataclasses import dataclass
+from typing import Mapping, Optional, Sequence
+
+from src import db as database
+
+
+@dataclass
+class PayoutSummary:
+    provider_id: str
+    total_earned: int          # Lifetime earnings (cents)
+    pending_payout: int        # Captured but not yet paid out (cents)
+    in_escrow: int             # Held in escrow (not yet captured) (cents)
+    completed_payments: int    # Count of completed payments
+    avg_job_payout: int = 0
+
+
+EARNINGS_SQL = """
+    SELECT total_earned_cents, pending_payout_cents, in_escrow_cents,
+           completed_payments, paid_payout_cents
+    FROM provider_earnings
+    WHERE provider_id = $1
+"""
+
+# Same contributions as the trigger, recomputed from scratch; $1 limits it
+# to some providers (NULL = all)
+REBUILD_EARNINGS_SQL = """
+    WITH written AS (
+        INSERT INTO provider_earnings (
+            provider_id, total_earned_cents, pending_payout_cents, in_escrow_cents,
+            completed_payments, paid_payout_cents, updated_at
+        )
+        SELECT provider_id,
+               COALESCE(SUM((provider_payout * 100)::bigint)
+                   FILTER (WHERE status = 'captured' AND payout_status = 'paid'), 0),
+               COALESCE(SUM((provider_payout * 100)::bigint)
+                   FILTER (WHERE status = 'captured' AND payout_status IN ('pending', 'scheduled')), 0),
+               COALESCE(SUM((provider_payout * 100)::bigint) FILTER (WHERE status = 'escrow_held'), 0),
+               COUNT(*) FILTER (WHERE payout_status = 'paid'),
+               COALESCE(SUM((provider_payout * 100)::bigint) FILTER (WHERE payout_status = 'paid'), 0),
+               NOW()
+        FROM payments
+        WHERE $1::uuid[] IS NULL OR provider_id = ANY($1::uuid[])
+        GROUP BY provider_id
+        ORDER BY provider_id
+        ON CONFLICT (provider_id) DO UPDATE SET
+            total_earned_cents = EXCLUDED.total_earned_cents,
+            pending_payout_cents = EXCLUDED.pending_payout_cents,
+            in_escrow_cents = EXCLUDED.in_escrow_cents,
+            completed_payments = EXCLUDED.completed_payments,
+            paid_payout_cents = EXCLUDED.paid_payout_cents,
+            updated_at = NOW()
+        RETURNING provider_id
+    )
+    SELECT COUNT(*) AS written FROM written
+"""
+
+
+def summary_from_ledger(provider_id: str, row: Optional[Mapping]) -> PayoutSummary:
+    """PayoutSummary from a provider_earnings row (None: no payments yet)."""
+    if row is None:
+        return PayoutSummary(provider_id=provider_id, total_earned=0, pending_payout=0, in_escrow=0,
+                             completed_payments=0, avg_job_payout=0)
+    completed = row["completed_payments"]
+    return PayoutSummary(
+        provider_id=provider_id,
+        total_earned=row["total_earned_cents"],
+        pending_payout=row["pending_payout_cents"],
+        in_escrow=row["in_escrow_cents"],
+        completed_payments=completed,
+        avg_job_payout=row["paid_payout_cents"] // completed if completed else 0,
+    )
+
+
+async def provider_earnings(provider_id: str) -> PayoutSummary:
+    """Earnings summary for one provider: a single primary-key read."""
+    rows = await database.fetch(EARNINGS_SQL, provider_id)
+    return summary_from_ledger(provider_id, rows[0] if rows else None)
+
+
+async def rebuild(provider_ids: Optional[Sequence[str]] = None) -> int:
+    """Recompute ledger rows from payments; returns how many were written."""
+    rows = await database.fetch(REBUILD_EARNINGS_SQL, list(provider_ids) if provider_ids is not None else None)
+    return rows[0]["written"] if rows else 0
@@ -4,28 +4,34 @@ Manages the Stripe Connect escrow payment flow: hold creation on bid acceptance,
 capture on job completion, refunds on disputes, and provider payouts.
 """
 
-import stripe
+import logging
+import os
+import random
+import time
 from dataclasses import dataclass, field
-from typing import Optional
-from enum import Enum
+from typing import Callable, List, Optional
 from datetime import datetime
 
+from src.lazy import lazy_import
+from src.payments import stripe_limiter
+from src.payments.fees import (  # noqa: F401  (rates re-exported for callers)
+    CUSTOMER_FEE_RATE,
+    ELITE_PROVIDER_FEE,
+    STANDARD_PROVIDER_FEE,
+    STRIPE_FIXED,
+    STRIPE_RATE,
+    compute_fees,
+)
+from src.payments.earnings import PayoutSummary, summary_from_ledger
+from src.payments.escrow_state import PaymentStatus, PayoutStatus  # noqa: F401  (re-exported)
+from src.payments.journal import REVIEW_PHASE, EscrowJournal, shared_journal
+from src.payments.stripe_limiter import Priority, StripeRateLimiter
+from src.payments.tax_reporting import ANNUAL_1099_THRESHOLD, summary_1099  # noqa: F401  (threshold re-exported)
 
-class PaymentStatus(Enum):
-    PENDING = "pending"
-    ESCROW_HELD = "escrow_held"
-    CAPTURED = "captured"
-    PARTIALLY_REFUNDED = "partially_refunded"
-    REFUNDED = "refunded"
-    FAILED = "failed"
-    CANCELLED = "cancelled"
+logger = logging.getLogger(__name__)
 
-
-class PayoutStatus(Enum):
-    PENDING = "pending"
-    SCHEDULED = "scheduled"
-    PAID = "paid"
-    FAILED = "failed"
+# The stripe SDK is loaded on first API call, not at import
+stripe = lazy_import("stripe")
 
 
 @dataclass
@@ -43,16 +49,6 @@ class EscrowHold:
     refunded_at: Optional[datetime] = None
 
 
-@dataclass
-class PayoutSummary:
-    provider_id: str
-    total_earned: int          # Lifetime earnings (cents)
-    pending_payout: int        # Captured but not yet paid out (cents)
-    in_escrow: int             # Held in escrow (not yet captured) (cents)
-    completed_payments: int    # Count of completed payments
-    avg_job_payout: int = 0
-
-
 @dataclass
 class StripeAPICall:
     """Mock Stripe API call for reference documentation"""
@@ -62,17 +58,39 @@ class StripeAPICall:
     expected_response: dict = field(default_factory=dict)
 
 
-# Fee rates
-CUSTOMER_FEE_RATE = 0.05       # 5% added to customer's total
-STANDARD_PROVIDER_FEE = 0.15   # 15% deducted from provider payout
-ELITE_PROVIDER_FEE = 0.12      # 12% for Elite tier providers
+# Fee rates and rounding live in src/payments/fees.py, the 1099 threshold in
+# src/payments/tax_reporting.py
+
+# Retries for transient Stripe failures (connection errors, 429s, 5xx):
+# full-jitter exponential backoff, same idempotency key on every attempt
+STRIPE_MAX_ATTEMPTS = int(os.getenv("STRIPE_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 4.0
+
+# Stripe forgets an idempotency key 24 hours after its first request; an
+# operation first journaled longer ago than this is not replayed, since the
+# replay could apply it a second time
+ESCROW_REPLAY_MAX_AGE = float(os.getenv("ESCROW_REPLAY_MAX_AGE", str(23 * 3600)))
+
 
-# Stripe processing (platform absorbs — see DEC-012)
-STRIPE_RATE = 0.029
-STRIPE_FIXED = 30  # 30 cents
+# Rate-limiter class per Stripe write (src/payments/stripe_limiter.py):
+# customers wait on creates, holds and captures
+OPERATION_PRIORITY = {
+    "create_escrow": Priority.INTERACTIVE,
+    "hold_funds": Priority.INTERACTIVE,
+    "capture_payment": Priority.INTERACTIVE,
+    "release_to_provider": Priority.DEFAULT,
+    "initiate_refund": Priority.DEFAULT,
+}
 
-# 1099 threshold
-ANNUAL_1099_THRESHOLD = 60000  # $600 per year
+
+def idempotency_key(bid_id: str, operation: str) -> str:
+    """Deterministic Stripe idempotency key for one operation on one bid."""
+    return f"escrow:{bid_id}:{operation}"
+
+
+def _transient_errors() -> tuple:
+    return (stripe.error.APIConnectionError, stripe.error.RateLimitError, stripe.error.APIError)
 
 
 class EscrowManager:
@@ -90,10 +108,107 @@ class EscrowManager:
 
     Key design choice: Manual capture = escrow.
     We authorize the customer's card but don't charge until job is confirmed complete.
+
+    Every Stripe write carries idempotency_key(bid_id, operation) and is
+    journaled before and after the call (src/payments/journal.py), so a
+    timed-out capture can be retried, or replayed by reconcile() after a
+    restart, without risking a double charge. Calls made without a bid_id
+    key on the PaymentIntent id instead. Every attempt first takes a token
+    from the process-wide Stripe rate limiter at OPERATION_PRIORITY.
     """
 
-    def __init__(self, stripe_client=None):
+    def __init__(
+        self,
+        stripe_client=None,
+        journal: Optional[EscrowJournal] = None,
+        max_attempts: int = STRIPE_MAX_ATTEMPTS,
+        sleep: Callable[[float], None] = time.sleep,
+        limiter: Optional[StripeRateLimiter] = None,
+        replay_max_age: float = ESCROW_REPLAY_MAX_AGE,
+    ):
         self.stripe = stripe_client
+        self.journal = journal if journal is not None else shared_journal()
+        self.max_attempts = max_attempts
+        self._sleep = sleep
+        self.limiter = limiter if limiter is not None else stripe_limiter.limiter
+        self.replay_max_age = replay_max_age
+
+    def _call(
+        self, operation: str, key: str, params: dict, request: Callable, priority: Optional[Priority] = None
+    ):
+        """
+        Run `request(idempotency_key=key)` through the rate limiter, with
+        journaling and retries.
+
+        Transient errors are retried with jittered backoff; if they outlast
+        max_attempts the outcome is journaled as unknown (reconcile() replays
+        it) and the error is re-raised. Other StripeErrors are final.
+        """
+        self.journal.record_intent(key, operation, params)
+        if priority is None:
+            priority = OPERATION_PRIORITY.get(operation, Priority.DEFAULT)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                result = self.limiter.call(priority, request, idempotency_key=key)
+            except _transient_errors() as e:
+                if attempt == self.max_attempts:
+                    self.journal.record_outcome(key, "unknown", error=str(e))
+                    raise
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+                logger.warning("Stripe %s attempt %d failed (%s); retrying in %.2fs", operation, attempt, e, delay)
+                self._sleep(delay)
+            except stripe.error.StripeError as e:
+                self.journal.record_outcome(key, "failed", error=str(e))
+                raise
+            else:
+                self.journal.record_outcome(key, "succeeded", stripe_id=getattr(result, "id", None))
+                return result
+
+    def reconcile(self) -> List[dict]:
+        """
+        Replay journaled operations whose outcome is unknown, including
+        those adopted from the journals of exited processes.
+
+        Run when a worker or job starts, before it makes new calls
+        (AsyncEscrowManager does this on `async with` entry, AutoCaptureJob
+        for the manager it creates). Each replay reuses the original
+        idempotency key, so Stripe returns the first result if the call had
+        gone through. An operation first journaled more than replay_max_age
+        seconds ago is past Stripe's idempotency window: it is journaled as
+        `review` instead of replayed, and logged as an error.
+
+        Returns one {"key", "operation", "payment_intent_id",
+        "result" | "error" | "review"} per pending operation.
+        """
+        # Another thread of this process (a job next to a worker) is already replaying
+        if not self.journal.reconcile_lock.acquire(blocking=False):
+            return []
+        try:
+            self.journal.adopt_orphans()
+            replays = []
+            for intent in self.journal.pending():
+                key = intent["key"]
+                outcome = {
+                    "key": key,
+                    "operation": intent["operation"],
+                    "payment_intent_id": intent["params"].get("payment_intent_id"),
+                }
+                entries = self.journal.entries(key)
+                age = time.time() - (entries[0]["at"] if entries else intent["at"])
+                if age > self.replay_max_age:
+                    outcome["review"] = f"first attempted {age / 3600:.1f}h ago, past Stripe's idempotency window"
+                    self.journal.record_outcome(key, REVIEW_PHASE, error=outcome["review"])
+                    logger.error("Not replaying %s (%s): check it against Stripe by hand", key, outcome["review"])
+                else:
+                    try:
+                        outcome["result"] = getattr(self, intent["operation"])(**intent["params"])
+                    except ValueError as e:
+                        outcome["error"] = str(e)
+                    logger.info("Reconciled %s: %s", key, "error" if "error" in outcome else "ok")
+                replays.append(outcome)
+            return replays
+        finally:
+            self.journal.reconcile_lock.release()
 
     def create_payment_intent(
         self,
@@ -115,13 +230,12 @@ class EscrowManager:
         - Provider receives: $850
         - Platform net (after Stripe): ~$169
         """
-        customer_fee = int(bid_amount_cents * CUSTOMER_FEE_RATE)
-        amount_total = bid_amount_cents + customer_fee
-
-        fee_rate = ELITE_PROVIDER_FEE if provider_tier == "elite" else STANDARD_PROVIDER_FEE
-        platform_fee = int(bid_amount_cents * fee_rate)
-        provider_payout = bid_amount_cents - platform_fee
-        application_fee = customer_fee + platform_fee
+        fees = compute_fees(bid_amount_cents, provider_tier)
+        customer_fee = fees.customer_fee
+        amount_total = fees.amount_total
+        platform_fee = fees.platform_fee
+        provider_payout = fees.provider_payout
+        application_fee = fees.application_fee
 
         # Exact Stripe API call structure (in production):
         api_call = StripeAPICall(
@@ -178,31 +292,42 @@ class EscrowManager:
         Create an escrow hold when a customer accepts a provider's bid.
         Creates actual Stripe PaymentIntent via API with manual capture.
         """
-        customer_fee = int(bid_amount_cents * CUSTOMER_FEE_RATE)
-        amount_total = bid_amount_cents + customer_fee
-
-        fee_rate = ELITE_PROVIDER_FEE if provider_tier == "elite" else STANDARD_PROVIDER_FEE
-        platform_fee = int(bid_amount_cents * fee_rate)
-        provider_payout = bid_amount_cents - platform_fee
-        application_fee = customer_fee + platform_fee
+        fees = compute_fees(bid_amount_cents, provider_tier)
+        customer_fee = fees.customer_fee
+        amount_total = fees.amount_total
+        platform_fee = fees.platform_fee
+        provider_payout = fees.provider_payout
+        application_fee = fees.application_fee
 
         try:
             # Create actual Stripe PaymentIntent with manual capture
-            payment_intent = stripe.PaymentIntent.create(
-                amount=amount_total,
-                currency="usd",
-                customer=customer_stripe_id,
-                capture_method="manual",  # KEY: escrow hold
-                transfer_data={
-                    "destination": provider_stripe_account_id,
-                    "amount": provider_payout,
-                },
-                application_fee_amount=application_fee,
-                metadata={
+            payment_intent = self._call(
+                "create_escrow",
+                idempotency_key(bid_id, "create"),
+                {
                     "bid_id": bid_id,
-                    "bid_amount": bid_amount_cents,
+                    "bid_amount_cents": bid_amount_cents,
+                    "customer_stripe_id": customer_stripe_id,
+                    "provider_stripe_account_id": provider_stripe_account_id,
                     "provider_tier": provider_tier,
                 },
+                lambda **options: stripe.PaymentIntent.create(
+                    amount=amount_total,
+                    currency="usd",
+                    customer=customer_stripe_id,
+                    capture_method="manual",  # KEY: escrow hold
+                    transfer_data={
+                        "destination": provider_stripe_account_id,
+                        "amount": provider_payout,
+                    },
+                    application_fee_amount=application_fee,
+                    metadata={
+                        "bid_id": bid_id,
+                        "bid_amount": bid_amount_cents,
+                        "provider_tier": provider_tier,
+                    },
+                    **options,
+                ),
             )
 
             return EscrowHold(
@@ -224,6 +349,7 @@ class EscrowManager:
         self,
         payment_intent_id: str,
         amount_cents: int,
+        bid_id: Optional[str] = None,
     ) -> dict:
         """
         Authorize funds without capturing (place in escrow).
@@ -233,7 +359,12 @@ class EscrowManager:
         """
         try:
             # Confirm the PaymentIntent to authorize funds
-            confirmed = stripe.PaymentIntent.confirm(payment_intent_id)
+            confirmed = self._call(
+                "hold_funds",
+                idempotency_key(bid_id or payment_intent_id, "hold"),
+                {"payment_intent_id": payment_intent_id, "amount_cents": amount_cents, "bid_id": bid_id},
+                lambda **options: stripe.PaymentIntent.confirm(payment_intent_id, **options),
+            )
 
             return {
                 "payment_intent_id": payment_intent_id,
@@ -245,16 +376,31 @@ class EscrowManager:
         except stripe.error.StripeError as e:
             raise ValueError(f"Failed to hold funds: {e}")
 
-    def capture_payment(self, payment_intent_id: str, amount_cents: int) -> dict:
+    def capture_payment(
+        self,
+        payment_intent_id: str,
+        amount_cents: int,
+        bid_id: Optional[str] = None,
+        priority: Optional[Priority] = None,
+    ) -> dict:
         """
         Capture (charge) a held payment when job is confirmed complete.
 
         Stripe API call:
         POST /v1/payment_intents/{payment_intent_id}/capture
+
+        Rate-limited as interactive unless `priority` says otherwise (batch
+        captures run at Priority.DEFAULT).
         """
         try:
             # Capture the PaymentIntent
-            captured = stripe.PaymentIntent.capture(payment_intent_id)
+            captured = self._call(
+                "capture_payment",
+                idempotency_key(bid_id or payment_intent_id, "capture"),
+                {"payment_intent_id": payment_intent_id, "amount_cents": amount_cents, "bid_id": bid_id},
+                lambda **options: stripe.PaymentIntent.capture(payment_intent_id, **options),
+                priority,
+            )
 
             return {
                 "payment_intent_id": payment_intent_id,
@@ -273,6 +419,7 @@ class EscrowManager:
         provider_stripe_account_id: str,
         provider_payout_cents: int,
         platform_fee_cents: int,
+        bid_id: Optional[str] = None,
     ) -> dict:
         """
         Transfer funds to provider and retain platform fee.
@@ -286,15 +433,27 @@ class EscrowManager:
         """
         try:
             # Create actual transfer to provider's connected account
-            transfer = stripe.Transfer.create(
-                amount=provider_payout_cents,
-                currency="usd",
-                destination=provider_stripe_account_id,
-                transfer_group=f"order_{payment_intent_id}",
-                metadata={
-                    "payment_intent": payment_intent_id,
-                    "platform_fee": platform_fee_cents,
+            transfer = self._call(
+                "release_to_provider",
+                idempotency_key(bid_id or payment_intent_id, "transfer"),
+                {
+                    "payment_intent_id": payment_intent_id,
+                    "provider_stripe_account_id": provider_stripe_account_id,
+                    "provider_payout_cents": provider_payout_cents,
+                    "platform_fee_cents": platform_fee_cents,
+                    "bid_id": bid_id,
                 },
+                lambda **options: stripe.Transfer.create(
+                    amount=provider_payout_cents,
+                    currency="usd",
+                    destination=provider_stripe_account_id,
+                    transfer_group=f"order_{payment_intent_id}",
+                    metadata={
+                        "payment_intent": payment_intent_id,
+                        "platform_fee": platform_fee_cents,
+                    },
+                    **options,
+                ),
             )
 
             return {
@@ -314,11 +473,19 @@ class EscrowManager:
         refund_type: str = "full",
         refund_amount_cents: Optional[int] = None,
         reason: str = "requested_by_customer",
+        bid_id: Optional[str] = None,
+        refund_seq: int = 1,
     ) -> dict:
         """
         Handle refunds: full, partial, or split resolution.
 
         Stripe API: POST /v1/refunds
+
+        `refund_seq` numbers the refunds of one bid (1 for the first, 2 for
+        the second, ...). The idempotency key includes it along with the
+        refund type and amount, so a retry of the same refund is
+        deduplicated while a second refund of an equal partial amount is a
+        new refund.
         """
         try:
             params = {
@@ -333,7 +500,20 @@ class EscrowManager:
                 params["amount"] = refund_amount_cents
 
             # Create actual refund via Stripe API
-            refund = stripe.Refund.create(**params)
+            operation = f"refund:{refund_seq}:{refund_type}:{params.get('amount', 'all')}"
+            refund = self._call(
+                "initiate_refund",
+                idempotency_key(bid_id or payment_intent_id, operation),
+                {
+                    "payment_intent_id": payment_intent_id,
+                    "refund_type": refund_type,
+                    "refund_amount_cents": refund_amount_cents,
+                    "reason": reason,
+                    "bid_id": bid_id,
+                    "refund_seq": refund_seq,
+                },
+                lambda **options: stripe.Refund.create(**params, **options),
+            )
 
             return {
                 "refund_id": refund.id,
@@ -387,88 +567,31 @@ class EscrowManager:
             "message": "An unknown error occurred",
         })
 
-    def get_provider_earnings(self, provider_id: str, stripe_account_id: str) -> PayoutSummary:
+    def get_provider_earnings(
+        self, provider_id: str, stripe_account_id: Optional[str] = None, ledger: Optional[dict] = None
+    ) -> PayoutSummary:
         """
-        Get provider's earnings summary from database and Stripe.
+        Build a provider's earnings summary from their provider_earnings row.
 
-        Queries: SELECT SUM(provider_payout) for different payment statuses
+        The ledger is maintained by triggers on payments; reading it is a
+        primary-key lookup (src/payments/earnings.py, or
+        AsyncEscrowManager.get_provider_earnings which reads it for you).
+        No Stripe call: the platform balance is not per provider.
         """
-        if not self.stripe:
-            # Fallback if Stripe client not configured
-            return PayoutSummary(
-                provider_id=provider_id,
-                total_earned=0,
-                pending_payout=0,
-                in_escrow=0,
-                completed_payments=0,
-                avg_job_payout=0,
-            )
-
-        try:
-            # In production, these queries run against the payments database table:
-            # total_earned = SELECT SUM(provider_payout) WHERE status='captured' AND payout_status='paid'
-            # pending_payout = SELECT SUM(provider_payout) WHERE status='captured' AND payout_status IN ('pending', 'scheduled')
-            # in_escrow = SELECT SUM(provider_payout) WHERE status='escrow_held'
-            # completed_payments = COUNT(*) WHERE payout_status='paid'
-            # avg_job_payout = AVG(provider_payout) WHERE payout_status='paid'
-
-            # Example: Query Stripe connected account balance for verification
-            balance = stripe.Balance.retrieve()
-
-            return PayoutSummary(
-                provider_id=provider_id,
-                total_earned=balance.available[0].amount if balance.available else 0,
-                pending_payout=balance.pending[0].amount if balance.pending else 0,
-                in_escrow=0,
-                completed_payments=0,
-                avg_job_payout=0,
-            )
+        return summary_from_ledger(provider_id, ledger)
 
-        except stripe.error.StripeError as e:
-            raise ValueError(f"Failed to get provider earnings: {e}")
-
-    def generate_1099_summary(self, provider_id: str, year: int) -> dict:
+    def generate_1099_summary(
+        self, provider_id: str, year: int, gross_income_cents: int = 0, job_count: int = 0
+    ) -> dict:
         """
-        Generate 1099 summary for tax reporting.
-
-        IRS requires reporting of providers earning $600+ per year.
+        Format a 1099 summary from a provider's paid payout totals.
 
-        Query: SELECT SUM(provider_payout) as gross_income
-               FROM payments
-               WHERE provider_id = $1 AND YEAR(captured_at) = $2
-                 AND payout_status = 'paid'
+        IRS requires reporting of providers earning $600+ per year. The
+        manager has no database access: totals come from the bulk 1099 job
+        (src/payments/tax_reporting.py); AsyncEscrowManager.generate_1099_summary
+        reads them for you.
         """
-        # In production, query the payments database table:
-        # SELECT
-        #   SUM(provider_payout) as gross_income_cents,
-        #   COUNT(*) as job_count
-        # FROM payments
-        # WHERE provider_id = %s
-        #   AND YEAR(payout_completed_at) = %s
-        #   AND payout_status = 'paid'
-
-        try:
-            # For reference implementation: would query database
-            # This shows the structure of the 1099 response
-            gross_income_cents = 0
-            job_count = 0
-
-            # IRS threshold: $600 in a year requires 1099-NEC reporting
-            should_issue_1099 = gross_income_cents >= ANNUAL_1099_THRESHOLD
-
-            return {
-                "year": year,
-                "provider_id": provider_id,
-                "gross_income_cents": gross_income_cents,
-                "should_issue_1099": should_issue_1099,
-                "is_reportable": should_issue_1099,
-                "job_count": job_count,
-                "notes": "Report to IRS if annual earnings >= $600",
-                "box_1a_nonemployee_compensation": gross_income_cents / 100.0,
-            }
-
-        except Exception as e:
-            raise ValueError(f"Failed to generate 1099 summary: {e}")
+        return summary_1099(provider_id, year, gross_income_cents, job_count)
 
     def calculate_platform_economics(self, bid_amount_cents: int, tier: str = "standard") -> dict:
         """
@@ -476,28 +599,20 @@ class EscrowManager:
         Used for financial reporting and unit economics analysis.
 
         Example: $1,000 bid, Standard tier
+        For many transactions at once use fees.compute_fee_columns.
         """
-        customer_fee = int(bid_amount_cents * CUSTOMER_FEE_RATE)
-        amount_total = bid_amount_cents + customer_fee
-
-        fee_rate = ELITE_PROVIDER_FEE if tier == "elite" else STANDARD_PROVIDER_FEE
-        platform_fee = int(bid_amount_cents * fee_rate)
-        provider_payout = bid_amount_cents - platform_fee
-
-        gross_platform_revenue = customer_fee + platform_fee
-        stripe_fee = int(amount_total * STRIPE_RATE) + STRIPE_FIXED
-        net_platform_revenue = gross_platform_revenue - stripe_fee
+        fees = compute_fees(bid_amount_cents, tier)
 
         return {
             "bid_amount": bid_amount_cents,
-            "customer_pays": amount_total,
-            "customer_fee": customer_fee,
-            "platform_fee_from_provider": platform_fee,
-            "provider_receives": provider_payout,
-            "gross_platform_revenue": gross_platform_revenue,
-            "stripe_processing_fee": stripe_fee,
-            "net_platform_revenue": net_platform_revenue,
-            "effective_take_rate": round(net_platform_revenue / bid_amount_cents, 4),
-            "provider_fee_rate": fee_rate,
+            "customer_pays": fees.amount_total,
+            "customer_fee": fees.customer_fee,
+            "platform_fee_from_provider": fees.platform_fee,
+            "provider_receives": fees.provider_payout,
+            "gross_platform_revenue": fees.application_fee,
+            "stripe_processing_fee": fees.stripe_fee,
+            "net_platform_revenue": fees.net_platform_revenue,
+            "effective_take_rate": round(fees.net_platform_revenue / bid_amount_cents, 4),
+            "provider_fee_rate": fees.provider_fee_rate,
             "tier": tier,
         }
@@ -0,0 +1,198 @@
+"""
+Escrow payment state machine.
+
+One definition of the payment and payout statuses, the legal status
+transitions between them, and a set-based way to apply transitions:
+
+    pending             -> escrow_held, failed, cancelled
+    escrow_held         -> captured, failed, cancelled
+    captured            -> partially_refunded, refunded
+    partially_refunded  -> partially_refunded, refunded
+    refunded, failed, cancelled are terminal
+
+payments.version (migration 009) is bumped by a trigger on every update of
+the row, whoever writes it, so it works as an optimistic concurrency token:
+read a payment with its version, decide, then apply the transition with
+that expected_version. If anything changed the row in between, the
+transition is reported as a conflict instead of overwriting the change.
+
+apply_transitions() applies any number of transitions in chunks of
+ESCROW_TRANSITION_BATCH_SIZE, one UPDATE ... FROM unnest(...) statement per
+chunk. Legality and version are checked inside the statement (and
+re-checked by Postgres after waiting on a locked row), so there is no
+separate read and no per-payment round trip. Every transition comes back
+as applied (with the new version) or as a conflict with its reason.
+"""
+
+import os
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, FrozenSet, List, Optional, Sequence
+
+from src import db as database
+
+ESCROW_TRANSITION_BATCH_SIZE = int(os.getenv("ESCROW_TRANSITION_BATCH_SIZE", "5000"))
+
+
+class PaymentStatus(Enum):
+    PENDING = "pending"
+    ESCROW_HELD = "escrow_held"
+    CAPTURED = "captured"
+    PARTIALLY_REFUNDED = "partially_refunded"
+    REFUNDED = "refunded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class PayoutStatus(Enum):
+    PENDING = "pending"
+    SCHEDULED = "scheduled"
+    PAID = "paid"
+    FAILED = "failed"
+
+
+TRANSITIONS: Dict[PaymentStatus, FrozenSet[PaymentStatus]] = {
+    PaymentStatus.PENDING: frozenset({PaymentStatus.ESCROW_HELD, PaymentStatus.FAILED, PaymentStatus.CANCELLED}),
+    PaymentStatus.ESCROW_HELD: frozenset({PaymentStatus.CAPTURED, PaymentStatus.FAILED, PaymentStatus.CANCELLED}),
+    PaymentStatus.CAPTURED: frozenset({PaymentStatus.PARTIALLY_REFUNDED, PaymentStatus.REFUNDED}),
+    PaymentStatus.PARTIALLY_REFUNDED: frozenset({PaymentStatus.PARTIALLY_REFUNDED, PaymentStatus.REFUNDED}),
+    PaymentStatus.REFUNDED: frozenset(),
+    PaymentStatus.FAILED: frozenset(),
+    PaymentStatus.CANCELLED: frozenset(),
+}
+
+# (from, to) pairs passed to the batch statements (here and the webhook
+# processor's). Statuses are unnested as payment_status_enum, the type of
+# payments.status
+LEGAL_FROM = [src.value for src, targets in TRANSITIONS.items() for _ in targets]
+LEGAL_TO = [dst.value for targets in TRANSITIONS.values() for dst in targets]
+
+APPLY_TRANSITIONS_SQL = """
+    WITH requested AS (
+        SELECT r.id, r.to_status, r.expected_version
+        FROM unnest($1::uuid[], $2::payment_status_enum[], $3::int[]) AS r(id, to_status, expected_version)
+    ), legal AS (
+        SELECT l.from_status, l.to_status
+        FROM unnest($4::payment_status_enum[], $5::payment_status_enum[]) AS l(from_status, to_status)
+    ), applied AS (
+        UPDATE payments AS p
+        SET status = r.to_status,
+            escrow_held_at = CASE WHEN r.to_status = 'escrow_held' THEN NOW() ELSE p.escrow_held_at END,
+            captured_at = CASE WHEN r.to_status = 'captured' THEN NOW() ELSE p.captured_at END,
+            refunded_at = CASE WHEN r.to_status IN ('partially_refunded', 'refunded')
+                               THEN NOW() ELSE p.refunded_at END,
+            updated_at = NOW()
+        FROM requested r
+        WHERE p.id = r.id
+          AND (r.expected_version IS NULL OR p.version = r.expected_version)
+          AND EXISTS (SELECT 1 FROM legal l WHERE l.from_status = p.status AND l.to_status = r.to_status)
+        RETURNING p.id, p.version
+    )
+    SELECT r.id::text AS id,
+           a.version AS new_version,
+           p.status AS current_status,
+           p.version AS current_version
+    FROM requested r
+    LEFT JOIN applied a ON a.id = r.id
+    LEFT JOIN payments p ON p.id = r.id
+"""
+
+
+class IllegalTransitionError(ValueError):
+    """A payment status change the state machine does not allow."""
+
+
+def can_transition(current: PaymentStatus, target: PaymentStatus) -> bool:
+    return target in TRANSITIONS[current]
+
+
+def check_transition(current: PaymentStatus, target: PaymentStatus) -> None:
+    """Raise IllegalTransitionError unless current -> target is legal."""
+    if not can_transition(current, target):
+        raise IllegalTransitionError(f"Illegal payment transition {current.value} -> {target.value}")
+
+
+@dataclass(frozen=True)
+class Transition:
+    payment_id: str
+    to_status: PaymentStatus
+    expected_version: Optional[int] = None  # None: apply if legal from whatever the current status is
+
+
+@dataclass
+class TransitionResult:
+    transition: Transition
+    applied: bool
+    version: Optional[int] = None  # new version if applied, else the current one
+    current_status: Optional[str] = None
+    # not_found | illegal_transition | version_conflict | concurrent_update
+    conflict: Optional[str] = None
+
+
+@dataclass
+class TransitionReport:
+    applied: List[TransitionResult] = field(default_factory=list)
+    conflicts: List[TransitionResult] = field(default_factory=list)
+    statements: int = 0
+
+
+def _result(transition: Transition, row) -> TransitionResult:
+    if row is not None and row["new_version"] is not None:
+        return TransitionResult(transition, True, row["new_version"], transition.to_status.value)
+    if row is None or row["current_status"] is None:
+        return TransitionResult(transition, False, conflict="not_found")
+
+    current_status, current_version = row["current_status"], row["current_version"]
+    if transition.expected_version is not None and current_version != transition.expected_version:
+        reason = "version_conflict"
+    elif not can_transition(PaymentStatus(current_status), transition.to_status):
+        reason = "illegal_transition"
+    else:
+        # Legal and current when the statement started, changed while it waited on the row lock
+        reason = "concurrent_update"
+    return TransitionResult(transition, False, current_version, current_status, reason)
+
+
+async def apply_transitions(
+    transitions: Sequence[Transition],
+    batch_size: int = ESCROW_TRANSITION_BATCH_SIZE,
+) -> TransitionReport:
+    """
+    Apply transitions set-based, batch_size per statement.
+
+    Each statement is atomic on its own; a conflict never blocks the other
+    transitions in its batch.
+
+    Raises:
+        ValueError: the same payment appears twice
+    """
+    ids = [t.payment_id for t in transitions]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Each payment may appear in at most one transition per call")
+
+    report = TransitionReport()
+    for start in range(0, len(transitions), batch_size):
+        chunk = transitions[start:start + batch_size]
+        rows = await database.fetch(
+            APPLY_TRANSITIONS_SQL,
+            [t.payment_id for t in chunk],
+            [t.to_status.value for t in chunk],
+            [t.expected_version for t in chunk],
+            LEGAL_FROM,
+            LEGAL_TO,
+        )
+        report.statements += 1
+        by_id = {row["id"]: row for row in rows}
+        for transition in chunk:
+            result = _result(transition, by_id.get(str(uuid.UUID(transition.payment_id))))
+            (report.applied if result.applied else report.conflicts).append(result)
+    return report
+
+
+async def transition(
+    payment_id: str, to_status: PaymentStatus, expected_version: Optional[int] = None
+) -> TransitionResult:
+    """Apply one transition (a batch of one)."""
+    report = await apply_transitions([Transition(payment_id, to_status, expected_version)])
+    return (report.applied or report.conflicts)[0]
@@ -0,0 +1,139 @@
+"""
+Escrow fee computation, one transaction or millions at a time.
+
+`compute_fees` is the single scalar path used by EscrowManager;
+`compute_fee_columns` computes the same columns over arrays for reporting
+and what-if fee simulations (re-running history under a new FeePolicy).
+
+Both round identically: each fee is float64 `amount * rate` truncated
+toward zero, exactly as `int(amount * rate)` does. NumPy multiplies in the
+same IEEE double precision as Python floats and `astype(int64)` truncates
+toward zero like `int()`, so every column matches the scalar result cent for
+cent (for amounts below 2**53 cents).
+
+numpy is imported on first batch call, so importing this module stays cheap
+for the API workers that only need the scalar path.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Union
+
+from src.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Fee rates
+CUSTOMER_FEE_RATE = 0.05       # 5% added to customer's total
+STANDARD_PROVIDER_FEE = 0.15   # 15% deducted from provider payout
+ELITE_PROVIDER_FEE = 0.12      # 12% for Elite tier providers
+
+# Stripe processing (platform absorbs — see DEC-012)
+STRIPE_RATE = 0.029
+STRIPE_FIXED = 30  # 30 cents
+
+
+@dataclass(frozen=True)
+class FeePolicy:
+    customer_fee_rate: float = CUSTOMER_FEE_RATE
+    standard_provider_fee: float = STANDARD_PROVIDER_FEE
+    elite_provider_fee: float = ELITE_PROVIDER_FEE
+    stripe_rate: float = STRIPE_RATE
+    stripe_fixed: int = STRIPE_FIXED
+
+    def provider_fee_rate(self, tier: str) -> float:
+        return self.elite_provider_fee if tier == "elite" else self.standard_provider_fee
+
+
+DEFAULT_POLICY = FeePolicy()
+
+# Output columns of compute_fee_columns, all integer cents
+FEE_COLUMNS = (
+    "bid_amount",
+    "customer_fee",
+    "amount_total",
+    "platform_fee",
+    "provider_payout",
+    "application_fee",
+    "stripe_fee",
+    "net_platform_revenue",
+)
+
+
+@dataclass(frozen=True)
+class FeeBreakdown:
+    bid_amount: int
+    customer_fee: int          # Added to the customer's total
+    amount_total: int          # Charged to customer
+    platform_fee: int          # Deducted from the provider
+    provider_payout: int
+    application_fee: int       # customer_fee + platform_fee, kept by the platform
+    stripe_fee: int            # Processing on amount_total, absorbed by the platform
+    net_platform_revenue: int
+    provider_fee_rate: float
+
+
+def compute_fees(bid_amount_cents: int, tier: str = "standard", policy: FeePolicy = DEFAULT_POLICY) -> FeeBreakdown:
+    """Fee breakdown for one bid."""
+    customer_fee = int(bid_amount_cents * policy.customer_fee_rate)
+    amount_total = bid_amount_cents + customer_fee
+
+    fee_rate = policy.provider_fee_rate(tier)
+    platform_fee = int(bid_amount_cents * fee_rate)
+    application_fee = customer_fee + platform_fee
+    stripe_fee = int(amount_total * policy.stripe_rate) + policy.stripe_fixed
+
+    return FeeBreakdown(
+        bid_amount=bid_amount_cents,
+        customer_fee=customer_fee,
+        amount_total=amount_total,
+        platform_fee=platform_fee,
+        provider_payout=bid_amount_cents - platform_fee,
+        application_fee=application_fee,
+        stripe_fee=stripe_fee,
+        net_platform_revenue=application_fee - stripe_fee,
+        provider_fee_rate=fee_rate,
+    )
+
+
+def compute_fee_columns(
+    bid_amounts,
+    tiers: Union[str, "np.ndarray", list] = "standard",
+    policy: FeePolicy = DEFAULT_POLICY,
+) -> Dict[str, "np.ndarray"]:
+    """
+    Fee columns for arrays of bids, matching compute_fees row for row.
+
+    Args:
+        bid_amounts: integer cents, any array-like
+        tiers: one tier for every row, an array of tier names, or a boolean
+               elite mask (fastest for large batches)
+        policy: rates to apply
+
+    Returns:
+        {column: int64 array} for every name in FEE_COLUMNS
+    """
+    bid = np.asarray(bid_amounts, dtype=np.int64)
+
+    if isinstance(tiers, str):
+        fee_rate = policy.provider_fee_rate(tiers)
+    else:
+        tiers = np.asarray(tiers)
+        elite = tiers if tiers.dtype == np.bool_ else tiers == "elite"
+        fee_rate = np.where(elite, policy.elite_provider_fee, policy.standard_provider_fee)
+
+    customer_fee = (bid * policy.customer_fee_rate).astype(np.int64)
+    amount_total = bid + customer_fee
+    platform_fee = (bid * fee_rate).astype(np.int64)
+    application_fee = customer_fee + platform_fee
+    stripe_fee = (amount_total * policy.stripe_rate).astype(np.int64) + policy.stripe_fixed
+
+    return {
+        "bid_amount": bid,
+        "customer_fee": customer_fee,
+        "amount_total": amount_total,
+        "platform_fee": platform_fee,
+        "provider_payout": bid - platform_fee,
+        "application_fee": application_fee,
+        "stripe_fee": stripe_fee,
+        "net_platform_revenue": application_fee - stripe_fee,
+    }
@@ -0,0 +1,246 @@
+"""
+Append-only journal of Stripe escrow operations.
+
+EscrowManager writes an `intent` entry before each Stripe call and an
+outcome entry after it, keyed by the call's deterministic idempotency key:
+
+    {"key": "bid-1:capture", "phase": "intent", "operation": "capture_payment", "params": {...}, "at": ...}
+    {"key": "bid-1:capture", "phase": "succeeded", "stripe_id": "pi_...", "at": ...}
+
+An intent with no outcome (process died mid-call) or whose outcome is
+`unknown` (transient errors outlasted the retries) is pending: Stripe may
+or may not have applied it. EscrowManager.reconcile() replays pending
+operations with the same idempotency key, so Stripe returns the original
+result instead of acting twice. Stripe keeps an idempotency key for 24
+hours only, so reconcile() does not replay an operation first journaled
+longer ago than that: it records a `review` outcome instead, and the
+operation waits in needs_review() for someone to check it against Stripe.
+
+Only pending operations are kept: once a key settles (succeeded or failed)
+its entries are dropped from memory, and the file is compacted (rewritten
+with just the pending entries) after every ESCROW_JOURNAL_COMPACT_AFTER
+settled operations, so neither grows with the number of calls ever made.
+
+One journal per process. ESCROW_JOURNAL_PATH is a base path: each process
+writes `<path>.<pid>` and holds an exclusive flock on it for as long as it
+is open, so no other process appends to or compacts it. Every EscrowManager
+built without an explicit journal shares the process's shared_journal().
+reconcile() first adopts orphans, the journals of processes that have
+exited (their flock is free): their pending entries are copied into this
+process's journal before the orphan is removed. The flock also means two
+workers never adopt, and so never replay, the same entries.
+
+Entries are JSON lines, flushed and fsynced before the call proceeds. With
+no path the journal is kept in memory only (tests, local tools); with
+NODE_ENV=production a journal without a path refuses to start, since an
+in-memory journal loses unknown outcomes on restart.
+"""
+
+import fcntl
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ESCROW_JOURNAL_PATH = os.getenv("ESCROW_JOURNAL_PATH") or None
+ESCROW_JOURNAL_REQUIRED = os.getenv("NODE_ENV") == "production"
+ESCROW_JOURNAL_COMPACT_AFTER = int(os.getenv("ESCROW_JOURNAL_COMPACT_AFTER", "10000"))
+
+# Outcomes after which an operation needs no replay
+SETTLED_PHASES = ("succeeded", "failed")
+# Outcome of an operation too old to replay; kept (and adopted) until a person settles it
+REVIEW_PHASE = "review"
+
+
+def _pending_entries(entries: List[dict]) -> Dict[str, List[dict]]:
+    """Entries of each key whose latest outcome is missing or unknown, oldest key first."""
+    pending: Dict[str, List[dict]] = {}
+    for entry in entries:
+        if entry["phase"] in SETTLED_PHASES:
+            pending.pop(entry["key"], None)
+        else:
+            pending.setdefault(entry["key"], []).append(entry)
+    return pending
+
+
+class EscrowJournal:
+    """Thread-safe JSON-lines journal; safe to share across AsyncEscrowManager threads."""
+
+    def __init__(
+        self,
+        path: Optional[str] = ESCROW_JOURNAL_PATH,
+        required: bool = ESCROW_JOURNAL_REQUIRED,
+        compact_after: int = ESCROW_JOURNAL_COMPACT_AFTER,
+    ):
+        if required and not path:
+            raise ValueError("ESCROW_JOURNAL_PATH must be set in production (the in-memory journal is lost on restart)")
+        self.base_path = path
+        self.pid = os.getpid()
+        self.path = f"{path}.{self.pid}" if path else None
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        # Held by the thread replaying pending entries (EscrowManager.reconcile)
+        self.reconcile_lock = threading.Lock()
+        self._entries: Dict[str, List[dict]] = {}  # pending key -> its entries, oldest key first
+        self._settled = 0  # settled operations appended since the last compaction
+        self._file = None
+        if self.path:
+            self._file = self._open_locked(self.path)
+            # Left by an exited process with the same pid: its entries are ours now
+            self._file.seek(0)
+            for line in self._file:
+                if line.strip():
+                    self._track(json.loads(line))
+
+    @staticmethod
+    def _open_locked(path: str):
+        journal_file = open(path, "a+")
+        try:
+            fcntl.flock(journal_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            journal_file.close()
+            raise ValueError(f"Escrow journal {path} is already open; share it with shared_journal()") from None
+        return journal_file
+
+    def _track(self, entry: dict) -> None:
+        if entry["phase"] in SETTLED_PHASES:
+            self._entries.pop(entry["key"], None)
+            self._settled += 1
+        else:
+            self._entries.setdefault(entry["key"], []).append(entry)
+
+    def _write(self, entries: List[dict]) -> None:
+        for entry in entries:
+            self._file.write(json.dumps(entry, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _compact(self) -> None:
+        """Rewrite this process's file with only the pending entries (caller holds the lock)."""
+        temporary = f"{self.path}.compact"
+        compacted = open(temporary, "w")
+        # Locked before it replaces the journal, so no other process can adopt it meanwhile
+        fcntl.flock(compacted.fileno(), fcntl.LOCK_EX)
+        for entries in self._entries.values():
+            for entry in entries:
+                compacted.write(json.dumps(entry, default=str) + "\n")
+        compacted.flush()
+        os.fsync(compacted.fileno())
+        os.replace(temporary, self.path)
+        self._file.close()
+        self._file = compacted
+        self._settled = 0
+
+    def _append(self, entry: dict) -> None:
+        entry["at"] = time.time()
+        with self._lock:
+            self._track(entry)
+            if self._file is not None:
+                self._write([entry])
+                if self._settled >= self.compact_after:
+                    self._compact()
+
+    def _orphan_paths(self) -> List[str]:
+        """Journals on the base path other than this process's: `<path>.<pid>`, or `<path>` itself."""
+        pattern = re.compile(re.escape(self.base_path) + r"(\.\d+)?")
+        candidates = glob.glob(glob.escape(self.base_path)) + glob.glob(f"{glob.escape(self.base_path)}.*")
+        return sorted(path for path in candidates if path != self.path and pattern.fullmatch(path))
+
+    def adopt_orphans(self) -> int:
+        """
+        Take over the pending entries of journals whose process has exited.
+
+        Returns how many operations were adopted. A journal still locked by
+        its (live) owner, or being adopted by another worker, is skipped.
+        """
+        if self.path is None:
+            return 0
+        adopted = 0
+        for orphan_path in self._orphan_paths():
+            try:
+                orphan = open(orphan_path, "r")
+            except FileNotFoundError:
+                continue
+            with orphan:
+                try:
+                    fcntl.flock(orphan.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    # Replaced by its owner's compaction or removed by another adopter meanwhile
+                    if os.fstat(orphan.fileno()).st_ino != os.stat(orphan_path).st_ino:
+                        continue
+                except (BlockingIOError, FileNotFoundError):
+                    continue
+                pending = _pending_entries([json.loads(line) for line in orphan if line.strip()])
+                with self._lock:
+                    # Durable here before the orphan goes away
+                    self._write([entry for entries in pending.values() for entry in entries])
+                    for entries in pending.values():
+                        for entry in entries:
+                            self._track(entry)
+                os.unlink(orphan_path)
+            if pending:
+                logger.info("Adopted %d pending escrow operations from %s", len(pending), orphan_path)
+            adopted += len(pending)
+        return adopted
+
+    def record_intent(self, key: str, operation: str, params: dict) -> None:
+        self._append({"key": key, "phase": "intent", "operation": operation, "params": params})
+
+    def record_outcome(self, key: str, phase: str, stripe_id: Optional[str] = None, error: Optional[str] = None):
+        """
+        `phase` is succeeded, failed (Stripe refused), unknown (may have
+        been applied) or review (unknown, and too old to replay).
+        """
+        entry = {"key": key, "phase": phase}
+        if stripe_id is not None:
+            entry["stripe_id"] = stripe_id
+        if error is not None:
+            entry["error"] = error
+        self._append(entry)
+
+    def _latest_intents(self, review: bool) -> List[dict]:
+        with self._lock:
+            return [
+                next(entry for entry in reversed(entries) if entry["phase"] == "intent")
+                for entries in self._entries.values()
+                if any(entry["phase"] == "intent" for entry in entries)
+                and (entries[-1]["phase"] == REVIEW_PHASE) == review
+            ]
+
+    def pending(self) -> List[dict]:
+        """Latest intent of each operation whose outcome is missing or unknown, oldest first."""
+        return self._latest_intents(review=False)
+
+    def needs_review(self) -> List[dict]:
+        """Latest intent of each operation reconcile() left for manual review."""
+        return self._latest_intents(review=True)
+
+    def entries(self, key: str) -> List[dict]:
+        """Entries of a pending operation ([] once it has settled)."""
+        with self._lock:
+            return list(self._entries.get(key, ()))
+
+    def close(self) -> None:
+        """Release the file; its pending entries are adopted by the next reconcile()."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_shared: Optional[EscrowJournal] = None
+_shared_lock = threading.Lock()
+
+
+def shared_journal() -> EscrowJournal:
+    """This process's journal on ESCROW_JOURNAL_PATH (a new one after fork)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared.pid != os.getpid():
+            _shared = EscrowJournal()
+        return _shared
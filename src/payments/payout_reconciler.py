@@ -0,0 +1,182 @@
+"""
+Bulk payout status reconciliation.
+
+Replaces the one-payment-at-a-time cron loop. Each run:
+
+1. pages through open payouts (pending/scheduled with a transfer) in id
+   order, PAYOUT_RECONCILE_PAGE_SIZE rows per query
+2. fetches each page's Stripe transfer + payout concurrently on a bounded
+   thread pool (PAYOUT_RECONCILE_CONCURRENCY calls in flight), paced by the
+   shared Stripe rate limiter in its background class
+3. writes every changed status of the page, and the page's checkpoint, in a
+   single UPDATE ... FROM unnest(...) statement
+
+The checkpoint (last payment id) lives in job_checkpoints. A run that dies
+resumes after the last committed page; a run that completes clears it so the
+next run starts from the beginning. A payment whose Stripe lookup fails is
+left unchanged and picked up by the next run.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+from src import db as database
+from src.lazy import lazy_import
+from src.payments.stripe_limiter import Priority, limiter
+
+stripe = lazy_import("stripe")
+
+logger = logging.getLogger(__name__)
+
+PAYOUT_RECONCILE_PAGE_SIZE = int(os.getenv("PAYOUT_RECONCILE_PAGE_SIZE", "500"))
+PAYOUT_RECONCILE_CONCURRENCY = int(os.getenv("PAYOUT_RECONCILE_CONCURRENCY", "16"))
+
+CHECKPOINT_JOB = "payout_reconciliation"
+START_POSITION = "00000000-0000-0000-0000-000000000000"
+
+# Stripe payout status -> payments.payout_status
+PAYOUT_STATUS_MAP = {
+    "paid": "paid",
+    "in_transit": "scheduled",
+    "pending": "pending",
+    "failed": "failed",
+    "canceled": "failed",
+}
+
+CHECKPOINT_SQL = "SELECT position FROM job_checkpoints WHERE job = $1"
+
+CLEAR_CHECKPOINT_SQL = "DELETE FROM job_checkpoints WHERE job = $1"
+
+OPEN_PAYOUTS_SQL = """
+    SELECT id::text AS id, stripe_transfer_id, payout_status, payout_completed_at
+    FROM payments
+    WHERE payout_status IN ('pending', 'scheduled')
+      AND stripe_transfer_id IS NOT NULL
+      AND id > $1::uuid
+    ORDER BY id
+    LIMIT $2
+"""
+
+# One statement per page: status updates and checkpoint commit together.
+# payout_status is payout_status_enum, so the statuses are unnested as one
+APPLY_PAGE_SQL = """
+    WITH updated AS (
+        UPDATE payments AS p
+        SET payout_status = u.payout_status,
+            payout_completed_at = u.payout_completed_at,
+            updated_at = NOW()
+        FROM unnest($1::uuid[], $2::payout_status_enum[], $3::timestamptz[])
+            AS u(id, payout_status, payout_completed_at)
+        WHERE p.id = u.id
+        RETURNING p.id
+    ), checkpoint AS (
+        INSERT INTO job_checkpoints (job, position, updated_at)
+        VALUES ($4, $5, NOW())
+        ON CONFLICT (job) DO UPDATE SET position = EXCLUDED.position, updated_at = NOW()
+    )
+    SELECT COUNT(*) AS updated FROM updated
+"""
+
+# (payout_status, payout_completed_at) for a transfer, or None if no payout yet
+PayoutLookup = Callable[[str], Optional[Tuple[str, Optional[datetime]]]]
+
+
+def stripe_payout_status(transfer_id: str) -> Optional[Tuple[str, Optional[datetime]]]:
+    """Blocking Stripe lookup: transfer, then the payout it landed in (background rate-limit class)."""
+    transfer = limiter.call(Priority.BACKGROUND, stripe.Transfer.retrieve, transfer_id)
+    if not transfer.destination_payment:
+        return None
+    payout = limiter.call(Priority.BACKGROUND, stripe.Payout.retrieve, transfer.destination_payment)
+    status = PAYOUT_STATUS_MAP.get(payout.status, "pending")
+    # arrival_date is only an estimate until the payout is paid (and stays set on failed ones)
+    completed_at = None
+    if status == "paid" and payout.arrival_date:
+        completed_at = datetime.fromtimestamp(payout.arrival_date, tz=timezone.utc)
+    return status, completed_at
+
+
+@dataclass
+class ReconcileReport:
+    resumed_from: Optional[str] = None
+    pages: int = 0
+    scanned: int = 0
+    updated: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.scanned / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+class PayoutReconciler:
+    """Resumable, concurrent reconciliation of payments.payout_status against Stripe."""
+
+    def __init__(
+        self,
+        lookup: PayoutLookup = stripe_payout_status,
+        page_size: int = PAYOUT_RECONCILE_PAGE_SIZE,
+        concurrency: int = PAYOUT_RECONCILE_CONCURRENCY,
+    ):
+        self.lookup = lookup
+        self.page_size = page_size
+        self.concurrency = concurrency
+
+    async def run(self, max_pages: Optional[int] = None) -> ReconcileReport:
+        """Reconcile from the last checkpoint; `max_pages` stops early (checkpoint kept)."""
+        report = ReconcileReport()
+        started = time.perf_counter()
+        rows = await database.fetch(CHECKPOINT_SQL, CHECKPOINT_JOB)
+        position = rows[0]["position"] if rows else START_POSITION
+        if rows:
+            report.resumed_from = position
+            logger.info("Resuming payout reconciliation after %s", position)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="payout-reconcile") as executor:
+            while max_pages is None or report.pages < max_pages:
+                page = await database.fetch(OPEN_PAYOUTS_SQL, position, self.page_size)
+                if not page:
+                    await database.fetch(CLEAR_CHECKPOINT_SQL, CHECKPOINT_JOB)
+                    break
+                position = page[-1]["id"]
+                report.updated += await self._apply_page(page, position, executor, report)
+                report.pages += 1
+                report.scanned += len(page)
+                if len(page) < self.page_size:
+                    await database.fetch(CLEAR_CHECKPOINT_SQL, CHECKPOINT_JOB)
+                    break
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(
+            "Payout reconciliation: %d scanned, %d updated, %d failed in %.1fs",
+            report.scanned, report.updated, report.failed, report.elapsed_seconds,
+        )
+        return report
+
+    async def _apply_page(self, page: List, position: str, executor, report: ReconcileReport) -> int:
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, self.lookup, row["stripe_transfer_id"]) for row in page),
+            return_exceptions=True,
+        )
+
+        ids, statuses, completed = [], [], []
+        for row, result in zip(page, results):
+            if isinstance(result, Exception):
+                report.failed += 1
+                logger.warning("Payout lookup failed for payment %s: %s", row["id"], result)
+                continue
+            if result is None or result == (row["payout_status"], row["payout_completed_at"]):
+                continue
+            ids.append(row["id"])
+            statuses.append(result[0])
+            completed.append(result[1])
+
+        rows = await database.fetch(APPLY_PAGE_SQL, ids, statuses, completed, CHECKPOINT_JOB, position)
+        return rows[0]["updated"] if rows else 0
@@ -0,0 +1,224 @@
+"""
+Client-side rate limiting for Stripe API calls.
+
+Stripe limits each account's request rate and answers the excess with 429.
+Unpaced, a bulk job (payout reconciliation, refunds during an incident) can
+spend the whole budget and push the interactive captures behind it into
+429 retries. Every Stripe call in the process goes through one shared
+StripeRateLimiter (`limiter`):
+
+- token bucket: STRIPE_RATE_LIMIT requests/sec with bursts of up to
+  STRIPE_RATE_BURST; a call waits for a token before it is sent
+- priority classes: interactive (create, hold, capture) > default
+  (transfers, refunds, onboarding) > background (reconciliation, batch
+  jobs). Waiting calls get tokens strictly in priority order, FIFO within
+  a class, and background calls may not take the last
+  STRIPE_BACKGROUND_RESERVE tokens, so a bulk job never drains the burst
+  an interactive call needs
+- back-off: a 429 pauses the whole bucket and empties it. The pause is the
+  response's Retry-After when Stripe sends one, otherwise a delay doubling
+  per consecutive 429 (reset by the next success). 429s that are lock
+  contention on one object (code lock_timeout) or marked
+  Stripe-Should-Retry: false do not pause everyone
+- queue-time histograms and wait/throttle counts per class are served on
+  /metrics (src/main.py)
+- run(), the asyncio entry point, waits and calls on the limiter's own
+  pool of STRIPE_MAX_CONCURRENCY threads, so calls paused by a 429 never
+  occupy the event loop's default executor that other code relies on
+
+Limits are per process: with N workers, set STRIPE_RATE_LIMIT to the
+account's limit divided by N.
+
+    captured = limiter.call(Priority.INTERACTIVE, stripe.PaymentIntent.capture, intent_id)
+    captured = await limiter.run(Priority.INTERACTIVE, stripe.PaymentIntent.capture, intent_id)
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.lazy import lazy_import
+from src.metrics import Histogram
+
+stripe = lazy_import("stripe")
+
+logger = logging.getLogger(__name__)
+
+STRIPE_RATE_LIMIT = float(os.getenv("STRIPE_RATE_LIMIT", "80"))
+STRIPE_RATE_BURST = float(os.getenv("STRIPE_RATE_BURST", "20"))
+STRIPE_BACKGROUND_RESERVE = float(os.getenv("STRIPE_BACKGROUND_RESERVE", "5"))
+STRIPE_MAX_CONCURRENCY = int(os.getenv("STRIPE_MAX_CONCURRENCY", "16"))
+
+BACKOFF_BASE_DELAY = 0.5
+BACKOFF_MAX_DELAY = 8.0
+MAX_RETRY_AFTER = 60.0  # ignore longer Retry-After values, as the stripe SDK does
+
+QUEUE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Priority(IntEnum):
+    """Lower is more important."""
+
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BACKGROUND = 2
+
+
+def _header(error, name: str) -> Optional[str]:
+    """Case-insensitive response header of a StripeError (HTTP clients differ in casing)."""
+    for key, value in (getattr(error, "headers", None) or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def retry_after(error) -> Optional[float]:
+    """Seconds from a StripeError's Retry-After header, if usable."""
+    value = _header(error, "retry-after")
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if 0 <= seconds <= MAX_RETRY_AFTER else None
+
+
+def pauses_bucket(error) -> bool:
+    """Whether a 429 reflects the account's request rate rather than one object."""
+    if str(_header(error, "stripe-should-retry")).lower() == "false":
+        return False
+    return getattr(error, "code", None) != "lock_timeout"
+
+
+class StripeRateLimiter:
+    """Thread-safe priority token bucket; see the module docstring."""
+
+    def __init__(
+        self,
+        rate: float = STRIPE_RATE_LIMIT,
+        burst: float = STRIPE_RATE_BURST,
+        background_reserve: float = STRIPE_BACKGROUND_RESERVE,
+        clock: Callable[[], float] = time.monotonic,
+        max_concurrency: int = STRIPE_MAX_CONCURRENCY,
+    ):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.capacity = burst
+        self.background_reserve = min(background_reserve, burst - 1)
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._tokens = burst
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._streak = 0
+        self._tickets = itertools.count()
+        self._waiting: List[Tuple[int, int]] = []  # heap of (priority, ticket)
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None  # run()'s threads, started on first use
+        self._executor_lock = threading.Lock()
+
+        self.queue_time: Dict[Priority, Histogram] = {p: Histogram(QUEUE_BUCKETS) for p in Priority}
+        self.waiting: Dict[Priority, int] = {p: 0 for p in Priority}
+        self.throttled = 0  # 429s that paused the bucket
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def _delay(self, entry: Tuple[int, int], now: float) -> Optional[float]:
+        """Seconds until `entry` may take a token: 0 now, None until it is at the head."""
+        if self._waiting[0] != entry:
+            return None
+        if now < self._paused_until:
+            return self._paused_until - now
+        needed = 1 + (self.background_reserve if entry[0] == Priority.BACKGROUND else 0)
+        self._refill(now)
+        return 0.0 if self._tokens >= needed else (needed - self._tokens) / self.rate
+
+    def acquire(self, priority: Priority = Priority.DEFAULT) -> float:
+        """Block until a token is granted; returns the seconds spent waiting."""
+        started = self._clock()
+        with self._cond:
+            entry = (int(priority), next(self._tickets))
+            heapq.heappush(self._waiting, entry)
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    delay = self._delay(entry, self._clock())
+                    if delay == 0:
+                        break
+                    self._cond.wait(delay)
+            finally:
+                self.waiting[priority] -= 1
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                # The next waiter in line becomes the head
+                self._cond.notify_all()
+            self._tokens -= 1
+            waited = self._clock() - started
+            self.queue_time[priority].observe(waited)
+        return waited
+
+    def throttle(self, delay: Optional[float] = None) -> float:
+        """Pause all calls after a 429; returns the pause in seconds."""
+        with self._cond:
+            now = self._clock()
+            # 429s for calls already in flight when the pause began are one episode
+            if now >= self._paused_until:
+                self._streak += 1
+            if delay is None:
+                delay = min(BACKOFF_MAX_DELAY, BACKOFF_BASE_DELAY * 2 ** (self._streak - 1))
+            self._paused_until = max(self._paused_until, now + delay)
+            self._refill(now)
+            self._tokens = 0.0
+            self.throttled += 1
+        logger.warning("Stripe rate limited; pausing Stripe calls for %.2fs", delay)
+        return delay
+
+    def succeeded(self) -> None:
+        with self._cond:
+            self._streak = 0
+
+    def call(self, priority: Priority, request: Callable, *args, **kwargs):
+        """Run one blocking Stripe request once a token is granted."""
+        self.acquire(priority)
+        try:
+            result = request(*args, **kwargs)
+        except stripe.error.RateLimitError as e:
+            if pauses_bucket(e):
+                self.throttle(retry_after(e))
+            raise
+        self.succeeded()
+        return result
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="stripe-limiter"
+                )
+            return self._executor
+
+    async def run(self, priority: Priority, request: Callable, *args, **kwargs):
+        """call() on the limiter's threads, so neither the wait nor the request blocks the event loop."""
+        call = functools.partial(self.call, priority, request, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), call)
+
+    def close(self) -> None:
+        """Wait for in-flight run() calls and stop their threads."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+limiter = StripeRateLimiter()
@@ -0,0 +1,247 @@
+"""
+Year-end 1099 generation for all providers in one pass.
+
+Replaces the per-provider paths (a `select("*")` per provider summed in
+Python, and a stub on EscrowManager). A run:
+
+1. aggregates the tax year's paid payouts per provider with one GROUP BY
+   over payments and upserts the totals into tax_1099_summaries in the
+   same statement, so no per-provider rows cross the wire; providers whose
+   totals disappeared since the last run (refunds) are deleted
+2. streams the transaction detail of reportable providers only, ordered by
+   provider, through a server-side cursor and writes one CSV per provider
+   to `output_dir/<year>/<provider_id>.csv`
+
+Both statements are served by idx_payments_paid_by_provider (migration 007).
+Rerunning a year is safe: summaries are upserted and files overwritten.
+"""
+
+import asyncio
+import csv
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from src import db as database
+
+logger = logging.getLogger(__name__)
+
+# IRS 1099-NEC threshold: $600 of payouts in the tax year
+ANNUAL_1099_THRESHOLD = 60000  # cents
+
+TAX_1099_OUTPUT_DIR = os.getenv("TAX_1099_OUTPUT_DIR", "reports/1099")
+TAX_1099_PREFETCH = 5000
+
+DETAIL_COLUMNS = ["payment_id", "request_id", "payout_completed_at", "provider_payout_cents"]
+
+SUMMARIZE_YEAR_SQL = """
+    WITH totals AS (
+        SELECT provider_id,
+               COUNT(*) AS transaction_count,
+               SUM(provider_payout) AS gross_amount,
+               MIN(payout_completed_at) AS first_paid_at,
+               MAX(payout_completed_at) AS last_paid_at
+        FROM payments
+        WHERE payout_status = 'paid'
+          AND payout_completed_at >= $2 AND payout_completed_at < $3
+        GROUP BY provider_id
+    ), written AS (
+        INSERT INTO tax_1099_summaries (
+            provider_id, tax_year, gross_amount, transaction_count,
+            reportable, first_paid_at, last_paid_at, generated_at
+        )
+        SELECT provider_id, $1, gross_amount, transaction_count,
+               gross_amount * 100 >= $4, first_paid_at, last_paid_at, NOW()
+        FROM totals
+        ON CONFLICT (provider_id, tax_year) DO UPDATE SET
+            gross_amount = EXCLUDED.gross_amount,
+            transaction_count = EXCLUDED.transaction_count,
+            reportable = EXCLUDED.reportable,
+            first_paid_at = EXCLUDED.first_paid_at,
+            last_paid_at = EXCLUDED.last_paid_at,
+            generated_at = NOW()
+        RETURNING reportable, gross_amount
+    ), stale AS (
+        DELETE FROM tax_1099_summaries AS s
+        WHERE s.tax_year = $1
+          AND NOT EXISTS (SELECT 1 FROM totals t WHERE t.provider_id = s.provider_id)
+    )
+    SELECT COUNT(*) AS providers,
+           COUNT(*) FILTER (WHERE reportable) AS reportable,
+           (COALESCE(SUM(gross_amount), 0) * 100)::bigint AS gross_cents
+    FROM written
+"""
+
+REPORTABLE_DETAIL_SQL = """
+    SELECT pay.provider_id::text AS provider_id,
+           pay.id::text AS payment_id,
+           pay.request_id::text AS request_id,
+           pay.payout_completed_at,
+           (pay.provider_payout * 100)::bigint AS provider_payout_cents
+    FROM tax_1099_summaries s
+    JOIN payments pay ON pay.provider_id = s.provider_id
+    WHERE s.tax_year = $1 AND s.reportable
+      AND pay.payout_status = 'paid'
+      AND pay.payout_completed_at >= $2 AND pay.payout_completed_at < $3
+    ORDER BY pay.provider_id, pay.payout_completed_at, pay.id
+"""
+
+SUMMARY_SQL = """
+    SELECT (gross_amount * 100)::bigint AS gross_cents, transaction_count
+    FROM tax_1099_summaries
+    WHERE provider_id = $1 AND tax_year = $2
+"""
+
+PROVIDER_TOTALS_SQL = """
+    SELECT (COALESCE(SUM(provider_payout), 0) * 100)::bigint AS gross_cents,
+           COUNT(*) AS transaction_count
+    FROM payments
+    WHERE provider_id = $1
+      AND payout_status = 'paid'
+      AND payout_completed_at >= $2 AND payout_completed_at < $3
+"""
+
+PROVIDER_DETAIL_SQL = """
+    SELECT id::text AS payment_id,
+           request_id::text AS request_id,
+           payout_completed_at,
+           (provider_payout * 100)::bigint AS provider_payout_cents
+    FROM payments
+    WHERE provider_id = $1
+      AND payout_status = 'paid'
+      AND payout_completed_at >= $2 AND payout_completed_at < $3
+    ORDER BY payout_completed_at, id
+"""
+
+
+def tax_year_bounds(year: int) -> Tuple[datetime, datetime]:
+    """[Jan 1, next Jan 1) in UTC."""
+    return datetime(year, 1, 1, tzinfo=timezone.utc), datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+
+
+def summary_1099(provider_id: str, year: int, gross_income_cents: int, job_count: int) -> dict:
+    """The 1099 summary returned to API callers for one provider and year."""
+    should_issue_1099 = gross_income_cents >= ANNUAL_1099_THRESHOLD
+    return {
+        "year": year,
+        "provider_id": provider_id,
+        "gross_income_cents": gross_income_cents,
+        "should_issue_1099": should_issue_1099,
+        "is_reportable": should_issue_1099,
+        "job_count": job_count,
+        "notes": "Report to IRS if annual earnings >= $600",
+        "box_1a_nonemployee_compensation": gross_income_cents / 100.0,
+    }
+
+
+async def provider_totals(provider_id: str, start: datetime, end: datetime) -> Tuple[int, int]:
+    """(gross cents, paid payout count) for one provider over [start, end)."""
+    rows = await database.fetch(PROVIDER_TOTALS_SQL, provider_id, start, end)
+    return (rows[0]["gross_cents"], rows[0]["transaction_count"]) if rows else (0, 0)
+
+
+async def provider_transactions(provider_id: str, start: datetime, end: datetime) -> List:
+    """Paid payouts of one provider over [start, end), oldest first."""
+    return await database.fetch(PROVIDER_DETAIL_SQL, provider_id, start, end)
+
+
+async def provider_summary(provider_id: str, year: int) -> dict:
+    """
+    1099 summary for one provider.
+
+    A primary-key read of the year's job output; before the job has run for
+    `year`, falls back to aggregating that provider's payments.
+    """
+    rows = await database.fetch(SUMMARY_SQL, provider_id, year)
+    if rows:
+        gross_cents, job_count = rows[0]["gross_cents"], rows[0]["transaction_count"]
+    else:
+        gross_cents, job_count = await provider_totals(provider_id, *tax_year_bounds(year))
+    return summary_1099(provider_id, year, gross_cents, job_count)
+
+
+@dataclass
+class Tax1099Report:
+    tax_year: int
+    providers: int = 0
+    reportable: int = 0
+    gross_cents: int = 0
+    detail_files: int = 0
+    detail_rows: int = 0
+    elapsed_seconds: float = 0.0
+
+
+def _write_detail(path: str, rows: List) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(DETAIL_COLUMNS)
+        for row in rows:
+            completed = row["payout_completed_at"]
+            writer.writerow([
+                row["payment_id"],
+                row["request_id"],
+                completed.isoformat() if completed else "",
+                row["provider_payout_cents"],
+            ])
+
+
+class Tax1099Job:
+    """Bulk 1099 summaries and detail files for one tax year."""
+
+    def __init__(
+        self,
+        output_dir: str = TAX_1099_OUTPUT_DIR,
+        threshold_cents: int = ANNUAL_1099_THRESHOLD,
+        prefetch: int = TAX_1099_PREFETCH,
+    ):
+        self.output_dir = output_dir
+        self.threshold_cents = threshold_cents
+        self.prefetch = prefetch
+
+    async def run(self, year: int, write_details: bool = True) -> Tax1099Report:
+        report = Tax1099Report(tax_year=year)
+        started = time.perf_counter()
+        start, end = tax_year_bounds(year)
+
+        rows = await database.fetch(SUMMARIZE_YEAR_SQL, year, start, end, self.threshold_cents)
+        if rows:
+            report.providers = rows[0]["providers"]
+            report.reportable = rows[0]["reportable"]
+            report.gross_cents = rows[0]["gross_cents"]
+
+        if write_details and report.reportable:
+            await self._write_details(year, start, end, report)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(
+            "1099 job %d: %d providers, %d reportable, %d detail rows in %.1fs",
+            year, report.providers, report.reportable, report.detail_rows, report.elapsed_seconds,
+        )
+        return report
+
+    async def _write_details(self, year: int, start: datetime, end: datetime, report: Tax1099Report) -> None:
+        directory = os.path.join(self.output_dir, str(year))
+        os.makedirs(directory, exist_ok=True)
+        loop = asyncio.get_running_loop()
+
+        async def flush(provider_id: str, rows: List) -> None:
+            path = os.path.join(directory, f"{provider_id}.csv")
+            # File I/O off the loop; the cursor keeps the next rows prefetched
+            await loop.run_in_executor(None, _write_detail, path, rows)
+            report.detail_files += 1
+            report.detail_rows += len(rows)
+
+        # Rows arrive grouped by provider: one provider's detail in memory at a time
+        provider_id: Optional[str] = None
+        rows: List = []
+        async for row in database.stream(REPORTABLE_DETAIL_SQL, year, start, end, prefetch=self.prefetch):
+            if row["provider_id"] != provider_id:
+                if rows:
+                    await flush(provider_id, rows)
+                provider_id, rows = row["provider_id"], []
+            rows.append(row)
+        if rows:
+            await flush(provider_id, rows)
@@ -0,0 +1,347 @@
+"""
+Stripe webhook ingestion: verify, persist, acknowledge; process later.
+
+The webhook request does only three things: check the Stripe-Signature
+HMAC, append the raw event to stripe_webhook_events, and return 200. It
+never touches payments, so a burst of events costs Stripe one fast insert
+each instead of serial status updates that time out and get retried.
+
+Ingest (WebhookIngestor)
+    Concurrent webhook requests are group-committed: events arriving while
+    an insert is in flight join the next multi-row INSERT (up to
+    WEBHOOK_BATCH_SIZE). A request is acknowledged only after its batch
+    committed, so an acknowledged event is durable. Redeliveries are
+    dropped by the event_id primary key (ON CONFLICT DO NOTHING).
+
+Process (WebhookProcessor)
+    Workers claim unprocessed events with FOR UPDATE SKIP LOCKED, oldest
+    Stripe `created` first, and apply them in one transaction:
+    - charge status events are coalesced per PaymentIntent (the newest
+      event wins) and written with one UPDATE ... FROM unnest()
+    - payments.stripe_event_created only moves forward, so an older event
+      processed late (another worker, a retry) never overwrites a newer
+      status; per-PaymentIntent order holds with any number of workers
+    - a status is written only if the escrow state machine allows the move
+      from the payment's current status (src/payments/escrow_state.py), so
+      a late charge.succeeded never reopens a refunded payment
+    - other event types go to an optional `fallback` handler, one by one,
+      after the claim transaction has committed, so a handler that calls
+      Stripe or another service never holds row locks or the transaction
+      open. The claim leases these events for WEBHOOK_FALLBACK_LEASE
+      seconds instead of locking them; if the worker dies before marking
+      them, they are claimed again when the lease runs out (at-least-once,
+      like Stripe's own delivery). A failing event is marked with its error
+      (dead-lettered) instead of blocking the queue. A processor without
+      a fallback claims only the charge status events, leaving the other
+      types queued for a worker that has one
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+from src import db as database
+from src.payments.escrow_state import LEGAL_FROM, LEGAL_TO
+
+logger = logging.getLogger(__name__)
+
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+WEBHOOK_TOLERANCE_SECONDS = 300
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "500"))
+WEBHOOK_FLUSH_DELAY = float(os.getenv("WEBHOOK_FLUSH_DELAY", "0.002"))
+WEBHOOK_PROCESS_BATCH_SIZE = int(os.getenv("WEBHOOK_PROCESS_BATCH_SIZE", "1000"))
+WEBHOOK_FALLBACK_LEASE = float(os.getenv("WEBHOOK_FALLBACK_LEASE", "300"))
+
+# Event type -> payments.status, applied set-based and coalesced per PaymentIntent
+COALESCED_STATUS = {
+    "charge.succeeded": "captured",
+    "charge.failed": "failed",
+}
+
+INSERT_EVENTS_SQL = """
+    INSERT INTO stripe_webhook_events (event_id, type, payment_intent_id, created, payload)
+    SELECT u.event_id, u.type, u.payment_intent_id, u.created, u.payload::jsonb
+    FROM unnest($1::text[], $2::text[], $3::text[], $4::timestamptz[], $5::text[])
+        AS u(event_id, type, payment_intent_id, created, payload)
+    ON CONFLICT (event_id) DO NOTHING
+    RETURNING event_id
+"""
+
+CLAIM_EVENTS_SQL = """
+    SELECT event_id, type, payment_intent_id, created, payload::text AS payload
+    FROM stripe_webhook_events
+    WHERE processed_at IS NULL
+      AND (claimed_until IS NULL OR claimed_until < NOW())
+      AND ($2::text[] IS NULL OR type = ANY($2::text[]))
+    ORDER BY created, received_at
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+"""
+
+# Fallback events are handled after the claim commits; the lease keeps other
+# workers off them meanwhile
+LEASE_EVENTS_SQL = """
+    UPDATE stripe_webhook_events
+    SET claimed_until = NOW() + make_interval(secs => $2)
+    WHERE event_id = ANY($1::text[])
+"""
+
+# payments.status is payment_status_enum; $4/$5 are the state machine's
+# legal (from, to) pairs. Returns the PaymentIntents actually updated
+APPLY_STATUSES_SQL = """
+    WITH legal AS (
+        SELECT l.from_status, l.to_status
+        FROM unnest($4::payment_status_enum[], $5::payment_status_enum[]) AS l(from_status, to_status)
+    )
+    UPDATE payments AS p
+    SET status = u.status,
+        stripe_event_created = u.created,
+        updated_at = NOW()
+    FROM unnest($1::text[], $2::payment_status_enum[], $3::timestamptz[])
+        AS u(payment_intent_id, status, created)
+    WHERE p.stripe_payment_intent_id = u.payment_intent_id
+      AND (p.stripe_event_created IS NULL OR p.stripe_event_created <= u.created)
+      AND EXISTS (SELECT 1 FROM legal l WHERE l.from_status = p.status AND l.to_status = u.status)
+    RETURNING p.stripe_payment_intent_id
+"""
+
+MARK_PROCESSED_SQL = """
+    UPDATE stripe_webhook_events AS e
+    SET processed_at = NOW(), error = u.error
+    FROM unnest($1::text[], $2::text[]) AS u(event_id, error)
+    WHERE e.event_id = u.event_id
+"""
+
+
+class SignatureError(ValueError):
+    """Webhook payload failed Stripe-Signature verification."""
+
+
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """Stripe-Signature header value for `payload` (tests, benchmarks, local replay)."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify_event(
+    payload: bytes,
+    signature_header: str,
+    secret: Optional[str] = None,
+    tolerance: int = WEBHOOK_TOLERANCE_SECONDS,
+    now: Optional[float] = None,
+) -> dict:
+    """
+    Check a Stripe-Signature header and return the parsed event.
+
+    Same scheme as stripe.Webhook.construct_event (HMAC-SHA256 over
+    "{t}.{payload}", any matching v1, timestamp within `tolerance`) without
+    loading the SDK or building StripeObjects on the request path.
+    """
+    secret = STRIPE_WEBHOOK_SECRET if secret is None else secret
+    if not secret:
+        raise SignatureError("Webhook secret not configured")
+
+    timestamp, candidates = None, []
+    for part in signature_header.split(","):
+        key, _, value = part.strip().partition("=")
+        if key == "t" and value.isdigit():
+            timestamp = int(value)
+        elif key == "v1":
+            candidates.append(value)
+    if timestamp is None or not candidates:
+        raise SignatureError("Malformed Stripe-Signature header")
+
+    now = time.time() if now is None else now
+    if abs(now - timestamp) > tolerance:
+        raise SignatureError("Timestamp outside tolerance")
+
+    expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, candidate) for candidate in candidates):
+        raise SignatureError("No matching signature")
+
+    try:
+        event = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        event = None
+    if not isinstance(event, dict) or "id" not in event or "type" not in event:
+        raise SignatureError("Payload is not a Stripe event")
+    return event
+
+
+def _payment_intent_id(event: dict) -> Optional[str]:
+    obj = (event.get("data") or {}).get("object") or {}
+    if obj.get("object") == "payment_intent":
+        return obj.get("id")
+    return obj.get("payment_intent")
+
+
+def event_row(event: dict, payload: bytes) -> Tuple:
+    created = datetime.fromtimestamp(event.get("created") or time.time(), tz=timezone.utc)
+    return event["id"], event["type"], _payment_intent_id(event), created, payload.decode()
+
+
+class WebhookIngestor:
+    """Group-commits verified events to stripe_webhook_events."""
+
+    def __init__(self, max_batch: int = WEBHOOK_BATCH_SIZE, max_delay: float = WEBHOOK_FLUSH_DELAY):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Tuple[Tuple, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._loop = None
+        self.stats = {"received": 0, "inserted": 0, "duplicates": 0, "flushes": 0}
+
+    async def ingest(self, event: dict, payload: bytes) -> None:
+        """Return once the event is committed (or was already stored)."""
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._flusher = loop.create_task(self._flush_loop())
+        committed = loop.create_future()
+        self._pending.append((event_row(event, payload), committed))
+        self.stats["received"] += 1
+        self._wakeup.set()
+        await committed
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if len(self._pending) < self.max_batch:
+                # Let concurrent requests join this batch
+                await asyncio.sleep(self.max_delay)
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[Tuple, asyncio.Future]]) -> None:
+        columns = [list(column) for column in zip(*(row for row, _ in batch))]
+        try:
+            inserted = await database.fetch(INSERT_EVENTS_SQL, *columns)
+        except Exception as e:
+            logger.error("Webhook batch insert failed (%d events): %s", len(batch), e)
+            for _, committed in batch:
+                if not committed.done():
+                    committed.set_exception(e)
+            return
+        self.stats["flushes"] += 1
+        self.stats["inserted"] += len(inserted)
+        self.stats["duplicates"] += len(batch) - len(inserted)
+        for _, committed in batch:
+            if not committed.done():
+                committed.set_result(None)
+
+    async def close(self) -> None:
+        """Flush anything queued and stop the flusher."""
+        if self._pending:
+            batch, self._pending = self._pending, []
+            await self._flush(batch)
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+
+class WebhookProcessor:
+    """Applies stored events in set-based batches."""
+
+    def __init__(
+        self,
+        batch_size: int = WEBHOOK_PROCESS_BATCH_SIZE,
+        event_types: Optional[Sequence[str]] = None,
+        fallback: Optional[Callable[[dict], Awaitable[None]]] = None,
+    ):
+        self.batch_size = batch_size
+        self.event_types = list(event_types) if event_types is not None else None
+        if fallback is None:
+            # Nothing here could handle the other types: leave them for a worker that can
+            self.event_types = [t for t in (self.event_types or COALESCED_STATUS) if t in COALESCED_STATUS]
+        self.fallback = fallback
+        self.stats = {"events": 0, "coalesced": 0, "status_updates": 0, "skipped": 0, "errors": 0}
+
+    async def process_batch(self) -> int:
+        """Claim and apply up to batch_size events; returns how many were claimed."""
+        async with database.transaction() as conn:
+            rows = await conn.fetch(CLAIM_EVENTS_SQL, self.batch_size, self.event_types)
+            if not rows:
+                return 0
+
+            latest: Dict[str, Tuple[str, datetime]] = {}
+            processed: Dict[str, Optional[str]] = {}
+            deferred: List = []
+            for row in rows:
+                status = COALESCED_STATUS.get(row["type"])
+                if status and row["payment_intent_id"]:
+                    # Rows arrive oldest first, so the newest event per intent wins
+                    latest[row["payment_intent_id"]] = (status, row["created"])
+                    processed[row["event_id"]] = None
+                elif self.fallback is not None:
+                    deferred.append(row)
+                else:
+                    processed[row["event_id"]] = "No PaymentIntent on charge event"
+
+            updated = []
+            if latest:
+                intents = list(latest)
+                updated = await conn.fetch(
+                    APPLY_STATUSES_SQL,
+                    intents,
+                    [latest[pi][0] for pi in intents],
+                    [latest[pi][1] for pi in intents],
+                    LEGAL_FROM,
+                    LEGAL_TO,
+                )
+                if len(updated) < len(intents):
+                    # Illegal moves (refunded -> captured), older than the last applied event, or unknown
+                    skipped = len(intents) - len(updated)
+                    logger.info("Webhook statuses skipped for %d of %d PaymentIntents", skipped, len(intents))
+            if processed:
+                await conn.fetch(MARK_PROCESSED_SQL, list(processed), list(processed.values()))
+            if deferred:
+                await conn.fetch(LEASE_EVENTS_SQL, [row["event_id"] for row in deferred], WEBHOOK_FALLBACK_LEASE)
+
+        errors = await self._run_fallback(deferred) if deferred else {}
+
+        self.stats["events"] += len(rows)
+        self.stats["status_updates"] += len(updated)
+        self.stats["skipped"] += len(latest) - len(updated)
+        self.stats["coalesced"] += sum(1 for row in rows if row["type"] in COALESCED_STATUS) - len(latest)
+        self.stats["errors"] += sum(1 for error in errors.values() if error)
+        return len(rows)
+
+    async def _run_fallback(self, rows: List) -> Dict[str, Optional[str]]:
+        """Hand leased events to the fallback outside any transaction, then mark them processed."""
+        errors: Dict[str, Optional[str]] = {}
+        for row in rows:
+            errors[row["event_id"]] = None
+            try:
+                await self.fallback(orjson.loads(row["payload"]))
+            except Exception as e:
+                logger.error("Webhook %s (%s) failed: %s", row["event_id"], row["type"], e)
+                errors[row["event_id"]] = str(e)
+        await database.fetch(MARK_PROCESSED_SQL, list(errors), list(errors.values()))
+        return errors
+
+    async def run(self, idle_delay: float = 0.5) -> None:
+        """Process until cancelled, sleeping `idle_delay` when the queue is empty."""
+        while True:
+            try:
+                claimed = await self.process_batch()
+            except database.DatabaseUnavailableError:
+                claimed = 0
+            except Exception as e:
+                logger.error("Webhook processing batch failed: %s", e)
+                claimed = 0
+            if claimed < self.batch_size:
+                await asyncio.sleep(idle_delay)
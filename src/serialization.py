@@ -0,0 +1,63 @@
+"""
+Fast response serialization for list endpoints.
+
+Rows coming back from src/listings.py are already typed by their SQL casts
+(text IDs, bigint cents, timestamptz datetimes), so running each one through
+Pydantic validation, then FastAPI's response_model re-validation, then
+jsonable_encoder is pure overhead at limit=1000. Handlers instead project the
+rows onto the model's field names and hand plain dicts to orjson.
+
+The response_model on each route still documents the shape in OpenAPI;
+returning a Response instance makes FastAPI skip re-validating it.
+"""
+
+from typing import Any, Iterable, List, Optional, Sequence, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    orjson-rendered JSON response.
+
+    OPT_UTC_Z renders UTC datetimes as "...Z", matching Pydantic's output, so
+    clients see identical payloads on the fast and validated paths.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+def rows_to_items(
+    rows: Iterable,
+    model: Type[BaseModel],
+    fields: Optional[Sequence[str]] = None,
+) -> List[dict]:
+    """
+    Project trusted DB rows onto `model`'s fields without validation.
+
+    Extra columns selected only for pagination (e.g. providers.created_at)
+    are dropped so the payload matches the documented schema. With `fields`
+    (a sparse fieldset), only those fields are kept, in model order.
+    """
+    names = tuple(name for name in model.model_fields if fields is None or name in fields)
+    return [{name: row[name] for name in names} for row in rows]
+
+
+def page_payload(
+    rows: Iterable,
+    model: Type[BaseModel],
+    limit: int,
+    next_cursor: Optional[str],
+    total: Optional[int],
+    fields: Optional[Sequence[str]] = None,
+) -> dict:
+    """Body of a cursor-paginated list response (see *List models in src/main.py)."""
+    return {
+        "total": total,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "items": rows_to_items(rows, model, fields),
+    }
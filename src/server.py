@@ -0,0 +1,204 @@
+"""
+Production server profile: multi-worker uvicorn with uvloop + httptools.
+
+    python -m src.server          (Dockerfile CMD; `make serve`)
+
+`python -m src.main` remains the single-process dev server with reload.
+
+Sizing (all overridable from the environment):
+- WEB_CONCURRENCY workers, default one per CPU core
+- DATABASE_MAX_CONNECTIONS is the Postgres connection budget for the whole
+  server. Each worker gets an equal share, minus its control connection
+  (LISTEN + health probes), as its asyncpg pool size, so
+  workers * (pool + 1) never exceeds the budget however many cores the host
+  has. With DATABASE_ORM_POOL=dedicated the share is split between the
+  asyncpg pool and the ORM pool.
+- Pools are opened in full during each worker's startup, before its
+  listening socket accepts connections, so the first requests never pay
+  connection setup.
+
+Pre-fork: the supervisor resolves the sizing above, checks the budget
+against the server's max_connections once, binds the socket (with
+BACKLOG) and only then spawns workers, which inherit the sizing through
+their environment.
+
+Shutdown: on SIGTERM a worker first fails /health/ready for DRAIN_SECONDS so
+load balancers stop routing to it, then stops accepting, lets in-flight
+requests finish for up to GRACEFUL_TIMEOUT seconds, and finally runs the app
+lifespan shutdown (closing pools). A second signal skips the drain delay.
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Leave room for migrations, psql and monitoring below max_connections
+RESERVED_CONNECTIONS = 5
+
+
+@dataclass
+class ServerSettings:
+    host: str
+    port: int
+    workers: int
+    db_budget: int
+    pool_size: int
+    orm_pool_size: int
+    backlog: int
+    keepalive_timeout: int
+    graceful_timeout: int
+    drain_seconds: float
+    loop: str
+    http: str
+
+    @property
+    def connections_per_worker(self) -> int:
+        return self.pool_size + self.orm_pool_size + 1  # + control connection
+
+    @property
+    def total_connections(self) -> int:
+        return self.workers * self.connections_per_worker
+
+
+def load_settings(env=os.environ) -> ServerSettings:
+    """Resolve worker count and per-worker pool sizes from the environment."""
+    workers = max(1, int(env.get("WEB_CONCURRENCY") or os.cpu_count() or 1))
+    db_budget = int(env.get("DATABASE_MAX_CONNECTIONS", "100"))
+
+    share = db_budget // workers - 1  # control connection
+    if share < 2:
+        raise ValueError(
+            f"DATABASE_MAX_CONNECTIONS={db_budget} is too small for {workers} workers "
+            f"(need at least {3 * workers})"
+        )
+    if env.get("DATABASE_ORM_POOL", "shared") == "dedicated":
+        pool_size, orm_pool_size = share - share // 2, share // 2
+    else:
+        pool_size, orm_pool_size = share, 0
+
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    if not (has_uvloop and has_httptools):
+        logger.warning("uvloop/httptools not installed; falling back to asyncio/h11")
+
+    return ServerSettings(
+        host=env.get("HOST", "0.0.0.0"),
+        port=int(env.get("PORT", "8000")),
+        workers=workers,
+        db_budget=db_budget,
+        pool_size=pool_size,
+        orm_pool_size=orm_pool_size,
+        # Kernel caps this at net.core.somaxconn
+        backlog=int(env.get("BACKLOG", "4096")),
+        # Longer than common load balancer idle timeouts (60s) so the LB,
+        # not the app, closes idle keep-alive connections
+        keepalive_timeout=int(env.get("KEEPALIVE_TIMEOUT", "75")),
+        graceful_timeout=int(env.get("GRACEFUL_TIMEOUT", "30")),
+        drain_seconds=float(env.get("DRAIN_SECONDS", "5")),
+        loop="uvloop" if has_uvloop else "asyncio",
+        http="httptools" if has_httptools else "h11",
+    )
+
+
+def worker_environment(settings: ServerSettings) -> dict:
+    """Variables src.db reads at import in each worker."""
+    return {
+        "DATABASE_POOL_SIZE": str(settings.pool_size),
+        "DATABASE_POOL_MIN_SIZE": str(settings.pool_size),
+        "DATABASE_MAX_OVERFLOW": "0",
+        "DATABASE_ORM_POOL_SIZE": str(settings.orm_pool_size),
+        "DRAIN_SECONDS": str(settings.drain_seconds),
+    }
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn.Server that fails readiness for a while before shutting down."""
+
+    def handle_exit(self, sig, frame) -> None:
+        if self.should_exit or getattr(self, "_draining", False):
+            super().handle_exit(sig, frame)
+            return
+
+        self._draining = True
+        drain_seconds = float(os.getenv("DRAIN_SECONDS", "5"))
+        from src import main
+
+        main.health_monitor.draining = True
+        logger.info("Draining for %.1fs before shutdown (pid %d)", drain_seconds, os.getpid())
+        timer = threading.Timer(drain_seconds, super().handle_exit, args=(sig, frame))
+        timer.daemon = True
+        timer.start()
+
+
+async def preflight(settings: ServerSettings) -> None:
+    """Check the connection budget against the database once, before forking."""
+    if importlib.util.find_spec("asyncpg") is None:
+        return
+
+    import asyncpg
+
+    from src.db import DATABASE_URL
+
+    try:
+        conn = await asyncpg.connect(DATABASE_URL, timeout=10)
+    except Exception as e:
+        logger.error("Preflight: database unreachable (%s); workers will retry on startup", str(e))
+        return
+    try:
+        max_connections = int(await conn.fetchval("SHOW max_connections"))
+        in_use = await conn.fetchval("SELECT count(*) FROM pg_stat_activity")
+    finally:
+        await conn.close()
+
+    available = max_connections - in_use - RESERVED_CONNECTIONS
+    if settings.total_connections > available:
+        logger.warning(
+            "Preflight: %d workers x %d connections = %d exceeds the %d available "
+            "(max_connections=%d, in use=%d); lower DATABASE_MAX_CONNECTIONS",
+            settings.workers, settings.connections_per_worker, settings.total_connections,
+            available, max_connections, in_use,
+        )
+
+
+def run(settings: ServerSettings) -> None:
+    import asyncio
+
+    os.environ.update(worker_environment(settings))
+    asyncio.run(preflight(settings))
+
+    logger.info(
+        "Starting %d workers (%s/%s): pool %d (+%d ORM) per worker, %d DB connections max",
+        settings.workers, settings.loop, settings.http, settings.pool_size,
+        settings.orm_pool_size, settings.total_connections,
+    )
+    config = uvicorn.Config(
+        "src.main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+        loop=settings.loop,
+        http=settings.http,
+        backlog=settings.backlog,
+        timeout_keep_alive=settings.keepalive_timeout,
+        timeout_graceful_shutdown=settings.graceful_timeout,
+        proxy_headers=True,
+        access_log=False,
+    )
+    server = DrainingServer(config)
+    sock = config.bind_socket()
+    if settings.workers > 1:
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run(sockets=[sock])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    run(load_settings())
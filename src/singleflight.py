@@ -0,0 +1,115 @@
+"""
+Single-flight coalescing for identical concurrent reads.
+
+When many requests ask for the same thing at the same moment (a hot service
+request's bids, the first page of the provider directory), only the first
+caller runs the query; everyone who arrives while it is in flight awaits the
+same result. Nothing is cached: once the call finishes, the next caller
+starts a fresh one.
+
+The shared call runs in its own task and waiters await it through
+asyncio.shield, so a client disconnect cancels that client's wait, never the
+query the other waiters depend on.
+
+Usage:
+    reads = SingleFlight()
+
+    @reads.coalesce("bids")
+    async def fetch_bids(request_id, limit): ...
+"""
+
+import asyncio
+import functools
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+MAX_TRACKED_KEYS = 1000
+
+
+@dataclass
+class FlightStats:
+    """Counters for one key (or one group of keys)."""
+
+    calls: int = 0
+    executions: int = 0
+
+    @property
+    def collapsed(self) -> int:
+        """Calls served by another caller's in-flight execution."""
+        return self.calls - self.executions
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key.
+
+    Stats are kept per group (e.g. "bids") and per key. Per-key stats are
+    bounded to the `max_tracked_keys` most recently seen keys so an endless
+    stream of distinct keys cannot grow memory.
+    """
+
+    def __init__(self, max_tracked_keys: int = MAX_TRACKED_KEYS):
+        self.max_tracked_keys = max_tracked_keys
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.group_stats: Dict[str, FlightStats] = {}
+        self.key_stats: "OrderedDict[Hashable, FlightStats]" = OrderedDict()
+
+    def _stats_for(self, group: str, key: Hashable):
+        group_stats = self.group_stats.setdefault(group, FlightStats())
+        key_stats = self.key_stats.get(key)
+        if key_stats is None:
+            key_stats = self.key_stats[key] = FlightStats()
+            while len(self.key_stats) > self.max_tracked_keys:
+                self.key_stats.popitem(last=False)
+        else:
+            self.key_stats.move_to_end(key)
+        return group_stats, key_stats
+
+    async def do(self, group: str, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn()` unless an identical call is in flight; return its result either way."""
+        flight_key = (group, key)
+        group_stats, key_stats = self._stats_for(group, flight_key)
+        group_stats.calls += 1
+        key_stats.calls += 1
+
+        task = self._inflight.get(flight_key)
+        if task is None:
+            group_stats.executions += 1
+            key_stats.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(flight_key, None))
+        return await asyncio.shield(task)
+
+    def coalesce(self, group: str):
+        """Decorator: coalesce calls to an async function with equal arguments."""
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                key = (args, tuple(sorted(kwargs.items())))
+                return await self.do(group, key, lambda: fn(*args, **kwargs))
+
+            return wrapper
+
+        return decorator
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def snapshot(self, top: int = 20) -> Dict[str, Any]:
+        """Group totals plus the `top` keys with the most collapsed calls."""
+        hot_keys = sorted(self.key_stats.items(), key=lambda item: item[1].collapsed, reverse=True)[:top]
+        return {
+            "in_flight": self.in_flight(),
+            "groups": {
+                group: {"calls": s.calls, "executions": s.executions, "collapsed": s.collapsed}
+                for group, s in self.group_stats.items()
+            },
+            "hot_keys": [
+                {"group": group, "key": repr(key), "calls": s.calls, "collapsed": s.collapsed}
+                for (group, key), s in hot_keys
+                if s.collapsed
+            ],
+        }
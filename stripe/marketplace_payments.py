@@ -4,41 +4,105 @@ Handles escrow payments, provider payouts, and marketplace fees.
 """
 
 import os
-import stripe
 import logging
 from decimal import Decimal
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from enum import Enum
 
-import asyncpg
-from supabase import create_client
+from src import db as database
+from src.lazy import LazyClient, lazy_import
+from src.payments.auto_capture import AutoCaptureJob
+from src.payments.escrow_state import (
+    IllegalTransitionError,
+    PaymentStatus,
+    PayoutStatus,
+    check_transition,
+)
+from src.payments.payout_reconciler import PAYOUT_STATUS_MAP, PayoutReconciler
+from src.payments.stripe_limiter import Priority, limiter
+from src.payments.tax_reporting import (
+    ANNUAL_1099_THRESHOLD,
+    Tax1099Job,
+    provider_totals,
+    provider_transactions,
+)
+from src.payments.webhooks import WebhookProcessor
 
 logger = logging.getLogger(__name__)
 
+# Heavy SDKs are deferred: the stripe module executes on first stripe.X access
+# and the Supabase client is built on first supabase.table(...) call.
+# Every Stripe call goes through the shared rate limiter, which also runs it
+# off the event loop (src/payments/stripe_limiter.py).
+stripe = lazy_import("stripe")
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 
-supabase = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_ANON_KEY")
-)
 
+def _create_supabase_client():
+    from supabase import create_client
+
+    return create_client(
+        os.getenv("SUPABASE_URL"),
+        os.getenv("SUPABASE_ANON_KEY")
+    )
+
+
+supabase = LazyClient(_create_supabase_client)
+
+
+# ============================================================================
+# Payment Status Transitions
+# ============================================================================
+
+
+async def transition_payment(
+    payment_intent_id: str,
+    to_status: PaymentStatus,
+    fields: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """
+    Move a payment to `to_status` through the escrow state machine.
+
+    Reads the payment's status and version, checks the move with
+    check_transition, then writes the status (and `fields`) only if the
+    version is unchanged, so a concurrent writer (webhook worker,
+    auto-capture) is never overwritten. Batch jobs use apply_transitions
+    (src/payments/escrow_state.py) for the same checks set-based.
+
+    Args:
+        payment_intent_id: Stripe PaymentIntent ID
+        to_status: Target payment status
+        fields: Other payment columns written in the same update
+
+    Returns:
+        True if the transition was applied; False (logged) if the payment
+        is missing, the move is illegal or the payment changed meanwhile
+    """
+    result = await supabase.table("payments").select("id, status, version").eq(
+        "stripe_payment_intent_id", payment_intent_id
+    ).execute()
+
+    if not result.data:
+        logger.warn(f"No payment found for PaymentIntent {payment_intent_id}")
+        return False
 
-class PaymentStatus(Enum):
-    PENDING = "pending"
-    ESCROW_HELD = "escrow_held"
-    CAPTURED = "captured"
-    PARTIALLY_REFUNDED = "partially_refunded"
-    REFUNDED = "refunded"
-    FAILED = "failed"
-    CANCELLED = "cancelled"
+    payment = result.data[0]
+    try:
+        check_transition(PaymentStatus(payment["status"]), to_status)
+    except IllegalTransitionError as e:
+        logger.warn(f"Payment {payment['id']} not updated: {e}")
+        return False
 
+    updated = await supabase.table("payments").update(
+        {**(fields or {}), "status": to_status.value}
+    ).eq("id", payment["id"]).eq("version", payment["version"]).execute()
 
-class PayoutStatus(Enum):
-    PENDING = "pending"
-    SCHEDULED = "scheduled"
-    PAID = "paid"
-    FAILED = "failed"
+    if not updated.data:
+        logger.warn(
+            f"Payment {payment['id']} changed while moving to {to_status.value}; not updated"
+        )
+        return False
+    return True
 
 
 # ============================================================================
@@ -65,7 +129,9 @@ async def onboard_provider_to_stripe(
         Stripe account ID if successful, None otherwise
     """
     try:
-        account = stripe.Account.create(
+        account = await limiter.run(
+            Priority.DEFAULT,
+            stripe.Account.create,
             type="express",
             country=country,
             email=email,
@@ -118,7 +184,9 @@ async def create_account_link(
 
         stripe_account_id = result.data["stripe_account_id"]
 
-        account_link = stripe.AccountLink.create(
+        account_link = await limiter.run(
+            Priority.DEFAULT,
+            stripe.AccountLink.create,
             account=stripe_account_id,
             type="account_onboarding",
             return_url=return_url,
@@ -180,7 +248,9 @@ async def create_payment_intent_with_escrow(
         stripe_processing_fee = int(bid_amount_cents * Decimal("0.029") + 30)  # 2.9% + $0.30
 
         # Create PaymentIntent with transfer_data for automatic split
-        payment_intent = stripe.PaymentIntent.create(
+        payment_intent = await limiter.run(
+            Priority.INTERACTIVE,
+            stripe.PaymentIntent.create,
             amount=bid_amount_cents,
             currency="usd",
             description=f"Service request {request_id} - {bid_amount} - Platform escrow",
@@ -213,8 +283,8 @@ async def create_payment_intent_with_escrow(
             "platform_fee": float(Decimal(platform_fee) / 100),
             "provider_payout": float(Decimal(amount_to_transfer) / 100),
             "stripe_processing_fee": float(Decimal(stripe_processing_fee) / 100),
-            "status": "pending",
-            "payout_status": "pending",
+            "status": PaymentStatus.PENDING.value,
+            "payout_status": PayoutStatus.PENDING.value,
         }
 
         result = await supabase.table("payments").insert([payment_data]).execute()
@@ -249,21 +319,21 @@ async def confirm_payment_intent(
         True if successful
     """
     try:
-        payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        payment_intent = await limiter.run(Priority.INTERACTIVE, stripe.PaymentIntent.retrieve, payment_intent_id)
 
         if payment_intent.status not in ["requires_confirmation", "requires_action"]:
             logger.warn(f"PaymentIntent {payment_intent_id} is in unexpected state")
             return False
 
-        confirmed = stripe.PaymentIntent.confirm(payment_intent_id)
+        confirmed = await limiter.run(Priority.INTERACTIVE, stripe.PaymentIntent.confirm, payment_intent_id)
 
         # Update payment status in database
-        await supabase.table("payments").update(
-            {
-                "status": "escrow_held",
-                "escrow_held_at": datetime.utcnow().isoformat(),
-            }
-        ).eq("stripe_payment_intent_id", payment_intent_id).execute()
+        if not await transition_payment(
+            payment_intent_id,
+            PaymentStatus.ESCROW_HELD,
+            {"escrow_held_at": datetime.utcnow().isoformat()},
+        ):
+            return False
 
         logger.info(f"PaymentIntent {payment_intent_id} confirmed and funds held in escrow")
         return True
@@ -295,7 +365,7 @@ async def capture_payment_and_transfer_to_provider(
     """
     try:
         # Capture the payment intent
-        captured = stripe.PaymentIntent.capture(payment_intent_id)
+        captured = await limiter.run(Priority.INTERACTIVE, stripe.PaymentIntent.capture, payment_intent_id)
 
         if captured.status != "succeeded":
             raise ValueError(f"PaymentIntent capture failed: {captured.status}")
@@ -317,7 +387,9 @@ async def capture_payment_and_transfer_to_provider(
 
         # The transfer happens automatically via transfer_data
         # But we can verify it completed
-        transfers = stripe.Transfer.list(
+        transfers = await limiter.run(
+            Priority.DEFAULT,
+            stripe.Transfer.list,
             destination=stripe_account_id,
             limit=1,
             source_transaction=payment_intent_id,
@@ -326,15 +398,17 @@ async def capture_payment_and_transfer_to_provider(
         transfer_id = transfers.data[0].id if transfers.data else None
 
         # Update payment status
-        await supabase.table("payments").update(
+        if not await transition_payment(
+            payment_intent_id,
+            PaymentStatus.CAPTURED,
             {
-                "status": "captured",
                 "captured_at": datetime.utcnow().isoformat(),
                 "payout_status": "scheduled",
                 "payout_scheduled_at": datetime.utcnow().isoformat(),
                 "stripe_transfer_id": transfer_id,
-            }
-        ).eq("stripe_payment_intent_id", payment_intent_id).execute()
+            },
+        ):
+            return False
 
         logger.info(
             f"Captured PaymentIntent {payment_intent_id} and transferred funds to provider"
@@ -344,12 +418,8 @@ async def capture_payment_and_transfer_to_provider(
     except Exception as e:
         logger.error(f"Failed to capture and transfer payment: {e}")
 
-        # Mark payment as failed
-        await supabase.table("payments").update(
-            {
-                "status": "failed",
-            }
-        ).eq("stripe_payment_intent_id", payment_intent_id).execute()
+        # Mark payment as failed (refused by the state machine if the capture went through)
+        await transition_payment(payment_intent_id, PaymentStatus.FAILED)
 
         return False
 
@@ -384,7 +454,9 @@ async def create_refund(
         payment = result.data
 
         # Create refund
-        refund = stripe.Refund.create(
+        refund = await limiter.run(
+            Priority.DEFAULT,
+            stripe.Refund.create,
             payment_intent=payment_intent_id,
             amount=amount_cents,
             reason=reason,
@@ -397,19 +469,21 @@ async def create_refund(
         # Update payment record
         refund_amount = amount_cents / 100 if amount_cents else payment["amount_total"]
         new_status = (
-            "partially_refunded" if amount_cents and amount_cents < int(
+            PaymentStatus.PARTIALLY_REFUNDED if amount_cents and amount_cents < int(
                 payment["amount_total"] * 100
-            ) else "refunded"
+            ) else PaymentStatus.REFUNDED
         )
 
-        await supabase.table("payments").update(
+        if not await transition_payment(
+            payment_intent_id,
+            new_status,
             {
-                "status": new_status,
                 "refunded_at": datetime.utcnow().isoformat(),
                 "refund_amount": refund_amount,
                 "refund_reason": reason,
-            }
-        ).eq("stripe_payment_intent_id", payment_intent_id).execute()
+            },
+        ):
+            return False
 
         logger.info(f"Created refund {refund.id} for PaymentIntent {payment_intent_id}")
         return True
@@ -498,21 +572,13 @@ async def update_payout_status(
             return
 
         # Get transfer details
-        transfer = stripe.Transfer.retrieve(transfer_id)
+        transfer = await limiter.run(Priority.BACKGROUND, stripe.Transfer.retrieve, transfer_id)
 
         # Check for associated payout
         if transfer.destination_payment:
-            payout = stripe.Payout.retrieve(transfer.destination_payment)
-
-            payout_status_map = {
-                "paid": "paid",
-                "in_transit": "scheduled",
-                "pending": "pending",
-                "failed": "failed",
-                "canceled": "failed",
-            }
+            payout = await limiter.run(Priority.BACKGROUND, stripe.Payout.retrieve, transfer.destination_payment)
 
-            new_status = payout_status_map.get(payout.status, "pending")
+            new_status = PAYOUT_STATUS_MAP.get(payout.status, "pending")
 
             # Update payout status
             await supabase.table("payments").update(
@@ -520,7 +586,7 @@ async def update_payout_status(
                     "payout_status": new_status,
                     "payout_completed_at": (
                         datetime.fromtimestamp(payout.arrival_date).isoformat()
-                        if payout.arrival_date
+                        if new_status == "paid" and payout.arrival_date
                         else None
                     ),
                 }
@@ -538,25 +604,49 @@ async def bulk_update_payout_statuses() -> None:
     """
     Bulk update payout statuses for all pending/scheduled payouts.
 
-    Should be run via cron job every 6 hours.
+    Should be run via cron job every 6 hours. Pages through open payouts with
+    concurrent Stripe lookups and one batched write per page, resuming from
+    the last checkpoint if a previous run was interrupted
+    (src/payments/payout_reconciler.py).
     """
     try:
-        # Get all payments with pending/scheduled payouts
-        result = await supabase.table("payments").select("id").in_(
-            "payout_status", ["pending", "scheduled"]
-        ).execute()
-
-        payment_ids = [p["id"] for p in result.data]
+        if database.get_asyncpg_pool() is None:
+            await database.init_asyncpg_pool()
 
-        for payment_id in payment_ids:
-            await update_payout_status(payment_id)
+        report = await PayoutReconciler().run()
 
-        logger.info(f"Updated payout statuses for {len(payment_ids)} payments")
+        logger.info(
+            f"Updated payout statuses for {report.updated} of {report.scanned} payments "
+            f"({report.failed} lookups failed)"
+        )
 
     except Exception as e:
         logger.error(f"Failed to bulk update payout statuses: {e}")
 
 
+async def run_auto_capture() -> None:
+    """
+    Capture confirmed-complete escrow holds before their authorization expires.
+
+    Should be run via cron job every hour. Captures due payments concurrently
+    with idempotency keys and records each page's outcomes in one statement
+    (src/payments/auto_capture.py).
+    """
+    try:
+        if database.get_asyncpg_pool() is None:
+            await database.init_asyncpg_pool()
+
+        report = await AutoCaptureJob().run()
+
+        logger.info(
+            f"Auto-captured {report.captured} of {report.selected} due payments "
+            f"({report.per_second:.1f}/s; {report.expired} expired, {report.failed} failed)"
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to run auto-capture: {e}")
+
+
 # ============================================================================
 # Tax Compliance: 1099 Tracking
 # ============================================================================
@@ -570,35 +660,27 @@ async def generate_1099_data(
     """
     Generate 1099 tax information for a provider.
 
-    Per IRS requirements, payments >= $20,000 and >= 200 transactions
-    require 1099 reporting.
+    Providers paid $600 or more in the period require 1099-NEC reporting
+    (ANNUAL_1099_THRESHOLD). Totals are aggregated in the database; for
+    year-end runs over all providers use run_1099_job.
 
     Args:
         provider_id: Provider ID
         start_date: Period start date
-        end_date: Period end date
+        end_date: Period end date (exclusive)
 
     Returns:
         Tax data dict with totals and transaction count
     """
     try:
-        # Get all paid transactions in period
-        result = await supabase.table("payments").select(
-            "*"
-        ).eq("provider_id", provider_id).eq(
-            "payout_status", "paid"
-        ).gte(
-            "payout_completed_at", start_date.isoformat()
-        ).lte(
-            "payout_completed_at", end_date.isoformat()
-        ).execute()
+        if database.get_asyncpg_pool() is None:
+            await database.init_asyncpg_pool()
 
-        payments = result.data
+        total_cents, transaction_count = await provider_totals(provider_id, start_date, end_date)
+        transactions = await provider_transactions(provider_id, start_date, end_date)
 
-        total_amount = sum(p["provider_payout"] for p in payments)
-        transaction_count = len(payments)
-
-        requires_1099 = total_amount >= 20000 and transaction_count >= 200
+        total_amount = Decimal(total_cents) / 100
+        requires_1099 = total_cents >= ANNUAL_1099_THRESHOLD
 
         return {
             "provider_id": provider_id,
@@ -610,11 +692,11 @@ async def generate_1099_data(
             "box_5b": float(total_amount * Decimal("0.0765")),  # Federal withheld (7.65%)
             "transactions": [
                 {
-                    "date": p["payout_completed_at"],
-                    "amount": p["provider_payout"],
-                    "request_id": p["request_id"],
+                    "date": t["payout_completed_at"].isoformat() if t["payout_completed_at"] else None,
+                    "amount": t["provider_payout_cents"] / 100,
+                    "request_id": t["request_id"],
                 }
-                for p in payments
+                for t in transactions
             ],
         }
 
@@ -623,6 +705,30 @@ async def generate_1099_data(
         return None
 
 
+async def run_1099_job(year: int, output_dir: Optional[str] = None) -> None:
+    """
+    Year-end 1099 run for every provider.
+
+    One grouped aggregate writes all per-provider totals to
+    tax_1099_summaries, then transaction detail is streamed to one CSV per
+    reportable provider (src/payments/tax_reporting.py).
+    """
+    try:
+        if database.get_asyncpg_pool() is None:
+            await database.init_asyncpg_pool()
+
+        job = Tax1099Job(output_dir) if output_dir else Tax1099Job()
+        report = await job.run(year)
+
+        logger.info(
+            f"1099 run {year}: {report.reportable} of {report.providers} providers reportable, "
+            f"{report.detail_files} detail files"
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to run 1099 job for {year}: {e}")
+
+
 # ============================================================================
 # Webhook Handlers
 # ============================================================================
@@ -647,16 +753,12 @@ async def handle_stripe_webhook(event: Dict[str, Any]) -> None:
         if event_type == "charge.succeeded":
             # Payment was captured - update status
             charge = event["data"]["object"]
-            await supabase.table("payments").update(
-                {"status": "captured"}
-            ).eq("stripe_payment_intent_id", charge.payment_intent).execute()
+            await transition_payment(charge.payment_intent, PaymentStatus.CAPTURED)
 
         elif event_type == "charge.failed":
             # Payment failed
             charge = event["data"]["object"]
-            await supabase.table("payments").update(
-                {"status": "failed"}
-            ).eq("stripe_payment_intent_id", charge.payment_intent).execute()
+            await transition_payment(charge.payment_intent, PaymentStatus.FAILED)
 
         elif event_type == "charge.dispute.created":
             # Chargeback/dispute
@@ -684,3 +786,20 @@ async def handle_stripe_webhook(event: Dict[str, Any]) -> None:
     except Exception as e:
         logger.error(f"Failed to handle Stripe webhook: {e}")
         raise
+
+
+async def run_webhook_worker() -> None:
+    """
+    Drain the stored webhook queue (POST /api/v1/webhooks/stripe).
+
+    Charge status events are applied in coalesced batches; every other event
+    type is handed to handle_stripe_webhook. Run as a long-lived worker; any
+    number may run side by side.
+    """
+    if database.get_asyncpg_pool() is None:
+        await database.init_asyncpg_pool()
+
+    async def fallback(payload: Dict[str, Any]) -> None:
+        await handle_stripe_webhook(stripe.Event.construct_from(payload, stripe.api_key))
+
+    await WebhookProcessor(fallback=fallback).run()
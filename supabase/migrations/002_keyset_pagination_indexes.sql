@@ -0,0 +1,19 @@
+-- Verified Services Marketplace: Keyset Pagination Indexes
+-- Supports cursor pagination on (created_at, id) for the list endpoints
+-- Created: 2026-10-19
+
+-- ============================================================================
+-- 1. SERVICE REQUESTS (unfiltered operator listing)
+-- ============================================================================
+
+-- Customer-filtered pages already seek on idx_service_requests_customer_id
+CREATE INDEX IF NOT EXISTS idx_service_requests_created
+    ON public.service_requests(created_at DESC, id DESC);
+
+-- ============================================================================
+-- 2. PROVIDERS (verified directory listing)
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_providers_verified_created
+    ON public.providers(created_at DESC, id DESC)
+    WHERE verification_status = 'verified' AND is_active = true;
@@ -0,0 +1,29 @@
+-- Verified Services Marketplace: Response Cache Invalidation
+-- Notifies the API when rows behind cached responses change
+-- Created: 2026-10-19
+
+-- ============================================================================
+-- 1. NOTIFY FUNCTION
+-- ============================================================================
+
+-- Payload is the cache namespace to invalidate (TG_ARGV[0]).
+-- Statement-level, so a bulk update sends one notification, not one per row.
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('cache_invalidation', TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- 2. PROVIDER DIRECTORY (/api/v1/providers)
+-- ============================================================================
+
+CREATE TRIGGER providers_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON public.providers
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('providers');
+
+CREATE TRIGGER verifications_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON public.verifications
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('providers');
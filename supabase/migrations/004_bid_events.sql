@@ -0,0 +1,38 @@
+-- Verified Services Marketplace: Live Bid Events
+-- Publishes new bids and bid status changes for the SSE stream
+-- Created: 2026-10-19
+
+-- ============================================================================
+-- 1. NOTIFY FUNCTION
+-- ============================================================================
+
+-- Payload matches the API's BidSummary so workers can forward it unchanged.
+CREATE OR REPLACE FUNCTION notify_bid_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('bid_events', json_build_object(
+        'id', NEW.id,
+        'request_id', NEW.request_id,
+        'provider_id', NEW.provider_id,
+        'provider_name', (SELECT business_name FROM public.providers WHERE id = NEW.provider_id),
+        'amount_cents', (NEW.amount * 100)::bigint,
+        'timeline_days', COALESCE(NEW.estimated_days, 0),
+        'status', NEW.status,
+        'submitted_at', NEW.created_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- 2. BIDS
+-- ============================================================================
+
+CREATE TRIGGER bids_notify_insert
+    AFTER INSERT ON public.bids
+    FOR EACH ROW EXECUTE FUNCTION notify_bid_event();
+
+CREATE TRIGGER bids_notify_status
+    AFTER UPDATE OF status ON public.bids
+    FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION notify_bid_event();
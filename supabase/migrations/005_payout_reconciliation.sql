@@ -0,0 +1,25 @@
+-- Verified Services Marketplace: Payout Reconciliation
+-- Resumable checkpoints for batch jobs and a seek index for open payouts
+-- Created: 2026-10-19
+
+-- ============================================================================
+-- 1. JOB CHECKPOINTS
+-- ============================================================================
+
+-- One row per resumable job; `position` is the job's keyset cursor. Written
+-- in the same statement as each batch of results, so a resumed run never
+-- skips or repeats a committed batch.
+CREATE TABLE IF NOT EXISTS public.job_checkpoints (
+    job         TEXT PRIMARY KEY,
+    position    TEXT NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- ============================================================================
+-- 2. OPEN PAYOUTS
+-- ============================================================================
+
+-- Reconciler pages through open payouts in id order
+CREATE INDEX IF NOT EXISTS idx_payments_open_payouts
+    ON public.payments(id)
+    WHERE payout_status IN ('pending', 'scheduled') AND stripe_transfer_id IS NOT NULL;
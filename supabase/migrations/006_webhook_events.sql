@@ -0,0 +1,40 @@
+-- Verified Services Marketplace: Stripe Webhook Event Queue
+-- Durable, deduplicated inbox for Stripe webhooks, processed asynchronously
+-- Created: 2026-10-19
+
+-- ============================================================================
+-- 1. EVENT INBOX
+-- ============================================================================
+
+-- event_id is Stripe's evt_ id: redeliveries hit the primary key and are
+-- dropped. processed_at IS NULL marks the queue; a non-null error with
+-- processed_at set is a dead-lettered event. claimed_until leases an event
+-- to the worker running its fallback handler outside the claim transaction.
+CREATE TABLE IF NOT EXISTS public.stripe_webhook_events (
+    event_id            TEXT PRIMARY KEY,
+    type                TEXT NOT NULL,
+    payment_intent_id   TEXT,
+    created             TIMESTAMPTZ NOT NULL,
+    payload             JSONB NOT NULL,
+    received_at         TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    processed_at        TIMESTAMPTZ,
+    claimed_until       TIMESTAMPTZ,
+    error               TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_stripe_webhook_events_queue
+    ON public.stripe_webhook_events(created, received_at)
+    WHERE processed_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_stripe_webhook_events_dead_letter
+    ON public.stripe_webhook_events(received_at)
+    WHERE error IS NOT NULL;
+
+-- ============================================================================
+-- 2. PER-PAYMENT EVENT ORDERING
+-- ============================================================================
+
+-- Creation time of the Stripe event that last set payments.status; status
+-- updates from older events are skipped.
+ALTER TABLE public.payments
+    ADD COLUMN IF NOT EXISTS stripe_event_created TIMESTAMPTZ;
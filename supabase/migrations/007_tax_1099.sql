@@ -0,0 +1,38 @@
+-- Verified Services Marketplace: Bulk 1099 Reporting
+-- Per-provider tax-year totals written by the year-end 1099 job, and the
+-- index both its aggregate and its detail stream read
+-- Created: 2026-10-19
+
+-- ============================================================================
+-- 1. 1099 SUMMARIES
+-- ============================================================================
+
+-- One row per provider with paid payouts in the tax year; upserted in bulk
+-- by a single GROUP BY over payments
+CREATE TABLE IF NOT EXISTS public.tax_1099_summaries (
+    provider_id         UUID NOT NULL REFERENCES public.providers(id),
+    tax_year            INTEGER NOT NULL,
+    gross_amount        NUMERIC(12,2) NOT NULL,
+    transaction_count   INTEGER NOT NULL,
+    reportable          BOOLEAN NOT NULL,
+    first_paid_at       TIMESTAMPTZ,
+    last_paid_at        TIMESTAMPTZ,
+    generated_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (provider_id, tax_year)
+);
+
+-- Detail files are written for reportable providers only
+CREATE INDEX IF NOT EXISTS idx_tax_1099_summaries_reportable
+    ON public.tax_1099_summaries(tax_year, provider_id)
+    WHERE reportable;
+
+-- ============================================================================
+-- 2. PAID PAYOUTS BY PROVIDER
+-- ============================================================================
+
+-- Grouped aggregate reads provider order with an index-only scan; the
+-- detail stream reads each provider's payouts in date order
+CREATE INDEX IF NOT EXISTS idx_payments_paid_by_provider
+    ON public.payments(provider_id, payout_completed_at)
+    INCLUDE (provider_payout)
+    WHERE payout_status = 'paid';
@@ -0,0 +1,148 @@
+-- Verified Services Marketplace: Provider Earnings Ledger
+-- Per-provider dashboard totals maintained by statement-level triggers on
+-- payments, so reading a provider's earnings is a primary-key lookup
+-- Created: 2026-10-19
+
+-- ============================================================================
+-- 1. LEDGER
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.provider_earnings (
+    provider_id             UUID PRIMARY KEY REFERENCES public.providers(id),
+    total_earned_cents      BIGINT NOT NULL DEFAULT 0,
+    pending_payout_cents    BIGINT NOT NULL DEFAULT 0,
+    in_escrow_cents         BIGINT NOT NULL DEFAULT 0,
+    completed_payments      INTEGER NOT NULL DEFAULT 0,
+    paid_payout_cents       BIGINT NOT NULL DEFAULT 0,  -- avg payout numerator
+    updated_at              TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- ============================================================================
+-- 2. DELTA APPLICATION
+-- ============================================================================
+
+-- Adds the contributions of a set of payment rows (sign +1 for new row
+-- versions, -1 for old ones) to the ledger: one upsert per provider, in
+-- provider order so concurrent transactions lock ledger rows consistently.
+-- Providers whose net change is zero (updates that touched no tracked
+-- column) are skipped.
+CREATE OR REPLACE FUNCTION public.add_provider_earnings(
+    p_provider_ids UUID[],
+    p_signs INTEGER[],
+    p_statuses TEXT[],
+    p_payout_statuses TEXT[],
+    p_payouts NUMERIC[]
+) RETURNS VOID AS $$
+    INSERT INTO public.provider_earnings AS e (
+        provider_id, total_earned_cents, pending_payout_cents, in_escrow_cents,
+        completed_payments, paid_payout_cents, updated_at
+    )
+    SELECT d.provider_id, d.total_earned, d.pending_payout, d.in_escrow, d.completed, d.paid_payout, NOW()
+    FROM (
+        SELECT c.provider_id,
+               SUM(c.sign * CASE WHEN c.status = 'captured' AND c.payout_status = 'paid'
+                                 THEN c.cents ELSE 0 END) AS total_earned,
+               SUM(c.sign * CASE WHEN c.status = 'captured' AND c.payout_status IN ('pending', 'scheduled')
+                                 THEN c.cents ELSE 0 END) AS pending_payout,
+               SUM(c.sign * CASE WHEN c.status = 'escrow_held' THEN c.cents ELSE 0 END) AS in_escrow,
+               SUM(c.sign * CASE WHEN c.payout_status = 'paid' THEN 1 ELSE 0 END) AS completed,
+               SUM(c.sign * CASE WHEN c.payout_status = 'paid' THEN c.cents ELSE 0 END) AS paid_payout
+        FROM (
+            SELECT u.provider_id, u.sign, u.status, u.payout_status, (u.payout * 100)::bigint AS cents
+            FROM unnest(p_provider_ids, p_signs, p_statuses, p_payout_statuses, p_payouts)
+                AS u(provider_id, sign, status, payout_status, payout)
+        ) c
+        GROUP BY c.provider_id
+    ) d
+    WHERE d.total_earned <> 0 OR d.pending_payout <> 0 OR d.in_escrow <> 0
+       OR d.completed <> 0 OR d.paid_payout <> 0
+    ORDER BY d.provider_id
+    ON CONFLICT (provider_id) DO UPDATE SET
+        total_earned_cents = e.total_earned_cents + EXCLUDED.total_earned_cents,
+        pending_payout_cents = e.pending_payout_cents + EXCLUDED.pending_payout_cents,
+        in_escrow_cents = e.in_escrow_cents + EXCLUDED.in_escrow_cents,
+        completed_payments = e.completed_payments + EXCLUDED.completed_payments,
+        paid_payout_cents = e.paid_payout_cents + EXCLUDED.paid_payout_cents,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+-- Statement-level with transition tables: a bulk UPDATE of thousands of
+-- payments costs one ledger upsert per affected provider. status and
+-- payout_status are enums; they are passed as text to match the TEXT[]
+-- parameters above
+CREATE OR REPLACE FUNCTION public.track_provider_earnings()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM public.add_provider_earnings(
+            array_agg(provider_id), array_agg(1), array_agg(status::text),
+            array_agg(payout_status::text), array_agg(provider_payout))
+        FROM new_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM public.add_provider_earnings(
+            array_agg(c.provider_id), array_agg(c.sign), array_agg(c.status::text),
+            array_agg(c.payout_status::text), array_agg(c.provider_payout))
+        FROM (
+            SELECT provider_id, 1 AS sign, status, payout_status, provider_payout FROM new_rows
+            UNION ALL
+            SELECT provider_id, -1 AS sign, status, payout_status, provider_payout FROM old_rows
+        ) c;
+    ELSE
+        PERFORM public.add_provider_earnings(
+            array_agg(provider_id), array_agg(-1), array_agg(status::text),
+            array_agg(payout_status::text), array_agg(provider_payout))
+        FROM old_rows;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- 3. TRIGGERS
+-- ============================================================================
+
+CREATE TRIGGER payments_earnings_insert
+    AFTER INSERT ON public.payments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.track_provider_earnings();
+
+CREATE TRIGGER payments_earnings_update
+    AFTER UPDATE ON public.payments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.track_provider_earnings();
+
+CREATE TRIGGER payments_earnings_delete
+    AFTER DELETE ON public.payments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.track_provider_earnings();
+
+-- ============================================================================
+-- 4. BACKFILL
+-- ============================================================================
+
+-- Writers are blocked until the migration commits, so no transition is
+-- both counted by the backfill and applied by a trigger
+LOCK TABLE public.payments IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO public.provider_earnings (
+    provider_id, total_earned_cents, pending_payout_cents, in_escrow_cents,
+    completed_payments, paid_payout_cents, updated_at
+)
+SELECT provider_id,
+       COALESCE(SUM((provider_payout * 100)::bigint)
+           FILTER (WHERE status = 'captured' AND payout_status = 'paid'), 0),
+       COALESCE(SUM((provider_payout * 100)::bigint)
+           FILTER (WHERE status = 'captured' AND payout_status IN ('pending', 'scheduled')), 0),
+       COALESCE(SUM((provider_payout * 100)::bigint) FILTER (WHERE status = 'escrow_held'), 0),
+       COUNT(*) FILTER (WHERE payout_status = 'paid'),
+       COALESCE(SUM((provider_payout * 100)::bigint) FILTER (WHERE payout_status = 'paid'), 0),
+       NOW()
+FROM public.payments
+GROUP BY provider_id
+ON CONFLICT (provider_id) DO UPDATE SET
+    total_earned_cents = EXCLUDED.total_earned_cents,
+    pending_payout_cents = EXCLUDED.pending_payout_cents,
+    in_escrow_cents = EXCLUDED.in_escrow_cents,
+    completed_payments = EXCLUDED.completed_payments,
+    paid_payout_cents = EXCLUDED.paid_payout_cents,
+    updated_at = NOW();
@@ -0,0 +1,25 @@
+-- Verified Services Marketplace: Escrow State Machine
+-- Row version on payments for optimistic concurrency on status transitions
+-- Created: 2026-10-19
+
+-- ============================================================================
+-- 1. PAYMENT ROW VERSION
+-- ============================================================================
+
+ALTER TABLE public.payments
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
+
+-- Every update bumps the version, whichever code path writes the row, so a
+-- transition applied with a stale expected_version is reported as a
+-- conflict (src/payments/escrow_state.py)
+CREATE OR REPLACE FUNCTION public.bump_row_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER payments_bump_version
+    BEFORE UPDATE ON public.payments
+    FOR EACH ROW EXECUTE FUNCTION public.bump_row_version();
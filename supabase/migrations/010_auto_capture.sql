@@ -0,0 +1,22 @@
+-- Verified Services Marketplace: Escrow Auto-Capture
+-- Indexes for the scheduled batch capture of confirmed escrow holds
+-- Created: 2026-10-19
+
+-- ============================================================================
+-- 1. DUE ESCROW HOLDS
+-- ============================================================================
+
+-- Keyset order of the auto-capture scan (src/payments/auto_capture.py):
+-- oldest holds first, only rows still in escrow
+CREATE INDEX IF NOT EXISTS idx_payments_escrow_held_age
+    ON public.payments (escrow_held_at, id)
+    WHERE status = 'escrow_held';
+
+-- ============================================================================
+-- 2. OPEN DISPUTES BY PAYMENT
+-- ============================================================================
+
+-- Disputed payments are never auto-captured
+CREATE INDEX IF NOT EXISTS idx_disputes_open_payment
+    ON public.disputes (payment_id)
+    WHERE status <> 'resolved';
@@ -0,0 +1,80 @@
+"""
+Shared fixtures: an in-memory stand-in for the asyncpg pool.
+"""
+
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src import db as database
+from src.payments import stripe_limiter
+
+
+class FakeConnection:
+    """Answers fetch() from the owning FakePool's handler."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetch(self, query, *args):
+        self.pool.queries.append((query, args))
+        return self.pool.handler(query, args)
+
+    async def fetchval(self, query, *args):
+        rows = await self.fetch(query, *args)
+        return next(iter(rows[0].values())) if rows else None
+
+    @asynccontextmanager
+    async def transaction(self, **kwargs):
+        yield
+
+    async def cursor(self, query, *args, prefetch=None):
+        for row in await self.fetch(query, *args):
+            yield row
+
+
+class FakePool:
+    """
+    Minimal asyncpg.Pool replacement.
+
+    `handler(query, args)` returns a list of dict rows; every query is
+    recorded in `queries` for assertions.
+    """
+
+    def __init__(self, handler=None, size=5, idle=5, max_size=20):
+        self.handler = handler or (lambda query, args: [])
+        self.queries = []
+        self.size, self.idle, self.max_size = size, idle, max_size
+
+    def get_size(self):
+        return self.size
+
+    def get_idle_size(self):
+        return self.idle
+
+    def get_max_size(self):
+        return self.max_size
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        yield FakeConnection(self)
+
+
+@pytest.fixture
+def fake_pool():
+    """Install a FakePool as the process-wide asyncpg pool."""
+    pool = FakePool()
+    previous = database.db_pool
+    database.db_pool = pool
+    yield pool
+    database.db_pool = previous
+
+
+@pytest.fixture(autouse=True)
+def stripe_rate_limiter():
+    """A fresh shared Stripe rate limiter per test, so one test's 429 pause never slows the next."""
+    previous = stripe_limiter.limiter
+    stripe_limiter.limiter = stripe_limiter.StripeRateLimiter()
+    yield stripe_limiter.limiter
+    stripe_limiter.limiter.close()
+    stripe_limiter.limiter = previous
@@ -0,0 +1,126 @@
+"""
+Admission Control Tests
+Priority lanes, queue deadlines and 429 shedding
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import main
+from src.admission import AdmissionController, AdmissionMiddleware, LaneConfig, lane_for_path
+
+
+def make_controller(capacity=4):
+    return AdmissionController(capacity, {
+        "customer": LaneConfig(priority=0, limit=4, share=1.0, max_queue=4, max_wait=1.0),
+        "provider": LaneConfig(priority=1, limit=3, share=0.75, max_queue=2, max_wait=1.0),
+        "operator": LaneConfig(priority=2, limit=1, share=0.5, max_queue=1, max_wait=0.05),
+    })
+
+
+class TestClassification:
+    """Routes map to lanes by path."""
+
+    @pytest.mark.parametrize("path,lane", [
+        ("/api/v1/requests/abc/bids", "customer"),
+        ("/api/v1/providers", "customer"),
+        ("/api/v1/requests", "provider"),
+        ("/api/v1/bids/export", "operator"),
+        ("/api/v1/requests/abc/bids/stream", None),
+        ("/health/ready", None),
+        ("/metrics", None),
+    ])
+    def test_lane_for_path(self, path, lane):
+        assert lane_for_path(path) == lane
+
+
+class TestController:
+    """Lower lanes are shed first as capacity fills."""
+
+    @pytest.mark.asyncio
+    async def test_operator_shed_while_customers_admitted(self):
+        controller = make_controller()
+        assert await controller.acquire("customer")
+        assert await controller.acquire("customer")
+
+        # Half of capacity in use: operator waits out its deadline, then 429
+        assert not await controller.acquire("operator")
+        assert await controller.acquire("customer")
+        assert controller.snapshot()["operator"]["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_immediately(self):
+        controller = make_controller()
+        for _ in range(2):
+            assert await controller.acquire("customer")
+        waiter = asyncio.ensure_future(controller.acquire("operator"))
+        await asyncio.sleep(0)
+
+        assert not await controller.acquire("operator")
+        assert controller.snapshot()["operator"]["queued"] == 1
+        waiter.cancel()
+
+    @pytest.mark.asyncio
+    async def test_freed_slot_goes_to_highest_priority(self):
+        controller = make_controller()
+        for _ in range(4):
+            assert await controller.acquire("customer")
+        provider = asyncio.ensure_future(controller.acquire("provider"))
+        customer = asyncio.ensure_future(controller.acquire("customer"))
+        await asyncio.sleep(0)
+
+        controller.release("customer")
+
+        assert await customer
+        assert not provider.done()
+        provider.cancel()
+        await asyncio.gather(provider, return_exceptions=True)
+        assert controller.snapshot()["provider"]["queued"] == 0
+
+
+class TestMiddleware:
+    """Rejected requests get 429 with Retry-After; slots are released."""
+
+    @pytest.mark.asyncio
+    async def test_rejection_and_release(self):
+        controller = make_controller(capacity=2)
+        release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        middleware = AdmissionMiddleware(app, controller)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        def call(path):
+            return middleware({"type": "http", "path": path, "headers": []}, None, send)
+
+        running = asyncio.ensure_future(call("/api/v1/providers"))
+        await asyncio.sleep(0)
+        await call("/api/v1/bids/export")
+
+        assert sent[0]["status"] == 429
+        assert (b"retry-after", b"1") in sent[0]["headers"]
+
+        release.set()
+        await running
+        assert sent[2]["status"] == 200
+        assert controller.in_flight == 0
+
+    def test_rejections_carry_cors_headers(self, monkeypatch):
+        async def full(lane):
+            return False
+
+        monkeypatch.setattr(main.admission, "acquire", full)
+
+        response = TestClient(main.app).get("/api/v1/providers", headers={"Origin": "https://app.example.com"})
+
+        assert response.status_code == 429
+        assert "access-control-allow-origin" in response.headers
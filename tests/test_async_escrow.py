@@ -0,0 +1,114 @@
+"""
+Async Escrow Tests
+AsyncEscrowManager against the local Stripe stand-in
+"""
+
+import asyncio
+import time
+
+import pytest
+import stripe
+
+from benchmarks.stripe_standin import DECLINED_CUSTOMER, StripeStandIn, use_standin
+from src.payments.async_escrow import AsyncEscrowManager
+from src.payments.escrow_manager import EscrowManager
+from src.payments.journal import EscrowJournal
+
+
+@pytest.fixture
+def stripe_config(monkeypatch):
+    """Restore the SDK's global config after use_standin()."""
+    for name in ("api_base", "api_key", "max_network_retries"):
+        monkeypatch.setattr(stripe, name, getattr(stripe, name))
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+
+
+@pytest.fixture
+def fake_stripe(stripe_config):
+    """Local Stripe stand-in (benchmarks/stripe_standin.py) with 50ms per call."""
+    with StripeStandIn(latency=0.05) as server:
+        use_standin(server.url)
+        yield server
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return EscrowManager(journal=EscrowJournal(str(tmp_path / "journal.jsonl")))
+
+
+class TestLifecycle:
+    """Same results and errors as the synchronous manager."""
+
+    @pytest.mark.asyncio
+    async def test_escrow_lifecycle(self, fake_stripe, manager):
+        async with AsyncEscrowManager(manager, max_concurrency=2) as escrow:
+            hold = await escrow.create_escrow("bid-1", 100000, "cus_1", "acct_1")
+            held = await escrow.hold_funds(hold.payment_intent_id, hold.amount_total)
+            captured = await escrow.capture_payment(hold.payment_intent_id, hold.amount_total)
+            released = await escrow.release_to_provider(
+                hold.payment_intent_id, "acct_1", hold.provider_payout, hold.platform_fee
+            )
+            refund = await escrow.initiate_refund(hold.payment_intent_id)
+
+        assert (hold.amount_total, hold.provider_payout) == (105000, 85000)
+        assert held["charge_id"].startswith("ch_")
+        assert captured["status"] == "succeeded"
+        assert released["destination"] == "acct_1"
+        assert refund["payment_intent_id"] == hold.payment_intent_id
+
+    @pytest.mark.asyncio
+    async def test_stripe_error_becomes_value_error(self, fake_stripe, manager):
+        async with AsyncEscrowManager(manager) as escrow:
+            with pytest.raises(ValueError, match="Failed to create escrow"):
+                await escrow.create_escrow("bid-2", 100000, DECLINED_CUSTOMER, "acct_1")
+
+
+class TestConcurrency:
+    """Calls overlap up to the limit without blocking the event loop."""
+
+    @pytest.mark.asyncio
+    async def test_bounded_and_non_blocking(self, fake_stripe, manager):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        async with AsyncEscrowManager(manager, max_concurrency=16) as escrow:
+            holds = await asyncio.gather(*(escrow.create_escrow(f"bid-{i}", 1000, "cus_1", "acct_1") for i in range(16)))
+            await asyncio.gather(*(escrow.hold_funds(h.payment_intent_id, h.amount_total) for h in holds))
+        fake_stripe.max_in_flight = 0
+
+        ticking = asyncio.ensure_future(ticker())
+        async with AsyncEscrowManager(manager, max_concurrency=4) as escrow:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(escrow.capture_payment(h.payment_intent_id, 1000) for h in holds))
+            elapsed = time.perf_counter() - started
+        ticking.cancel()
+
+        assert all(result["status"] == "succeeded" for result in results)
+        assert fake_stripe.max_in_flight == 4
+        assert elapsed < 16 * fake_stripe.latency / 2
+        assert ticks >= 10
+
+
+class TestRateLimits:
+    """429s are retried under the same idempotency key until they succeed."""
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_creates_retried(self, stripe_config, tmp_path):
+        manager = EscrowManager(journal=EscrowJournal(str(tmp_path / "journal.jsonl")),
+                                max_attempts=6, sleep=lambda delay: time.sleep(0.6))
+
+        with StripeStandIn(rate_limit=2) as server:
+            use_standin(server.url)
+            async with AsyncEscrowManager(manager, max_concurrency=4) as escrow:
+                holds = await asyncio.gather(
+                    *(escrow.create_escrow(f"bid-{i}", 1000, "cus_1", "acct_1") for i in range(4))
+                )
+
+        assert len({hold.payment_intent_id for hold in holds}) == 4
+        assert server.stats["rate_limited"] >= 2
+        assert server.stats["200"] == 4
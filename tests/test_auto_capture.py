@@ -0,0 +1,183 @@
+"""
+Auto-Capture Tests
+Due holds selected by keyset pages, captured concurrently, recorded in bulk
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import stripe
+
+from src.payments import auto_capture, escrow_state
+from src.payments.auto_capture import AutoCaptureJob
+from src.payments.escrow_manager import idempotency_key
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+def pid(i):
+    return str(uuid.UUID(int=i))
+
+
+class EscrowTable:
+    """payments joined to service_requests/disputes, answering the job's two statements."""
+
+    def __init__(self):
+        self.rows = {}
+        self.statements = 0
+
+    def add(self, i, held_days_ago, request_status="completed", disputed=False, status="escrow_held"):
+        self.rows[pid(i)] = {
+            "id": pid(i), "bid_id": pid(1000 + i), "stripe_payment_intent_id": f"pi_{i}", "amount_cents": 105000,
+            "escrow_held_at": NOW - timedelta(days=held_days_ago), "version": 0, "status": status,
+            "request_status": request_status, "disputed": disputed,
+        }
+
+    def __call__(self, query, args):
+        if query == auto_capture.DUE_CAPTURES_SQL:
+            due_before, after_at, after_id, limit = args
+            due = sorted(
+                (row for row in self.rows.values()
+                 if row["status"] == "escrow_held" and row["escrow_held_at"] <= due_before
+                 and (row["escrow_held_at"], row["id"]) > (after_at, after_id)
+                 and row["request_status"] == "completed" and not row["disputed"]),
+                key=lambda row: (row["escrow_held_at"], row["id"]),
+            )
+            return [dict(row) for row in due[:limit]]
+        if query == escrow_state.APPLY_TRANSITIONS_SQL:
+            self.statements += 1
+            ids, targets, expected, legal_from, legal_to = args
+            legal = set(zip(legal_from, legal_to))
+            result = []
+            for payment_id, target, version in zip(ids, targets, expected):
+                row = self.rows[payment_id]
+                current = {"current_status": row["status"], "current_version": row["version"]}
+                applied = None
+                if (version is None or version == row["version"]) and (row["status"], target) in legal:
+                    row["status"], row["version"] = target, row["version"] + 1
+                    applied = row["version"]
+                result.append({"id": payment_id, "new_version": applied, **current})
+            return result
+        raise AssertionError(f"unexpected query: {query}")
+
+
+class FakeEscrow:
+    """AsyncEscrowManager.capture_payment stand-in; failing intents raise like EscrowManager."""
+
+    def __init__(self, failures=None, delay=0.01):
+        self.failures = failures or {}  # payment intent id -> Stripe error code
+        self.delay = delay
+        self.calls = []
+        self.in_flight = self.max_in_flight = 0
+
+    async def capture_payment(self, payment_intent_id, amount_cents, bid_id=None, priority=None):
+        self.calls.append((payment_intent_id, idempotency_key(bid_id, "capture"), priority))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            code = self.failures.get(payment_intent_id)
+            if code:
+                try:
+                    raise stripe.error.InvalidRequestError("Capture failed", None, code=code)
+                except stripe.error.StripeError as e:
+                    raise ValueError(f"Failed to capture payment: {e}")
+            return {"payment_intent_id": payment_intent_id, "status": "succeeded"}
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def table(fake_pool):
+    table = EscrowTable()
+    fake_pool.handler = table
+    return table
+
+
+class TestSelection:
+    """Only confirmed, undisputed holds inside the expiry window."""
+
+    @pytest.mark.asyncio
+    async def test_due_window(self, table):
+        table.add(1, 5.5)                              # due
+        table.add(2, 4)                                # held too recently
+        table.add(3, 7.5)                              # authorization already expired
+        table.add(4, 6, request_status="in_progress")  # not confirmed complete
+        table.add(5, 6, disputed=True)
+        table.add(6, 6, status="captured")
+        escrow = FakeEscrow()
+
+        report = await AutoCaptureJob(escrow, window_hours=48).run(now=NOW)
+
+        assert [call[0] for call in escrow.calls] == ["pi_1"]
+        assert (report.selected, report.captured, report.captured_cents) == (1, 1, 105000)
+        assert table.rows[pid(1)]["status"] == "captured"
+
+
+class TestBatch:
+    """Bounded concurrency, deterministic keys, one status write per page."""
+
+    @pytest.mark.asyncio
+    async def test_pages_captured_concurrently(self, table):
+        for i in range(1, 26):
+            table.add(i, 6 + i / 100)
+        escrow = FakeEscrow()
+
+        report = await AutoCaptureJob(escrow, page_size=10, concurrency=4).run(now=NOW)
+
+        assert (report.pages, report.selected, report.captured, report.failed) == (3, 25, 25, 0)
+        assert report.statements == table.statements == 3
+        assert escrow.max_in_flight == 4
+        assert [call[0] for call in escrow.calls[:2]] == ["pi_25", "pi_24"]  # oldest hold first
+        assert escrow.calls[0][1] == idempotency_key(pid(1025), "capture")
+        assert {call[2] for call in escrow.calls} == {auto_capture.Priority.DEFAULT}
+        assert all(row["status"] == "captured" for row in table.rows.values())
+
+    @pytest.mark.asyncio
+    async def test_failures_reported_and_expired_recorded(self, table):
+        for i in range(1, 6):
+            table.add(i, 6)
+        escrow = FakeEscrow({"pi_2": "charge_expired_for_capture", "pi_3": "rate_limit"})
+
+        report = await AutoCaptureJob(escrow, page_size=2).run(now=NOW)
+
+        assert (report.selected, report.captured, report.expired, report.failed) == (5, 3, 1, 1)
+        assert report.failures == {"charge_expired_for_capture": 1, "rate_limit": 1}
+        assert [table.rows[pid(i)]["status"] for i in range(1, 6)] == [
+            "captured", "failed", "escrow_held", "captured", "captured",
+        ]
+        assert report.per_second > 0 and not report.conflicts
+
+    @pytest.mark.asyncio
+    async def test_capture_recorded_by_another_path(self, table):
+        table.add(1, 6)
+        escrow = FakeEscrow()
+        original = escrow.capture_payment
+
+        async def raced(*args, **kwargs):
+            result = await original(*args, **kwargs)
+            table.rows[pid(1)]["status"] = "captured"  # webhook recorded it first
+            return result
+
+        escrow.capture_payment = raced
+        report = await AutoCaptureJob(escrow).run(now=NOW)
+
+        assert report.captured == 1 and not report.conflicts
+
+    @pytest.mark.asyncio
+    async def test_unrecordable_capture_reported(self, table):
+        table.add(1, 6)
+        escrow = FakeEscrow()
+        original = escrow.capture_payment
+
+        async def cancelled(*args, **kwargs):
+            result = await original(*args, **kwargs)
+            table.rows[pid(1)]["status"] = "cancelled"
+            return result
+
+        escrow.capture_payment = cancelled
+        report = await AutoCaptureJob(escrow).run(now=NOW)
+
+        assert [(c.conflict, c.current_status) for c in report.conflicts] == [("illegal_transition", "cancelled")]
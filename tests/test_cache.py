@@ -0,0 +1,204 @@
+"""
+Response Cache Tests
+ETag revalidation, TTLs and invalidation for cached list endpoints
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import main
+from src.cache import InMemoryCacheBackend, RedisCacheBackend, ResponseCache
+from src.main import app
+
+PROVIDER_ROW = {
+    "provider_id": "4e8a1c2b-9d0f-4b3a-8e7c-1a5d6f2b9c04",
+    "name": "Peachtree Plumbing",
+    "status": "verified",
+    "license_verified": True,
+    "insurance_verified": True,
+    "background_check_verified": True,
+    "overall_tier": "elite",
+    "created_at": datetime(2026, 3, 1, tzinfo=timezone.utc),
+}
+
+
+class FakeRedis:
+    """Just the redis.asyncio commands RedisCacheBackend uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if not (nx and key in self.data):
+            self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Fresh in-memory response cache installed on the app."""
+    response_cache = ResponseCache(InMemoryCacheBackend())
+    monkeypatch.setattr(main, "response_cache", response_cache)
+    return response_cache
+
+
+@pytest.fixture
+def provider_pool(fake_pool):
+    fake_pool.handler = lambda query, args: [PROVIDER_ROW]
+    return fake_pool
+
+
+class TestProvidersCache:
+    """/api/v1/providers is served from cache with ETags."""
+
+    def test_second_request_is_cache_hit(self, cache, provider_pool):
+        client = TestClient(app)
+
+        first = client.get("/api/v1/providers", params={"tier": "elite"})
+        second = client.get("/api/v1/providers", params={"tier": "elite"})
+
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert second.json() == first.json()
+        assert second.headers["etag"] == first.headers["etag"]
+        assert len(provider_pool.queries) == 1
+
+    def test_matching_etag_returns_304(self, cache, provider_pool):
+        client = TestClient(app)
+        etag = client.get("/api/v1/providers").headers["etag"]
+
+        response = client.get("/api/v1/providers", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_varies_by_query_params(self, cache, provider_pool):
+        client = TestClient(app)
+
+        elite = client.get("/api/v1/providers", params={"tier": "elite"})
+        standard = client.get("/api/v1/providers", params={"tier": "standard"})
+        reordered = client.get("/api/v1/providers?service_type=plumbing&tier=elite")
+        same = client.get("/api/v1/providers?tier=elite&service_type=plumbing")
+
+        assert elite.headers["etag"] != standard.headers["etag"]
+        assert reordered.headers["etag"] == same.headers["etag"]
+        assert same.headers["x-cache"] == "HIT"
+
+    def test_revalidation_after_ttl_skips_render(self, monkeypatch, provider_pool):
+        clock = FakeClock()
+        monkeypatch.setattr(main, "response_cache", ResponseCache(InMemoryCacheBackend(clock=clock)))
+        client = TestClient(app)
+        etag = client.get("/api/v1/providers").headers["etag"]
+
+        clock.now = 3600
+        response = client.get("/api/v1/providers", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert len(provider_pool.queries) == 1
+
+    def test_etags_not_shared_across_processes(self, monkeypatch, provider_pool):
+        client = TestClient(app)
+        monkeypatch.setattr(main, "response_cache", ResponseCache(InMemoryCacheBackend()))
+        etag = client.get("/api/v1/providers").headers["etag"]
+
+        # A restarted (or other) worker: same request, its own version numbering
+        monkeypatch.setattr(main, "response_cache", ResponseCache(InMemoryCacheBackend()))
+        response = client.get("/api/v1/providers", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    @pytest.mark.asyncio
+    async def test_invalidation_changes_etag(self, cache, provider_pool):
+        client = TestClient(app)
+        etag = client.get("/api/v1/providers").headers["etag"]
+
+        await cache.invalidate("providers")
+        response = client.get("/api/v1/providers", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.headers["x-cache"] == "MISS"
+
+    def test_errors_are_not_cached(self, cache):
+        client = TestClient(app)
+
+        client.get("/api/v1/providers")
+        client.get("/api/v1/providers")
+
+        assert cache.stats["hits"] == 0
+
+
+class TestBackends:
+    """Both backends honor TTLs and versions."""
+
+    @pytest.mark.asyncio
+    async def test_in_memory_ttl_expiry(self):
+        clock = FakeClock()
+        backend = InMemoryCacheBackend(clock=clock)
+        await backend.set("k", b"v", ttl=60)
+
+        clock.now = 59
+        assert await backend.get("k") == b"v"
+        clock.now = 60
+        assert await backend.get("k") is None
+
+    @pytest.mark.asyncio
+    async def test_in_memory_evicts_least_recently_used(self):
+        backend = InMemoryCacheBackend(max_entries=2)
+        await backend.set("a", b"1", ttl=60)
+        await backend.set("b", b"2", ttl=60)
+        await backend.get("a")
+
+        await backend.set("c", b"3", ttl=60)
+
+        assert await backend.get("a") == b"1"
+        assert await backend.get("b") is None
+
+    @pytest.mark.asyncio
+    async def test_redis_backend_versions_are_shared(self):
+        client = FakeRedis()
+        worker_a, worker_b = RedisCacheBackend(client), RedisCacheBackend(client)
+
+        version = await worker_a.bump_version("providers")
+
+        assert await worker_b.get_version("providers") == version
+
+    @pytest.mark.asyncio
+    async def test_redis_versions_reseeded_after_flush(self):
+        client = FakeRedis()
+        backend = RedisCacheBackend(client)
+        before = await backend.bump_version("providers")
+
+        client.data.clear()
+
+        assert await backend.get_version("providers") != before
+        assert await backend.bump_version("providers") != before
+
+    def test_redis_backend_serves_cached_response(self, monkeypatch, provider_pool):
+        monkeypatch.setattr(main, "response_cache", ResponseCache(RedisCacheBackend(FakeRedis())))
+        client = TestClient(app)
+
+        client.get("/api/v1/providers")
+        response = client.get("/api/v1/providers")
+
+        assert response.headers["x-cache"] == "HIT"
+        assert response.json()["items"][0]["name"] == "Peachtree Plumbing"
+        assert len(provider_pool.queries) == 1
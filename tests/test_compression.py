@@ -0,0 +1,83 @@
+"""
+Compression Tests
+gzip/brotli above the size threshold, streaming untouched
+"""
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.cache import _etag_matches
+from src.compression import CompressionMiddleware, choose_encoding
+
+LARGE = "x" * 4096
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(LARGE, headers={"ETag": '"providers-1-abc"'})
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            yield LARGE.encode()
+            yield LARGE.encode()
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+class TestCompressionMiddleware:
+    """Complete responses over the threshold are compressed."""
+
+    def test_large_response_gzipped(self):
+        client = TestClient(make_app())
+
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == LARGE
+        assert int(response.headers["content-length"]) < len(LARGE)
+        assert response.headers["etag"] == 'W/"providers-1-abc"'
+
+    def test_small_response_untouched(self):
+        client = TestClient(make_app())
+
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+
+    def test_streaming_response_untouched(self):
+        client = TestClient(make_app())
+
+        response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert len(response.content) == 2 * len(LARGE)
+
+    def test_identity_when_not_accepted(self):
+        client = TestClient(make_app())
+
+        response = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+
+
+class TestNegotiation:
+    """Accept-Encoding parsing and weak ETag revalidation."""
+
+    def test_q_zero_refuses_encoding(self):
+        assert choose_encoding("gzip;q=0") == ""
+        assert choose_encoding("deflate, gzip;q=0.5") == "gzip"
+
+    def test_weak_etag_matches_for_revalidation(self):
+        assert _etag_matches('W/"providers-1-abc"', '"providers-1-abc"')
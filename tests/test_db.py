@@ -0,0 +1,199 @@
+"""
+Database Layer Tests
+Connection budget: lazy ORM engine and shared asyncpg pool
+"""
+
+import asyncio
+import json
+import time
+
+import asyncpg
+import pytest
+
+from src import db as database
+
+
+class CodecConnection:
+    """asyncpg connection stand-in tracking per-connection json codecs."""
+
+    def __init__(self):
+        self.codecs = {}
+
+    async def set_type_codec(self, type_name, *, encoder, decoder, schema="public", format="text"):
+        self.codecs[(schema, type_name)] = decoder
+
+    async def reset_type_codec(self, type_name, *, schema="public"):
+        self.codecs.pop((schema, type_name), None)
+
+    async def fetchval(self, query):
+        value = '{"status": "captured"}'  # SELECT '...'::jsonb
+        decoder = self.codecs.get(("pg_catalog", "jsonb"))
+        return decoder(value) if decoder else value
+
+
+class FakePool:
+    """Records acquire/release calls in place of an asyncpg pool."""
+
+    def __init__(self):
+        self.acquired = []
+        self.released = []
+
+    async def acquire(self, timeout=None):
+        conn = CodecConnection()
+        self.acquired.append(conn)
+        return conn
+
+    async def release(self, conn, timeout=None):
+        self.released.append(conn)
+
+
+class SinglePool(FakePool):
+    """Hands out the same physical connection every time."""
+
+    def __init__(self):
+        super().__init__()
+        self.conn = CodecConnection()
+
+    async def acquire(self, timeout=None):
+        self.acquired.append(self.conn)
+        return self.conn
+
+
+@pytest.fixture(autouse=True)
+def reset_database_state():
+    yield
+    database.db_pool = None
+    database.async_engine = None
+    database.AsyncSessionLocal = None
+    database.DATABASE_ORM_POOL = "shared"
+
+
+class TestLazyOrmEngine:
+    """SQLAlchemy is only built on first ORM use."""
+
+    @pytest.mark.asyncio
+    async def test_engine_not_created_at_import(self):
+        assert database.get_sessionmaker() is None
+        assert database.async_engine is None
+
+    @pytest.mark.asyncio
+    async def test_shared_mode_uses_null_pool(self):
+        database.DATABASE_ORM_POOL = "shared"
+
+        await database.init_sqlalchemy()
+
+        assert database.async_engine.pool.__class__.__name__ == "NullPool"
+
+    @pytest.mark.asyncio
+    async def test_dedicated_mode_uses_queue_pool(self):
+        database.DATABASE_ORM_POOL = "dedicated"
+
+        await database.init_sqlalchemy()
+
+        assert database.async_engine.pool.size() == database.DATABASE_POOL_SIZE
+
+    @pytest.mark.asyncio
+    async def test_init_is_idempotent(self):
+        first = await database.init_sqlalchemy()
+        second = await database.init_sqlalchemy()
+
+        assert first is second
+
+
+class TestSharedPool:
+    """ORM sessions borrow from and return to the asyncpg pool."""
+
+    @pytest.mark.asyncio
+    async def test_borrow_requires_pool(self):
+        database.db_pool = None
+
+        with pytest.raises(RuntimeError):
+            await database._borrow_pooled_connection()
+
+    @pytest.mark.asyncio
+    async def test_close_returns_connection_to_pool(self):
+        pool = FakePool()
+        database.db_pool = pool
+
+        borrowed = await database._borrow_pooled_connection()
+        await borrowed.close()
+
+        assert pool.released == pool.acquired
+
+    @pytest.mark.asyncio
+    async def test_orm_codecs_do_not_leak_to_raw_queries(self):
+        pool = SinglePool()
+        database.db_pool = pool
+        raw = await pool.acquire()
+
+        assert await raw.fetchval("SELECT $1::jsonb") == '{"status": "captured"}'
+
+        # SQLAlchemy's asyncpg dialect registers its codecs on connect
+        borrowed = await database._borrow_pooled_connection()
+        for type_name in ("json", "jsonb", "inet", "cidr"):
+            await borrowed.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+        assert await borrowed.fetchval("SELECT $1::jsonb") == {"status": "captured"}
+        await borrowed.close()
+
+        assert pool.released == [pool.conn] and pool.conn.codecs == {}
+        assert await raw.fetchval("SELECT $1::jsonb") == '{"status": "captured"}'
+
+
+class ListeningConnection:
+    """Control connection stand-in recording LISTEN subscriptions."""
+
+    def __init__(self):
+        self.channels = []
+
+    async def add_listener(self, channel, listener):
+        self.channels.append(channel)
+
+    async def close(self):
+        pass
+
+    def is_closed(self):
+        return False
+
+
+@pytest.fixture
+def control(monkeypatch):
+    monkeypatch.setattr(database, "control_conn", None)
+    monkeypatch.setattr(database, "_listeners", {})
+    return monkeypatch
+
+
+class TestControlConnection:
+    """LISTEN registrations share one bounded connection attempt."""
+
+    @pytest.mark.asyncio
+    async def test_unreachable_database_is_bounded(self, control):
+        connects = []
+
+        async def hang(*args, **kwargs):
+            connects.append(args)
+            await asyncio.sleep(60)
+
+        control.setattr(asyncpg, "connect", hang)
+        control.setattr(database, "DATABASE_CONTROL_CONNECT_TIMEOUT", 0.05)
+        started = time.perf_counter()
+
+        assert not await database.add_listeners({"a": print, "b": print})
+
+        assert time.perf_counter() - started < 1
+        assert len(connects) == 1
+        # Subscribed by the next successful reconnect
+        assert set(database._listeners) == {"a", "b"}
+
+    @pytest.mark.asyncio
+    async def test_reconnect_subscribes_every_channel(self, control):
+        conn = ListeningConnection()
+
+        async def connect(*args, **kwargs):
+            return conn
+
+        control.setattr(asyncpg, "connect", connect)
+
+        assert await database.add_listeners({"a": print, "b": print})
+        assert await database.add_listener("c", print)
+
+        assert conn.channels == ["a", "b", "c"]
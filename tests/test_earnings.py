@@ -0,0 +1,70 @@
+"""
+Provider Earnings Tests
+Dashboard reads are one primary-key lookup of the materialized ledger
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import main
+from src.main import app
+from src.payments import earnings
+from src.payments.escrow_manager import EscrowManager
+
+PROVIDER_ID = "8f14e45f-ceea-467a-9575-0f0e0a4b2f11"
+
+LEDGER_ROW = {
+    "total_earned_cents": 425000,
+    "pending_payout_cents": 85000,
+    "in_escrow_cents": 120000,
+    "completed_payments": 3,
+    "paid_payout_cents": 425000,
+}
+
+
+@pytest.fixture
+def ledger(fake_pool):
+    rows = {PROVIDER_ID: LEDGER_ROW}
+    fake_pool.handler = lambda query, args: [rows[args[0]]] if args[0] in rows else []
+    return fake_pool
+
+
+class TestEndpoint:
+    """GET /api/v1/providers/{id}/earnings."""
+
+    def test_single_primary_key_read(self, ledger):
+        response = TestClient(app).get(f"/api/v1/providers/{PROVIDER_ID}/earnings")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "provider_id": PROVIDER_ID,
+            "total_earned": 425000,
+            "pending_payout": 85000,
+            "in_escrow": 120000,
+            "completed_payments": 3,
+            "avg_job_payout": 141666,
+        }
+        assert ledger.queries == [(earnings.EARNINGS_SQL, (PROVIDER_ID,))]
+
+    def test_provider_without_payments(self, ledger):
+        other = "00000000-0000-0000-0000-000000000001"
+
+        body = TestClient(app).get(f"/api/v1/providers/{other}/earnings").json()
+
+        assert body["total_earned"] == body["completed_payments"] == body["avg_job_payout"] == 0
+
+    def test_invalid_id_and_database_down(self, ledger, monkeypatch):
+        client = TestClient(app)
+        assert client.get("/api/v1/providers/not-a-uuid/earnings").status_code == 400
+
+        monkeypatch.setattr(main.database, "db_pool", None)
+        assert client.get(f"/api/v1/providers/{PROVIDER_ID}/earnings").status_code == 503
+
+
+class TestEscrowManager:
+    """The manager formats a ledger row; it never calls Stripe."""
+
+    def test_summary_from_ledger_row(self):
+        summary = EscrowManager().get_provider_earnings(PROVIDER_ID, ledger=LEDGER_ROW)
+
+        assert (summary.total_earned, summary.in_escrow, summary.avg_job_payout) == (425000, 120000, 141666)
@@ -0,0 +1,214 @@
+"""
+Enum Schema Tests
+Payment SQL and triggers against the production (Supabase) enum columns
+
+payments.status and payments.payout_status are payment_status_enum and
+payout_status_enum in supabase/migrations/001_initial_schema.sql, so every
+statement that writes or passes them must type its values accordingly.
+These tests build a scratch schema with those enum columns, apply the
+payment migrations to it and run the real SQL. They need a disposable
+Postgres: set TEST_DATABASE_URL to run them.
+"""
+
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import asyncpg
+import orjson
+import pytest
+import pytest_asyncio
+
+from src import db as database
+from src.payments import webhooks
+from src.payments.escrow_state import PaymentStatus, Transition, apply_transitions
+from src.payments.payout_reconciler import PayoutReconciler
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+MIGRATIONS = Path(__file__).resolve().parent.parent / "supabase" / "migrations"
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+# The enum columns of 001's payments table; everything else the migrations need
+BASE_TABLES_SQL = """
+    CREATE TABLE providers (id UUID PRIMARY KEY);
+    CREATE TABLE payments (
+        id                          UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        provider_id                 UUID NOT NULL REFERENCES providers(id),
+        stripe_payment_intent_id    TEXT NOT NULL UNIQUE,
+        stripe_transfer_id          TEXT,
+        provider_payout             NUMERIC(10,2) NOT NULL,
+        status                      payment_status_enum DEFAULT 'pending',
+        payout_status               payout_status_enum DEFAULT 'pending',
+        escrow_held_at              TIMESTAMPTZ,
+        captured_at                 TIMESTAMPTZ,
+        refunded_at                 TIMESTAMPTZ,
+        payout_completed_at         TIMESTAMPTZ,
+        updated_at                  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
+"""
+
+PAYMENT_MIGRATIONS = (
+    "005_payout_reconciliation.sql",
+    "006_webhook_events.sql",
+    "008_provider_earnings.sql",
+    "009_escrow_state.sql",
+)
+
+PROVIDER_ID = "5b1e7c3a-2d4f-4e6a-8b9c-0d1e2f3a4b5c"
+
+
+def enum_types_sql() -> str:
+    initial = (MIGRATIONS / "001_initial_schema.sql").read_text()
+    return "\n".join(re.findall(r"CREATE TYPE (?:payment|payout)_status_enum AS ENUM \([^)]*\);", initial))
+
+
+def migration_sql(name: str, schema: str) -> str:
+    return (MIGRATIONS / name).read_text().replace("public.", f"{schema}.")
+
+
+@pytest_asyncio.fixture
+async def enum_db():
+    """Scratch schema with enum payment columns, installed as the process-wide pool."""
+    schema = f"enum_schema_{uuid.uuid4().hex[:12]}"
+    admin = await asyncpg.connect(TEST_DATABASE_URL)
+    await admin.execute(f"CREATE SCHEMA {schema}")
+    pool = await asyncpg.create_pool(
+        TEST_DATABASE_URL, min_size=1, max_size=4, server_settings={"search_path": schema}
+    )
+    previous = database.db_pool
+    try:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(enum_types_sql())
+                await conn.execute(BASE_TABLES_SQL)
+                for name in PAYMENT_MIGRATIONS:
+                    await conn.execute(migration_sql(name, schema))
+                await conn.execute("INSERT INTO providers (id) VALUES ($1)", uuid.UUID(PROVIDER_ID))
+        database.db_pool = pool
+        yield pool
+    finally:
+        database.db_pool = previous
+        await pool.close()
+        await admin.execute(f"DROP SCHEMA {schema} CASCADE")
+        await admin.close()
+
+
+async def insert_payment(pool, intent_id, status, payout_status="pending", payout=Decimal("100.00"), transfer_id=None):
+    return await pool.fetchval(
+        """
+        INSERT INTO payments (provider_id, stripe_payment_intent_id, stripe_transfer_id,
+                              provider_payout, status, payout_status)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        RETURNING id::text
+        """,
+        uuid.UUID(PROVIDER_ID), intent_id, transfer_id, payout, status, payout_status,
+    )
+
+
+async def ledger(pool) -> dict:
+    row = await pool.fetchrow(
+        "SELECT total_earned_cents, pending_payout_cents, in_escrow_cents, completed_payments "
+        "FROM provider_earnings WHERE provider_id = $1",
+        uuid.UUID(PROVIDER_ID),
+    )
+    return dict(row) if row else {}
+
+
+class TestEarningsTriggers:
+    """Migration 008's statement triggers accept enum status columns."""
+
+    @pytest.mark.asyncio
+    async def test_insert_update_delete_maintain_ledger(self, enum_db):
+        paid = await insert_payment(enum_db, "pi_paid", "captured", "paid")
+        held = await insert_payment(enum_db, "pi_held", "escrow_held", payout=Decimal("50.00"))
+
+        assert await ledger(enum_db) == {
+            "total_earned_cents": 10000, "pending_payout_cents": 0, "in_escrow_cents": 5000, "completed_payments": 1,
+        }
+
+        await enum_db.execute("UPDATE payments SET status = 'captured' WHERE id = $1::uuid", held)
+        await enum_db.execute("DELETE FROM payments WHERE id = $1::uuid", paid)
+
+        assert await ledger(enum_db) == {
+            "total_earned_cents": 0, "pending_payout_cents": 5000, "in_escrow_cents": 0, "completed_payments": 0,
+        }
+
+
+class TestPayoutReconciler:
+    """APPLY_PAGE_SQL writes payout_status_enum values."""
+
+    @pytest.mark.asyncio
+    async def test_page_applied(self, enum_db):
+        payment_id = await insert_payment(enum_db, "pi_1", "captured", transfer_id="tr_1")
+        completed_at = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+        report = await PayoutReconciler(lookup=lambda transfer_id: ("paid", completed_at)).run()
+
+        row = await enum_db.fetchrow(
+            "SELECT payout_status::text, payout_completed_at FROM payments WHERE id = $1::uuid", payment_id
+        )
+        assert report.updated == 1
+        assert tuple(row) == ("paid", completed_at)
+        assert await ledger(enum_db) == {
+            "total_earned_cents": 10000, "pending_payout_cents": 0, "in_escrow_cents": 0, "completed_payments": 1,
+        }
+
+
+class TestWebhookProcessor:
+    """APPLY_STATUSES_SQL writes legal payment_status_enum moves; fallback events are leased then marked."""
+
+    @pytest.mark.asyncio
+    async def test_status_events_and_fallback(self, enum_db):
+        payment_id = await insert_payment(enum_db, "pi_1", "escrow_held")
+        refunded = await insert_payment(enum_db, "pi_refunded", "refunded")
+        events = [
+            webhooks.event_row(event, orjson.dumps(event))
+            for event in (
+                {"id": "evt_1", "type": "charge.succeeded", "created": 1760000000,
+                 "data": {"object": {"object": "charge", "payment_intent": "pi_1"}}},
+                {"id": "evt_2", "type": "charge.dispute.created", "created": 1760000001, "data": {"object": {}}},
+                {"id": "evt_3", "type": "charge.succeeded", "created": 1760000002,
+                 "data": {"object": {"object": "charge", "payment_intent": "pi_refunded"}}},
+            )
+        ]
+        await enum_db.fetch(webhooks.INSERT_EVENTS_SQL, *[list(column) for column in zip(*events)])
+        handled = []
+
+        async def fallback(event):
+            handled.append(event["id"])
+
+        assert await webhooks.WebhookProcessor(fallback=fallback).process_batch() == 3
+
+        assert await enum_db.fetchval("SELECT status::text FROM payments WHERE id = $1::uuid", payment_id) == "captured"
+        assert await enum_db.fetchval("SELECT status::text FROM payments WHERE id = $1::uuid", refunded) == "refunded"
+        assert handled == ["evt_2"]
+        assert await enum_db.fetchval("SELECT COUNT(*) FROM stripe_webhook_events WHERE processed_at IS NULL") == 0
+
+
+class TestEscrowTransitions:
+    """APPLY_TRANSITIONS_SQL compares and writes payment_status_enum values."""
+
+    @pytest.mark.asyncio
+    async def test_legal_applied_illegal_and_stale_rejected(self, enum_db):
+        held = await insert_payment(enum_db, "pi_held", "escrow_held")
+        refunded = await insert_payment(enum_db, "pi_refunded", "refunded")
+        stale = await insert_payment(enum_db, "pi_stale", "escrow_held")
+
+        report = await apply_transitions([
+            Transition(held, PaymentStatus.CAPTURED),
+            Transition(refunded, PaymentStatus.CAPTURED),
+            Transition(stale, PaymentStatus.FAILED, expected_version=3),
+        ])
+
+        assert [r.transition.payment_id for r in report.applied] == [held]
+        assert {r.transition.payment_id: (r.conflict, r.current_status) for r in report.conflicts} == {
+            refunded: ("illegal_transition", "refunded"), stale: ("version_conflict", "escrow_held"),
+        }
+        row = await enum_db.fetchrow(
+            "SELECT status::text, version, captured_at FROM payments WHERE id = $1::uuid", held
+        )
+        assert (row["status"], row["version"]) == ("captured", 1) and row["captured_at"] is not None
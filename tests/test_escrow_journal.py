@@ -0,0 +1,268 @@
+"""
+Escrow Journal Tests
+Idempotency keys, jittered retries and restart reconciliation
+"""
+
+import fcntl
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+import stripe
+
+from src.payments import async_escrow
+from src.payments.async_escrow import AsyncEscrowManager
+from src.payments.escrow_manager import EscrowManager, idempotency_key
+from src.payments.escrow_state import APPLY_TRANSITIONS_SQL
+from src.payments.journal import EscrowJournal
+
+
+class FlakyCapture:
+    """PaymentIntent.capture stand-in failing with `errors` before succeeding."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.keys = []
+
+    def __call__(self, payment_intent_id, idempotency_key=None):
+        self.keys.append(idempotency_key)
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(id=payment_intent_id, status="succeeded", charges=SimpleNamespace(data=[]))
+
+
+PAYMENT_ID = "5b1e7c3a-2d4f-4e6a-8b9c-0d1e2f3a4b5c"
+
+
+def timeout():
+    return stripe.error.APIConnectionError("Request timed out")
+
+
+@pytest.fixture
+def delays():
+    return []
+
+
+@pytest.fixture
+def make_manager(delays):
+    def make(journal, max_attempts=4):
+        return EscrowManager(journal=journal, max_attempts=max_attempts, sleep=delays.append)
+    return make
+
+
+class TestRetries:
+    """Transient errors retry with the same key; final errors do not."""
+
+    def test_retries_reuse_deterministic_key(self, monkeypatch, make_manager, delays):
+        capture = FlakyCapture(timeout(), stripe.error.RateLimitError("Too many requests"))
+        monkeypatch.setattr(stripe.PaymentIntent, "capture", capture)
+        journal = EscrowJournal(None)
+
+        result = make_manager(journal).capture_payment("pi_1", 105000, bid_id="bid-1")
+
+        assert result["status"] == "succeeded"
+        assert capture.keys == [idempotency_key("bid-1", "capture")] * 3
+        assert len(delays) == 2 and 0 <= delays[0] <= 0.25 and 0 <= delays[1] <= 0.5
+        # Settled operations are dropped from the journal
+        assert journal.entries(capture.keys[0]) == []
+        assert journal.pending() == []
+
+    def test_card_error_is_final(self, monkeypatch, make_manager, delays):
+        capture = FlakyCapture(stripe.error.CardError("Card declined", None, "card_declined"))
+        monkeypatch.setattr(stripe.PaymentIntent, "capture", capture)
+        journal = EscrowJournal(None)
+
+        with pytest.raises(ValueError, match="Failed to capture payment"):
+            make_manager(journal).capture_payment("pi_1", 105000, bid_id="bid-1")
+
+        assert len(capture.keys) == 1 and delays == []
+        assert journal.pending() == []
+
+    def test_distinct_partial_refunds_get_distinct_keys(self):
+        assert idempotency_key("bid-1", "refund:partial:500") != idempotency_key("bid-1", "refund:partial:700")
+
+    def test_equal_partial_refunds_keyed_by_sequence(self, monkeypatch, make_manager):
+        keys = []
+
+        def create(idempotency_key=None, **params):
+            keys.append(idempotency_key)
+            return SimpleNamespace(id="re_1", amount=params["amount"], status="succeeded",
+                                   payment_intent=params["payment_intent"])
+
+        monkeypatch.setattr(stripe.Refund, "create", create)
+        manager = make_manager(EscrowJournal(None))
+
+        manager.initiate_refund("pi_1", "partial", 500, bid_id="bid-1", refund_seq=1)
+        manager.initiate_refund("pi_1", "partial", 500, bid_id="bid-1", refund_seq=2)
+        manager.initiate_refund("pi_1", "partial", 500, bid_id="bid-1", refund_seq=2)  # retry of the second
+
+        assert keys[0] != keys[1] and keys[1] == keys[2]
+
+
+def exited(journal):
+    """Close `journal` as its process would on exit; the file is left under another (dead) pid."""
+    journal.close()
+    orphan = f"{journal.base_path}.0"
+    os.replace(journal.path, orphan)
+    return orphan
+
+
+class TestReconcile:
+    """Unknown outcomes survive a restart and are replayed idempotently."""
+
+    def test_replay_after_restart(self, monkeypatch, make_manager, tmp_path):
+        path = str(tmp_path / "escrow_journal.jsonl")
+        monkeypatch.setattr(stripe.PaymentIntent, "capture", FlakyCapture(timeout(), timeout()))
+        crashed = EscrowJournal(path)
+
+        with pytest.raises(ValueError):
+            make_manager(crashed, max_attempts=2).capture_payment("pi_1", 105000, bid_id="bid-1")
+
+        # New process: the exited one's pending entries are adopted, Stripe now reachable
+        orphan = exited(crashed)
+        capture = FlakyCapture()
+        monkeypatch.setattr(stripe.PaymentIntent, "capture", capture)
+        journal = EscrowJournal(path)
+        assert journal.pending() == []
+
+        replays = make_manager(journal).reconcile()
+
+        assert replays[0]["result"]["status"] == "succeeded"
+        assert capture.keys == [idempotency_key("bid-1", "capture")]
+        assert journal.pending() == []
+        assert not os.path.exists(orphan)
+        journal.close()
+
+    @pytest.mark.asyncio
+    async def test_async_manager_reconciles_on_entry(self, monkeypatch, make_manager, tmp_path, fake_pool):
+        path = str(tmp_path / "escrow_journal.jsonl")
+        monkeypatch.setattr(stripe.PaymentIntent, "capture", FlakyCapture(timeout()))
+        crashed = EscrowJournal(path)
+        with pytest.raises(ValueError):
+            make_manager(crashed, max_attempts=1).capture_payment("pi_1", 105000, bid_id="bid-1")
+        exited(crashed)
+
+        capture = FlakyCapture()
+        monkeypatch.setattr(stripe.PaymentIntent, "capture", capture)
+        journal = EscrowJournal(path)
+        fake_pool.handler = lambda query, args: (
+            [{"id": PAYMENT_ID, "stripe_payment_intent_id": "pi_1"}] if query == async_escrow.REPLAYED_PAYMENTS_SQL
+            else [{"id": PAYMENT_ID, "new_version": 2, "current_status": "captured", "current_version": 2}]
+        )
+
+        async with AsyncEscrowManager(make_manager(journal)):
+            assert capture.keys == [idempotency_key("bid-1", "capture")]
+            assert journal.pending() == []
+        journal.close()
+
+        # The replayed capture is recorded on the payment through the state machine
+        [(_, args)] = [(query, args) for query, args in fake_pool.queries if query == APPLY_TRANSITIONS_SQL]
+        assert args[:3] == ([PAYMENT_ID], ["captured"], [None])
+
+    def test_stale_operations_left_for_review(self, monkeypatch, make_manager, tmp_path):
+        path = str(tmp_path / "escrow_journal.jsonl")
+        capture = FlakyCapture()
+        monkeypatch.setattr(stripe.PaymentIntent, "capture", capture)
+        # A capture left unknown a day ago by an exited process: Stripe has forgotten its key
+        with open(f"{path}.0", "w") as orphan:
+            orphan.write(json.dumps({"key": "escrow:bid-1:capture", "phase": "intent", "operation": "capture_payment",
+                                     "params": {"payment_intent_id": "pi_1", "amount_cents": 105000,
+                                                "bid_id": "bid-1"},
+                                     "at": time.time() - 24 * 3600}) + "\n")
+        journal = EscrowJournal(path)
+
+        [replay] = make_manager(journal).reconcile()
+
+        assert "review" in replay and "result" not in replay
+        assert capture.keys == []
+        assert journal.pending() == []
+        assert [intent["key"] for intent in journal.needs_review()] == ["escrow:bid-1:capture"]
+        # Still there for the next process until someone settles it
+        exited(journal)
+        restarted = EscrowJournal(path)
+        assert restarted.adopt_orphans() == 1
+        assert make_manager(restarted).reconcile() == []
+        assert [intent["key"] for intent in restarted.needs_review()] == ["escrow:bid-1:capture"]
+        restarted.close()
+
+    def test_production_requires_journal_path(self, tmp_path):
+        with pytest.raises(ValueError, match="ESCROW_JOURNAL_PATH"):
+            EscrowJournal(None, required=True)
+
+        EscrowJournal(str(tmp_path / "escrow_journal.jsonl"), required=True).close()
+
+
+class TestProcessJournals:
+    """Each process owns its journal file; exited processes' files are adopted once."""
+
+    def test_one_open_journal_per_process_file(self, tmp_path):
+        journal = EscrowJournal(str(tmp_path / "escrow_journal.jsonl"))
+
+        assert journal.path == f"{tmp_path / 'escrow_journal.jsonl'}.{os.getpid()}"
+        with pytest.raises(ValueError, match="already open"):
+            EscrowJournal(journal.base_path)
+        journal.close()
+
+    def test_live_journals_are_not_adopted(self, tmp_path):
+        path = str(tmp_path / "escrow_journal.jsonl")
+        other = f"{path}.0"
+        # Another live process holding its journal
+        with open(other, "w") as held:
+            held.write(json.dumps({"key": "bid-9:capture", "phase": "intent", "operation": "capture_payment",
+                                   "params": {}, "at": 0}) + "\n")
+            held.flush()
+            fcntl.flock(held.fileno(), fcntl.LOCK_EX)
+            journal = EscrowJournal(path)
+
+            assert journal.adopt_orphans() == 0
+            assert os.path.exists(other)
+
+        # Once that process has exited, its pending operation moves here
+        assert journal.adopt_orphans() == 1
+        assert [p["key"] for p in journal.pending()] == ["bid-9:capture"]
+        assert not os.path.exists(other)
+        assert "bid-9:capture" in open(journal.path).read()
+        journal.close()
+
+    def test_managers_share_the_process_journal(self):
+        assert EscrowManager().journal is EscrowManager().journal
+
+
+class TestCompaction:
+    """Settled operations do not accumulate in memory or on disk."""
+
+    def test_adoption_keeps_only_pending_entries(self, tmp_path):
+        journal = EscrowJournal(str(tmp_path / "escrow_journal.jsonl"))
+        for i in range(3):
+            journal.record_intent(f"bid-{i}:capture", "capture_payment", {"payment_intent_id": f"pi_{i}"})
+        journal.record_outcome("bid-0:capture", "succeeded", stripe_id="pi_0")
+        journal.record_outcome("bid-1:capture", "unknown", error="timed out")
+        journal.record_outcome("bid-2:capture", "failed", error="card_declined")
+        exited(journal)
+
+        restarted = EscrowJournal(journal.base_path)
+        restarted.adopt_orphans()
+
+        assert [p["key"] for p in restarted.pending()] == ["bid-1:capture"]
+        with open(restarted.path) as adopted:
+            assert [json.loads(line)["phase"] for line in adopted] == ["intent", "unknown"]
+        restarted.close()
+
+    def test_compacts_after_settled_operations(self, tmp_path):
+        journal = EscrowJournal(str(tmp_path / "escrow_journal.jsonl"), compact_after=2)
+        journal.record_intent("bid-0:capture", "capture_payment", {})
+        for i in range(1, 3):
+            journal.record_intent(f"bid-{i}:capture", "capture_payment", {})
+            journal.record_outcome(f"bid-{i}:capture", "succeeded")
+
+        with open(journal.path) as compacted:
+            assert [json.loads(line)["key"] for line in compacted] == ["bid-0:capture"]
+
+        # Still appendable, and still this process's: another instance cannot open it
+        journal.record_outcome("bid-0:capture", "succeeded")
+        with pytest.raises(ValueError, match="already open"):
+            EscrowJournal(journal.base_path)
+        journal.close()
+        assert journal.pending() == []
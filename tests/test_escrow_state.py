@@ -0,0 +1,128 @@
+"""
+Escrow State Machine Tests
+Legal transitions, version checks and set-based batch application
+"""
+
+import uuid
+
+import pytest
+
+from src.payments import escrow_state
+from src.payments.escrow_state import (
+    IllegalTransitionError,
+    PaymentStatus,
+    Transition,
+    apply_transitions,
+    check_transition,
+    transition,
+)
+
+
+def pid(i):
+    return str(uuid.UUID(int=i))
+
+
+class PaymentsTable:
+    """payments(id, status, version) answering APPLY_TRANSITIONS_SQL."""
+
+    def __init__(self, rows):
+        self.rows = {payment_id: {"status": status, "version": 0} for payment_id, status in rows.items()}
+        self.statements = 0
+        self.interfere = None  # payment id changed by "another transaction" mid-statement
+
+    def __call__(self, query, args):
+        assert query == escrow_state.APPLY_TRANSITIONS_SQL
+        ids, targets, expected, legal_from, legal_to = args
+        legal = set(zip(legal_from, legal_to))
+        self.statements += 1
+        before = {payment_id: dict(row) for payment_id, row in self.rows.items()}
+        result = []
+        for payment_id, target, version in zip(ids, targets, expected):
+            row = self.rows.get(payment_id)
+            applied = None
+            if row is not None and payment_id != self.interfere:
+                if (version is None or row["version"] == version) and (row["status"], target) in legal:
+                    row["status"], row["version"] = target, row["version"] + 1
+                    applied = row["version"]
+            snapshot = before.get(payment_id, {})
+            result.append({
+                "id": payment_id,
+                "new_version": applied,
+                "current_status": snapshot.get("status"),
+                "current_version": snapshot.get("version"),
+            })
+        return result
+
+
+class TestTransitions:
+    """The transition table."""
+
+    def test_legal_and_terminal(self):
+        check_transition(PaymentStatus.PENDING, PaymentStatus.ESCROW_HELD)
+        check_transition(PaymentStatus.ESCROW_HELD, PaymentStatus.CAPTURED)
+        check_transition(PaymentStatus.CAPTURED, PaymentStatus.REFUNDED)
+        for terminal in (PaymentStatus.REFUNDED, PaymentStatus.FAILED, PaymentStatus.CANCELLED):
+            assert escrow_state.TRANSITIONS[terminal] == frozenset()
+
+    def test_illegal(self):
+        with pytest.raises(IllegalTransitionError, match="pending -> captured"):
+            check_transition(PaymentStatus.PENDING, PaymentStatus.CAPTURED)
+
+    def test_statuses_defined_once(self):
+        from src.payments import escrow_manager
+
+        assert escrow_manager.PaymentStatus is PaymentStatus
+
+
+class TestBatch:
+    """Thousands of transitions, a few statements, every conflict reported."""
+
+    @pytest.mark.asyncio
+    async def test_bulk_capture_in_chunks(self, fake_pool):
+        table = PaymentsTable({pid(i): "escrow_held" for i in range(12000)})
+        fake_pool.handler = table
+
+        report = await apply_transitions(
+            [Transition(pid(i), PaymentStatus.CAPTURED, expected_version=0) for i in range(12000)],
+            batch_size=5000,
+        )
+
+        assert table.statements == report.statements == 3
+        assert len(report.applied) == 12000 and not report.conflicts
+        assert report.applied[0].version == 1
+        assert all(row["status"] == "captured" for row in table.rows.values())
+
+    @pytest.mark.asyncio
+    async def test_conflicts_reported(self, fake_pool):
+        table = PaymentsTable({pid(1): "escrow_held", pid(2): "pending", pid(3): "escrow_held", pid(4): "escrow_held"})
+        table.rows[pid(3)]["version"] = 7
+        table.interfere = pid(4)
+        fake_pool.handler = table
+
+        report = await apply_transitions([
+            Transition(pid(1), PaymentStatus.CAPTURED),
+            Transition(pid(2), PaymentStatus.CAPTURED),
+            Transition(pid(3), PaymentStatus.CAPTURED, expected_version=6),
+            Transition(pid(4), PaymentStatus.CAPTURED),
+            Transition(pid(5), PaymentStatus.CAPTURED),
+        ])
+
+        assert [r.transition.payment_id for r in report.applied] == [pid(1)]
+        assert {r.transition.payment_id: r.conflict for r in report.conflicts} == {
+            pid(2): "illegal_transition",
+            pid(3): "version_conflict",
+            pid(4): "concurrent_update",
+            pid(5): "not_found",
+        }
+        assert table.rows[pid(2)]["status"] == "pending"
+        assert table.statements == 1
+
+    @pytest.mark.asyncio
+    async def test_single_transition_and_duplicates(self, fake_pool):
+        fake_pool.handler = PaymentsTable({pid(1): "pending"})
+
+        result = await transition(pid(1), PaymentStatus.ESCROW_HELD)
+        assert result.applied and result.version == 1
+
+        with pytest.raises(ValueError):
+            await apply_transitions([Transition(pid(1), PaymentStatus.FAILED), Transition(pid(1), PaymentStatus.CANCELLED)])
@@ -0,0 +1,102 @@
+"""
+Bid Event Tests
+In-process fan-out of bid NOTIFY payloads to SSE subscribers
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.events import BidEventHub, bid_event_stream
+from src.main import app
+
+REQUEST_ID = "7d9f2a4e-3c1b-4a5e-9f0d-2b6c8e1a4f73"
+
+
+def bid_payload(bid_id="b1", request_id=REQUEST_ID):
+    return json.dumps({
+        "id": bid_id,
+        "request_id": request_id,
+        "provider_name": "Peachtree Plumbing",
+        "amount_cents": 46000,
+        "status": "pending",
+    })
+
+
+class TestBidEventHub:
+    """One published event reaches every subscriber of that request only."""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_to_request_subscribers(self):
+        hub = BidEventHub()
+
+        with hub.subscribe(REQUEST_ID) as a, hub.subscribe(REQUEST_ID) as b, hub.subscribe("other") as other:
+            hub.publish(bid_payload())
+
+            assert (await a.get())["id"] == "b1"
+            assert (await b.get())["id"] == "b1"
+            assert other.empty()
+
+        assert hub.subscriber_count() == 0
+
+    def test_malformed_payload_ignored(self):
+        hub = BidEventHub()
+
+        hub.publish("not json")
+
+        assert hub.stats["published"] == 0
+
+
+class TestBidEventStream:
+    """SSE framing, heartbeats and overflow handling."""
+
+    @pytest.mark.asyncio
+    async def test_stream_emits_sse_frames(self):
+        hub = BidEventHub()
+        stream = bid_event_stream(hub, REQUEST_ID, heartbeat=10)
+
+        assert await stream.__anext__() == b"retry: 5000\n\n"
+        next_frame = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        hub.publish(bid_payload("b7"))
+        frame = (await next_frame).decode()
+
+        assert frame.startswith("id: b7\nevent: bid\ndata: ")
+        assert json.loads(frame.split("data: ", 1)[1])["amount_cents"] == 46000
+        await stream.aclose()
+        assert hub.subscriber_count(REQUEST_ID) == 0
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_when_idle(self):
+        hub = BidEventHub()
+        stream = bid_event_stream(hub, REQUEST_ID, heartbeat=0.01)
+
+        await stream.__anext__()
+
+        assert await stream.__anext__() == b": keepalive\n\n"
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_is_closed(self):
+        hub = BidEventHub(queue_size=2)
+        stream = bid_event_stream(hub, REQUEST_ID, heartbeat=10)
+        await stream.__anext__()
+
+        for i in range(5):
+            hub.publish(bid_payload(f"b{i}"))
+        frames = [frame async for frame in stream]
+
+        assert frames[-1].startswith(b"event: overflow")
+        assert hub.stats["overflowed"] == 3
+        assert hub.subscriber_count() == 0
+
+
+class TestBidStreamEndpoint:
+    """The SSE route validates the request ID before subscribing."""
+
+    def test_invalid_request_id_is_400(self):
+        response = TestClient(app).get("/api/v1/requests/not-a-uuid/bids/stream")
+
+        assert response.status_code == 400
@@ -0,0 +1,132 @@
+"""
+Export Tests
+Streaming NDJSON / CSV history exports
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import exports
+from src.main import app
+from src.pagination import Cursor
+
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+LAST_ID = "3f6c2a8e-9b1d-4e7a-8c5f-1d2e3a4b5c6d"
+
+
+def payment_rows(count):
+    return [
+        {
+            "id": f"pay-{i}",
+            "status": "captured",
+            "amount_total_cents": 105000,
+            "captured_at": None,
+            "created_at": BASE_TIME + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+class TestExportQuery:
+    """Export SQL is ordered and filterable."""
+
+    def test_orders_oldest_first_with_since(self):
+        query, args = exports.build_export_query(
+            "payments", {"pay.status": "captured", "pay.provider_id": None}, since=BASE_TIME
+        )
+
+        assert "pay.status = $1" in query
+        assert "pay.created_at > $2" in query
+        assert query.rstrip().endswith("ORDER BY pay.created_at, pay.id")
+        assert args == ["captured", BASE_TIME]
+
+    def test_resumes_after_last_row_key(self):
+        query, args = exports.build_export_query(
+            "payments", {"pay.status": "captured"}, since=BASE_TIME, after=Cursor(BASE_TIME, LAST_ID)
+        )
+
+        # Rows sharing the last row's created_at but with a later id are kept
+        assert "(pay.created_at, pay.id) > ($2::timestamptz, $3::uuid)" in query
+        assert "pay.created_at > $" not in query
+        assert args == ["captured", BASE_TIME, LAST_ID]
+
+
+class TestExportChunks:
+    """Rows are emitted in bounded chunks."""
+
+    @pytest.mark.asyncio
+    async def test_chunks_hold_at_most_chunk_rows(self, fake_pool):
+        fake_pool.handler = lambda query, args: payment_rows(25)
+
+        chunks = [c async for c in exports.export_chunks("SELECT", [], "ndjson", chunk_rows=10)]
+
+        assert [c.count(b"\n") for c in chunks] == [10, 10, 5]
+
+
+class TestExportEndpoints:
+    """Endpoints stream NDJSON and CSV."""
+
+    def test_ndjson_export(self, fake_pool):
+        fake_pool.handler = lambda query, args: payment_rows(3)
+        client = TestClient(app)
+
+        response = client.get("/api/v1/payments/export", params={"format": "ndjson"})
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert [line["id"] for line in lines] == ["pay-0", "pay-1", "pay-2"]
+        assert lines[0]["created_at"] == "2026-01-01T00:00:00Z"
+
+    def test_csv_export_has_single_header(self, fake_pool):
+        fake_pool.handler = lambda query, args: payment_rows(3)
+        client = TestClient(app)
+
+        response = client.get("/api/v1/payments/export", params={"format": "csv"})
+
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == ["id", "status", "amount_total_cents", "captured_at", "created_at"]
+        assert len(rows) == 4
+        assert 'filename="payments.csv"' in response.headers["content-disposition"]
+
+    def test_resume_with_after_id(self, fake_pool):
+        fake_pool.handler = lambda query, args: payment_rows(1)
+        client = TestClient(app)
+
+        response = client.get(
+            "/api/v1/bids/export", params={"since": BASE_TIME.isoformat(), "after_id": LAST_ID}
+        )
+
+        query, args = fake_pool.queries[0]
+        assert response.status_code == 200
+        assert "(b.created_at, b.id) > ($1::timestamptz, $2::uuid)" in query
+        assert args == (BASE_TIME, LAST_ID)
+
+    @pytest.mark.parametrize("params", [{"after_id": LAST_ID}, {"since": "2026-01-01T00:00:00Z", "after_id": "x"}])
+    def test_invalid_resume_position_rejected(self, fake_pool, params):
+        client = TestClient(app)
+
+        response = client.get("/api/v1/payments/export", params=params)
+
+        assert response.status_code == 400
+        assert fake_pool.queries == []
+
+    @pytest.mark.parametrize("params", [{"status": "bogus"}, {"payout_status": "captured"}])
+    def test_unknown_status_rejected(self, fake_pool, params):
+        client = TestClient(app)
+
+        response = client.get("/api/v1/payments/export", params=params)
+
+        assert response.status_code == 400
+        assert fake_pool.queries == []
+
+    def test_unknown_format_rejected(self, fake_pool):
+        client = TestClient(app)
+
+        response = client.get("/api/v1/requests/export", params={"format": "xlsx"})
+
+        assert response.status_code == 422
@@ -0,0 +1,68 @@
+"""
+Fee Engine Tests
+Batch fee columns match the scalar EscrowManager economics to the cent
+"""
+
+import numpy as np
+import pytest
+
+from src.payments.escrow_manager import EscrowManager
+from src.payments.fees import FEE_COLUMNS, FeePolicy, compute_fee_columns, compute_fees
+
+# Amounts where float products land close to a whole cent
+EDGE_AMOUNTS = [0, 1, 19, 20, 99, 100, 333, 1000, 6667, 33333, 100000, 142857, 999999, 10**9 + 7]
+
+
+def random_bids(n, seed=7):
+    rng = np.random.default_rng(seed)
+    amounts = np.concatenate([rng.integers(0, 10**7, n), EDGE_AMOUNTS])
+    tiers = rng.choice(["standard", "elite"], len(amounts))
+    return amounts, tiers
+
+
+class TestScalarParity:
+    """Every batch column equals compute_fees row for row."""
+
+    @pytest.mark.parametrize("policy", [FeePolicy(), FeePolicy(customer_fee_rate=0.07, elite_provider_fee=0.1)])
+    def test_columns_match_scalar(self, policy):
+        amounts, tiers = random_bids(20000)
+
+        columns = compute_fee_columns(amounts, tiers, policy)
+
+        for i, (amount, tier) in enumerate(zip(amounts.tolist(), tiers.tolist())):
+            expected = compute_fees(amount, tier, policy)
+            for name in FEE_COLUMNS:
+                assert columns[name][i] == getattr(expected, name), (amount, tier, name)
+
+    def test_matches_platform_economics(self):
+        manager = EscrowManager()
+        amounts, tiers = random_bids(500)
+        amounts[amounts == 0] = 1  # take rate divides by the bid
+
+        columns = compute_fee_columns(amounts, tiers)
+
+        for i, (amount, tier) in enumerate(zip(amounts.tolist(), tiers.tolist())):
+            economics = manager.calculate_platform_economics(amount, tier)
+            assert columns["amount_total"][i] == economics["customer_pays"]
+            assert columns["provider_payout"][i] == economics["provider_receives"]
+            assert columns["stripe_fee"][i] == economics["stripe_processing_fee"]
+            assert columns["net_platform_revenue"][i] == economics["net_platform_revenue"]
+
+
+class TestTierInputs:
+    """Tiers may be one name, an array of names, or an elite mask."""
+
+    def test_mask_and_names_agree(self):
+        amounts, tiers = random_bids(1000)
+
+        by_name = compute_fee_columns(amounts, tiers)
+        by_mask = compute_fee_columns(amounts, tiers == "elite")
+
+        for name in FEE_COLUMNS:
+            assert np.array_equal(by_name[name], by_mask[name])
+
+    def test_single_tier_for_all_rows(self):
+        columns = compute_fee_columns([100000, 50000], "elite")
+
+        assert columns["platform_fee"].tolist() == [12000, 6000]
+        assert columns["provider_payout"].dtype == np.int64
@@ -0,0 +1,63 @@
+"""
+Sparse Fieldset Tests
+?fields= is pushed into the SQL projection and the response
+"""
+
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from src.listings import BID_PROJECTION, PROVIDER_PROJECTION
+from src.main import app
+
+BID_ROW = {
+    "id": "b1c4e2a0-5d3f-4e7a-9c1b-2f6d8a0e4c71",
+    "amount_cents": 46000,
+    "submitted_at": datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc),
+}
+
+
+class TestProjection:
+    """Only requested columns, and the joins they need, are selected."""
+
+    def test_full_projection_keeps_join(self):
+        sql = BID_PROJECTION.select()
+
+        assert "p.business_name AS provider_name" in sql
+        assert "JOIN providers p" in sql
+
+    def test_unrequested_join_dropped(self):
+        sql = BID_PROJECTION.select(("id", "amount_cents"))
+
+        assert "JOIN providers" not in sql
+        assert "provider_name" not in sql
+
+    def test_unrequested_subqueries_dropped(self):
+        sql = PROVIDER_PROJECTION.select(("provider_id", "name"))
+
+        assert "verifications" not in sql
+
+
+class TestFieldsParameter:
+    """Endpoints select and return only the requested fields."""
+
+    def test_bids_sparse_fieldset(self, fake_pool):
+        fake_pool.handler = lambda query, args: [BID_ROW]
+        client = TestClient(app)
+
+        response = client.get(f"/api/v1/requests/{uuid.uuid4()}/bids", params={"fields": "id,amount_cents"})
+
+        assert response.status_code == 200
+        assert response.json()["items"] == [{"id": BID_ROW["id"], "amount_cents": 46000}]
+        query = fake_pool.queries[0][0]
+        assert "b.created_at AS submitted_at" in query  # keyset column always selected
+        assert "JOIN providers" not in query
+
+    def test_unknown_field_is_400(self, fake_pool):
+        client = TestClient(app)
+
+        response = client.get(f"/api/v1/requests/{uuid.uuid4()}/bids", params={"fields": "id,password"})
+
+        assert response.status_code == 400
+        assert fake_pool.queries == []
@@ -0,0 +1,116 @@
+"""
+Health Monitor Tests
+Health endpoints are served from a background snapshot
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import db as database
+from src import main
+from src.health import HealthMonitor
+from src.main import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def healthy_probe(lag=None):
+    async def probe(timeout=None):
+        return {"in_recovery": False, "replica_lag_seconds": lag}
+
+    return probe
+
+
+async def failing_probe(timeout=None):
+    raise ConnectionRefusedError("connection refused")
+
+
+@pytest.fixture
+def monitor(monkeypatch, fake_pool):
+    """HealthMonitor installed on the app with a healthy probe and fake pool."""
+    health_monitor = HealthMonitor(interval=5, probe=healthy_probe(), pool_stats=database.pool_stats, clock=FakeClock())
+    monkeypatch.setattr(main, "health_monitor", health_monitor)
+    return health_monitor
+
+
+class TestReadiness:
+    """Readiness reflects DB reachability, pool saturation and replica lag."""
+
+    @pytest.mark.asyncio
+    async def test_ready_when_healthy(self, monitor):
+        await monitor.refresh()
+
+        assert monitor.readiness()["status"] == "ready"
+
+    def test_not_ready_before_first_probe(self, monitor):
+        assert monitor.readiness()["reasons"] == ["starting"]
+
+    @pytest.mark.asyncio
+    async def test_probe_failure(self, monitor):
+        monitor.probe = failing_probe
+
+        await monitor.refresh()
+
+        readiness = monitor.readiness()
+        assert readiness["status"] == "not_ready"
+        assert "database unavailable" in readiness["reasons"]
+        assert readiness["error"] == "connection refused"
+
+    @pytest.mark.asyncio
+    async def test_pool_saturation(self, monitor, fake_pool):
+        fake_pool.size, fake_pool.idle, fake_pool.max_size = 20, 0, 20
+
+        await monitor.refresh()
+
+        assert monitor.readiness()["reasons"] == ["pool saturated"]
+        assert monitor.readiness()["pool"]["in_use"] == 20
+
+    @pytest.mark.asyncio
+    async def test_replica_lag(self, monitor):
+        monitor.probe = healthy_probe(lag=120.0)
+
+        await monitor.refresh()
+
+        assert monitor.readiness()["reasons"] == ["replica lag"]
+
+    @pytest.mark.asyncio
+    async def test_stale_snapshot(self, monitor):
+        await monitor.refresh()
+
+        monitor.clock.now += 16
+
+        assert "health snapshot stale" in monitor.readiness()["reasons"]
+
+
+class TestHealthEndpoints:
+    """Endpoints never touch the pool."""
+
+    @pytest.mark.asyncio
+    async def test_endpoints_serve_snapshot_without_queries(self, monitor, fake_pool):
+        await monitor.refresh()
+        client = TestClient(app)
+
+        live = client.get("/health")
+        ready = client.get("/health/ready")
+
+        assert live.json()["database"] == "ready"
+        assert ready.status_code == 200
+        assert ready.json()["status"] == "ready"
+        assert fake_pool.queries == []
+
+    @pytest.mark.asyncio
+    async def test_not_ready_is_503(self, monitor):
+        monitor.probe = failing_probe
+        await monitor.refresh()
+        client = TestClient(app)
+
+        response = client.get("/health/ready")
+
+        assert response.status_code == 503
+        assert client.get("/health").json()["database"] == "unavailable"
@@ -0,0 +1,57 @@
+"""
+Lazy Startup Tests
+Deferred SDK imports and on-demand clients
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from src.lazy import LazyClient, lazy_import
+
+
+class TestLazyClient:
+    """Clients are built once, on first attribute access."""
+
+    def test_factory_not_called_until_used(self):
+        calls = []
+        client = LazyClient(lambda: calls.append(1) or "payments")
+
+        assert calls == []
+        assert client.is_initialized is False
+
+        assert client.upper() == "PAYMENTS"
+        assert client.title() == "Payments"
+        assert calls == [1]
+
+    def test_reset_rebuilds_client(self):
+        calls = []
+        client = LazyClient(lambda: calls.append(1) or object())
+
+        first = client.get()
+        client.reset()
+        second = client.get()
+
+        assert first is not second
+        assert len(calls) == 2
+
+
+class TestLazyImport:
+    """Modules resolve immediately but execute on first use."""
+
+    def test_missing_module_raises(self):
+        with pytest.raises(ImportError):
+            lazy_import("module_that_does_not_exist_anywhere")
+
+    def test_api_import_does_not_load_heavy_sdks(self):
+        probe = (
+            "import sys, src.main; "
+            "print(','.join(m for m in ('asyncpg', 'sqlalchemy', 'stripe', 'uvicorn') "
+            "if type(sys.modules.get(m)).__name__ == 'module'))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", probe], capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == ""
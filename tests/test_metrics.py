@@ -0,0 +1,91 @@
+"""
+Metrics Tests
+RED metrics per route template and the /metrics endpoint
+"""
+
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import main, metrics
+from src.cache import ResponseCache
+from src.main import app
+from src.metrics import Histogram
+
+BIDS_ROUTE = "/api/v1/requests/{request_id}/bids"
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """The app's metrics registry, emptied, with an uncached providers route."""
+    monkeypatch.setattr(main, "response_cache", ResponseCache())
+    metrics.registry.routes.clear()
+    yield metrics.registry
+    metrics.registry.routes.clear()
+
+
+class TestHistogram:
+    """Bucketed observations and quantile bounds."""
+
+    def test_quantile_is_bucket_upper_bound(self):
+        histogram = Histogram((0.1, 0.5, 5.0))
+        for value in (0.05, 0.05, 0.3, 4.0):
+            histogram.observe(value)
+
+        assert histogram.quantile(0.5) == 0.1
+        assert histogram.quantile(0.95) == 5.0
+        assert histogram.count == 4
+
+
+class TestMetricsMiddleware:
+    """Requests are labelled by route template with DB time attached."""
+
+    def test_labels_by_route_template(self, registry, fake_pool):
+        client = TestClient(app)
+
+        for _ in range(3):
+            client.get(f"/api/v1/requests/{uuid.uuid4()}/bids")
+
+        metrics = registry.routes[("GET", BIDS_ROUTE)]
+        assert metrics.statuses == {200: 3}
+        assert metrics.duration.count == 3
+        assert metrics.db_queries == 3
+        assert metrics.response_size.sum > 0
+        assert not any("7d9f" in route for _method, route in registry.routes)
+
+    def test_errors_and_unmatched_paths(self, registry):
+        client = TestClient(app)
+
+        client.get(f"/api/v1/requests/{uuid.uuid4()}/bids")  # no pool -> 503
+        client.get("/no/such/path")
+
+        assert registry.routes[("GET", BIDS_ROUTE)].statuses == {503: 1}
+        assert registry.routes[("GET", "unmatched")].statuses == {404: 1}
+
+    def test_admission_rejections_labelled_by_route(self, registry, monkeypatch):
+        async def full(lane):
+            return False
+
+        monkeypatch.setattr(main.admission, "acquire", full)
+        client = TestClient(app)
+
+        assert client.get(f"/api/v1/requests/{uuid.uuid4()}/bids").status_code == 429
+
+        assert registry.routes[("GET", BIDS_ROUTE)].statuses == {429: 1}
+        assert ("GET", "unmatched") not in registry.routes
+
+
+class TestMetricsEndpoint:
+    """/metrics renders Prometheus text."""
+
+    def test_exposition(self, registry, fake_pool):
+        client = TestClient(app)
+        client.get("/api/v1/providers")
+
+        body = client.get("/metrics").text
+
+        assert 'http_requests_total{method="GET",route="/api/v1/providers",status="200"} 1' in body
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/v1/providers",le="5.0"} 1' in body
+        assert 'db_pool_connections{state="max_size"} 20' in body
+        assert "bid_stream_subscribers 0" in body
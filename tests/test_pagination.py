@@ -0,0 +1,168 @@
+"""
+Pagination Tests
+Keyset cursors and cursor-paginated list endpoints
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.pagination import Cursor, decode_cursor, encode_cursor, keyset_predicate, split_page
+
+BASE_TIME = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+REQUEST_ID = "7d9f2a4e-3c1b-4a5e-9f0d-2b6c8e1a4f73"
+
+
+def make_bid_rows(count):
+    """Bid rows newest-first, as the bids query returns them."""
+    return [
+        {
+            "id": str(uuid.UUID(int=count - i)),
+            "request_id": REQUEST_ID,
+            "provider_id": str(uuid.UUID(int=1000 + i)),
+            "provider_name": f"Provider {i}",
+            "amount_cents": 45000 + i * 1000,
+            "timeline_days": 7,
+            "status": "pending",
+            "submitted_at": BASE_TIME - timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+class TestCursorCodec:
+    """Cursor tokens round-trip and reject tampering."""
+
+    def test_round_trip(self):
+        token = encode_cursor(BASE_TIME, REQUEST_ID)
+
+        assert decode_cursor(token) == Cursor(created_at=BASE_TIME, id=REQUEST_ID)
+
+    def test_token_is_url_safe(self):
+        token = encode_cursor(BASE_TIME, REQUEST_ID)
+
+        assert all(c.isalnum() or c in "-_" for c in token)
+
+    def test_invalid_token_raises(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_non_uuid_id_raises(self):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor(BASE_TIME, "1; DROP TABLE payments"))
+
+
+class TestKeyset:
+    """Seek predicate and page splitting."""
+
+    def test_first_page_has_no_predicate(self):
+        assert keyset_predicate(None, first_param=3) == ("TRUE", [])
+
+    def test_predicate_numbers_params_after_filters(self):
+        cursor = Cursor(created_at=BASE_TIME, id=REQUEST_ID)
+
+        sql, args = keyset_predicate(cursor, first_param=3, created_at_column="b.created_at", id_column="b.id")
+
+        assert sql == "(b.created_at, b.id) < ($3::timestamptz, $4::uuid)"
+        assert args == [BASE_TIME, REQUEST_ID]
+
+    def test_extra_row_yields_next_cursor(self):
+        rows = make_bid_rows(4)
+
+        page, next_cursor = split_page(rows, 3, key=lambda r: (r["submitted_at"], r["id"]))
+
+        assert len(page) == 3
+        assert decode_cursor(next_cursor).id == rows[2]["id"]
+
+    def test_last_page_has_no_cursor(self):
+        page, next_cursor = split_page(make_bid_rows(2), 3, key=lambda r: (r["submitted_at"], r["id"]))
+
+        assert len(page) == 2
+        assert next_cursor is None
+
+
+class TestListEndpoints:
+    """Endpoints seek with the cursor instead of OFFSET."""
+
+    def test_bids_first_page(self, fake_pool):
+        fake_pool.handler = lambda query, args: make_bid_rows(3)
+        client = TestClient(app)
+
+        response = client.get(f"/api/v1/requests/{REQUEST_ID}/bids", params={"limit": 2})
+
+        body = response.json()
+        assert response.status_code == 200
+        assert len(body["items"]) == 2
+        assert body["next_cursor"] is not None
+        assert body["total"] is None
+        query, args = fake_pool.queries[0]
+        assert "OFFSET" not in query
+        assert args[-1] == 3  # limit + 1 probe row
+
+    def test_bids_next_page_passes_cursor_key(self, fake_pool):
+        rows = make_bid_rows(3)
+        token = encode_cursor(rows[1]["submitted_at"], rows[1]["id"])
+        client = TestClient(app)
+
+        client.get(f"/api/v1/requests/{REQUEST_ID}/bids", params={"limit": 2, "cursor": token})
+
+        query, args = fake_pool.queries[0]
+        assert "(b.created_at, b.id) <" in query
+        assert args[1:3] == (rows[1]["submitted_at"], rows[1]["id"])
+
+    def test_invalid_cursor_is_400(self, fake_pool):
+        client = TestClient(app)
+
+        response = client.get("/api/v1/providers", params={"cursor": "garbage"})
+
+        assert response.status_code == 400
+
+    def test_cursor_with_non_uuid_id_is_400(self, fake_pool):
+        client = TestClient(app)
+        cursor = encode_cursor(BASE_TIME, "not-a-uuid")
+
+        response = client.get("/api/v1/providers", params={"cursor": cursor})
+
+        assert response.status_code == 400
+        assert fake_pool.queries == []
+
+    @pytest.mark.parametrize("path", ["/api/v1/requests", f"/api/v1/requests/{REQUEST_ID}/bids"])
+    def test_unknown_status_is_400(self, fake_pool, path):
+        client = TestClient(app)
+
+        response = client.get(path, params={"status": "bogus"})
+
+        assert response.status_code == 400
+        assert fake_pool.queries == []
+
+    def test_known_status_filters(self, fake_pool):
+        client = TestClient(app)
+
+        client.get("/api/v1/requests", params={"status": "bidding"})
+
+        query, args = fake_pool.queries[0]
+        assert "sr.status = $1" in query and args[0] == "bidding"
+
+    def test_estimated_total_uses_explain(self, fake_pool):
+        def handler(query, args):
+            if query.startswith("EXPLAIN"):
+                return [{"QUERY PLAN": [{"Plan": {"Plan Rows": 45000}}]}]
+            return []
+
+        fake_pool.handler = handler
+        client = TestClient(app)
+
+        body = client.get("/api/v1/requests", params={"include_total": "true"}).json()
+
+        assert body["total"] == 45000
+        assert not any("COUNT(" in q for q, _ in fake_pool.queries)
+
+    def test_no_pool_is_503(self):
+        client = TestClient(app)
+
+        response = client.get("/api/v1/providers")
+
+        assert response.status_code == 503
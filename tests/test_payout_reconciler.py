@@ -0,0 +1,147 @@
+"""
+Payout Reconciler Tests
+Paged, concurrent Stripe lookups with batched writes and resumable checkpoints
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+import stripe
+
+from src.payments import payout_reconciler as reconciler_module
+from src.payments.payout_reconciler import PayoutReconciler
+
+ARRIVED = datetime(2026, 3, 4, tzinfo=timezone.utc)
+
+
+class PaymentsTable:
+    """In-memory payments + job_checkpoints answering the reconciler's SQL."""
+
+    def __init__(self, count):
+        self.payments = {
+            f"00000000-0000-0000-0000-{i:012d}": {"payout_status": "pending", "payout_completed_at": None}
+            for i in range(1, count + 1)
+        }
+        self.checkpoints = {}
+        self.writes = 0
+
+    def __call__(self, query, args):
+        if query == reconciler_module.CHECKPOINT_SQL:
+            return [{"position": self.checkpoints[args[0]]}] if args[0] in self.checkpoints else []
+        if query == reconciler_module.CLEAR_CHECKPOINT_SQL:
+            self.checkpoints.pop(args[0], None)
+            return []
+        if query == reconciler_module.OPEN_PAYOUTS_SQL:
+            after, limit = args
+            open_ids = sorted(
+                pid for pid, row in self.payments.items()
+                if row["payout_status"] in ("pending", "scheduled") and pid > after
+            )
+            return [
+                {"id": pid, "stripe_transfer_id": f"tr_{pid[-4:]}", **self.payments[pid]}
+                for pid in open_ids[:limit]
+            ]
+        if query == reconciler_module.APPLY_PAGE_SQL:
+            ids, statuses, completed, job, position = args
+            self.writes += 1
+            for pid, status, at in zip(ids, statuses, completed):
+                self.payments[pid] = {"payout_status": status, "payout_completed_at": at}
+            self.checkpoints[job] = position
+            return [{"updated": len(ids)}]
+        raise AssertionError(f"unexpected query: {query}")
+
+
+def paid_lookup(transfer_id):
+    number = int(transfer_id[3:])
+    if number % 5 == 0:
+        raise RuntimeError("stripe unavailable")
+    if number % 3 == 0:
+        return None  # no payout yet
+    return "paid", ARRIVED
+
+
+@pytest.fixture
+def table(fake_pool):
+    table = PaymentsTable(10)
+    fake_pool.handler = table
+    return table
+
+
+class TestRun:
+    """One batched write per page; failures and no-ops are left untouched."""
+
+    @pytest.mark.asyncio
+    async def test_reconciles_all_pages(self, table):
+        report = await PayoutReconciler(paid_lookup, page_size=4, concurrency=4).run()
+
+        assert (report.scanned, report.updated, report.failed, report.pages) == (10, 5, 2, 3)
+        assert table.writes == 3
+        assert table.payments["00000000-0000-0000-0000-000000000001"]["payout_status"] == "paid"
+        assert table.payments["00000000-0000-0000-0000-000000000005"]["payout_status"] == "pending"
+        assert table.checkpoints == {}
+
+    @pytest.mark.asyncio
+    async def test_lookups_bounded_by_concurrency(self, table):
+        lock = threading.Lock()
+        in_flight = peak = 0
+
+        def slow_lookup(transfer_id):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return "scheduled", None
+
+        await PayoutReconciler(slow_lookup, page_size=10, concurrency=3).run()
+
+        assert peak == 3
+
+
+class TestResume:
+    """An interrupted run continues after its last committed page."""
+
+    @pytest.mark.asyncio
+    async def test_resume_from_checkpoint(self, table):
+        seen = []
+
+        def recording_lookup(transfer_id):
+            seen.append(transfer_id)
+            return "paid", ARRIVED
+
+        first = await PayoutReconciler(recording_lookup, page_size=4).run(max_pages=1)
+        assert table.checkpoints == {"payout_reconciliation": "00000000-0000-0000-0000-000000000004"}
+
+        # Make the first page open again: a resumed run must not revisit it
+        for i in range(1, 5):
+            table.payments[f"00000000-0000-0000-0000-{i:012d}"]["payout_status"] = "pending"
+        second = await PayoutReconciler(recording_lookup, page_size=4).run()
+
+        assert first.scanned == 4
+        assert second.resumed_from == "00000000-0000-0000-0000-000000000004"
+        assert second.scanned == 6
+        assert len(seen) == 10 and len(set(seen)) == 10
+        assert table.checkpoints == {}
+
+
+class TestStripeLookup:
+    """A payout's arrival date is its completion time only once it is paid."""
+
+    @pytest.mark.parametrize("stripe_status,expected", [
+        ("paid", ("paid", ARRIVED)),
+        ("in_transit", ("scheduled", None)),
+        ("failed", ("failed", None)),
+    ])
+    def test_completed_at_only_when_paid(self, monkeypatch, stripe_status, expected):
+        monkeypatch.setattr(
+            stripe.Transfer, "retrieve", lambda transfer_id: SimpleNamespace(destination_payment="po_1")
+        )
+        monkeypatch.setattr(stripe.Payout, "retrieve", lambda payout_id: SimpleNamespace(
+            status=stripe_status, arrival_date=int(ARRIVED.timestamp())))
+
+        assert reconciler_module.stripe_payout_status("tr_1") == expected
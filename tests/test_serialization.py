@@ -0,0 +1,50 @@
+"""
+Serialization Tests
+Fast list-response path matches the validated Pydantic output
+"""
+
+import json
+from datetime import datetime, timezone
+
+from src.main import BidList, BidSummary, ProviderVerification
+from src.serialization import FastJSONResponse, page_payload, rows_to_items
+
+BID_ROW = {
+    "id": "b1c4e2a0-5d3f-4e7a-9c1b-2f6d8a0e4c71",
+    "request_id": "7d9f2a4e-3c1b-4a5e-9f0d-2b6c8e1a4f73",
+    "provider_id": "4e8a1c2b-9d0f-4b3a-8e7c-1a5d6f2b9c04",
+    "provider_name": "Peachtree Plumbing",
+    "amount_cents": 46000,
+    "timeline_days": 8,
+    "status": "pending",
+    "submitted_at": datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc),
+}
+
+
+class TestFastPath:
+    """orjson payloads are byte-for-byte compatible with Pydantic's JSON."""
+
+    def test_matches_validated_response(self):
+        fast = FastJSONResponse(page_payload([BID_ROW], BidSummary, 50, "abc", None)).body
+        validated = BidList(
+            total=None, limit=50, next_cursor="abc", items=[BidSummary(**BID_ROW)]
+        ).model_dump_json()
+
+        assert json.loads(fast) == json.loads(validated)
+
+    def test_extra_columns_dropped(self):
+        row = {
+            "provider_id": "4e8a1c2b-9d0f-4b3a-8e7c-1a5d6f2b9c04",
+            "name": "Peachtree Plumbing",
+            "status": "verified",
+            "license_verified": True,
+            "insurance_verified": True,
+            "background_check_verified": False,
+            "overall_tier": "elite",
+            "created_at": datetime(2026, 3, 1, tzinfo=timezone.utc),
+        }
+
+        items = rows_to_items([row], ProviderVerification)
+
+        assert "created_at" not in items[0]
+        assert list(items[0]) == list(ProviderVerification.model_fields)
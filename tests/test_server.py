@@ -0,0 +1,52 @@
+"""
+Server Profile Tests
+Worker sizing keeps total DB connections within budget
+"""
+
+import pytest
+
+from src import main
+from src.server import load_settings, worker_environment
+
+
+class TestSizing:
+    """Pools are sized per worker from one connection budget."""
+
+    @pytest.mark.parametrize("workers", [1, 2, 4, 8, 16])
+    def test_total_connections_within_budget(self, workers):
+        settings = load_settings({"WEB_CONCURRENCY": str(workers), "DATABASE_MAX_CONNECTIONS": "100"})
+
+        assert settings.workers == workers
+        assert settings.total_connections <= 100
+        assert settings.pool_size >= 2
+
+    def test_dedicated_orm_pool_splits_share(self):
+        settings = load_settings({
+            "WEB_CONCURRENCY": "4",
+            "DATABASE_MAX_CONNECTIONS": "100",
+            "DATABASE_ORM_POOL": "dedicated",
+        })
+
+        assert (settings.pool_size, settings.orm_pool_size) == (12, 12)
+        assert settings.total_connections == 100
+
+    def test_budget_too_small_rejected(self):
+        with pytest.raises(ValueError):
+            load_settings({"WEB_CONCURRENCY": "16", "DATABASE_MAX_CONNECTIONS": "20"})
+
+    def test_workers_open_full_pool_at_startup(self):
+        settings = load_settings({"WEB_CONCURRENCY": "2", "DATABASE_MAX_CONNECTIONS": "42"})
+
+        env = worker_environment(settings)
+
+        assert env["DATABASE_POOL_SIZE"] == env["DATABASE_POOL_MIN_SIZE"] == "20"
+        assert env["DATABASE_MAX_OVERFLOW"] == "0"
+
+
+class TestDrain:
+    """A draining worker reports not ready."""
+
+    def test_draining_fails_readiness(self, monkeypatch):
+        monkeypatch.setattr(main.health_monitor, "draining", True)
+
+        assert main.health_monitor.readiness()["reasons"][0] == "draining"
@@ -0,0 +1,131 @@
+"""
+Single-Flight Tests
+Identical concurrent reads share one database call
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from src import listings
+from src.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Concurrent identical calls collapse onto one execution."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+        executions = 0
+
+        async def load():
+            nonlocal executions
+            executions += 1
+            await release.wait()
+            return "rows"
+
+        waiters = [asyncio.create_task(flight.do("bids", "req-1", load)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert results == ["rows"] * 10
+        assert executions == 1
+        assert flight.group_stats["bids"].collapsed == 9
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight()
+        executions = 0
+
+        async def load():
+            nonlocal executions
+            executions += 1
+            return executions
+
+        assert await flight.do("bids", "req-1", load) == 1
+        assert await flight.do("bids", "req-1", load) == 2
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0)
+            return object()
+
+        a, b = await asyncio.gather(flight.do("bids", "a", load), flight.do("bids", "b", load))
+
+        assert a is not b
+        assert flight.group_stats["bids"].collapsed == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0)
+            raise RuntimeError("database down")
+
+        results = await asyncio.gather(
+            *(flight.do("bids", "req-1", load) for _ in range(3)), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "rows"
+
+        first = asyncio.create_task(flight.do("bids", "req-1", load))
+        second = asyncio.create_task(flight.do("bids", "req-1", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "rows"
+
+    def test_per_key_stats_are_bounded(self):
+        flight = SingleFlight(max_tracked_keys=2)
+
+        async def run():
+            async def load():
+                return None
+
+            for key in ("a", "b", "c"):
+                await flight.do("bids", key, load)
+
+        asyncio.run(run())
+
+        assert [key for _group, key in flight.key_stats] == ["b", "c"]
+        assert flight.group_stats["bids"].calls == 3
+
+
+class TestCoalescedListings:
+    """fetch_bids is single-flighted at the db boundary."""
+
+    @pytest.mark.asyncio
+    async def test_hot_request_bids_run_one_query(self, fake_pool):
+        row = {"id": "b1", "submitted_at": datetime(2026, 3, 1, tzinfo=timezone.utc)}
+        fake_pool.handler = lambda query, args: [row]
+        request_id = uuid.uuid4()
+
+        pages = await asyncio.gather(
+            *(listings.fetch_bids(request_id=request_id, limit=50) for _ in range(20))
+        )
+
+        assert len(fake_pool.queries) == 1
+        assert all(page.rows == [row] for page in pages)
+        snapshot = listings.read_flight.snapshot()
+        assert snapshot["hot_keys"][0]["collapsed"] >= 19
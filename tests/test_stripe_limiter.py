@@ -0,0 +1,156 @@
+"""
+Stripe Rate Limiter Tests
+Token pacing, priority classes, 429 back-off and queue-time metrics
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import stripe
+
+from src import metrics
+from src.payments.escrow_manager import EscrowManager
+from src.payments.journal import EscrowJournal
+from src.payments.stripe_limiter import Priority, StripeRateLimiter
+
+
+def rate_limited(**headers):
+    return stripe.error.RateLimitError("Too many requests", headers=headers, code="rate_limit")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPacing:
+    """Tokens are granted at the configured rate, in priority order."""
+
+    def test_waits_for_refill(self):
+        limiter = StripeRateLimiter(rate=20, burst=2, background_reserve=0)
+
+        waits = [limiter.acquire() for _ in range(4)]
+
+        assert waits[0] < 0.01 and waits[1] < 0.01
+        assert 0.03 <= waits[2] <= 0.2 and 0.03 <= waits[3] <= 0.2
+        assert limiter.queue_time[Priority.DEFAULT].count == 4
+
+    def test_interactive_served_before_background(self):
+        limiter = StripeRateLimiter(rate=10, burst=1, background_reserve=0)
+        limiter.acquire()
+        order = []
+
+        def take(priority):
+            limiter.acquire(priority)
+            order.append(priority)
+
+        background = [threading.Thread(target=take, args=(Priority.BACKGROUND,)) for _ in range(2)]
+        for thread in background:
+            thread.start()
+        while limiter.waiting[Priority.BACKGROUND] < 2:
+            time.sleep(0.001)
+        interactive = threading.Thread(target=take, args=(Priority.INTERACTIVE,))
+        interactive.start()
+        for thread in (*background, interactive):
+            thread.join(timeout=5)
+
+        assert order == [Priority.INTERACTIVE, Priority.BACKGROUND, Priority.BACKGROUND]
+
+    def test_background_leaves_reserve(self):
+        limiter = StripeRateLimiter(rate=10, burst=3, background_reserve=2)
+
+        assert limiter.acquire(Priority.BACKGROUND) < 0.01
+        assert limiter.acquire(Priority.INTERACTIVE) < 0.01
+        assert limiter.acquire(Priority.INTERACTIVE) < 0.01
+        assert limiter.acquire(Priority.BACKGROUND) >= 0.25
+
+
+class TestBackoff:
+    """A 429 pauses every class; lock contention on one object does not."""
+
+    def test_retry_after_pauses_bucket(self):
+        limiter = StripeRateLimiter(rate=100, burst=10)
+        request = SimpleNamespace(calls=0)
+
+        def throttled():
+            request.calls += 1
+            raise rate_limited(**{"retry-after": "0.2"})
+
+        with pytest.raises(stripe.error.RateLimitError):
+            limiter.call(Priority.BACKGROUND, throttled)
+
+        assert limiter.throttled == 1
+        assert limiter.acquire(Priority.INTERACTIVE) >= 0.15
+
+    def test_exponential_without_retry_after(self):
+        clock = Clock()
+        limiter = StripeRateLimiter(rate=10, burst=5, clock=clock)
+
+        assert limiter.throttle() == 0.5
+        clock.now = 0.1  # another in-flight call's 429 from the same episode
+        assert limiter.throttle() == 0.5
+        clock.now = 1.0
+        assert limiter.throttle() == 1.0
+        limiter.succeeded()
+        clock.now = 5.0
+        assert limiter.throttle() == 0.5
+
+    def test_lock_timeout_does_not_pause(self):
+        limiter = StripeRateLimiter(rate=100, burst=10)
+
+        def locked():
+            raise stripe.error.RateLimitError("Object locked", code="lock_timeout")
+
+        with pytest.raises(stripe.error.RateLimitError):
+            limiter.call(Priority.INTERACTIVE, locked)
+
+        assert limiter.throttled == 0
+        assert limiter.acquire() < 0.01
+
+
+class TestCallers:
+    """EscrowManager takes a token per attempt at its operation's class."""
+
+    def test_capture_is_interactive(self, monkeypatch, stripe_rate_limiter):
+        monkeypatch.setattr(
+            stripe.PaymentIntent, "capture",
+            lambda payment_intent_id, idempotency_key=None: SimpleNamespace(
+                id=payment_intent_id, status="succeeded", charges=SimpleNamespace(data=[])),
+        )
+
+        EscrowManager(journal=EscrowJournal(None)).capture_payment("pi_1", 105000, bid_id="bid-1")
+
+        assert stripe_rate_limiter.queue_time[Priority.INTERACTIVE].count == 1
+
+    @pytest.mark.asyncio
+    async def test_run_uses_the_limiters_threads(self):
+        limiter = StripeRateLimiter(rate=100, burst=10, max_concurrency=2)
+
+        threads = await asyncio.gather(*(
+            limiter.run(Priority.DEFAULT, lambda: threading.current_thread().name) for _ in range(3)
+        ))
+        limiter.close()
+
+        # Not the event loop's default executor, which a 429 pause would otherwise tie up
+        assert all(name.startswith("stripe-limiter") for name in threads)
+        assert limiter.queue_time[Priority.DEFAULT].count == 3
+
+    def test_queue_time_exposed(self):
+        registry = metrics.MetricsRegistry()
+        limiter = StripeRateLimiter()
+        limiter.acquire(Priority.BACKGROUND)
+        registry.register_histogram("stripe_limiter_queue_seconds", "Queue time.", lambda: {
+            f'priority="{p.name.lower()}"': h for p, h in limiter.queue_time.items()
+        })
+
+        text = registry.render()
+
+        assert "# TYPE stripe_limiter_queue_seconds histogram" in text
+        assert 'stripe_limiter_queue_seconds_count{priority="background"} 1' in text
+        assert 'stripe_limiter_queue_seconds_bucket{priority="interactive",le="+Inf"} 0' in text
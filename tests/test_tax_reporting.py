@@ -0,0 +1,124 @@
+"""
+Tax Reporting Tests
+One grouped aggregate for all providers; detail files only for reportable ones
+"""
+
+import csv
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from src.payments import tax_reporting
+from src.payments.tax_reporting import Tax1099Job, provider_summary
+
+
+def paid_at(month):
+    return datetime(2025, month, 1, tzinfo=timezone.utc)
+
+
+class PaymentsTable:
+    """Paid payouts + tax_1099_summaries answering the job's SQL."""
+
+    def __init__(self, payouts):
+        # (provider_id, dollars, payout_completed_at)
+        self.payouts = payouts
+        self.summaries = {}
+
+    def __call__(self, query, args):
+        if query == tax_reporting.SUMMARIZE_YEAR_SQL:
+            year, start, end, threshold = args
+            totals = {}
+            for provider_id, amount, at in self.payouts:
+                if start <= at < end:
+                    gross, count = totals.get(provider_id, (Decimal(0), 0))
+                    totals[provider_id] = (gross + amount, count + 1)
+            self.summaries = {
+                (provider_id, year): (gross, count, gross * 100 >= threshold)
+                for provider_id, (gross, count) in totals.items()
+            }
+            return [{
+                "providers": len(totals),
+                "reportable": sum(1 for _, _, reportable in self.summaries.values() if reportable),
+                "gross_cents": int(sum(gross for gross, _ in totals.values()) * 100),
+            }]
+        if query == tax_reporting.REPORTABLE_DETAIL_SQL:
+            year, start, end = args
+            rows = [
+                {
+                    "provider_id": provider_id, "payment_id": f"pay_{i}", "request_id": f"req_{i}",
+                    "payout_completed_at": at, "provider_payout_cents": int(amount * 100),
+                }
+                for i, (provider_id, amount, at) in enumerate(self.payouts)
+                if start <= at < end and self.summaries[(provider_id, year)][2]
+            ]
+            return sorted(rows, key=lambda row: (row["provider_id"], row["payout_completed_at"]))
+        if query == tax_reporting.SUMMARY_SQL:
+            provider_id, year = args
+            if (provider_id, year) not in self.summaries:
+                return []
+            gross, count, _ = self.summaries[(provider_id, year)]
+            return [{"gross_cents": int(gross * 100), "transaction_count": count}]
+        if query == tax_reporting.PROVIDER_TOTALS_SQL:
+            return [{"gross_cents": 12345, "transaction_count": 3}]
+        raise AssertionError(f"unexpected query: {query}")
+
+
+@pytest.fixture
+def table(fake_pool):
+    table = PaymentsTable([
+        ("prov_a", Decimal("400.00"), paid_at(3)),
+        ("prov_a", Decimal("250.00"), paid_at(1)),
+        ("prov_b", Decimal("599.99"), paid_at(6)),
+        ("prov_c", Decimal("600.00"), paid_at(12)),
+        ("prov_c", Decimal("900.00"), datetime(2026, 1, 1, tzinfo=timezone.utc)),
+    ])
+    fake_pool.handler = table
+    return table
+
+
+class TestJob:
+    """Totals in one statement, streamed detail for reportable providers."""
+
+    @pytest.mark.asyncio
+    async def test_run(self, table, fake_pool, tmp_path):
+        report = await Tax1099Job(output_dir=str(tmp_path)).run(2025)
+
+        assert (report.providers, report.reportable, report.gross_cents) == (3, 2, 184999)
+        assert [query for query, _ in fake_pool.queries] == [
+            tax_reporting.SUMMARIZE_YEAR_SQL, tax_reporting.REPORTABLE_DETAIL_SQL,
+        ]
+        assert sorted(p.name for p in (tmp_path / "2025").iterdir()) == ["prov_a.csv", "prov_c.csv"]
+        with open(tmp_path / "2025" / "prov_a.csv") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == tax_reporting.DETAIL_COLUMNS
+        assert [row[3] for row in rows[1:]] == ["25000", "40000"]
+        assert (report.detail_files, report.detail_rows) == (2, 3)
+
+    @pytest.mark.asyncio
+    async def test_summaries_only(self, table, fake_pool, tmp_path):
+        await Tax1099Job(output_dir=str(tmp_path)).run(2025, write_details=False)
+
+        assert len(fake_pool.queries) == 1
+        assert not (tmp_path / "2025").exists()
+
+
+class TestProviderSummary:
+    """Job output is read by key; before a run, one provider is aggregated."""
+
+    @pytest.mark.asyncio
+    async def test_reads_job_output(self, table, tmp_path):
+        await Tax1099Job(output_dir=str(tmp_path)).run(2025, write_details=False)
+
+        summary = await provider_summary("prov_b", 2025)
+
+        assert summary["gross_income_cents"] == 59999
+        assert summary["job_count"] == 1
+        assert summary["should_issue_1099"] is False
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_aggregate(self, table, fake_pool):
+        summary = await provider_summary("prov_a", 2024)
+
+        assert summary["gross_income_cents"] == 12345
+        assert fake_pool.queries[-1][0] == tax_reporting.PROVIDER_TOTALS_SQL
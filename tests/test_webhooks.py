@@ -0,0 +1,196 @@
+"""
+Webhook Queue Tests
+Signature checks, durable deduplicated ingest and coalesced processing
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from src import db as database
+from src import main
+from src.main import app
+from src.payments import webhooks
+from src.payments.webhooks import SignatureError, WebhookIngestor, WebhookProcessor, sign_payload, verify_event
+
+SECRET = "whsec_test"
+
+
+def charge_event(event_id, payment_intent, type="charge.succeeded", created=1760000000):
+    return {
+        "id": event_id,
+        "type": type,
+        "created": created,
+        "data": {"object": {"object": "charge", "id": f"ch_{event_id}", "payment_intent": payment_intent}},
+    }
+
+
+class InboxTable:
+    """stripe_webhook_events stand-in for the insert statement."""
+
+    def __init__(self):
+        self.events = {}
+        self.inserts = 0
+
+    def __call__(self, query, args):
+        assert query == webhooks.INSERT_EVENTS_SQL
+        self.inserts += 1
+        new = []
+        for event_id, *row in zip(*args):
+            if event_id not in self.events:
+                self.events[event_id] = row
+                new.append({"event_id": event_id})
+        return new
+
+
+class TestSignature:
+    """Stripe-Signature verification."""
+
+    def test_valid_signature(self):
+        payload = orjson.dumps(charge_event("evt_1", "pi_1"))
+
+        event = verify_event(payload, sign_payload(payload, SECRET), SECRET)
+
+        assert event["id"] == "evt_1"
+
+    @pytest.mark.parametrize("header", ["", "t=1,v1=deadbeef", "v1=abc"])
+    def test_rejects_bad_headers(self, header):
+        with pytest.raises(SignatureError):
+            verify_event(b"{}", header, SECRET)
+
+    def test_rejects_tampered_payload_and_stale_timestamp(self):
+        payload = orjson.dumps(charge_event("evt_1", "pi_1"))
+        header = sign_payload(payload, SECRET, timestamp=1000)
+
+        with pytest.raises(SignatureError, match="tolerance"):
+            verify_event(payload, header, SECRET)
+        with pytest.raises(SignatureError, match="No matching"):
+            verify_event(payload + b" ", header, SECRET, now=1000)
+
+
+class TestIngest:
+    """Acknowledged events are committed once, in group commits."""
+
+    @pytest.fixture
+    def inbox(self, fake_pool, monkeypatch):
+        monkeypatch.setattr(webhooks, "STRIPE_WEBHOOK_SECRET", SECRET)
+        monkeypatch.setattr(main, "webhook_ingestor", WebhookIngestor())
+        inbox = InboxTable()
+        fake_pool.handler = inbox
+        return inbox
+
+    def post(self, client, event):
+        payload = orjson.dumps(event)
+        return client.post(
+            "/api/v1/webhooks/stripe", content=payload, headers={"Stripe-Signature": sign_payload(payload, SECRET)}
+        )
+
+    def test_redelivery_is_deduplicated(self, inbox):
+        client = TestClient(app)
+
+        first = self.post(client, charge_event("evt_1", "pi_1"))
+        second = self.post(client, charge_event("evt_1", "pi_1"))
+
+        assert first.status_code == second.status_code == 200
+        assert list(inbox.events) == ["evt_1"]
+        assert main.webhook_ingestor.stats["duplicates"] == 1
+
+    def test_bad_signature_rejected(self, inbox):
+        response = TestClient(app).post(
+            "/api/v1/webhooks/stripe", content=b"{}", headers={"Stripe-Signature": "t=1,v1=00"}
+        )
+
+        assert response.status_code == 400
+        assert inbox.inserts == 0
+
+    def test_database_down_is_503(self, inbox, monkeypatch):
+        monkeypatch.setattr(main.database, "db_pool", None)
+
+        assert self.post(TestClient(app), charge_event("evt_1", "pi_1")).status_code == 503
+
+    @pytest.mark.asyncio
+    async def test_concurrent_events_share_inserts(self, inbox):
+        ingestor = WebhookIngestor(max_batch=100)
+        events = [charge_event(f"evt_{i}", f"pi_{i % 7}") for i in range(250)]
+
+        await asyncio.gather(*(ingestor.ingest(event, orjson.dumps(event)) for event in events))
+        await ingestor.close()
+
+        assert len(inbox.events) == 250
+        assert inbox.inserts <= 4
+
+
+class TestProcessor:
+    """Charge events coalesce per PaymentIntent; others go to the fallback."""
+
+    @pytest.mark.asyncio
+    async def test_coalesced_batch(self, fake_pool, monkeypatch):
+        def at(second):
+            return datetime.fromtimestamp(1760000000 + second, tz=timezone.utc)
+
+        claimed = [
+            {"event_id": "evt_1", "type": "charge.succeeded", "payment_intent_id": "pi_1", "created": at(0)},
+            {"event_id": "evt_2", "type": "charge.succeeded", "payment_intent_id": "pi_2", "created": at(1)},
+            {"event_id": "evt_3", "type": "charge.failed", "payment_intent_id": "pi_1", "created": at(2)},
+            {"event_id": "evt_4", "type": "charge.dispute.created", "payment_intent_id": None, "created": at(3)},
+        ]
+        for row in claimed:
+            row["payload"] = orjson.dumps({"id": row["event_id"], "type": row["type"]}).decode()
+        fake_pool.handler = lambda query, args: (
+            claimed if query == webhooks.CLAIM_EVENTS_SQL
+            # pi_1 is refunded already: failed is not a legal move from there
+            else [{"stripe_payment_intent_id": "pi_2"}] if query == webhooks.APPLY_STATUSES_SQL
+            else []
+        )
+        handled = []
+        open_transactions = []
+        claim_transaction = database.transaction
+
+        @asynccontextmanager
+        async def tracked_transaction():
+            async with claim_transaction() as conn:
+                open_transactions.append(conn)
+                yield conn
+                open_transactions.pop()
+
+        monkeypatch.setattr(database, "transaction", tracked_transaction)
+
+        async def fallback(event):
+            handled.append((event["id"], len(open_transactions)))
+            raise RuntimeError("dispute handler down")
+
+        processor = WebhookProcessor(fallback=fallback)
+        assert await processor.process_batch() == 4
+
+        statements = {query: args for query, args in fake_pool.queries}
+        intents, statuses, _, legal_from, legal_to = statements[webhooks.APPLY_STATUSES_SQL]
+        assert dict(zip(intents, statuses)) == {"pi_1": "failed", "pi_2": "captured"}
+        assert ("refunded", "captured") not in set(zip(legal_from, legal_to))
+        assert ("escrow_held", "captured") in set(zip(legal_from, legal_to))
+        marked = {}
+        for query, args in fake_pool.queries:
+            if query == webhooks.MARK_PROCESSED_SQL:
+                marked.update(zip(*args))
+        assert marked == {"evt_1": None, "evt_2": None, "evt_3": None, "evt_4": "dispute handler down"}
+        assert statements[webhooks.LEASE_EVENTS_SQL][0] == ["evt_4"]
+        # Handled after the claim transaction committed, then marked on its own
+        assert handled == [("evt_4", 0)]
+        assert fake_pool.queries[-1][0] == webhooks.MARK_PROCESSED_SQL
+        assert processor.stats["coalesced"] == 1
+        assert processor.stats["status_updates"] == 1 and processor.stats["skipped"] == 1
+        assert processor.stats["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_without_fallback_other_types_stay_queued(self, fake_pool):
+        fake_pool.handler = lambda query, args: []
+
+        await WebhookProcessor().process_batch()
+        await WebhookProcessor(event_types=["charge.succeeded", "account.updated"]).process_batch()
+
+        claims = [args for query, args in fake_pool.queries if query == webhooks.CLAIM_EVENTS_SQL]
+        assert sorted(claims[0][1]) == sorted(webhooks.COALESCED_STATUS)
+        assert claims[1][1] == ["charge.succeeded"]